@@ -0,0 +1,167 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Builds the index mappings of all the (blended) GPT datasets of a training config offline, on CPU and without
+torch.distributed, so that a large job does not have to build them on rank 0 while all the other ranks wait.
+
+It takes the same config and overrides as megatron_gpt_pretraining.py, and builds exactly the index mappings that
+the training will load. With model.data.index_mapping_cache_dir set, the index mappings are content-addressed, and
+shared by all the jobs using the same documents, sequence length and seed.
+
+python megatron_gpt_build_index_mappings.py \
+    model.data.data_prefix=[0.5,/data/my-gpt3_00_text_document,0.5,/data/my-gpt3_01_text_document] \
+    model.data.index_mapping_cache_dir=/data/index_mapping_cache \
+    model.data.seq_length=2048 \
+    model.global_batch_size=1536 \
+    trainer.max_steps=300000 \
+    +num_workers=16
+"""
+
+import multiprocessing
+import os
+import time
+
+import numpy as np
+from omegaconf import OmegaConf
+from omegaconf.dictconfig import DictConfig
+
+from nemo.collections.nlp.data.language_modeling.megatron.base_dataset_utils import (
+    get_datasets_weights_and_num_samples,
+    get_train_valid_test_split_,
+)
+from nemo.collections.nlp.data.language_modeling.megatron.dataset_utils import compile_helper
+from nemo.collections.nlp.data.language_modeling.megatron.gpt_dataset import build_index_mapping_files
+from nemo.collections.nlp.data.language_modeling.megatron.indexed_dataset import make_dataset as make_indexed_dataset
+from nemo.core.config import hydra_runner
+from nemo.utils import logging
+
+
+def get_train_valid_test_num_samples(cfg):
+    """Number of train, validation and test samples, as in MegatronGPTModel.build_train_valid_test_datasets."""
+    global_batch_size = cfg.model.global_batch_size
+    max_train_steps = cfg.trainer.max_steps
+    eval_iters = (max_train_steps // cfg.trainer.val_check_interval + 1) * cfg.trainer.limit_val_batches
+    test_iters = cfg.trainer.limit_test_batches
+
+    train_valid_test_num_samples = [
+        max_train_steps * global_batch_size,
+        eval_iters * global_batch_size,
+        test_iters * global_batch_size,
+    ]
+    if cfg.trainer.limit_val_batches <= 1.0 and isinstance(cfg.trainer.limit_val_batches, float):
+        train_valid_test_num_samples[1] = 1
+    return train_valid_test_num_samples
+
+
+def get_index_mapping_jobs(cfg, train_valid_test_num_samples):
+    """Index mappings of the datasets built by gpt_dataset.build_train_valid_test_datasets.
+
+    Returns:
+        A list of (name, data prefix, index of the split of the documents or None for all of them, number of samples).
+    """
+    data_prefix = cfg.model.data.data_prefix
+    names = ['train', 'valid', 'test']
+    jobs = []
+
+    if isinstance(data_prefix, DictConfig):
+        # Separate datasets, with all their documents
+        for index, (name, key) in enumerate(zip(names, ['train', 'validation', 'test'])):
+            num_samples = int(train_valid_test_num_samples[index])
+            prefixes = list(data_prefix[key])
+            if len(prefixes) == 1:
+                jobs.append((name, prefixes[0], None, num_samples))
+            else:
+                prefixes, _, datasets_num_samples = get_datasets_weights_and_num_samples(prefixes, num_samples)
+                for prefix, dataset_num_samples in zip(prefixes, datasets_num_samples):
+                    jobs.append((name, prefix, None, dataset_num_samples))
+        return jobs
+
+    # Train, validation and test splits of the documents of every dataset
+    if len(data_prefix) == 1:
+        prefixes, datasets_num_samples = [data_prefix[0]], [train_valid_test_num_samples]
+    else:
+        prefixes, _, datasets_num_samples = get_datasets_weights_and_num_samples(
+            list(data_prefix), train_valid_test_num_samples
+        )
+    for prefix, dataset_num_samples in zip(prefixes, datasets_num_samples):
+        for index, name in enumerate(names):
+            jobs.append((name, prefix, index, dataset_num_samples[index]))
+    return jobs
+
+
+class IndexMappingBuilder:
+    def __init__(self, cfg):
+        self.data_cfg = cfg.model.data
+        self.seed = cfg.model.seed
+
+    def build(self, job):
+        name, data_prefix, split_index, num_samples = job
+        indexed_dataset = make_indexed_dataset(data_prefix, self.data_cfg.data_impl, skip_warmup=True)
+        total_num_of_documents = indexed_dataset.sizes.shape[0]
+        if split_index is None:
+            start, end = 0, total_num_of_documents
+        else:
+            splits = get_train_valid_test_split_(self.data_cfg.splits_string, total_num_of_documents)
+            start, end = splits[split_index], splits[split_index + 1]
+            if end <= start:
+                return job, None
+
+        drop_last = True
+        if name == 'valid':
+            drop_last = self.data_cfg.get('validation_drop_last', True)
+        add_extra_token = 0 if self.data_cfg.get('no_seqlen_plus_one_input_tokens', False) else 1
+        filename, _ = build_index_mapping_files(
+            name,
+            data_prefix,
+            np.arange(start=start, stop=end, step=1, dtype=np.int32),
+            indexed_dataset.sizes,
+            num_samples,
+            self.data_cfg.seq_length,
+            self.seed,
+            index_mapping_dir=self.data_cfg.get('index_mapping_dir', None),
+            drop_last=drop_last,
+            add_extra_token=add_extra_token,
+            index_mapping_cache_dir=self.data_cfg.get('index_mapping_cache_dir', None),
+        )
+        return job, filename
+
+
+@hydra_runner(config_path="conf", config_name="megatron_gpt_config")
+def main(cfg) -> None:
+    logging.info(f'\n{OmegaConf.to_yaml(cfg.model.data)}')
+    for mapping_dir in [cfg.model.data.get('index_mapping_dir'), cfg.model.data.get('index_mapping_cache_dir')]:
+        if mapping_dir is not None:
+            os.makedirs(mapping_dir, exist_ok=True)
+    # compile the C++ helpers once, before the workers use them
+    compile_helper()
+
+    jobs = get_index_mapping_jobs(cfg, get_train_valid_test_num_samples(cfg))
+    builder = IndexMappingBuilder(cfg)
+    num_workers = min(cfg.get('num_workers', 1), len(jobs))
+    logging.info(f'Building {len(jobs)} index mappings with {num_workers} workers.')
+
+    start_time = time.time()
+    with multiprocessing.Pool(num_workers) as pool:
+        for i, (job, filename) in enumerate(pool.imap_unordered(builder.build, jobs), start=1):
+            name, data_prefix, _, num_samples = job
+            if filename is None:
+                logging.info(f'{i}/{len(jobs)}: no {name} documents in {data_prefix}')
+            else:
+                logging.info(f'{i}/{len(jobs)}: {name} {data_prefix} ({num_samples} samples) -> {filename}')
+    logging.info(f'Built {len(jobs)} index mappings in {time.time() - start_time:.1f} seconds.')
+
+
+if __name__ == '__main__':
+    main()  # noqa pylint: disable=no-value-for-parameter
@@ -23,6 +23,10 @@ from torch.utils.data import DataLoader, Dataset
 from nemo.collections.nlp.models.language_modeling.megatron_gpt_model import MegatronGPTModel
 from nemo.collections.nlp.modules.common.megatron.megatron_init import fake_initialize_model_parallel
 from nemo.collections.nlp.modules.common.megatron_web_server import get_demo
+from nemo.collections.nlp.modules.common.text_generation_scheduler import (
+    ContinuousBatchingScheduler,
+    MegatronGPTStepModel,
+)
 from nemo.collections.nlp.modules.common.text_generation_server import MegatronServer
 from nemo.collections.nlp.modules.common.text_generation_utils import generate
 from nemo.collections.nlp.modules.common.transformer.text_generation import LengthParam, SamplingParam
@@ -258,7 +262,12 @@ def main(cfg) -> None:
             if cfg.web_server:
                 thread = threading.Thread(target=get_demo, daemon=True, args=(cfg.share, cfg.username, cfg.password))
                 thread.start()
-            server = MegatronServer(model.cuda())
+            scheduler = None
+            if cfg.get('continuous_batching_max_batch_size', 0) > 0:
+                scheduler = ContinuousBatchingScheduler(
+                    MegatronGPTStepModel(model.cuda()), model.tokenizer, cfg.continuous_batching_max_batch_size
+                )
+            server = MegatronServer(model.cuda(), scheduler=scheduler)
             server.run("0.0.0.0", port=cfg.port)
 
         while True:
@@ -16,6 +16,7 @@ import json
 import math
 import multiprocessing
 import os
+from collections import OrderedDict
 from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 import braceexpand
@@ -25,10 +26,11 @@ import webdataset as wd
 from torch.utils.data import ChainDataset
 from tqdm import tqdm
 
+from nemo.collections.asr.parts.preprocessing.audio_cache import DecodedAudioCache
 from nemo.collections.asr.parts.preprocessing.features import WaveformFeaturizer
 from nemo.collections.asr.parts.utils.audio_utils import ChannelSelectorType
 from nemo.collections.common import tokenizers
-from nemo.collections.common.parts.preprocessing import collections, parsers
+from nemo.collections.common.parts.preprocessing import collections, compiled_manifest, parsers
 from nemo.core.classes import Dataset, IterableDataset
 from nemo.core.neural_types import *
 from nemo.utils import logging
@@ -113,6 +115,8 @@ class ASRManifestProcessor:
     "utterance_id", "ctm_utt": "en_4156", "side": "A"}
     Args:
         manifest_filepath: Path to manifest json as described above. Can be comma-separated paths.
+            Paths can also point to compiled manifest directories, see
+            `nemo.collections.common.parts.preprocessing.compiled_manifest`.
         parser: Str for a language specific preprocessor or a callable.
         max_duration: If audio exceeds this length, do not include in dataset.
         min_duration: If audio is less than this length, do not include in dataset.
@@ -120,6 +124,12 @@ class ASRManifestProcessor:
         bos_id: Id of beginning of sequence symbol to append if not None.
         eos_id: Id of end of sequence symbol to append if not None.
         pad_id: Id of pad symbol. Defaults to 0.
+        lazy_tokenization: If True, transcripts are tokenized on first access instead of when the manifest is
+            loaded. Transcripts which fail to parse are then kept with an empty transcript.
+        tokens_cache_size: Maximum number of tokenized transcripts kept in memory in lazy mode.
+        tokens_cache_dir: Optional directory for a persistent tokens cache used in lazy mode. The cache is
+            keyed by the manifests and the parser fingerprint and is built once by global rank zero, when it
+            is not found. The tokens are streamed to disk, so the build does not hold them in memory.
     """
 
     def __init__(
@@ -133,22 +143,89 @@ class ASRManifestProcessor:
         eos_id: Optional[int] = None,
         pad_id: int = 0,
         index_by_file_id: bool = False,
+        lazy_tokenization: bool = False,
+        tokens_cache_size: int = 10000,
+        tokens_cache_dir: Optional[str] = None,
     ):
         self.parser = parser
 
-        self.collection = collections.ASRAudioText(
+        manifest_filepaths = manifest_filepath.split(',') if isinstance(manifest_filepath, str) else manifest_filepath
+        num_compiled = sum(compiled_manifest.is_compiled_manifest(path) for path in manifest_filepaths)
+        if num_compiled == 0:
+            collection_cls = collections.ASRAudioText
+        elif num_compiled == len(manifest_filepaths):
+            collection_cls = collections.CompiledASRAudioText
+            manifest_filepath = manifest_filepaths
+        else:
+            raise ValueError("Compiled and JSON manifests cannot be mixed in a single dataset.")
+
+        self.collection = collection_cls(
             manifests_files=manifest_filepath,
             parser=parser,
             min_duration=min_duration,
             max_duration=max_duration,
             max_number=max_utts,
             index_by_file_id=index_by_file_id,
+            lazy_tokenization=lazy_tokenization,
         )
 
         self.eos_id = eos_id
         self.bos_id = bos_id
         self.pad_id = pad_id
 
+        self.lazy_tokenization = lazy_tokenization
+        self._tokens_lru = _TokensLRUCache(tokens_cache_size) if lazy_tokenization else None
+        self._tokens_disk_cache = None
+        if lazy_tokenization and tokens_cache_dir is not None:
+            self._tokens_disk_cache = self._load_tokens_disk_cache(manifest_filepath, tokens_cache_dir)
+
+    def _load_tokens_disk_cache(
+        self, manifest_filepath: Union[str, List[str]], tokens_cache_dir: str
+    ) -> Optional[compiled_manifest.TokensCache]:
+        parser_fingerprint = parsers.get_parser_fingerprint(self.parser)
+        if parser_fingerprint is None:
+            logging.warning("Parser %s cannot be fingerprinted, persistent tokens cache is disabled.", self.parser)
+            return None
+
+        try:
+            cache_path = compiled_manifest.get_tokens_cache_path(
+                tokens_cache_dir, manifest_filepath, parser_fingerprint
+            )
+        except OSError:
+            logging.warning(
+                "Manifests %s are not local files, persistent tokens cache is disabled.", manifest_filepath
+            )
+            return None
+
+        if torch.distributed.is_available() and torch.distributed.is_initialized():
+            # build the cache once on global rank zero, the other ranks open it after the barrier
+            if is_global_rank_zero() and not os.path.isdir(cache_path):
+                self._build_tokens_disk_cache(cache_path, tokens_cache_dir, parser_fingerprint)
+            torch.distributed.barrier()
+        elif not os.path.isdir(cache_path):
+            if not is_global_rank_zero():
+                logging.warning(
+                    'Torch distributed is not initialized and tokens cache %s is built only on global rank zero. '
+                    'Persistent tokens cache is disabled on this rank, please update data config to use '
+                    '`defer_setup = True` to share it.',
+                    cache_path,
+                )
+                return None
+            self._build_tokens_disk_cache(cache_path, tokens_cache_dir, parser_fingerprint)
+
+        return compiled_manifest.TokensCache(cache_path)
+
+    def _build_tokens_disk_cache(self, cache_path: str, tokens_cache_dir: str, parser_fingerprint: str):
+        logging.info("Building tokens cache %s", cache_path)
+        os.makedirs(tokens_cache_dir, exist_ok=True)
+        # the cache is written in manifest entry id order, the collection may be sorted by duration
+        samples = sorted((sample for sample in self.collection if sample.text_tokens is None), key=lambda s: s.id)
+        entries = (
+            (sample.id, collections.parse_text_tokens(self.parser, sample.text_raw, sample.lang)) for sample in samples
+        )
+        num_ids = max((sample.id for sample in self.collection), default=-1) + 1
+        compiled_manifest.build_tokens_cache(cache_path, entries, num_ids, parser_fingerprint)
+
     def process_text_by_id(self, index: int) -> Tuple[List[int], int]:
         sample = self.collection[index]
         return self.process_text_by_sample(sample)
@@ -159,7 +236,10 @@ class ASRManifestProcessor:
         return self.process_text_by_sample(sample)
 
     def process_text_by_sample(self, sample: collections.ASRAudioText.OUTPUT_TYPE) -> Tuple[List[int], int]:
-        t, tl = sample.text_tokens, len(sample.text_tokens)
+        t = sample.text_tokens
+        if t is None:
+            t = self._get_lazy_text_tokens(sample)
+        tl = len(t)
 
         if self.bos_id is not None:
             t = [self.bos_id] + t
@@ -170,6 +250,43 @@ class ASRManifestProcessor:
 
         return t, tl
 
+    def _get_lazy_text_tokens(self, sample: collections.ASRAudioText.OUTPUT_TYPE) -> List[int]:
+        if self._tokens_disk_cache is not None:
+            t = self._tokens_disk_cache.get(sample.id)
+            if t is not None:
+                return t
+
+        t = self._tokens_lru.get(sample.id)
+        if t is None:
+            t = collections.parse_text_tokens(self.parser, sample.text_raw, sample.lang)
+            if t is None:
+                logging.warning("Fail to parse '%s' text line, using empty transcript.", sample.text_raw)
+                t = []
+            self._tokens_lru.put(sample.id, t)
+        return t
+
+
+class _TokensLRUCache:
+    """Bounded least-recently-used cache of tokenized transcripts, keyed by manifest entry id."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+
+    def get(self, key: int) -> Optional[List[int]]:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key: int, value: List[int]):
+        if self.max_size <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
 
 def expand_audio_filepaths(audio_tar_filepaths, shard_strategy: str, world_size: int, global_rank: int):
     valid_shard_strategies = ['scatter', 'replicate']
@@ -369,6 +486,12 @@ class _AudioTextDataset(Dataset):
         pad_id: Id of pad symbol. Defaults to 0
         return_sample_id (bool): whether to return the sample_id as a part of each sample
         channel_selector (int | Iterable[int] | str): select a single channel or a subset of channels from multi-channel audio. If set to `'average'`, it performs averaging across channels. Disabled if set to `None`. Defaults to `None`. Uses zero-based indexing.
+        lazy_tokenization (bool): whether to tokenize transcripts on first access instead of at construction time. Defaults to False.
+        tokens_cache_size (int): maximum number of tokenized transcripts kept in memory in lazy mode. Defaults to 10000.
+        tokens_cache_dir (str): optional directory of a persistent tokens cache used in lazy mode. Defaults to None.
+        audio_cache_dir (str): optional directory of a persistent cache of decoded and resampled audio. Defaults to None.
+        audio_cache_max_gb (float): maximum size of the decoded audio cache in GB, least recently used entries are removed first. Defaults to 100.
+        audio_cache_dtype (str): storage type of the decoded audio cache, `float32` or `int16`. Defaults to `float32`.
     """
 
     @property
@@ -399,6 +522,12 @@ class _AudioTextDataset(Dataset):
         pad_id: int = 0,
         return_sample_id: bool = False,
         channel_selector: Optional[ChannelSelectorType] = None,
+        lazy_tokenization: bool = False,
+        tokens_cache_size: int = 10000,
+        tokens_cache_dir: Optional[str] = None,
+        audio_cache_dir: Optional[str] = None,
+        audio_cache_max_gb: float = 100.0,
+        audio_cache_dtype: str = 'float32',
     ):
         if type(manifest_filepath) == str:
             manifest_filepath = manifest_filepath.split(",")
@@ -415,8 +544,16 @@ class _AudioTextDataset(Dataset):
             bos_id=bos_id,
             eos_id=eos_id,
             pad_id=pad_id,
+            lazy_tokenization=lazy_tokenization,
+            tokens_cache_size=tokens_cache_size,
+            tokens_cache_dir=tokens_cache_dir,
+        )
+        audio_cache = None
+        if audio_cache_dir is not None:
+            audio_cache = DecodedAudioCache(audio_cache_dir, max_size_gb=audio_cache_max_gb, dtype=audio_cache_dtype)
+        self.featurizer = WaveformFeaturizer(
+            sample_rate=sample_rate, int_values=int_values, augmentor=augmentor, audio_cache=audio_cache
         )
-        self.featurizer = WaveformFeaturizer(sample_rate=sample_rate, int_values=int_values, augmentor=augmentor)
         self.trim = trim
         self.return_sample_id = return_sample_id
         self.channel_selector = channel_selector
@@ -488,6 +625,12 @@ class AudioToCharDataset(_AudioTextDataset):
         eos_id: Id of end of sequence symbol to append if not None
         return_sample_id (bool): whether to return the sample_id as a part of each sample
         channel_selector (int | Iterable[int] | str): select a single channel or a subset of channels from multi-channel audio. If set to `'average'`, it performs averaging across channels. Disabled if set to `None`. Defaults to `None`. Uses zero-based indexing.
+        lazy_tokenization (bool): whether to tokenize transcripts on first access instead of at construction time. Defaults to False.
+        tokens_cache_size (int): maximum number of tokenized transcripts kept in memory in lazy mode. Defaults to 10000.
+        tokens_cache_dir (str): optional directory of a persistent tokens cache used in lazy mode. Defaults to None.
+        audio_cache_dir (str): optional directory of a persistent cache of decoded and resampled audio. Defaults to None.
+        audio_cache_max_gb (float): maximum size of the decoded audio cache in GB, least recently used entries are removed first. Defaults to 100.
+        audio_cache_dtype (str): storage type of the decoded audio cache, `float32` or `int16`. Defaults to `float32`.
     """
 
     @property
@@ -522,6 +665,12 @@ class AudioToCharDataset(_AudioTextDataset):
         parser: Union[str, Callable] = 'en',
         return_sample_id: bool = False,
         channel_selector: Optional[ChannelSelectorType] = None,
+        lazy_tokenization: bool = False,
+        tokens_cache_size: int = 10000,
+        tokens_cache_dir: Optional[str] = None,
+        audio_cache_dir: Optional[str] = None,
+        audio_cache_max_gb: float = 100.0,
+        audio_cache_dtype: str = 'float32',
     ):
         self.labels = labels
 
@@ -544,6 +693,12 @@ class AudioToCharDataset(_AudioTextDataset):
             pad_id=pad_id,
             return_sample_id=return_sample_id,
             channel_selector=channel_selector,
+            lazy_tokenization=lazy_tokenization,
+            tokens_cache_size=tokens_cache_size,
+            tokens_cache_dir=tokens_cache_dir,
+            audio_cache_dir=audio_cache_dir,
+            audio_cache_max_gb=audio_cache_max_gb,
+            audio_cache_dtype=audio_cache_dtype,
         )
 
 
@@ -582,6 +737,12 @@ class AudioToBPEDataset(_AudioTextDataset):
             tokens to beginning and ending of speech respectively.
         return_sample_id (bool): whether to return the sample_id as a part of each sample
         channel_selector (int | Iterable[int] | str): select a single channel or a subset of channels from multi-channel audio. If set to `'average'`, it performs averaging across channels. Disabled if set to `None`. Defaults to `None`. Uses zero-based indexing.
+        lazy_tokenization (bool): whether to tokenize transcripts on first access instead of at construction time. Defaults to False.
+        tokens_cache_size (int): maximum number of tokenized transcripts kept in memory in lazy mode. Defaults to 10000.
+        tokens_cache_dir (str): optional directory of a persistent tokens cache used in lazy mode. Defaults to None.
+        audio_cache_dir (str): optional directory of a persistent cache of decoded and resampled audio. Defaults to None.
+        audio_cache_max_gb (float): maximum size of the decoded audio cache in GB, least recently used entries are removed first. Defaults to 100.
+        audio_cache_dtype (str): storage type of the decoded audio cache, `float32` or `int16`. Defaults to `float32`.
     """
 
     @property
@@ -610,6 +771,12 @@ class AudioToBPEDataset(_AudioTextDataset):
         use_start_end_token: bool = True,
         return_sample_id: bool = False,
         channel_selector: Optional[ChannelSelectorType] = None,
+        lazy_tokenization: bool = False,
+        tokens_cache_size: int = 10000,
+        tokens_cache_dir: Optional[str] = None,
+        audio_cache_dir: Optional[str] = None,
+        audio_cache_max_gb: float = 100.0,
+        audio_cache_dtype: str = 'float32',
     ):
         if use_start_end_token and hasattr(tokenizer, "bos_id") and tokenizer.bos_id > 0:
             bos_id = tokenizer.bos_id
@@ -659,6 +826,12 @@ class AudioToBPEDataset(_AudioTextDataset):
             trim=trim,
             return_sample_id=return_sample_id,
             channel_selector=channel_selector,
+            lazy_tokenization=lazy_tokenization,
+            tokens_cache_size=tokens_cache_size,
+            tokens_cache_dir=tokens_cache_dir,
+            audio_cache_dir=audio_cache_dir,
+            audio_cache_max_gb=audio_cache_max_gb,
+            audio_cache_dtype=audio_cache_dtype,
         )
 
 
@@ -25,6 +25,7 @@ from pytorch_lightning.callbacks import BasePredictionWriter
 from torch.utils.data import ChainDataset
 
 from nemo.collections.asr.data import audio_to_text, audio_to_text_dali
+from nemo.collections.asr.data.bucketing_sampler import DurationBucketingBatchSampler, get_dataset_durations
 from nemo.collections.asr.parts.preprocessing.perturb import process_augmentations
 from nemo.collections.common.data.dataset import ConcatDataset
 from nemo.utils import logging
@@ -142,6 +143,12 @@ def get_char_dataset(config: dict, augmentor: Optional['AudioAugmentor'] = None)
         parser=config.get('parser', 'en'),
         return_sample_id=config.get('return_sample_id', False),
         channel_selector=config.get('channel_selector', None),
+        lazy_tokenization=config.get('lazy_tokenization', False),
+        tokens_cache_size=config.get('tokens_cache_size', 10000),
+        tokens_cache_dir=config.get('tokens_cache_dir', None),
+        audio_cache_dir=config.get('audio_cache_dir', None),
+        audio_cache_max_gb=config.get('audio_cache_max_gb', 100.0),
+        audio_cache_dtype=config.get('audio_cache_dtype', 'float32'),
     )
     return dataset
 
@@ -212,6 +219,12 @@ def get_bpe_dataset(
         use_start_end_token=config.get('use_start_end_token', True),
         return_sample_id=config.get('return_sample_id', False),
         channel_selector=config.get('channel_selector', None),
+        lazy_tokenization=config.get('lazy_tokenization', False),
+        tokens_cache_size=config.get('tokens_cache_size', 10000),
+        tokens_cache_dir=config.get('tokens_cache_dir', None),
+        audio_cache_dir=config.get('audio_cache_dir', None),
+        audio_cache_max_gb=config.get('audio_cache_max_gb', 100.0),
+        audio_cache_dtype=config.get('audio_cache_dtype', 'float32'),
     )
     return dataset
 
@@ -778,3 +791,40 @@ def calc_bucketing_batch_sizes(ds_config, datasets_len):
             f"batch_size should have the same length as the number of buckets ({len(bucketing_batch_sizes)}!={datasets_len}) "
         )
     return bucketing_batch_sizes
+
+
+def get_duration_bucketing_batch_sampler(
+    config: dict, dataset: torch.utils.data.Dataset, global_rank: int, world_size: int
+) -> Optional[DurationBucketingBatchSampler]:
+    """
+    Instantiates a DurationBucketingBatchSampler if dynamic batching is enabled with `batch_duration` in the config.
+
+    Args:
+        config: Config of the dataset and data loader.
+        dataset: Map-style dataset instantiated from `config`.
+        global_rank: Global rank of this device.
+        world_size: Global world size in the training method.
+
+    Returns:
+        An instance of DurationBucketingBatchSampler, or None if `batch_duration` is not set.
+    """
+    if config.get('batch_duration', None) is None:
+        return None
+    if config.get('is_tarred', False) or isinstance(dataset, torch.utils.data.IterableDataset):
+        raise ValueError(
+            "batch_duration is only supported by map-style (non-tarred) datasets, "
+            "use bucketing with bucketing_batch_size for tarred datasets."
+        )
+    logging.info(f"Dynamic batching is enabled with batch_duration={config['batch_duration']}")
+    return DurationBucketingBatchSampler(
+        durations=get_dataset_durations(dataset),
+        batch_duration=config['batch_duration'],
+        num_buckets=config.get('num_buckets', 30),
+        max_batch_size=config.get('max_batch_size', None),
+        quadratic_duration=config.get('quadratic_duration', None),
+        shuffle=config.get('shuffle', False),
+        seed=config.get('seed', 0),
+        drop_last=config.get('drop_last', False),
+        global_rank=global_rank,
+        world_size=world_size,
+    )
@@ -0,0 +1,213 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import torch
+
+from nemo.utils import logging
+
+__all__ = ['DurationBucketingBatchSampler', 'get_dataset_durations']
+
+
+class DurationBucketingBatchSampler(torch.utils.data.Sampler):
+    """
+    Batch sampler for map-style datasets which builds batches of similar-duration utterances under a total
+    duration budget, instead of a fixed number of utterances.
+
+    Utterances are assigned to `num_buckets` buckets of equal size by duration quantiles. At every epoch, each
+    bucket is shuffled and split greedily into batches whose padded cost, `batch size * cost(longest utterance)`,
+    does not exceed `batch_duration`; batches of all buckets are then shuffled together. The cost of an utterance
+    is its duration, plus `duration ** 2 / quadratic_duration` if `quadratic_duration` is set, which accounts for
+    the quadratic cost of self-attention for long utterances. Since the number of frames is proportional to the
+    duration, a frame budget is obtained by scaling `batch_duration` by the frame rate.
+
+    Every rank builds the same batches from `seed` and the epoch, and iterates over every `world_size`-th batch,
+    so the sampler must not be wrapped in a `DistributedSampler`: the trainer must be created with
+    `replace_sampler_ddp=False`, otherwise the sampler raises an error when the trainer tries to re-instantiate it.
+
+    Iteration can be resumed in the middle of an epoch with `load_state_dict`. Since the data loader prefetches
+    batches, the sampler does not know how many of its batches were consumed by the training loop: `state_dict`
+    takes this number, which `ASRModel` derives from the optimizer steps of the epoch and stores in the checkpoints.
+
+    Args:
+        durations: duration of every utterance of the dataset, in seconds.
+        batch_duration: maximum padded cost of a batch, in seconds.
+        num_buckets: number of duration buckets.
+        max_batch_size: optional maximum number of utterances in a batch.
+        quadratic_duration: optional duration (in seconds) at which the quadratic cost of an utterance is equal
+            to its linear cost.
+        shuffle: whether to shuffle utterances and batches at every epoch.
+        seed: random seed, must be the same on all ranks.
+        drop_last: whether to drop the last batches of an epoch which cannot be split evenly across ranks. If False,
+            batches from the beginning of the epoch are repeated instead.
+        global_rank: rank of this process, defaults to the rank of the default process group.
+        world_size: number of processes, defaults to the size of the default process group.
+    """
+
+    def __init__(
+        self,
+        durations: Sequence[float],
+        batch_duration: float,
+        num_buckets: int = 30,
+        max_batch_size: Optional[int] = None,
+        quadratic_duration: Optional[float] = None,
+        shuffle: bool = True,
+        seed: int = 0,
+        drop_last: bool = False,
+        global_rank: Optional[int] = None,
+        world_size: Optional[int] = None,
+    ):
+        if batch_duration <= 0:
+            raise ValueError(f"batch_duration must be positive, got {batch_duration}")
+        if num_buckets < 1:
+            raise ValueError(f"num_buckets must be positive, got {num_buckets}")
+        if max_batch_size is not None and max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be positive, got {max_batch_size}")
+        if world_size is None:
+            world_size = torch.distributed.get_world_size() if torch.distributed.is_initialized() else 1
+        if global_rank is None:
+            global_rank = torch.distributed.get_rank() if torch.distributed.is_initialized() else 0
+        if not 0 <= global_rank < world_size:
+            raise ValueError(f"Invalid global_rank {global_rank} for world_size {world_size}")
+
+        self.durations = np.asarray(durations, dtype=np.float64)
+        if len(self.durations) == 0:
+            raise ValueError("DurationBucketingBatchSampler received an empty dataset")
+        self.batch_duration = batch_duration
+        self.num_buckets = num_buckets
+        self.max_batch_size = max_batch_size
+        self.quadratic_duration = quadratic_duration
+        self.shuffle = shuffle
+        self.seed = seed
+        self.drop_last = drop_last
+        self.global_rank = global_rank
+        self.world_size = world_size
+
+        self.costs = self.durations
+        if quadratic_duration is not None:
+            self.costs = self.durations + self.durations ** 2 / quadratic_duration
+        num_too_long = int((self.costs > batch_duration).sum())
+        if num_too_long > 0:
+            logging.warning(
+                f"{num_too_long} utterances exceed batch_duration={batch_duration} and will be in batches of one"
+            )
+
+        # buckets of (almost) equal size, each sorted by duration
+        order = np.argsort(self.durations, kind='stable')
+        self.buckets = [bucket for bucket in np.array_split(order, num_buckets) if len(bucket) > 0]
+
+        self.epoch = 0
+        # number of batches of the current epoch skipped by the next iteration, when resuming
+        self.batches_consumed = 0
+        self._cached_epoch, self._cached_batches = None, None
+
+    @property
+    def batch_size(self) -> int:
+        """
+        Not defined, batches have a variable number of utterances. The trainer reads it when it re-instantiates
+        a batch sampler around a `DistributedSampler`, which is not supported since the batches are already sharded.
+        """
+        raise ValueError(
+            "DurationBucketingBatchSampler shards the batches across ranks itself and cannot be wrapped in a "
+            "DistributedSampler, the trainer must be created with `replace_sampler_ddp=False`."
+        )
+
+    def set_epoch(self, epoch: int):
+        """Sets the epoch, which determines the batches of the epoch when shuffling."""
+        if epoch != self.epoch:
+            self.batches_consumed = 0
+        self.epoch = epoch
+
+    def state_dict(self, batches_consumed: int) -> Dict[str, int]:
+        """
+        Returns the state of the sampler.
+
+        Args:
+            batches_consumed: number of batches of the current epoch consumed by the training loop on this rank.
+        """
+        return {'epoch': self.epoch, 'batches_consumed': batches_consumed, 'seed': self.seed}
+
+    def load_state_dict(self, state_dict: Dict[str, int]):
+        """Restores the state of the sampler, the next iteration starts after the consumed batches of the epoch."""
+        self.epoch = state_dict['epoch']
+        self.batches_consumed = state_dict['batches_consumed']
+        self.seed = state_dict['seed']
+        self._cached_epoch, self._cached_batches = None, None
+
+    def _split_bucket(self, bucket: np.ndarray) -> List[List[int]]:
+        """Greedily splits the utterances of a bucket into batches under the duration budget."""
+        batches, batch, batch_max_cost = [], [], 0.0
+        for idx, cost in zip(bucket.tolist(), self.costs[bucket].tolist()):
+            max_cost = max(batch_max_cost, cost)
+            is_full = self.max_batch_size is not None and len(batch) >= self.max_batch_size
+            if batch and (is_full or (len(batch) + 1) * max_cost > self.batch_duration):
+                batches.append(batch)
+                batch, max_cost = [], cost
+            batch.append(idx)
+            batch_max_cost = max_cost
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _get_rank_batches(self) -> List[List[int]]:
+        """Returns the batches of this rank for the current epoch."""
+        if self._cached_epoch == self.epoch:
+            return self._cached_batches
+
+        rng = np.random.default_rng([self.seed, self.epoch])
+        batches = []
+        for bucket in self.buckets:
+            if self.shuffle:
+                bucket = rng.permutation(bucket)
+            batches.extend(self._split_bucket(bucket))
+        if self.shuffle:
+            batches = [batches[idx] for idx in rng.permutation(len(batches))]
+
+        # every rank gets the same number of batches
+        if self.drop_last:
+            batches = batches[: len(batches) - len(batches) % self.world_size]
+        elif len(batches) % self.world_size != 0:
+            num_missing = self.world_size - len(batches) % self.world_size
+            batches += (batches * num_missing)[:num_missing]
+
+        self._cached_epoch, self._cached_batches = self.epoch, batches[self.global_rank :: self.world_size]
+        return self._cached_batches
+
+    def __iter__(self) -> Iterator[List[int]]:
+        batches = self._get_rank_batches()
+        start = self.batches_consumed
+        # the batches are only skipped once, the next iteration starts a new pass
+        self.batches_consumed = 0
+        yield from batches[start:]
+
+    def __len__(self) -> int:
+        return len(self._get_rank_batches())
+
+
+def get_dataset_durations(dataset: torch.utils.data.Dataset) -> np.ndarray:
+    """
+    Returns the durations of the utterances of a manifest-based dataset (e.g., `AudioToCharDataset`),
+    or of a `ConcatDataset` of such datasets.
+    """
+    if isinstance(dataset, torch.utils.data.ConcatDataset):
+        return np.concatenate([get_dataset_durations(sub_dataset) for sub_dataset in dataset.datasets])
+    if not hasattr(dataset, 'manifest_processor'):
+        raise ValueError(f"Cannot get utterance durations of dataset of type {type(dataset).__name__}")
+    collection = dataset.manifest_processor.collection
+    durations = getattr(collection, 'durations', None)
+    if durations is None:
+        durations = [entry.duration for entry in collection]
+    return np.asarray(durations, dtype=np.float64)
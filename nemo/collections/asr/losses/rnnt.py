@@ -303,6 +303,21 @@ class RNNTLoss(Loss):
         self.reduction = reduction
         self._loss = resolve_rnnt_loss(loss_name, blank_idx=self._blank, loss_kwargs=loss_kwargs)
 
+    @property
+    def fastemit_lambda(self) -> float:
+        """FastEmit regularization weight of the resolved loss function."""
+        return self._get_loss_attribute('fastemit_lambda')
+
+    @property
+    def clamp(self) -> float:
+        """Gradient clamping value of the resolved loss function, 0.0 if the gradients are not clamped."""
+        return self._get_loss_attribute('clamp')
+
+    def _get_loss_attribute(self, name: str) -> float:
+        if not hasattr(self._loss, name):
+            raise ValueError(f"The RNNT loss function {type(self._loss).__name__} does not support `{name}`.")
+        return getattr(self._loss, name)
+
     def reduce(self, losses, target_lengths):
 
         if isinstance(losses, List):
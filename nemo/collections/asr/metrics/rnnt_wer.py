@@ -26,8 +26,9 @@ from torchmetrics import Metric
 from nemo.collections.asr.metrics.wer import move_dimension_to_the_front
 from nemo.collections.asr.parts.submodules import rnnt_beam_decoding as beam_decode
 from nemo.collections.asr.parts.submodules import rnnt_greedy_decoding as greedy_decode
+from nemo.collections.asr.parts.submodules.context_biasing import BoostingTrie, get_boosting_trie
 from nemo.collections.asr.parts.utils.asr_confidence_utils import ConfidenceConfig, ConfidenceMixin
-from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis, NBestHypotheses
+from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis, NBestHypotheses, PackedHypotheses
 from nemo.utils import logging
 
 __all__ = ['RNNTDecoding', 'RNNTWER']
@@ -42,7 +43,7 @@ class AbstractRNNTDecoding(ConfidenceMixin):
             strategy: str value which represents the type of decoding that can occur.
                 Possible values are :
                 -   greedy, greedy_batch (for greedy decoding).
-                -   beam, tsd, alsd (for beam search decoding).
+                -   beam, tsd, alsd, maes, beam_batch (for beam search decoding).
 
             compute_hypothesis_token_set: A bool flag, which determines whether to compute a list of decoded
                 tokens as well as the decoded string. Default is False in order to avoid double decoding
@@ -185,6 +186,9 @@ class AbstractRNNTDecoding(ConfidenceMixin):
                     thereby reducing speed but potentially improving accuracy). This is a hyper parameter to be experimentally
                     tuned on a validation set.
 
+                beam_batch_max_symbols: optional int, the maximum number of target tokens emitted per timestep
+                    by a hypothesis of the `beam_batch` strategy, which decodes all the utterances of a batch at once.
+
                 softmax_temperature: Scales the logits of the joint prior to computing log_softmax.
 
         decoder: The Decoder/Prediction network module.
@@ -214,7 +218,7 @@ class AbstractRNNTDecoding(ConfidenceMixin):
             if blank_id == 0:
                 raise ValueError("blank_id must equal len(vocabs) for multi-blank RNN-T models")
 
-        possible_strategies = ['greedy', 'greedy_batch', 'beam', 'tsd', 'alsd', 'maes']
+        possible_strategies = ['greedy', 'greedy_batch', 'beam', 'tsd', 'alsd', 'maes', 'beam_batch']
         if self.cfg.strategy not in possible_strategies:
             raise ValueError(f"Decoding strategy must be one of {possible_strategies}")
 
@@ -223,7 +227,7 @@ class AbstractRNNTDecoding(ConfidenceMixin):
             if self.cfg.strategy in ['greedy', 'greedy_batch']:
                 self.preserve_alignments = self.cfg.greedy.get('preserve_alignments', False)
 
-            elif self.cfg.strategy in ['beam', 'tsd', 'alsd', 'maes']:
+            elif self.cfg.strategy in ['beam', 'tsd', 'alsd', 'maes', 'beam_batch']:
                 self.preserve_alignments = self.cfg.beam.get('preserve_alignments', False)
 
         # Update compute timestamps
@@ -231,13 +235,19 @@ class AbstractRNNTDecoding(ConfidenceMixin):
             if self.cfg.strategy in ['greedy', 'greedy_batch']:
                 self.compute_timestamps = self.cfg.greedy.get('compute_timestamps', False)
 
-            elif self.cfg.strategy in ['beam', 'tsd', 'alsd', 'maes']:
+            elif self.cfg.strategy in ['beam', 'tsd', 'alsd', 'maes', 'beam_batch']:
                 self.compute_timestamps = self.cfg.beam.get('compute_timestamps', False)
 
         # Test if alignments are being preserved for RNNT
         if self.compute_timestamps is True and self.preserve_alignments is False:
             raise ValueError("If `compute_timesteps` flag is set, then `preserve_alignments` flag must also be set.")
 
+        if self.cfg.strategy == 'beam_batch' and self.preserve_alignments:
+            raise ValueError(
+                "The `beam_batch` decoding strategy does not support `preserve_alignments` (required by "
+                "`compute_timestamps`), please use the `beam` strategy instead."
+            )
+
         # initialize confidence-related fields
         self._init_confidence(self.cfg.get('confidence_cfg', None))
 
@@ -247,7 +257,7 @@ class AbstractRNNTDecoding(ConfidenceMixin):
                 self.preserve_frame_confidence = self.cfg.greedy.get('preserve_frame_confidence', False)
                 self.confidence_method_cfg = self.cfg.greedy.get('confidence_method_cfg', None)
 
-            elif self.cfg.strategy in ['beam', 'tsd', 'alsd', 'maes']:
+            elif self.cfg.strategy in ['beam', 'tsd', 'alsd', 'maes', 'beam_batch']:
                 # Not implemented
                 pass
 
@@ -363,6 +373,20 @@ class AbstractRNNTDecoding(ConfidenceMixin):
                 preserve_alignments=self.preserve_alignments,
             )
 
+        elif self.cfg.strategy == 'beam_batch':
+
+            self.decoding = beam_decode.BeamRNNTInfer(
+                decoder_model=decoder,
+                joint_model=joint,
+                beam_size=self.cfg.beam.beam_size,
+                return_best_hypothesis=decoding_cfg.beam.get('return_best_hypothesis', True),
+                search_type='beam_batch',
+                score_norm=self.cfg.beam.get('score_norm', True),
+                beam_batch_max_symbols=self.cfg.beam.get('beam_batch_max_symbols', 10),
+                softmax_temperature=self.cfg.beam.get('softmax_temperature', 1.0),
+                preserve_alignments=self.preserve_alignments,
+            )
+
         else:
 
             raise ValueError(
@@ -413,6 +437,12 @@ class AbstractRNNTDecoding(ConfidenceMixin):
 
         prediction_list = hypotheses_list
 
+        if isinstance(prediction_list, PackedHypotheses):
+            if not return_hypotheses and not self.compute_timestamps:
+                # only the text is required, which is decoded without creating Hypothesis objects
+                return self.decode_packed_hypotheses(prediction_list), None
+            prediction_list = list(prediction_list)
+
         if isinstance(prediction_list[0], NBestHypotheses):
             hypotheses = []
             all_hypotheses = []
@@ -503,6 +533,28 @@ class AbstractRNNTDecoding(ConfidenceMixin):
 
         return hypotheses_list
 
+    def decode_packed_hypotheses(self, hypotheses: PackedHypotheses) -> List[str]:
+        """
+        Decode packed hypotheses into a list of strings, without creating Hypothesis objects.
+
+        Args:
+            hypotheses: PackedHypotheses.
+
+        Returns:
+            A list of strings.
+        """
+        num_extra_outputs = len(self.big_blank_durations) if self.big_blank_durations is not None else 0
+        texts = []
+        for idx in range(len(hypotheses)):
+            prediction = hypotheses.get_y_sequence(idx).numpy()
+            # Remove any blank and possibly big blank tokens
+            if self.blank_id != 0:
+                prediction = prediction[prediction < self.blank_id - num_extra_outputs]
+            else:
+                prediction = prediction[prediction != self.blank_id]
+            texts.append(self.decode_tokens_to_str(prediction.tolist()))
+        return texts
+
     def compute_confidence(self, hypotheses_list: List[Hypothesis]) -> List[Hypothesis]:
         """
         Computes high-level (per-token and/or per-word) confidence scores for a list of hypotheses.
@@ -568,6 +620,39 @@ class AbstractRNNTDecoding(ConfidenceMixin):
         """
         raise NotImplementedError()
 
+    def build_boosting_trie(self, phrases: List[str], boost: float) -> BoostingTrie:
+        """
+        Implemented by subclass in order to encode a list of phrases and compile them into a BoostingTrie,
+        used for contextual biasing.
+
+        Args:
+            phrases: List of phrases to boost.
+            boost: Reward of every token of a matched phrase.
+
+        Returns:
+            The (cached) BoostingTrie of the phrases.
+        """
+        raise NotImplementedError()
+
+    def set_boosting_phrases(self, phrases: Optional[List[str]], boost: float = 1.0):
+        """
+        Biases the beam search towards a list of phrases (contextual biasing), e.g. the customer-specific terms of
+        a request. The phrases are encoded and compiled into a BoostingTrie the first time the list is used,
+        so that the list can be changed for every request. Supported by the `beam` and `maes` strategies.
+
+        Args:
+            phrases: List of phrases to boost, or None to disable contextual biasing.
+            boost: Reward (added to the log probability) of every token of a matched phrase.
+        """
+        if not hasattr(self.decoding, 'set_boosting_trie'):
+            raise ValueError(f"Contextual biasing is not supported by the `{self.cfg.strategy}` strategy.")
+
+        boosting_trie = None
+        if phrases:
+            boosting_trie = self.build_boosting_trie(phrases, boost=boost)
+            logging.info(f"Boosting {boosting_trie.num_phrases} phrases out of {len(phrases)}")
+        self.decoding.set_boosting_trie(boosting_trie)
+
     @abstractmethod
     def decode_tokens_to_lang(self, tokens: List[int]) -> str:
         """
@@ -908,7 +993,7 @@ class RNNTDecoding(AbstractRNNTDecoding):
             strategy: str value which represents the type of decoding that can occur.
                 Possible values are :
                 -   greedy, greedy_batch (for greedy decoding).
-                -   beam, tsd, alsd (for beam search decoding).
+                -   beam, tsd, alsd, maes, beam_batch (for beam search decoding).
 
             compute_hypothesis_token_set: A bool flag, which determines whether to compute a list of decoded
                 tokens as well as the decoded string. Default is False in order to avoid double decoding
@@ -1039,6 +1124,9 @@ class RNNTDecoding(AbstractRNNTDecoding):
                     thereby reducing speed but potentially improving accuracy). This is a hyper parameter to be experimentally
                     tuned on a validation set.
 
+                beam_batch_max_symbols: optional int, the maximum number of target tokens emitted per timestep
+                    by a hypothesis of the `beam_batch` strategy, which decodes all the utterances of a batch at once.
+
                 softmax_temperature: Scales the logits of the joint prior to computing log_softmax.
 
         decoder: The Decoder/Prediction network module.
@@ -1097,6 +1185,19 @@ class RNNTDecoding(AbstractRNNTDecoding):
         token_list = [self.labels_map[c] for c in tokens if c < self.blank_id - self.num_extra_outputs]
         return token_list
 
+    def build_boosting_trie(self, phrases: List[str], boost: float) -> BoostingTrie:
+        """
+        Encodes a list of phrases and compiles them into a BoostingTrie, used for contextual biasing.
+
+        Args:
+            phrases: List of phrases to boost.
+            boost: Reward of every token of a matched phrase.
+
+        Returns:
+            The (cached) BoostingTrie of the phrases.
+        """
+        return get_boosting_trie(phrases, boost=boost, vocabulary=list(self.labels_map.values()))
+
     def decode_tokens_to_lang(self, tokens: List[int]) -> str:
         """
         Compute the most likely language ID (LID) string given the tokens.
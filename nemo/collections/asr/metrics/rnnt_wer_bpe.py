@@ -21,6 +21,7 @@ from torchmetrics import Metric
 
 from nemo.collections.asr.metrics.rnnt_wer import AbstractRNNTDecoding, RNNTDecodingConfig
 from nemo.collections.asr.metrics.wer import move_dimension_to_the_front
+from nemo.collections.asr.parts.submodules.context_biasing import BoostingTrie, get_boosting_trie
 from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis, NBestHypotheses
 from nemo.collections.common.tokenizers.aggregate_tokenizer import AggregateTokenizer
 from nemo.collections.common.tokenizers.tokenizer_spec import TokenizerSpec
@@ -245,6 +246,19 @@ class RNNTBPEDecoding(AbstractRNNTDecoding):
         token_list = self.tokenizer.ids_to_tokens(tokens)
         return token_list
 
+    def build_boosting_trie(self, phrases: List[str], boost: float) -> BoostingTrie:
+        """
+        Encodes a list of phrases and compiles them into a BoostingTrie, used for contextual biasing.
+
+        Args:
+            phrases: List of phrases to boost.
+            boost: Reward of every token of a matched phrase.
+
+        Returns:
+            The (cached) BoostingTrie of the phrases.
+        """
+        return get_boosting_trie(phrases, boost=boost, tokenizer=self.tokenizer)
+
     def decode_tokens_to_lang(self, tokens: List[int]) -> str:
         """
         Compute the most likely language ID (LID) string given the tokens.
@@ -24,8 +24,14 @@ from omegaconf import DictConfig, OmegaConf
 from torchmetrics import Metric
 
 from nemo.collections.asr.parts.submodules import ctc_beam_decoding, ctc_greedy_decoding
+from nemo.collections.asr.parts.submodules.context_biasing import BoostingTrie, get_boosting_trie
 from nemo.collections.asr.parts.utils.asr_confidence_utils import ConfidenceConfig, ConfidenceMixin
-from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis, NBestHypotheses
+from nemo.collections.asr.parts.utils.rnnt_utils import (
+    Hypothesis,
+    NBestHypotheses,
+    PackedCTCHypotheses,
+    PackedHypotheses,
+)
 from nemo.utils import logging, logging_mode
 
 __all__ = ['word_error_rate', 'word_error_rate_detail', 'WER', 'move_dimension_to_the_front']
@@ -153,6 +159,7 @@ class AbstractCTCDecoding(ConfidenceMixin):
                 Possible values are :
                 -   greedy (for greedy decoding).
                 -   beam (for DeepSpeed KenLM based decoding).
+                -   prefix (for built-in CTC prefix beam search with an optional ARPA n-gram LM).
 
             compute_timestamps: A bool flag, which determines whether to compute the character/subword, or
                 word based timestamp mapping the output log-probabilities to discrite intervals of timestamps.
@@ -248,7 +255,12 @@ class AbstractCTCDecoding(ConfidenceMixin):
                 kenlm_path: str, path to a KenLM ARPA or .binary file (depending on the strategy chosen).
                     If the path is invalid (file is not found at path), will raise a deferred error at the moment
                     of calculation of beam search, so that users may update / change the decoding strategy
-                    to point to the correct file.
+                    to point to the correct file. The `prefix` strategy requires an ARPA file, and decodes without
+                    LM if it is not set.
+
+                prefix_cfg: optional dict-like object with the settings of the `prefix` strategy (see
+                    `ctc_beam_decoding.PrefixBeamSearchConfig`) - the number of tokens per frame and the minimum token
+                    log probability for pruning, the word delimiter of char models, and the number of worker processes.
 
         blank_id: The id of the RNNT blank token.
     """
@@ -278,7 +290,7 @@ class AbstractCTCDecoding(ConfidenceMixin):
         self.batch_dim_index = self.cfg.get('batch_dim_index', 0)
         self.word_seperator = self.cfg.get('word_seperator', ' ')
 
-        possible_strategies = ['greedy', 'beam', 'flashlight']
+        possible_strategies = ['greedy', 'beam', 'flashlight', 'prefix']
         if self.cfg.strategy not in possible_strategies:
             raise ValueError(f"Decoding strategy must be one of {possible_strategies}. Given {self.cfg.strategy}")
 
@@ -364,6 +376,23 @@ class AbstractCTCDecoding(ConfidenceMixin):
 
             self.decoding.override_fold_consecutive_value = False
 
+        elif self.cfg.strategy == 'prefix':
+
+            self.decoding = ctc_beam_decoding.BeamCTCInfer(
+                blank_id=blank_id,
+                beam_size=self.cfg.beam.get('beam_size', 1),
+                search_type='prefix',
+                return_best_hypothesis=self.cfg.beam.get('return_best_hypothesis', True),
+                preserve_alignments=self.preserve_alignments,
+                compute_timestamps=self.compute_timestamps,
+                beam_alpha=self.cfg.beam.get('beam_alpha', 1.0),
+                beam_beta=self.cfg.beam.get('beam_beta', 0.0),
+                kenlm_path=self.cfg.beam.get('kenlm_path', None),
+                prefix_cfg=self.cfg.beam.get('prefix_cfg', None),
+            )
+
+            self.decoding.override_fold_consecutive_value = False
+
         else:
             raise ValueError(
                 f"Incorrect decoding strategy supplied. Must be one of {possible_strategies}\n"
@@ -423,6 +452,17 @@ class AbstractCTCDecoding(ConfidenceMixin):
             # extract the hypotheses
             hypotheses_list = hypotheses_list[0]  # type: List[Hypothesis]
 
+        is_packed = isinstance(hypotheses_list, PackedHypotheses)
+        if is_packed:
+            decoded_texts = self.decode_packed_hypotheses(hypotheses_list, fold_consecutive)
+            if not return_hypotheses and not self.compute_timestamps:
+                # only the text is required, which is decoded without creating Hypothesis objects
+                return decoded_texts, None
+
+            hypotheses_list = list(hypotheses_list)
+            for hyp, text in zip(hypotheses_list, decoded_texts):
+                hyp.text = text
+
         if isinstance(hypotheses_list[0], NBestHypotheses):
             hypotheses = []
             all_hypotheses = []
@@ -450,9 +490,12 @@ class AbstractCTCDecoding(ConfidenceMixin):
             return best_hyp_text, all_hyp_text
 
         else:
-            hypotheses = self.decode_hypothesis(
-                hypotheses_list, fold_consecutive
-            )  # type: List[Union[Hypothesis, NBestHypotheses]]
+            if is_packed:
+                hypotheses = hypotheses_list
+            else:
+                hypotheses = self.decode_hypothesis(
+                    hypotheses_list, fold_consecutive
+                )  # type: List[Union[Hypothesis, NBestHypotheses]]
 
             # If computing timestamps
             if self.compute_timestamps is True:
@@ -546,6 +589,45 @@ class AbstractCTCDecoding(ConfidenceMixin):
 
         return hypotheses_list
 
+    def decode_packed_hypotheses(
+        self, hypotheses: PackedHypotheses, fold_consecutive: bool
+    ) -> List[Union[str, Tuple[List[int], List[int], List[int]]]]:
+        """
+        Decode packed hypotheses into a list of strings, without creating Hypothesis objects.
+        The tokens after CTC collapse are provided by PackedCTCHypotheses, so that the hypotheses are only
+        de-tokenized here.
+
+        Args:
+            hypotheses: PackedHypotheses with the per-frame labels of every sample.
+            fold_consecutive: Whether to collapse the ctc blank tokens or not.
+
+        Returns:
+            A list of strings, or a list of tuples (decoded_prediction, token_lengths, token_repetitions) if
+            computing timestamps, as the `text` of the Hypothesis returned by `decode_hypothesis`.
+        """
+        texts = []
+        for idx in range(len(hypotheses)):
+            if fold_consecutive and isinstance(hypotheses, PackedCTCHypotheses):
+                decoded_prediction, token_lengths, token_repetitions = hypotheses.get_tokens(idx)
+            else:
+                prediction = hypotheses.get_y_sequence(idx).numpy()
+                keep = prediction != self.blank_id
+                if fold_consecutive:
+                    keep[1:] &= prediction[1:] != prediction[:-1]
+                decoded_prediction = prediction[keep].tolist()
+                token_lengths = token_repetitions = None
+
+            if self.compute_timestamps is True:
+                if token_lengths is None:
+                    if fold_consecutive:
+                        raise ValueError("Computing timestamps requires the tokens of PackedCTCHypotheses")
+                    token_lengths = [1] * len(decoded_prediction)
+                    token_repetitions = [1] * len(decoded_prediction)
+                texts.append((decoded_prediction, token_lengths, token_repetitions))
+            else:
+                texts.append(self.decode_tokens_to_str(decoded_prediction))
+        return texts
+
     def compute_confidence(self, hypotheses_list: List[Hypothesis]) -> List[Hypothesis]:
         """
         Computes high-level (per-token and/or per-word) confidence scores for a list of hypotheses.
@@ -617,6 +699,39 @@ class AbstractCTCDecoding(ConfidenceMixin):
         """
         raise NotImplementedError()
 
+    def build_boosting_trie(self, phrases: List[str], boost: float) -> BoostingTrie:
+        """
+        Implemented by subclass in order to encode a list of phrases and compile them into a BoostingTrie,
+        used for contextual biasing.
+
+        Args:
+            phrases: List of phrases to boost.
+            boost: Reward of every token of a matched phrase.
+
+        Returns:
+            The (cached) BoostingTrie of the phrases.
+        """
+        raise NotImplementedError()
+
+    def set_boosting_phrases(self, phrases: Optional[List[str]], boost: float = 1.0):
+        """
+        Biases the beam search towards a list of phrases (contextual biasing), e.g. the customer-specific terms of
+        a request. The phrases are encoded and compiled into a BoostingTrie the first time the list is used,
+        so that the list can be changed for every request. Supported by the `prefix` beam search strategies.
+
+        Args:
+            phrases: List of phrases to boost, or None to disable contextual biasing.
+            boost: Reward (added to the log probability) of every token of a matched phrase.
+        """
+        if not hasattr(self.decoding, 'set_boosting_trie'):
+            raise ValueError(f"Contextual biasing is not supported by the `{self.cfg.strategy}` strategy.")
+
+        boosting_trie = None
+        if phrases:
+            boosting_trie = self.build_boosting_trie(phrases, boost=boost)
+            logging.info(f"Boosting {boosting_trie.num_phrases} phrases out of {len(phrases)}")
+        self.decoding.set_boosting_trie(boosting_trie)
+
     def compute_ctc_timestamps(self, hypothesis: Hypothesis, timestamp_type: str = "all"):
         """
         Method to compute time stamps at char/subword, and word level given some hypothesis.
@@ -919,6 +1034,7 @@ class CTCDecoding(AbstractCTCDecoding):
                 Possible values are :
                 -   greedy (for greedy decoding).
                 -   beam (for DeepSpeed KenLM based decoding).
+                -   prefix (for built-in CTC prefix beam search with an optional ARPA n-gram LM).
 
             compute_timestamps: A bool flag, which determines whether to compute the character/subword, or
                 word based timestamp mapping the output log-probabilities to discrite intervals of timestamps.
@@ -1014,7 +1130,12 @@ class CTCDecoding(AbstractCTCDecoding):
                 kenlm_path: str, path to a KenLM ARPA or .binary file (depending on the strategy chosen).
                     If the path is invalid (file is not found at path), will raise a deferred error at the moment
                     of calculation of beam search, so that users may update / change the decoding strategy
-                    to point to the correct file.
+                    to point to the correct file. The `prefix` strategy requires an ARPA file, and decodes without
+                    LM if it is not set.
+
+                prefix_cfg: optional dict-like object with the settings of the `prefix` strategy (see
+                    `ctc_beam_decoding.PrefixBeamSearchConfig`) - the number of tokens per frame and the minimum token
+                    log probability for pruning, the word delimiter of char models, and the number of worker processes.
 
         blank_id: The id of the RNNT blank token.
     """
@@ -1074,6 +1195,19 @@ class CTCDecoding(AbstractCTCDecoding):
         token_list = [self.labels_map[c] for c in tokens if c != self.blank_id]
         return token_list
 
+    def build_boosting_trie(self, phrases: List[str], boost: float) -> BoostingTrie:
+        """
+        Encodes a list of phrases and compiles them into a BoostingTrie, used for contextual biasing.
+
+        Args:
+            phrases: List of phrases to boost.
+            boost: Reward of every token of a matched phrase.
+
+        Returns:
+            The (cached) BoostingTrie of the phrases.
+        """
+        return get_boosting_trie(phrases, boost=boost, vocabulary=self.vocabulary)
+
 
 class WER(Metric):
     """
@@ -21,6 +21,7 @@ from torchmetrics import Metric
 
 from nemo.collections.asr.metrics.wer import AbstractCTCDecoding, CTCDecodingConfig
 from nemo.collections.asr.parts.submodules import ctc_beam_decoding
+from nemo.collections.asr.parts.submodules.context_biasing import BoostingTrie, get_boosting_trie
 from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis
 from nemo.collections.common.tokenizers.tokenizer_spec import TokenizerSpec
 from nemo.utils import logging
@@ -37,6 +38,7 @@ class CTCBPEDecoding(AbstractCTCDecoding):
                 Possible values are :
                 -   greedy (for greedy decoding).
                 -   beam (for DeepSpeed KenLM based decoding).
+                -   prefix (for built-in CTC prefix beam search with an optional ARPA n-gram LM).
 
             compute_timestamps: A bool flag, which determines whether to compute the character/subword, or
                 word based timestamp mapping the output log-probabilities to discrite intervals of timestamps.
@@ -132,7 +134,12 @@ class CTCBPEDecoding(AbstractCTCDecoding):
                 kenlm_path: str, path to a KenLM ARPA or .binary file (depending on the strategy chosen).
                     If the path is invalid (file is not found at path), will raise a deferred error at the moment
                     of calculation of beam search, so that users may update / change the decoding strategy
-                    to point to the correct file.
+                    to point to the correct file. The `prefix` strategy requires an ARPA file, and decodes without
+                    LM if it is not set.
+
+                prefix_cfg: optional dict-like object with the settings of the `prefix` strategy (see
+                    `ctc_beam_decoding.PrefixBeamSearchConfig`) - the number of tokens per frame and the minimum token
+                    log probability for pruning, the word delimiter of char models, and the number of worker processes.
 
         tokenizer: NeMo tokenizer object, which inherits from TokenizerSpec.
     """
@@ -198,6 +205,19 @@ class CTCBPEDecoding(AbstractCTCDecoding):
         token_list = self.tokenizer.ids_to_tokens(tokens)
         return token_list
 
+    def build_boosting_trie(self, phrases: List[str], boost: float) -> BoostingTrie:
+        """
+        Encodes a list of phrases and compiles them into a BoostingTrie, used for contextual biasing.
+
+        Args:
+            phrases: List of phrases to boost.
+            boost: Reward of every token of a matched phrase.
+
+        Returns:
+            The (cached) BoostingTrie of the phrases.
+        """
+        return get_boosting_trie(phrases, boost=boost, tokenizer=self.tokenizer)
+
 
 class WERBPE(Metric):
     """
@@ -13,10 +13,12 @@
 # limitations under the License.
 import logging
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Callable, Dict, List, Optional
 
 import torch
 
+from nemo.collections.asr.data import audio_to_text_dataset
+from nemo.collections.asr.data.bucketing_sampler import DurationBucketingBatchSampler
 from nemo.core.classes import ModelPT
 from nemo.core.classes.common import PretrainedModelInfo
 from nemo.core.classes.exportable import Exportable
@@ -139,6 +141,62 @@ class ASRModel(ModelPT, ABC):
                 logging.warning(f'detected inf or nan values in gradients! Setting gradients to zero.')
                 self.zero_grad()
 
+    def _setup_duration_bucketing_dataloader(
+        self, config: Dict, dataset: torch.utils.data.Dataset, collate_fn: Callable
+    ) -> Optional[torch.utils.data.DataLoader]:
+        """
+        Returns a data loader with dynamic batching if `batch_duration` is set in the config, None otherwise.
+        See `audio_to_text_dataset.get_duration_bucketing_batch_sampler`.
+        """
+        batch_sampler = audio_to_text_dataset.get_duration_bucketing_batch_sampler(
+            config, dataset, global_rank=self.global_rank, world_size=self.world_size
+        )
+        if batch_sampler is None:
+            return None
+        return torch.utils.data.DataLoader(
+            dataset=dataset,
+            batch_sampler=batch_sampler,
+            collate_fn=collate_fn,
+            num_workers=config.get('num_workers', 0),
+            pin_memory=config.get('pin_memory', False),
+        )
+
+    def _get_duration_bucketing_sampler(self) -> Optional[DurationBucketingBatchSampler]:
+        """Returns the batch sampler of the training data loader if dynamic batching (`batch_duration`) is used."""
+        batch_sampler = getattr(getattr(self, '_train_dl', None), 'batch_sampler', None)
+        if isinstance(batch_sampler, DurationBucketingBatchSampler):
+            return batch_sampler
+        return None
+
+    def on_train_epoch_start(self):
+        """Records the optimizer step at the beginning of the epoch, unless resuming in the middle of the epoch."""
+        epoch_start_step = getattr(self, '_epoch_start_step', None)
+        if epoch_start_step is None or epoch_start_step[0] != self.current_epoch:
+            self._epoch_start_step = (self.current_epoch, self.trainer.global_step)
+
+    def on_save_checkpoint(self, checkpoint):
+        """
+        Saves the position of dynamic batching in the epoch, so that training resumes with the next batch.
+        The number of batches consumed by the training loop is derived from the optimizer steps of the epoch,
+        since the data loader prefetches batches from the sampler.
+        """
+        sampler = self._get_duration_bucketing_sampler()
+        epoch_start_step = getattr(self, '_epoch_start_step', None)
+        if sampler is None or epoch_start_step is None:
+            return
+        batches_consumed = (self.trainer.global_step - epoch_start_step[1]) * self.trainer.accumulate_grad_batches
+        checkpoint['duration_bucketing_sampler'] = sampler.state_dict(batches_consumed)
+        checkpoint['duration_bucketing_sampler']['epoch_start_step'] = epoch_start_step[1]
+
+    def on_load_checkpoint(self, checkpoint):
+        """Restores the position of dynamic batching in the epoch."""
+        sampler = self._get_duration_bucketing_sampler()
+        state = checkpoint.get('duration_bucketing_sampler', None)
+        if sampler is None or state is None:
+            return
+        sampler.load_state_dict(state)
+        self._epoch_start_step = (state['epoch'], state['epoch_start_step'])
+
 
 class ExportableEncDecModel(Exportable):
     """
@@ -386,6 +386,7 @@ class ASRWithTTSModel(ASRModel):
 
     def on_fit_start(self):
         """Call asr_model on_fit_start hook, ensure TTS model is frozen"""
+        super().on_fit_start()
         self.asr_model.on_fit_start()
         self.tts_model.freeze()
 
@@ -479,6 +479,10 @@ class EncDecRNNTBPEModel(EncDecRNNTModel, ASRBPEMixin):
         else:
             collate_fn = dataset.datasets[0].collate_fn
 
+        dataloader = self._setup_duration_bucketing_dataloader(config, dataset, collate_fn)
+        if dataloader is not None:
+            return dataloader
+
         return torch.utils.data.DataLoader(
             dataset=dataset,
             batch_size=config['batch_size'],
@@ -30,6 +30,7 @@ from typing import Any, Dict, List, Optional, Tuple, Union
 
 import torch
 from omegaconf import DictConfig, OmegaConf
+from torch.utils.checkpoint import checkpoint
 
 from nemo.collections.asr.modules import rnnt_abstract
 from nemo.collections.asr.parts.submodules import stateless_net
@@ -398,6 +399,21 @@ class StatelessTransducerDecoder(rnnt_abstract.AbstractRNNTDecoder, Exportable):
 
         return old_states
 
+    def batch_gather_states(self, batch_states: List[torch.Tensor], indices: torch.Tensor) -> List[torch.Tensor]:
+        """Gather the states of a batch of decoder states at certain indices.
+
+        Args:
+            batch_states: packed decoder states
+                single element list of (B x C)
+
+            indices (torch.Tensor): Long tensor of shape (B') with the indices of the states to gather.
+
+        Returns:
+            batch of decoder states of batch size B'.
+                single element list of (B' x C)
+        """
+        return [batch_states[0].index_select(0, indices)]
+
     def batch_score_hypothesis(
         self, hypotheses: List[rnnt_utils.Hypothesis], cache: Dict[Tuple[int], Any], batch_states: List[torch.Tensor]
     ) -> Tuple[torch.Tensor, List[torch.Tensor], torch.Tensor]:
@@ -1047,6 +1063,21 @@ class RNNTDecoder(rnnt_abstract.AbstractRNNTDecoder, Exportable, AdapterModuleMi
 
         return old_states
 
+    def batch_gather_states(self, batch_states: List[torch.Tensor], indices: torch.Tensor) -> List[torch.Tensor]:
+        """Gather the states of a batch of decoder states at certain indices.
+
+        Args:
+            batch_states (list): packed decoder states
+                (L x B x H, L x B x H)
+
+            indices (torch.Tensor): Long tensor of shape (B') with the indices of the states to gather.
+
+        Returns:
+            batch of decoder states of batch size B'.
+                (L x B' x H, L x B' x H)
+        """
+        return [state.index_select(1, indices) for state in batch_states]
+
     # Adapter method overrides
     def add_adapter(self, name: str, cfg: DictConfig):
         # Update the config with correct input dim
@@ -1117,6 +1148,21 @@ class RNNTJoint(rnnt_abstract.AbstractRNNTJoint, Exportable, AdapterModuleMixin)
 
         fused_batch_size: Optional int, required if `fuse_loss_wer` flag is set. Determines the size of the
             sub-batches. Should be any value below the actual batch size per GPU.
+
+        fused_time_chunk_size: Optional int, only used when `fuse_loss_wer` flag is set. If provided, the joint of
+            every sub-batch is further split into chunks of `fused_time_chunk_size` acoustic timesteps, so that the
+            peak memory of the joint is bounded by the chunk size instead of the length of the utterances.
+
+            Each chunk of the joint is reduced to the log probabilities of the blank and target tokens, and is
+            recomputed during the backward pass (activation checkpointing), so the full [B, T, U, V + 1] tensor
+            is never materialized. The RNNT loss is then computed on the [B, T, U] lattice, with the same value
+            and gradients as the loss module (including its `fastemit_lambda` and `clamp` arguments).
+
+            Note: This is only supported for the RNNT loss, without extra outputs (multi-blank and TDT models), and
+            with loss functions that expose their `fastemit_lambda` and `clamp` (e.g. `warprnnt_numba`).
+
+        fused_label_chunk_size: Optional int, only used when `fused_time_chunk_size` is set. If provided, the
+            chunks of the joint are also split into `fused_label_chunk_size` target timesteps.
     """
 
     @property
@@ -1181,6 +1227,8 @@ class RNNTJoint(rnnt_abstract.AbstractRNNTJoint, Exportable, AdapterModuleMixin)
         fuse_loss_wer: bool = False,
         fused_batch_size: Optional[int] = None,
         experimental_fuse_loss_wer: Any = None,
+        fused_time_chunk_size: Optional[int] = None,
+        fused_label_chunk_size: Optional[int] = None,
     ):
         super().__init__()
 
@@ -1200,6 +1248,8 @@ class RNNTJoint(rnnt_abstract.AbstractRNNTJoint, Exportable, AdapterModuleMixin)
         if fuse_loss_wer and (fused_batch_size is None):
             raise ValueError("If `fuse_loss_wer` is set, then `fused_batch_size` cannot be None!")
 
+        self.set_fused_chunk_sizes(fused_time_chunk_size, fused_label_chunk_size)
+
         self._loss = None
         self._wer = None
 
@@ -1314,36 +1364,46 @@ class RNNTJoint(rnnt_abstract.AbstractRNNTJoint, Exportable, AdapterModuleMixin)
                     if sub_dec.shape[1] != max_sub_transcript_length + 1:
                         sub_dec = sub_dec.narrow(dim=1, start=0, length=max_sub_transcript_length + 1)
 
-                    # Perform joint => [sub-batch, T', U', V + 1]
-                    sub_joint = self.joint(sub_enc, sub_dec)
-
-                    del sub_dec
-
                     # Reduce transcript length to correct alignment
                     # Transcript: [sub-batch, L] -> [sub-batch, L']; L' <= L
                     if sub_transcripts.shape[1] != max_sub_transcript_length:
                         sub_transcripts = sub_transcripts.narrow(dim=1, start=0, length=max_sub_transcript_length)
 
-                    # Compute sub batch loss
-                    # preserve loss reduction type
-                    loss_reduction = self.loss.reduction
+                    if self._fused_time_chunk_size is not None:
+                        # Perform joint and loss over chunks of [sub-batch, T'', U'', V + 1]
+                        loss_batch = self._chunked_joint_loss(
+                            sub_enc, sub_dec, sub_transcripts, sub_enc_lens, sub_transcript_lens
+                        )
 
-                    # override loss reduction to sum
-                    self.loss.reduction = None
+                        del sub_dec
+
+                    else:
+                        # Perform joint => [sub-batch, T', U', V + 1]
+                        sub_joint = self.joint(sub_enc, sub_dec)
+
+                        del sub_dec
+
+                        # Compute sub batch loss
+                        # preserve loss reduction type
+                        loss_reduction = self.loss.reduction
+
+                        # override loss reduction to sum
+                        self.loss.reduction = None
+
+                        # compute and preserve loss
+                        loss_batch = self.loss(
+                            log_probs=sub_joint,
+                            targets=sub_transcripts,
+                            input_lengths=sub_enc_lens,
+                            target_lengths=sub_transcript_lens,
+                        )
+
+                        # reset loss reduction type
+                        self.loss.reduction = loss_reduction
 
-                    # compute and preserve loss
-                    loss_batch = self.loss(
-                        log_probs=sub_joint,
-                        targets=sub_transcripts,
-                        input_lengths=sub_enc_lens,
-                        target_lengths=sub_transcript_lens,
-                    )
                     losses.append(loss_batch)
                     target_lengths.append(sub_transcript_lens)
 
-                    # reset loss reduction type
-                    self.loss.reduction = loss_reduction
-
                 else:
                     losses = None
 
@@ -1437,6 +1497,102 @@ class RNNTJoint(rnnt_abstract.AbstractRNNTJoint, Exportable, AdapterModuleMixin)
 
         return res
 
+    def _chunked_joint_loss(
+        self,
+        f: torch.Tensor,
+        g: torch.Tensor,
+        transcripts: torch.Tensor,
+        encoder_lengths: torch.Tensor,
+        transcript_lengths: torch.Tensor,
+    ) -> torch.Tensor:
+        """
+        Computes the RNNT loss of every sample without materializing the joint tensor, by computing the joint over
+        chunks of `fused_time_chunk_size` x `fused_label_chunk_size` timesteps. Only the log probabilities of the
+        blank and target tokens of every chunk are kept, and the chunks are recomputed in the backward pass.
+
+        Args:
+            f: Output of the Encoder model. A torch.Tensor of shape [B, T, H1]
+            g: Output of the Decoder model. A torch.Tensor of shape [B, U + 1, H2]
+            transcripts: Target tokens, a torch.Tensor of shape [B, U]
+            encoder_lengths: Lengths of the acoustic sequences, a torch.Tensor of shape [B]
+            transcript_lengths: Lengths of the target sequences, a torch.Tensor of shape [B]
+
+        Returns:
+            The unreduced losses, a torch.Tensor of shape [B].
+        """
+        if self._num_extra_outputs > 0:
+            raise ValueError("`fused_time_chunk_size` is not supported by joints with extra outputs!")
+
+        blank = self._vocab_size
+        fastemit_lambda = self.loss.fastemit_lambda
+        clamp = self.loss.clamp
+
+        # The labels of the emissions at every target timestep, the last (and padded) ones being unused
+        labels = torch.nn.functional.pad(transcripts.long(), (0, 1), value=blank)
+        positions = torch.arange(labels.shape[1], device=labels.device)
+        labels = labels.masked_fill(positions[None, :] >= transcript_lengths[:, None], blank)
+
+        # The gradients of the logits are clamped per sample, therefore the scale of every loss is required
+        loss_grads = {}
+
+        def clamp_grad(grad):
+            if 'scale' not in loss_grads:
+                return grad.clamp(-clamp, clamp)
+            bound = clamp * loss_grads['scale']
+            return torch.maximum(torch.minimum(grad, bound), -bound)
+
+        def transition_log_probs(f_chunk, g_chunk, labels_chunk):
+            res = self.joint(f_chunk, g_chunk)  # [B, T'', U'', V + 1]
+
+            if clamp > 0 and res.requires_grad:
+                res.register_hook(clamp_grad)
+
+            res = res.float().log_softmax(dim=-1)
+            blank_log_probs = res[..., blank]
+            label_log_probs = res.gather(
+                dim=-1, index=labels_chunk[:, None, :, None].expand(-1, res.shape[1], -1, -1)
+            ).squeeze(-1)
+            return blank_log_probs, label_log_probs
+
+        time_chunk_size = self._fused_time_chunk_size
+        label_chunk_size = self._fused_label_chunk_size or g.shape[1]
+        blank_log_probs, label_log_probs = [], []
+        for t in range(0, f.shape[1], time_chunk_size):
+            f_chunk = f.narrow(dim=1, start=t, length=min(time_chunk_size, f.shape[1] - t))
+            blank_row, label_row = [], []
+            for u in range(0, g.shape[1], label_chunk_size):
+                length = min(label_chunk_size, g.shape[1] - u)
+                g_chunk = g.narrow(dim=1, start=u, length=length)
+                labels_chunk = labels.narrow(dim=1, start=u, length=length)
+                if torch.is_grad_enabled():
+                    blank_chunk, label_chunk = checkpoint(
+                        transition_log_probs, f_chunk, g_chunk, labels_chunk, use_reentrant=False
+                    )
+                else:
+                    blank_chunk, label_chunk = transition_log_probs(f_chunk, g_chunk, labels_chunk)
+                blank_row.append(blank_chunk)
+                label_row.append(label_chunk)
+            blank_log_probs.append(torch.cat(blank_row, dim=2))
+            label_log_probs.append(torch.cat(label_row, dim=2))
+
+        blank_log_probs = torch.cat(blank_log_probs, dim=1)  # [B, T, U + 1]
+        label_log_probs = torch.cat(label_log_probs, dim=1)  # [B, T, U + 1]
+
+        if fastemit_lambda > 0:
+            # FastEmit scales the gradients of the emissions by (1 + lambda), and the loss by (1 + lambda)
+            label_log_probs = label_log_probs * (1 + fastemit_lambda) - label_log_probs.detach() * fastemit_lambda
+
+        losses = -rnnt_utils.rnnt_log_likelihood(
+            blank_log_probs, label_log_probs, encoder_lengths.long(), transcript_lengths.long()
+        )
+        if fastemit_lambda > 0:
+            losses = losses + losses.detach() * fastemit_lambda
+
+        if clamp > 0 and losses.requires_grad:
+            losses.register_hook(lambda grad: loss_grads.__setitem__('scale', grad.abs()[:, None, None, None]))
+
+        return losses
+
     def _joint_net_modules(self, num_classes, pred_n_hidden, enc_n_hidden, joint_n_hidden, activation, dropout):
         """
         Prepare the trainable modules of the Joint Network
@@ -1527,6 +1683,27 @@ class RNNTJoint(rnnt_abstract.AbstractRNNTJoint, Exportable, AdapterModuleMixin)
     def set_fused_batch_size(self, fused_batch_size):
         self._fused_batch_size = fused_batch_size
 
+    @property
+    def fused_time_chunk_size(self):
+        return self._fused_time_chunk_size
+
+    @property
+    def fused_label_chunk_size(self):
+        return self._fused_label_chunk_size
+
+    def set_fused_chunk_sizes(self, fused_time_chunk_size, fused_label_chunk_size=None):
+        if fused_time_chunk_size is not None and fused_time_chunk_size <= 0:
+            raise ValueError("`fused_time_chunk_size` must be a positive integer or None!")
+
+        if fused_label_chunk_size is not None:
+            if fused_time_chunk_size is None:
+                raise ValueError("`fused_label_chunk_size` can only be set along with `fused_time_chunk_size`!")
+            if fused_label_chunk_size <= 0:
+                raise ValueError("`fused_label_chunk_size` must be a positive integer or None!")
+
+        self._fused_time_chunk_size = fused_time_chunk_size
+        self._fused_label_chunk_size = fused_label_chunk_size
+
 
 class RNNTDecoderJoint(torch.nn.Module, Exportable):
     """
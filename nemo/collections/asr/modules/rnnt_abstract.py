@@ -277,3 +277,19 @@ class AbstractRNNTDecoder(NeuralModule, ABC):
                 (L x B x H, L x B x H)
         """
         raise NotImplementedError()
+
+    def batch_gather_states(self, batch_states: List[torch.Tensor], indices: torch.Tensor) -> List[torch.Tensor]:
+        """Gather the states of a batch of decoder states at certain indices.
+        The same index can occur several times, e.g. to expand the hypotheses of a beam.
+
+        Args:
+            batch_states (list): packed decoder states
+                (L x B x H, L x B x H)
+
+            indices (torch.Tensor): Long tensor of shape (B') with the indices of the states to gather.
+
+        Returns:
+            batch of decoder states of batch size B'.
+                (L x B' x H, L x B' x H)
+        """
+        raise NotImplementedError()
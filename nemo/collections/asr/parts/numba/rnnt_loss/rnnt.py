@@ -28,11 +28,12 @@
 
 import multiprocessing
 
+import numba
 import torch
 from numba import cuda
 
 from nemo.collections.asr.parts.numba.rnnt_loss.utils import global_constants, rnnt_helper
-from nemo.collections.asr.parts.numba.rnnt_loss.utils.cpu_utils import cpu_rnnt
+from nemo.collections.asr.parts.numba.rnnt_loss.utils.cpu_utils import cpu_rnnt_kernel
 from nemo.collections.asr.parts.numba.rnnt_loss.utils.cuda_utils import gpu_rnnt
 
 
@@ -51,7 +52,9 @@ def rnnt_loss_cpu(
     """
     Wrapper method for accessing CPU RNNT loss.
 
-    CPU implementation ported from [HawkAaron/warp-transducer](https://github.com/HawkAaron/warp-transducer).
+    Like the GPU implementation, the log softmax of the activations is computed within the loss, and the
+    gradients are computed with respect to the activations (see `cpu_rnnt_kernel`), in parallel over the
+    samples of the batch, or within the samples for small batches.
 
     Args:
         acts: Activation tensor of shape [B, T, U, V+1].
@@ -64,74 +67,29 @@ def rnnt_loss_cpu(
         fastemit_lambda: Float scaling factor for FastEmit regularization. Refer to
             FastEmit: Low-latency Streaming ASR with Sequence-level Emission Regularization.
         clamp: Float value. When set to value >= 0.0, will clamp the gradient to [-clamp, clamp].
-        num_threads: Number of threads for OpenMP.
+        num_threads: Number of numba threads, all the cores if negative, the current numba setting if 0.
     """
-    # aliases
-    log_probs = acts
-    flat_labels = labels
-
-    minibatch_size = log_probs.shape[0]
-    maxT = log_probs.shape[1]
-    maxU = log_probs.shape[2]
-    alphabet_size = log_probs.shape[3]
-
     if num_threads < 0:
         num_threads = multiprocessing.cpu_count()
 
-    num_threads = max(1, num_threads)  # have to use at least 1 thread
-
-    gpu_size, status = rnnt_helper.get_workspace_size(maxT, maxU, minibatch_size, gpu=False)
-    if status != global_constants.RNNTStatus.RNNT_STATUS_SUCCESS:
-        raise RuntimeError("Invalid parameter passed when calculating working space memory")
-
-    cpu_workspace = torch.zeros(gpu_size, device=log_probs.device, dtype=log_probs.dtype, requires_grad=False)
-
-    ### VIEW TENSORS AS VECTORS FOR POINTER INDEXING ###
-    log_probs, acts_shape = rnnt_helper.flatten_tensor(log_probs)
-    flat_labels, labels_shape = rnnt_helper.flatten_tensor(flat_labels)
-
-    wrapper = cpu_rnnt.CPURNNT(
-        minibatch=minibatch_size,
-        maxT=maxT,
-        maxU=maxU,
-        alphabet_size=alphabet_size,
-        workspace=cpu_workspace,
-        blank=blank_label,
-        fastemit_lambda=fastemit_lambda,
-        clamp=clamp,
-        num_threads=num_threads,
-        batch_first=True,
-    )
-
-    if grads is None:
-        status = wrapper.score_forward(
-            log_probs=log_probs.data,
-            costs=costs,
-            flat_labels=flat_labels.data,
-            label_lengths=label_lengths.data,
-            input_lengths=input_lengths.data,
+    # the number of numba threads is a process-wide setting, restore it after the loss
+    prev_num_threads = numba.get_num_threads()
+    if num_threads > 0:
+        numba.set_num_threads(min(num_threads, numba.config.NUMBA_NUM_THREADS))
+    try:
+        cpu_rnnt_kernel.cost_and_grad(
+            acts.detach().numpy(),
+            labels.numpy(),
+            input_lengths.numpy(),
+            label_lengths.numpy(),
+            costs=costs.numpy(),
+            grads=None if grads is None else grads.numpy(),
+            blank=blank_label,
+            fastemit_lambda=fastemit_lambda,
+            clamp=clamp,
         )
-
-        if status != global_constants.RNNTStatus.RNNT_STATUS_SUCCESS:
-            raise RuntimeError("Could not calculate forward scores")
-
-    else:
-        ### FLATTEN GRAD TENSOR ###
-        grads, grads_shape = rnnt_helper.flatten_tensor(grads)
-
-        status = wrapper.cost_and_grad(
-            log_probs=log_probs.data,
-            grads=grads.data,
-            costs=costs,
-            flat_labels=flat_labels.data,
-            label_lengths=label_lengths.data,
-            input_lengths=input_lengths.data,
-        )
-
-        if status != global_constants.RNNTStatus.RNNT_STATUS_SUCCESS:
-            raise RuntimeError("Could not calculate forward scores")
-
-    del cpu_workspace, wrapper
+    finally:
+        numba.set_num_threads(prev_num_threads)
     return True
 
 
@@ -32,7 +32,6 @@ from torch.autograd import Function
 from torch.nn import Module
 
 from nemo.collections.asr.parts.numba.rnnt_loss import rnnt
-from nemo.collections.asr.parts.numba.rnnt_loss.utils.cpu_utils import cpu_rnnt
 
 __all__ = ['rnnt_loss', 'RNNTLossNumba', 'MultiblankRNNTLossNumba']
 
@@ -118,7 +117,7 @@ class _MultiblankRNNTNumba(Function):
         if is_cuda:
             loss_func = rnnt.multiblank_rnnt_loss_gpu
         else:
-            raise NotImplementedError()
+            raise NotImplementedError("The multi-blank RNNT loss is only implemented on GPU.")
 
         grads = torch.zeros_like(acts) if acts.requires_grad else None
         minibatch_size = acts.size(0)
@@ -173,19 +172,7 @@ def rnnt_loss(
             'mean': the output losses will be divided by the target lengths and
             then the mean over the batch is taken. Default: 'mean'
     """
-    if not acts.is_cuda:
-        # Since CPU requires log_softmax to be computed explicitly, we need to perform grad clipping
-        # *after* we have obtained the gradients of loss(logsoftmax()).
-        # This is highly wasteful since it requires a copy of the entire joint tensor which is expensive.
-        # CUDA version is much more efficient since it performs an inplace logsoftmax, and therefore
-        # can inplace clamp the gradient.
-        if clamp > 0.0:
-            acts = cpu_rnnt.LogSoftmaxGradModification.apply(acts, clamp)
-
-        # NOTE manually done log_softmax for CPU version,
-        # log_softmax is computed within GPU version.
-        acts = torch.nn.functional.log_softmax(acts, -1)
-
+    # NOTE: log_softmax is computed within both the CPU and GPU versions, which also clamp the gradients.
     return _RNNTNumba.apply(acts, labels, act_lens, label_lens, blank, reduction, fastemit_lambda, clamp)
 
 
@@ -219,19 +206,6 @@ def multiblank_rnnt_loss(
             'mean': the output losses will be divided by the target lengths and
             then the mean over the batch is taken. Default: 'mean'
     """
-    if not acts.is_cuda:
-        # Since CPU requires log_softmax to be computed explicitly, we need to perform grad clipping
-        # *after* we have obtained the gradients of loss(logsoftmax()).
-        # This is highly wasteful since it requires a copy of the entire joint tensor which is expensive.
-        # CUDA version is much more efficient since it performs an inplace logsoftmax, and therefore
-        # can inplace clamp the gradient.
-        if clamp > 0.0:
-            acts = cpu_rnnt.LogSoftmaxGradModification.apply(acts, clamp)
-
-        # NOTE manually done log_softmax for CPU version,
-        # log_softmax is computed within GPU version.
-        acts = torch.nn.functional.log_softmax(acts, -1)
-
     return _MultiblankRNNTNumba.apply(
         acts, labels, act_lens, label_lens, blank, big_blank_durations, reduction, fastemit_lambda, clamp
     )
@@ -265,19 +239,7 @@ class RNNTLossNumba(Module):
         act_lens: Tensor of size (batch) containing size of each output sequence from the network
         label_lens: Tensor of (batch) containing label length of each example
         """
-        if not acts.is_cuda:
-            # Since CPU requires log_softmax to be computed explicitly, we need to perform grad clipping
-            # *after* we have obtained the gradients of loss(logsoftmax()).
-            # This is highly wasteful since it requires a copy of the entire joint tensor which is expensive.
-            # CUDA version is much more efficient since it performs an inplace logsoftmax, and therefore
-            # can inplace clamp the gradient.
-            if self.clamp > 0.0:
-                acts = cpu_rnnt.LogSoftmaxGradModification.apply(acts, self.clamp)
-
-            # NOTE manually done log_softmax for CPU version,
-            # log_softmax is computed within GPU version.
-            acts = torch.nn.functional.log_softmax(acts, -1)
-
+        # NOTE: log_softmax is computed within both the CPU and GPU versions, which also clamp the gradients.
         return self.loss(
             acts, labels, act_lens, label_lens, self.blank, self.reduction, self.fastemit_lambda, self.clamp
         )
@@ -327,19 +289,6 @@ class MultiblankRNNTLossNumba(Module):
         act_lens: Tensor of size (batch) containing size of each output sequence from the network
         label_lens: Tensor of (batch) containing label length of each example
         """
-        if not acts.is_cuda:
-            # Since CPU requires log_softmax to be computed explicitly, we need to perform grad clipping
-            # *after* we have obtained the gradients of loss(logsoftmax()).
-            # This is highly wasteful since it requires a copy of the entire joint tensor which is expensive.
-            # CUDA version is much more efficient since it performs an inplace logsoftmax, and therefore
-            # can inplace clamp the gradient.
-            if self.clamp > 0.0:
-                acts = cpu_rnnt.LogSoftmaxGradModification.apply(acts, self.clamp)
-
-            # NOTE manually done log_softmax for CPU version,
-            # log_softmax is computed within GPU version.
-            acts = torch.nn.functional.log_softmax(acts, -1)
-
         return self.loss(
             acts,
             labels,
@@ -0,0 +1,266 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Multi-threaded CPU kernels of the RNNT loss.
+
+Like the CUDA kernels, they take the activations of the joint before the log softmax and compute the gradients with
+respect to these activations, so that neither the log probabilities nor their gradients are materialized. Only the
+log normalizers and the log probabilities of the blank and label tokens ([T, U] each) and the alphas and betas are
+kept for every sample.
+
+Samples are processed in parallel when there are at least as many samples as threads. Otherwise, the samples are
+processed one after the other, each of them in parallel: the log normalizers and the gradients over the time steps,
+and the alphas and betas over the cells of every anti-diagonal of the [T, U] lattice, which only depend on the
+previous anti-diagonal.
+"""
+
+import math
+
+import numba
+import numpy as np
+from numba import jit, prange
+
+__all__ = ['cost_and_grad']
+
+
+@jit(nopython=True, nogil=True, inline='always')
+def _log_sum_exp(a, b):
+    if a == -np.inf:
+        return b
+    if b == -np.inf:
+        return a
+    if a > b:
+        return math.log1p(math.exp(b - a)) + a
+    return math.log1p(math.exp(a - b)) + b
+
+
+def _log_softmax_of_transitions(acts, labels, T, U, blank, log_norms, blank_log_probs, label_log_probs):
+    """
+    Computes the log normalizers of the activations [T, U, V+1], and the log probabilities of the blank and
+    label transitions [T, U].
+    """
+    alphabet_size = acts.shape[2]
+    for t in prange(T):
+        for u in range(U):
+            row = acts[t, u]
+            max_act = row[0]
+            for v in range(1, alphabet_size):
+                max_act = max(max_act, row[v])
+            total = 0.0
+            for v in range(alphabet_size):
+                total += math.exp(row[v] - max_act)
+            log_norm = max_act + math.log(total)
+            log_norms[t, u] = log_norm
+            blank_log_probs[t, u] = row[blank] - log_norm
+            if u < U - 1:
+                label_log_probs[t, u] = row[labels[u]] - log_norm
+
+
+def _compute_alphas(blank_log_probs, label_log_probs, T, U, alphas):
+    """Computes the forward variables [T, U] by anti-diagonals, returns the log likelihood."""
+    alphas[0, 0] = 0.0
+    for diagonal in range(1, T + U - 1):
+        for t in prange(max(0, diagonal - U + 1), min(T, diagonal + 1)):
+            u = diagonal - t
+            if t == 0:
+                alphas[0, u] = alphas[0, u - 1] + label_log_probs[0, u - 1]
+            elif u == 0:
+                alphas[t, 0] = alphas[t - 1, 0] + blank_log_probs[t - 1, 0]
+            else:
+                no_emit = alphas[t - 1, u] + blank_log_probs[t - 1, u]
+                emit = alphas[t, u - 1] + label_log_probs[t, u - 1]
+                alphas[t, u] = _log_sum_exp(emit, no_emit)
+    return alphas[T - 1, U - 1] + blank_log_probs[T - 1, U - 1]
+
+
+def _compute_betas(blank_log_probs, label_log_probs, T, U, betas):
+    """Computes the backward variables [T, U] by anti-diagonals, returns the log likelihood."""
+    betas[T - 1, U - 1] = blank_log_probs[T - 1, U - 1]
+    for diagonal in range(T + U - 3, -1, -1):
+        for t in prange(max(0, diagonal - U + 1), min(T, diagonal + 1)):
+            u = diagonal - t
+            if u == U - 1:
+                betas[t, u] = betas[t + 1, u] + blank_log_probs[t, u]
+            elif t == T - 1:
+                betas[t, u] = betas[t, u + 1] + label_log_probs[t, u]
+            else:
+                no_emit = betas[t + 1, u] + blank_log_probs[t, u]
+                emit = betas[t, u + 1] + label_log_probs[t, u]
+                betas[t, u] = _log_sum_exp(emit, no_emit)
+    return betas[0, 0]
+
+
+def _compute_grads(
+    acts,
+    labels,
+    T,
+    U,
+    blank,
+    log_norms,
+    blank_log_probs,
+    label_log_probs,
+    alphas,
+    betas,
+    loglike,
+    fastemit_lambda,
+    clamp,
+    grads,
+):
+    """
+    Computes the gradients of the negative log likelihood with respect to the activations [T, U, V+1], as done by
+    `compute_grad_kernel` of the CUDA implementation.
+    """
+    alphabet_size = acts.shape[2]
+    log_emit_scale = math.log1p(fastemit_lambda)
+    for t in prange(T):
+        for u in range(U):
+            # gradient of the log normalizer: the occupancy of the cell, and the FastEmit regularization
+            scale = math.exp(alphas[t, u] + betas[t, u] - loglike)
+            if fastemit_lambda > 0.0 and u < U - 1:
+                scale += fastemit_lambda * math.exp(alphas[t, u] + label_log_probs[t, u] + betas[t, u + 1] - loglike)
+            row = acts[t, u]
+            grad = grads[t, u]
+            for v in range(alphabet_size):
+                grad[v] = scale * math.exp(row[v] - log_norms[t, u])
+
+            # gradients of the blank and label transitions
+            if t < T - 1:
+                grad[blank] -= math.exp(alphas[t, u] + blank_log_probs[t, u] + betas[t + 1, u] - loglike)
+            elif u == U - 1:
+                grad[blank] -= math.exp(alphas[t, u] + blank_log_probs[t, u] - loglike)
+            if u < U - 1:
+                grad[labels[u]] -= math.exp(
+                    log_emit_scale + alphas[t, u] + label_log_probs[t, u] + betas[t, u + 1] - loglike
+                )
+
+            if clamp > 0.0:
+                for v in range(alphabet_size):
+                    grad[v] = min(max(grad[v], -clamp), clamp)
+
+
+def _make_sample_kernel(parallel: bool):
+    """
+    Compiles the kernel of a single sample, either multi-threaded or to be run by a thread of a batch.
+    Only the multi-threaded kernels are cached on disk, since the cache of a function does not depend on the
+    `parallel` option it is compiled with.
+    """
+    compile_fn = jit(nopython=True, nogil=True, parallel=parallel, cache=parallel)
+    log_softmax_of_transitions = compile_fn(_log_softmax_of_transitions)
+    compute_alphas = compile_fn(_compute_alphas)
+    compute_betas = compile_fn(_compute_betas)
+    compute_grads = compile_fn(_compute_grads)
+
+    @jit(nopython=True, nogil=True, cache=parallel)
+    def sample_cost_and_grad(acts, labels, T, U, blank, fastemit_lambda, clamp, grads, compute_grad):
+        log_norms = np.empty((T, U), dtype=np.float64)
+        blank_log_probs = np.empty((T, U), dtype=np.float64)
+        label_log_probs = np.empty((T, U), dtype=np.float64)
+        log_softmax_of_transitions(acts, labels, T, U, blank, log_norms, blank_log_probs, label_log_probs)
+
+        alphas = np.empty((T, U), dtype=np.float64)
+        loglike = compute_alphas(blank_log_probs, label_log_probs, T, U, alphas)
+        if compute_grad:
+            betas = np.empty((T, U), dtype=np.float64)
+            compute_betas(blank_log_probs, label_log_probs, T, U, betas)
+            compute_grads(
+                acts,
+                labels,
+                T,
+                U,
+                blank,
+                log_norms,
+                blank_log_probs,
+                label_log_probs,
+                alphas,
+                betas,
+                loglike,
+                fastemit_lambda,
+                clamp,
+                grads,
+            )
+        return -loglike * (1.0 + fastemit_lambda)
+
+    return sample_cost_and_grad
+
+
+_sample_cost_and_grad = _make_sample_kernel(parallel=False)
+_parallel_sample_cost_and_grad = _make_sample_kernel(parallel=True)
+
+
+@jit(nopython=True, nogil=True, parallel=True, cache=True)
+def _batch_cost_and_grad(
+    acts, labels, input_lengths, label_lengths, blank, fastemit_lambda, clamp, costs, grads, compute_grad
+):
+    for b in prange(acts.shape[0]):
+        costs[b] = _sample_cost_and_grad(
+            acts[b],
+            labels[b],
+            input_lengths[b],
+            label_lengths[b] + 1,
+            blank,
+            fastemit_lambda,
+            clamp,
+            grads[b],
+            compute_grad,
+        )
+
+
+def cost_and_grad(
+    acts: np.ndarray,
+    labels: np.ndarray,
+    input_lengths: np.ndarray,
+    label_lengths: np.ndarray,
+    costs: np.ndarray,
+    grads: np.ndarray,
+    blank: int,
+    fastemit_lambda: float,
+    clamp: float,
+):
+    """
+    Computes the RNNT loss of a batch and, optionally, its gradients with respect to the activations.
+
+    Args:
+        acts: Activations of the joint, before or after the log softmax, of shape [B, T, U, V+1].
+        labels: Ground truth labels of shape [B, U-1].
+        input_lengths: Lengths of the acoustic sequences [B].
+        label_lengths: Lengths of the target sequences [B].
+        costs: Vector [B] which receives the negative log likelihoods (scaled by 1 + `fastemit_lambda`).
+        grads: Zero array of shape [B, T, U, V+1] which receives the gradients, or None to only compute the costs.
+        blank: Index of the blank token in the vocabulary.
+        fastemit_lambda: Float scaling factor for FastEmit regularization. Refer to
+            FastEmit: Low-latency Streaming ASR with Sequence-level Emission Regularization.
+        clamp: Float value. When set to value > 0.0, will clamp the gradient to [-clamp, clamp].
+    """
+    compute_grad = grads is not None
+    if not compute_grad:
+        grads = np.empty((acts.shape[0], 0, 0, 0), dtype=acts.dtype)
+
+    if acts.shape[0] >= numba.get_num_threads():
+        _batch_cost_and_grad(
+            acts, labels, input_lengths, label_lengths, blank, fastemit_lambda, clamp, costs, grads, compute_grad
+        )
+    else:
+        for b in range(acts.shape[0]):
+            costs[b] = _parallel_sample_cost_and_grad(
+                acts[b],
+                labels[b],
+                input_lengths[b],
+                label_lengths[b] + 1,
+                blank,
+                fastemit_lambda,
+                clamp,
+                grads[b],
+                compute_grad,
+            )
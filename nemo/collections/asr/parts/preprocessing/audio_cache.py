@@ -0,0 +1,178 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+from nemo.utils import logging
+
+__all__ = ['DecodedAudioCache']
+
+
+class DecodedAudioCache:
+    """
+    Persistent, size-bounded cache of decoded and resampled audio.
+
+    Entries are stored as `.npy` files named after a hash of the audio file (path, size, modification time) and of
+    the decoding parameters (target sample rate, channel selector, offset, duration), so a modified file is never
+    served from the cache. Entries are read back as copy-on-write memory maps, which avoids decoding and copying
+    the samples, and can be shared by several processes (e.g., data loader workers) through the OS page cache.
+
+    When the size of the cache exceeds `max_size_gb`, the least recently used entries are removed. The cache is
+    safe to share between processes: entries are written atomically and the size limit is enforced by every
+    process independently, so it may be exceeded temporarily.
+
+    Args:
+        cache_dir: directory of the cache, created if it does not exist.
+        max_size_gb: maximum size of the cache, in GB.
+        dtype: storage type of the samples, `float32` (lossless) or `int16` (16-bit PCM, half the size).
+    """
+
+    # Size of the cache after eviction, relative to the maximum size
+    EVICTION_RATIO = 0.9
+    SUPPORTED_DTYPES = ('float32', 'int16')
+
+    def __init__(self, cache_dir: str, max_size_gb: float = 100.0, dtype: str = 'float32'):
+        if dtype not in self.SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported audio cache dtype `{dtype}`, expected one of {self.SUPPORTED_DTYPES}")
+        self.cache_dir = cache_dir
+        self.max_size = int(max_size_gb * 1024 ** 3)
+        self.dtype = dtype
+        # Size of the cache as known by this process, computed on the first write
+        self._size = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get_key(
+        self,
+        audio_file,
+        target_sr: int,
+        int_values: bool = False,
+        offset: float = 0,
+        duration: float = 0,
+        channel_selector: Optional[Union[int, Iterable[int], str]] = None,
+    ) -> Optional[str]:
+        """
+        Returns the cache key of the decoded `audio_file`, or None if the audio cannot be cached
+        (e.g., it is a file-like object or the file does not exist).
+        """
+        if not isinstance(audio_file, str):
+            return None
+        try:
+            stat = os.stat(audio_file)
+        except OSError:
+            return None
+
+        if channel_selector is not None and not isinstance(channel_selector, (int, str)):
+            channel_selector = list(channel_selector)
+        description = [
+            os.path.abspath(audio_file),
+            stat.st_size,
+            stat.st_mtime_ns,
+            target_sr,
+            int_values,
+            offset,
+            duration,
+            channel_selector,
+            self.dtype,
+        ]
+        return hashlib.sha1(json.dumps(description).encode()).hexdigest()
+
+    def load(self, key: str) -> Optional[np.ndarray]:
+        """
+        Returns the samples of a cache entry as a copy-on-write memory map, or None if the entry does not exist.
+        """
+        path = self._get_path(key)
+        try:
+            samples = np.load(path, mmap_mode='c')
+            # modification time is used as the last access time for LRU eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return samples
+
+    def save(self, key: str, samples: np.ndarray) -> bool:
+        """
+        Adds `samples` (float32, in [-1, 1] range) to the cache, and evicts old entries if the cache is full.
+        Returns True if the entry was written.
+        """
+        if self.dtype == 'int16':
+            samples = np.clip(np.round(samples * 2 ** 15), -(2 ** 15), 2 ** 15 - 1).astype(np.int16)
+        else:
+            samples = samples.astype(np.float32, copy=False)
+
+        path = self._get_path(key)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix='.tmp', delete=False) as f:
+                tmp_path = f.name
+                np.save(f, samples)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Could not write decoded audio cache entry {path}: `{e}`")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+        if self._size is None:
+            self._size = self._scan_size()
+        else:
+            self._size += os.path.getsize(path)
+        if self._size > self.max_size:
+            self._evict()
+        return True
+
+    def _get_path(self, key: str) -> str:
+        # entries are sharded in sub-directories to keep directories small
+        return os.path.join(self.cache_dir, key[:2], key + '.npy')
+
+    def _list_entries(self):
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.npy'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        # removed by another process
+                        continue
+                    yield entry.path, stat.st_size, stat.st_mtime_ns
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._list_entries())
+
+    def _evict(self):
+        """Removes the least recently used entries, until the cache is below `EVICTION_RATIO` of its size limit."""
+        entries = sorted(self._list_entries(), key=lambda entry: entry[2])
+        size = sum(entry[1] for entry in entries)
+        target_size = int(self.max_size * self.EVICTION_RATIO)
+        num_removed = 0
+        for path, entry_size, _ in entries:
+            if size <= target_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # already removed by another process
+                pass
+            size -= entry_size
+            num_removed += 1
+        self._size = size
+        logging.debug(f"Removed {num_removed} entries from decoded audio cache {self.cache_dir}")
@@ -34,7 +34,9 @@
 # This file contains code artifacts adapted from https://github.com/ryanleary/patter
 import math
 import random
-from typing import Optional, Tuple, Union
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple, Union
 
 import librosa
 import numpy as np
@@ -161,10 +163,11 @@ def make_seq_mask_like(
 
 
 class WaveformFeaturizer(object):
-    def __init__(self, sample_rate=16000, int_values=False, augmentor=None):
+    def __init__(self, sample_rate=16000, int_values=False, augmentor=None, audio_cache=None):
         self.augmentor = augmentor if augmentor is not None else AudioAugmentor()
         self.sample_rate = sample_rate
         self.int_values = int_values
+        self.audio_cache = audio_cache
 
     def max_augmentation_length(self, length):
         return self.augmentor.max_augmentation_length(length)
@@ -195,6 +198,7 @@ class WaveformFeaturizer(object):
             trim_hop_length=trim_hop_length,
             orig_sr=orig_sr,
             channel_selector=channel_selector,
+            audio_cache=self.audio_cache,
         )
         return self.process_segment(audio)
 
@@ -466,6 +470,232 @@ class FilterbankFeatures(nn.Module):
         return x, seq_len
 
 
+class FilterbankFeaturesCPU:
+    """
+    Batched, multi-threaded CPU implementation of `FilterbankFeatures` for inference.
+
+    Features are computed for a list of variable-length signals, so feature extraction can run in data loader
+    workers (e.g., in a `collate_fn`) and the model only receives features, passed as `processed_signal` /
+    `processed_signal_length` to its `forward`. Compared to calling `FilterbankFeatures` on each utterance:
+
+    - utterances are sorted by length and processed in chunks of `chunk_size`, which bounds memory and padding,
+      and chunks are processed in parallel by `num_threads` threads (torch operators release the GIL);
+    - signal buffers are allocated once per thread and reused across calls, as are the window and filterbank;
+    - int16 (PCM) signals are converted directly into the signal buffer, and their `1 / 2**15` scale is folded
+      into the filterbank, which avoids an intermediate float copy and gives the same features as float signals.
+
+    Each utterance is padded as if it was processed alone (reflection at its own boundaries), so the features
+    do not depend on the other utterances of the batch. Dithering and narrowband augmentation are training-time
+    perturbations and are not applied.
+
+    Example:
+        featurizer = FilterbankFeaturesCPU(model.preprocessor.featurizer, num_threads=4)
+        features, features_len = featurizer([audio_1, audio_2])
+        log_probs, encoded_len, greedy_predictions = model(
+            processed_signal=features, processed_signal_length=features_len
+        )
+
+    Args:
+        featurizer: `FilterbankFeatures` module whose configuration, window and filterbank are used.
+        chunk_size: number of utterances processed together.
+        num_threads: number of threads processing chunks in parallel.
+    """
+
+    def __init__(self, featurizer: FilterbankFeatures, chunk_size: int = 16, num_threads: int = 1):
+        if chunk_size < 1 or num_threads < 1:
+            raise ValueError(f"chunk_size and num_threads must be positive, got {chunk_size} and {num_threads}")
+        self.chunk_size = chunk_size
+        self.num_threads = num_threads
+
+        self.n_fft = featurizer.n_fft
+        self.hop_length = featurizer.hop_length
+        self.win_length = featurizer.win_length
+        self.exact_pad = featurizer.stft_pad_amount is not None
+        self.pad_amount = featurizer.stft_pad_amount if self.exact_pad else self.n_fft // 2
+        self.preemph = featurizer.preemph
+        self.mag_power = featurizer.mag_power
+        self.log = featurizer.log
+        self.log_zero_guard_type = featurizer.log_zero_guard_type
+        self.log_zero_guard_value = featurizer.log_zero_guard_value_fn(torch.empty(0, dtype=torch.float))
+        self.frame_splicing = featurizer.frame_splicing
+        self.normalize = featurizer.normalize
+        self.pad_to = featurizer.pad_to
+        self.max_length = int(featurizer.max_length)
+        self.pad_value = featurizer.pad_value
+
+        self.window = None if featurizer.window is None else featurizer.window.detach().to('cpu', torch.float)
+        self.fb = featurizer.fb.detach().to('cpu', torch.float).squeeze(0)
+        # int16 samples are not scaled to [-1, 1): the scale is applied to the mel energies instead
+        self.fb_int16 = self.fb * (2.0 ** -15) ** self.mag_power
+
+        self._local = threading.local()
+        self._executor = None
+
+    def __getstate__(self):
+        # thread pool and per-thread buffers are re-created in each process (e.g., data loader workers)
+        state = self.__dict__.copy()
+        state['_local'] = None
+        state['_executor'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def get_seq_len(self, lengths: torch.Tensor) -> torch.Tensor:
+        """Returns the number of feature frames of signals of `lengths` samples."""
+        return torch.div(lengths + 2 * self.pad_amount - self.n_fft, self.hop_length, rounding_mode='floor') + 1
+
+    def __call__(
+        self,
+        signals: Union[torch.Tensor, np.ndarray, List[Union[torch.Tensor, np.ndarray]]],
+        lengths: Optional[torch.Tensor] = None,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Computes the features of a batch of signals.
+
+        Args:
+            signals: list of 1-D signals (float, or int16 PCM), or padded signals of shape [B, T] with `lengths`.
+            lengths: lengths of padded `signals`, in samples.
+
+        Returns:
+            Features of shape [B, D, T'] padded with `pad_value` (as `FilterbankFeatures`), and their lengths.
+        """
+        if lengths is not None:
+            signals = [signals[idx, : int(length)] for idx, length in enumerate(lengths)]
+        signals = [torch.from_numpy(signal) if isinstance(signal, np.ndarray) else signal for signal in signals]
+        if len(signals) == 0:
+            raise ValueError("Expected at least one signal")
+
+        is_int16 = [signal.dtype == torch.int16 for signal in signals]
+        if any(is_int16) and not all(is_int16):
+            raise ValueError("Signals of a batch must be all int16, or all floating point")
+        fb = self.fb_int16 if is_int16[0] else self.fb
+
+        signal_lengths = torch.tensor([signal.shape[0] for signal in signals], dtype=torch.long)
+        features_lengths = self.get_seq_len(signal_lengths)
+        max_len = int(features_lengths.max())
+        if self.pad_to == "max":
+            max_len = self.max_length
+        elif self.pad_to > 0 and max_len % self.pad_to != 0:
+            max_len += self.pad_to - max_len % self.pad_to
+        num_features = fb.shape[0] * self.frame_splicing
+        features = torch.full((len(signals), num_features, max_len), self.pad_value, dtype=torch.float)
+
+        order = torch.argsort(signal_lengths, descending=True).tolist()
+        chunks = [order[start : start + self.chunk_size] for start in range(0, len(order), self.chunk_size)]
+
+        def process(chunk):
+            chunk_features = self._process_chunk([signals[idx] for idx in chunk], fb)
+            features[chunk, :, : chunk_features.shape[-1]] = chunk_features
+
+        if self.num_threads > 1 and len(chunks) > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.num_threads)
+            # consume the results to propagate exceptions
+            list(self._executor.map(process, chunks))
+        else:
+            for chunk in chunks:
+                process(chunk)
+        return features, features_lengths
+
+    def _get_buffer(self, name: str, num_rows: int, num_columns: int) -> torch.Tensor:
+        """Returns a [num_rows, num_columns] view of a buffer of the current thread, grown if needed."""
+        buffer = getattr(self._local, name, None)
+        if buffer is None or buffer.shape[0] < num_rows or buffer.shape[1] < num_columns:
+            rows = max(num_rows, self.chunk_size)
+            columns = num_columns if buffer is None else max(num_columns, buffer.shape[1])
+            buffer = torch.empty(rows, columns, dtype=torch.float)
+            setattr(self._local, name, buffer)
+        return buffer[:num_rows, :num_columns]
+
+    def _reflect_pad(self, x: torch.Tensor, lengths: torch.Tensor):
+        """Reflection-pads in place each signal of `x`, which starts at `pad_amount` and has `lengths` samples."""
+        pad = self.pad_amount
+        if pad == 0:
+            return
+        steps = torch.arange(1, pad + 1)
+        last = (pad + lengths - 1).unsqueeze(1)
+        # indices are clamped for signals shorter than the padding
+        left = torch.minimum(pad + steps.flip(0).unsqueeze(0), last)
+        right = torch.maximum(last - steps.unsqueeze(0), torch.tensor(pad))
+        x[:, :pad] = torch.gather(x, 1, left)
+        x.scatter_(1, last + steps.unsqueeze(0), torch.gather(x, 1, right))
+
+    def _preemphasize(self, x: torch.Tensor) -> torch.Tensor:
+        out = self._get_buffer('preemph_buffer', x.shape[0], x.shape[1])
+        out[:, 0] = x[:, 0]
+        torch.add(x[:, 1:], x[:, :-1], alpha=-self.preemph, out=out[:, 1:])
+        return out
+
+    def _normalize(self, x: torch.Tensor, lengths: torch.Tensor) -> torch.Tensor:
+        if self.normalize not in ("per_feature", "all_features"):
+            x, _, _ = normalize_batch(x, lengths, normalize_type=self.normalize)
+            return x
+        if self.normalize == "per_feature" and (lengths == 1).any():
+            raise ValueError(
+                "normalize_batch with `per_feature` normalize_type received a tensor of length 1. This will result "
+                "in torch.std() returning nan. Make sure your audio length has enough samples for a single "
+                "feature (ex. at least `hop_length` for Mel Spectrograms)."
+            )
+        valid = (torch.arange(x.shape[-1]).unsqueeze(0) < lengths.unsqueeze(1)).unsqueeze(1)
+        dims = (-1,) if self.normalize == "per_feature" else (-2, -1)
+        count = lengths.view(-1, 1, 1).to(x.dtype)
+        if self.normalize == "all_features":
+            count = count * x.shape[1]
+        mean = x.masked_fill(~valid, 0.0).sum(dim=dims, keepdim=True) / count
+        centered = (x - mean).masked_fill_(~valid, 0.0)
+        std = torch.sqrt(centered.pow(2).sum(dim=dims, keepdim=True) / (count - 1)) + CONSTANT
+        return centered.div_(std)
+
+    def _process_chunk(self, signals: List[torch.Tensor], fb: torch.Tensor) -> torch.Tensor:
+        pad = self.pad_amount
+        lengths = torch.tensor([signal.shape[0] for signal in signals], dtype=torch.long)
+        x = self._get_buffer('signal_buffer', len(signals), int(lengths.max()) + 2 * pad)
+        x.zero_()
+        for row, signal in enumerate(signals):
+            # converts int16 samples directly into the float buffer
+            x[row, pad : pad + signal.shape[0]].copy_(signal)
+
+        # same order of operations as `FilterbankFeatures.forward`
+        if self.exact_pad:
+            self._reflect_pad(x, lengths)
+        if self.preemph is not None:
+            x = self._preemphasize(x)
+        if not self.exact_pad:
+            self._reflect_pad(x, lengths)
+
+        x = torch.stft(
+            x,
+            n_fft=self.n_fft,
+            hop_length=self.hop_length,
+            win_length=self.win_length,
+            center=False,
+            window=self.window,
+            return_complex=True,
+        )
+        # power spectrum as re^2 + im^2, a strided reduction over the last dimension of size 2 is much slower
+        x = torch.view_as_real(x)
+        x = torch.square(x[..., 0]).addcmul_(x[..., 1], x[..., 1])
+        if self.mag_power != 2.0:
+            x = x.pow_(self.mag_power / 2)
+        x = torch.matmul(fb, x)
+
+        if self.log:
+            if self.log_zero_guard_type == "add":
+                x = x.add_(self.log_zero_guard_value).log_()
+            else:
+                x = x.clamp_(min=self.log_zero_guard_value).log_()
+        if self.frame_splicing > 1:
+            x = splice_frames(x, self.frame_splicing)
+
+        features_lengths = self.get_seq_len(lengths)
+        if self.normalize:
+            x = self._normalize(x, features_lengths)
+        mask = torch.arange(x.shape[-1]).unsqueeze(0) >= features_lengths.unsqueeze(1)
+        return x.masked_fill_(mask.unsqueeze(1), self.pad_value)
+
+
 class FilterbankFeaturesTA(nn.Module):
     """
     Exportable, `torchaudio`-based implementation of Mel Spectrogram extraction.
@@ -156,6 +156,10 @@ class AudioSegment(object):
         Audio sample type is usually integer or float-point.
         Integers will be scaled to [-1, 1] in float32.
         """
+        if isinstance(samples, np.memmap) and samples.mode == 'c' and samples.dtype == np.float32:
+            # copy-on-write memory maps (e.g., from the decoded audio cache) can be used without a copy,
+            # in-place modifications are private to this process
+            return samples
         float32_samples = samples.astype('float32')
         if samples.dtype in np.sctypes['int']:
             bits = np.iinfo(samples.dtype).bits
@@ -181,6 +185,7 @@ class AudioSegment(object):
         trim_hop_length=512,
         orig_sr=None,
         channel_selector=None,
+        audio_cache=None,
     ):
         """
         Load a file supported by librosa and return as an AudioSegment.
@@ -199,8 +204,50 @@ class AudioSegment(object):
         :param channel selector: string denoting the downmix mode, an integer denoting the channel to be selected, or an iterable
                                  of integers denoting a subset of channels. Channel selector is using zero-based indexing.
                                  If set to `None`, the original signal will be used.
+        :param audio_cache: optional DecodedAudioCache storing the decoded and resampled signal. The cache is used
+                            only when target_sr is set.
         :return: numpy array of samples
         """
+        cache_key = None
+        if audio_cache is not None and target_sr is not None:
+            cache_key = audio_cache.get_key(
+                audio_file,
+                target_sr=target_sr,
+                int_values=int_values,
+                offset=offset,
+                duration=duration,
+                channel_selector=channel_selector,
+            )
+        if cache_key is not None:
+            samples = audio_cache.load(cache_key)
+            if samples is None:
+                segment = cls.from_file(
+                    audio_file,
+                    target_sr=target_sr,
+                    int_values=int_values,
+                    offset=offset,
+                    duration=duration,
+                    orig_sr=orig_sr,
+                    channel_selector=channel_selector,
+                )
+                samples = segment._samples
+                # read back the stored samples, so that the results do not depend on cache hits
+                if audio_cache.save(cache_key, samples):
+                    cached_samples = audio_cache.load(cache_key)
+                    samples = cached_samples if cached_samples is not None else samples
+            # samples are already resampled, and channels are already selected
+            return cls(
+                samples,
+                target_sr,
+                target_sr=target_sr,
+                trim=trim,
+                trim_ref=trim_ref,
+                trim_top_db=trim_top_db,
+                trim_frame_length=trim_frame_length,
+                trim_hop_length=trim_hop_length,
+                orig_sr=orig_sr,
+            )
+
         samples = None
         if not isinstance(audio_file, str) or os.path.splitext(audio_file)[-1] in sf_supported_formats:
             try:
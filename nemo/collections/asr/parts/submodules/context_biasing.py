@@ -0,0 +1,187 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import weakref
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from nemo.collections.common.tokenizers.tokenizer_spec import TokenizerSpec
+
+__all__ = ['BoostingTrie', 'get_boosting_trie']
+
+
+class BoostingTrie:
+    """
+    Aho-Corasick automaton of the token ids of boosted phrases, used for contextual biasing of beam search.
+
+    A hypothesis carries a state of the automaton (a node of the trie of the phrases, the root being 0), which is
+    updated with every emitted token by `advance`. Every token which extends a partial match of a phrase is
+    rewarded with `boost`, so that hypotheses spelling a phrase are kept in the beam. When a match is broken,
+    the automaton follows the failure links to the longest suffix which is a prefix of a phrase, and the reward of
+    the abandoned tokens is taken back. When a phrase is completed, its reward is kept and the state goes back to
+    the root. The reward of a partial match at the end of decoding is taken back by `finalize`.
+
+    The transitions are memoized, so that after a few utterances advancing a state costs a single dict lookup.
+
+    Args:
+        phrases: token ids of the phrases to boost.
+        boost: reward (added to the log probability) of every token of a matched phrase.
+        max_cached_transitions: maximum number of memoized transitions, the memo is cleared when it is exceeded.
+    """
+
+    ROOT = 0
+
+    def __init__(self, phrases: Iterable[Sequence[int]], boost: float = 1.0, max_cached_transitions: int = 1000000):
+        self.boost = boost
+        self.max_cached_transitions = max_cached_transitions
+
+        self._children = {}  # type: Dict[Tuple[int, int], int]
+        self._node_children = [[]]  # type: List[List[Tuple[int, int]]]
+        self._depth = [0]
+        self._is_end = [False]
+        self.num_phrases = 0
+
+        for phrase in phrases:
+            if len(phrase) == 0:
+                continue
+            node = self.ROOT
+            for token in phrase:
+                token = int(token)
+                child = self._children.get((node, token))
+                if child is None:
+                    child = len(self._depth)
+                    self._children[(node, token)] = child
+                    self._node_children[node].append((token, child))
+                    self._node_children.append([])
+                    self._depth.append(self._depth[node] + 1)
+                    self._is_end.append(False)
+                node = child
+            self._is_end[node] = True
+            self.num_phrases += 1
+
+        self._fail = [self.ROOT] * len(self._depth)
+        # length of the longest phrase which ends at a node, possibly as a suffix of the path to the node
+        self._output_depth = [depth if is_end else 0 for depth, is_end in zip(self._depth, self._is_end)]
+        self._build_failure_links()
+
+        self._transitions = {}  # type: Dict[Tuple[int, int], Tuple[float, int]]
+
+    def _build_failure_links(self):
+        # breadth first, so that the failure links of the shorter prefixes are known
+        queue = [child for _, child in self._node_children[self.ROOT]]
+        for node in queue:
+            for token, child in self._node_children[node]:
+                fail = self._fail[node]
+                while fail != self.ROOT and (fail, token) not in self._children:
+                    fail = self._fail[fail]
+                self._fail[child] = self._children.get((fail, token), self.ROOT)
+                if not self._is_end[child]:
+                    self._output_depth[child] = self._output_depth[self._fail[child]]
+                queue.append(child)
+
+    def __len__(self) -> int:
+        """Returns the number of nodes of the trie."""
+        return len(self._depth)
+
+    def advance(self, state: int, token: int) -> Tuple[float, int]:
+        """
+        Advances a state with an emitted token.
+
+        Args:
+            state: the state of the hypothesis.
+            token: the emitted token id.
+
+        Returns:
+            A tuple (reward to add to the score of the hypothesis, new state).
+        """
+        key = (state, token)
+        transition = self._transitions.get(key)
+        if transition is None:
+            if len(self._transitions) >= self.max_cached_transitions:
+                self._transitions.clear()
+            transition = self._transitions[key] = self._compute_transition(state, token)
+        return transition
+
+    def _compute_transition(self, state: int, token: int) -> Tuple[float, int]:
+        node = state
+        while node != self.ROOT and (node, token) not in self._children:
+            node = self._fail[node]
+        node = self._children.get((node, token), self.ROOT)
+
+        partial_reward = self.boost * self._depth[state]
+        if self._output_depth[node] > 0:
+            # a phrase is completed: its reward replaces the reward of the partial match
+            return self.boost * self._output_depth[node] - partial_reward, self.ROOT
+        return self.boost * self._depth[node] - partial_reward, node
+
+    def finalize(self, state: int) -> float:
+        """Returns the reward to add to the score of a hypothesis at the end of decoding (removes partial matches)."""
+        return -self.boost * self._depth[state]
+
+
+# tries of the most recently used phrase lists
+_BOOSTING_TRIE_CACHE = OrderedDict()  # type: OrderedDict
+_BOOSTING_TRIE_CACHE_SIZE = 16
+
+
+def get_boosting_trie(
+    phrases: Sequence,
+    boost: float = 1.0,
+    vocabulary: Optional[Sequence[str]] = None,
+    tokenizer: Optional[TokenizerSpec] = None,
+) -> BoostingTrie:
+    """
+    Returns the BoostingTrie of a list of phrases, which is only built (and tokenized) the first time the list is used.
+
+    The cache is keyed on the phrases, the boost and the vocabulary or tokenizer. Only a weak reference to the
+    tokenizer is kept, so that the cache does not keep a model alive.
+
+    Args:
+        phrases: token ids of the phrases to boost, or their texts if `vocabulary` or `tokenizer` is given.
+        boost: reward of every token of a matched phrase.
+        vocabulary: optional labels of the character tokens, the phrases with characters outside of the
+            vocabulary are ignored.
+        tokenizer: optional tokenizer of the phrases.
+
+    Returns:
+        The BoostingTrie, shared by all the callers with the same phrases, boost and vocabulary or tokenizer.
+    """
+    if tokenizer is not None:
+        key = (tuple(phrases), float(boost), weakref.ref(tokenizer))
+    elif vocabulary is not None:
+        key = (tuple(phrases), float(boost), tuple(vocabulary))
+    else:
+        key = (tuple(tuple(phrase) for phrase in phrases), float(boost), None)
+    trie = _BOOSTING_TRIE_CACHE.get(key)
+    if trie is None:
+        if tokenizer is not None:
+            token_ids = [tokenizer.text_to_ids(phrase) for phrase in key[0]]
+        elif vocabulary is not None:
+            label_to_id = {label: idx for idx, label in enumerate(vocabulary)}
+            token_ids = [_encode_with_vocabulary(phrase, label_to_id) for phrase in key[0]]
+        else:
+            token_ids = key[0]
+        trie = BoostingTrie(token_ids, boost=boost)
+        _BOOSTING_TRIE_CACHE[key] = trie
+        if len(_BOOSTING_TRIE_CACHE) > _BOOSTING_TRIE_CACHE_SIZE:
+            _BOOSTING_TRIE_CACHE.popitem(last=False)
+    else:
+        _BOOSTING_TRIE_CACHE.move_to_end(key)
+    return trie
+
+
+def _encode_with_vocabulary(text: str, label_to_id: Dict[str, int]) -> List[int]:
+    """Returns the character token ids of a text, or an empty list if it has characters outside of the vocabulary."""
+    token_ids = [label_to_id.get(char) for char in text]
+    return [] if None in token_ids else token_ids
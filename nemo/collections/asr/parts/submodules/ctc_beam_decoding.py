@@ -13,12 +13,15 @@
 # limitations under the License.
 
 import math
+import multiprocessing
 import os
 from dataclasses import dataclass
-from typing import Iterable, List, Optional, Tuple, Union
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
+import numpy as np
 import torch
 
+from nemo.collections.asr.parts.submodules.context_biasing import BoostingTrie
 from nemo.collections.asr.parts.utils import rnnt_utils
 from nemo.collections.common.tokenizers.tokenizer_spec import TokenizerSpec
 from nemo.core.classes import Typing, typecheck
@@ -59,6 +62,22 @@ def _states_to_device(dec_state, device='cpu'):
     return dec_state
 
 
+# BeamCTCInfer used by the workers of a fork-based pool, which inherit it (and its language model) copy-on-write
+_POOL_BEAM_CTC_INFER = None
+
+
+def _prefix_beam_search_in_worker(logprobs: np.ndarray) -> List[Tuple[float, List[int]]]:
+    return _POOL_BEAM_CTC_INFER._prefix_beam_search_sample(logprobs)
+
+
+def _log_add(a: float, b: float) -> float:
+    if a < b:
+        a, b = b, a
+    if b == -math.inf:
+        return a
+    return a + math.log1p(math.exp(b - a))
+
+
 class AbstractBeamCTCInfer(Typing):
     """A beam CTC decoder.
 
@@ -186,6 +205,7 @@ class BeamCTCInfer(AbstractBeamCTCInfer):
         beam_beta: float = 0.0,
         kenlm_path: str = None,
         flashlight_cfg: Optional['FlashlightConfig'] = None,
+        prefix_cfg: Optional['PrefixBeamSearchConfig'] = None,
         # pyctcdecode_cfg: Optional['PyCTCDecodeConfig'] = None,
     ):
         super().__init__(blank_id=blank_id, beam_size=beam_size)
@@ -208,10 +228,12 @@ class BeamCTCInfer(AbstractBeamCTCInfer):
             raise NotImplementedError(f"The search type of `pyctcdecode` is currently not supported.\n" f"")
         elif search_type == "flashlight":
             self.search_algorithm = self.flashlight_beam_search
+        elif search_type == "prefix":
+            self.search_algorithm = self.prefix_beam_search
         else:
             raise NotImplementedError(
                 f"The search type ({search_type}) supplied is not supported!\n"
-                f"Please use one of : (default, nemo, pyctcdecode)"
+                f"Please use one of : (default, nemo, pyctcdecode, flashlight, prefix)"
             )
 
         self.beam_alpha = beam_alpha
@@ -229,10 +251,16 @@ class BeamCTCInfer(AbstractBeamCTCInfer):
             flashlight_cfg = FlashlightConfig()
         self.flashlight_cfg = flashlight_cfg
 
+        if prefix_cfg is None:
+            prefix_cfg = PrefixBeamSearchConfig()
+        self.prefix_cfg = prefix_cfg
+
         # Default beam search scorer functions
         self.default_beam_scorer = None
         self.pyctcdecode_beam_scorer = None
         self.flashlight_beam_scorer = None
+        self.ngram_lm = None
+        self.boosting_trie = None
         self.token_offset = 0
 
     @typecheck()
@@ -522,6 +550,219 @@ class BeamCTCInfer(AbstractBeamCTCInfer):
 
         return nbest_hypotheses
 
+    @torch.no_grad()
+    def prefix_beam_search(
+        self, x: torch.Tensor, out_len: torch.Tensor
+    ) -> List[Union[rnnt_utils.Hypothesis, rnnt_utils.NBestHypotheses]]:
+        """
+        CTC prefix beam search with optional shallow fusion of an ARPA n-gram language model, implemented without
+        external decoders. The LM is queried with whole words for char models, and with every token (encoded as a
+        unicode char shifted by `token_offset`, as done by `train_kenlm.py`) for subword models.
+        Prefixes which spell the phrases of the optional `boosting_trie` are rewarded (contextual biasing).
+
+        Args:
+            x: Tensor of shape [B, T, V+1]
+            out_len: Tensor of shape [B], the lengths of the sequences.
+
+        Returns:
+            A list of NBestHypotheses, one per sample.
+        """
+        if self.compute_timestamps:
+            raise ValueError(
+                f"Beam Search with strategy `{self.search_type}` does not support time stamp calculation!"
+            )
+
+        if self.ngram_lm is None and self.kenlm_path is not None:
+            if not os.path.exists(self.kenlm_path):
+                raise FileNotFoundError(
+                    f"ARPA file not found at : {self.kenlm_path}. Please set a valid path in the decoding config."
+                )
+
+            # Must import at runtime to avoid circular dependency due to module level import.
+            from nemo.collections.asr.parts.submodules.ngram_lm import NGramLM
+
+            self.ngram_lm = NGramLM.from_arpa(self.kenlm_path)
+
+        # a single copy of the whole batch to the host
+        x = x.to('cpu')
+        logprobs = x.float().numpy()
+        lengths = out_len.tolist() if out_len is not None else [x.shape[1]] * x.shape[0]
+        samples = [logprobs[idx, : lengths[idx]] for idx in range(len(lengths))]
+
+        num_workers = min(self.prefix_cfg.num_workers, len(samples))
+        if num_workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+            global _POOL_BEAM_CTC_INFER
+            _POOL_BEAM_CTC_INFER = self
+            try:
+                with multiprocessing.get_context("fork").Pool(num_workers) as pool:
+                    beams_batch = pool.map(_prefix_beam_search_in_worker, samples)
+            finally:
+                _POOL_BEAM_CTC_INFER = None
+        else:
+            beams_batch = [self._prefix_beam_search_sample(sample) for sample in samples]
+
+        # For each sample in the batch
+        nbest_hypotheses = []
+        for beams_idx, beams in enumerate(beams_batch):
+            hypotheses = []
+            for score, pred_token_ids in beams:
+                hypothesis = rnnt_utils.Hypothesis(
+                    score=score, y_sequence=pred_token_ids, dec_state=None, timestep=[], last_token=None
+                )
+
+                # If alignment must be preserved, we preserve a view of the output logprobs.
+                if self.preserve_alignments:
+                    hypothesis.alignments = x[beams_idx][: lengths[beams_idx]]
+
+                hypotheses.append(hypothesis)
+
+            nbest_hypotheses.append(rnnt_utils.NBestHypotheses(hypotheses))
+
+        return nbest_hypotheses
+
+    def _prefix_beam_search_sample(self, logprobs: np.ndarray) -> List[Tuple[float, List[int]]]:
+        """
+        Prefix beam search of a single sample.
+
+        The prefixes are nodes of a tree of the expanded prefixes, so that extending a prefix and comparing prefixes
+        does not depend on their length. The LM score of a prefix is computed once, when it is created.
+
+        Args:
+            logprobs: log probabilities of shape [T, V+1].
+
+        Returns:
+            A list of (score, token ids) tuples, sorted by decreasing score.
+        """
+        blank_id = self.blank_id
+        beam_size_token = min(self.prefix_cfg.beam_size_token, logprobs.shape[-1])
+        token_min_logp = self.prefix_cfg.token_min_logp
+        lm = self.ngram_lm
+        word_delimiter = self.prefix_cfg.word_delimiter
+
+        # tree of prefixes, the root (node 0) is the empty prefix
+        parents, last_tokens = [-1], [-1]
+        children = {}  # type: Dict[Tuple[int, int], int]
+        # for every prefix: the LM score of the completed words, the LM state, the number of words and the
+        # (char models) word being spelled
+        lm_scores, lm_states, num_words, partial_words = [0.0], [lm.start_state() if lm else ()], [0], ['']
+        # for every prefix: the contextual biasing reward and state
+        boosting_trie = self.boosting_trie
+        boost_scores, boost_states = [0.0], [0]
+        lm_cache = {}  # type: Dict[Tuple[Tuple[int, ...], str], Tuple[float, Tuple[int, ...]]]
+
+        def score_word(state, word):
+            key = (state, word)
+            if key not in lm_cache:
+                lm_cache[key] = lm.score(state, lm.word_id(word))
+            return lm_cache[key]
+
+        def extend(prefix, token):
+            key = (prefix, token)
+            child = children.get(key)
+            if child is None:
+                child = len(parents)
+                children[key] = child
+                parents.append(prefix)
+                last_tokens.append(token)
+                lm_score, lm_state, words, partial = lm_scores[prefix], lm_states[prefix], num_words[prefix], ''
+                if lm is not None:
+                    if self.decoding_type == 'subword':
+                        logprob, lm_state = score_word(lm_state, chr(token + self.token_offset))
+                        lm_score, words = lm_score + logprob, words + 1
+                    elif self.vocab[token] == word_delimiter:
+                        if partial_words[prefix]:
+                            logprob, lm_state = score_word(lm_state, partial_words[prefix])
+                            lm_score, words = lm_score + logprob, words + 1
+                    else:
+                        partial = partial_words[prefix] + self.vocab[token]
+                lm_scores.append(lm_score)
+                lm_states.append(lm_state)
+                num_words.append(words)
+                partial_words.append(partial)
+
+                boost_score, boost_state = boost_scores[prefix], boost_states[prefix]
+                if boosting_trie is not None:
+                    reward, boost_state = boosting_trie.advance(boost_state, token)
+                    boost_score += reward
+                boost_scores.append(boost_score)
+                boost_states.append(boost_state)
+            return child
+
+        def fusion_score(prefix):
+            score = boost_scores[prefix]
+            if lm is not None:
+                score += self.beam_alpha * lm_scores[prefix] + self.beam_beta * num_words[prefix]
+            return score
+
+        # prefix -> [log prob ending with blank, log prob ending with non-blank]
+        beams = {0: [0.0, -math.inf]}
+        for frame in logprobs:
+            if beam_size_token < len(frame):
+                candidates = np.argpartition(frame, -beam_size_token)[-beam_size_token:]
+            else:
+                candidates = np.arange(len(frame))
+            candidates = [(int(token), float(frame[token])) for token in candidates if frame[token] >= token_min_logp]
+            if not candidates:
+                token = int(frame.argmax())
+                candidates = [(token, float(frame[token]))]
+
+            next_beams = {}
+            for prefix, (p_blank, p_non_blank) in beams.items():
+                p_total = _log_add(p_blank, p_non_blank)
+                for token, logp in candidates:
+                    if token == blank_id:
+                        entry = next_beams.setdefault(prefix, [-math.inf, -math.inf])
+                        entry[0] = _log_add(entry[0], p_total + logp)
+                    elif token == last_tokens[prefix]:
+                        # repeated token: collapsed, unless separated by a blank
+                        entry = next_beams.setdefault(prefix, [-math.inf, -math.inf])
+                        entry[1] = _log_add(entry[1], p_non_blank + logp)
+                        if p_blank > -math.inf:
+                            entry = next_beams.setdefault(extend(prefix, token), [-math.inf, -math.inf])
+                            entry[1] = _log_add(entry[1], p_blank + logp)
+                    else:
+                        entry = next_beams.setdefault(extend(prefix, token), [-math.inf, -math.inf])
+                        entry[1] = _log_add(entry[1], p_total + logp)
+
+            if len(next_beams) > self.beam_size:
+                best = sorted(
+                    next_beams.items(), key=lambda item: _log_add(*item[1]) + fusion_score(item[0]), reverse=True
+                )
+                next_beams = dict(best[: self.beam_size])
+            beams = next_beams
+
+        results = []
+        for prefix, (p_blank, p_non_blank) in beams.items():
+            score = _log_add(p_blank, p_non_blank)
+            if lm is not None:
+                lm_score, lm_state, words = lm_scores[prefix], lm_states[prefix], num_words[prefix]
+                if partial_words[prefix]:
+                    logprob, lm_state = score_word(lm_state, partial_words[prefix])
+                    lm_score, words = lm_score + logprob, words + 1
+                lm_score += lm.final_score(lm_state)
+                score += self.beam_alpha * lm_score + self.beam_beta * words
+            if boosting_trie is not None:
+                score += boost_scores[prefix] + boosting_trie.finalize(boost_states[prefix])
+
+            tokens = []
+            while prefix > 0:
+                tokens.append(last_tokens[prefix])
+                prefix = parents[prefix]
+            results.append((score, tokens[::-1]))
+
+        return sorted(results, key=lambda result: result[0], reverse=True)
+
+    def set_boosting_trie(self, boosting_trie: Optional[BoostingTrie]):
+        """
+        Sets the phrases to bias the decoding towards, e.g. for every request. Only supported by the `prefix` search.
+
+        Args:
+            boosting_trie: BoostingTrie of the token ids of the phrases, or None to disable contextual biasing.
+        """
+        if boosting_trie is not None and self.search_type != 'prefix':
+            raise ValueError(f"Contextual biasing is not supported by the `{self.search_type}` search type.")
+        self.boosting_trie = boosting_trie
+
     def set_decoding_type(self, decoding_type: str):
         super().set_decoding_type(decoding_type)
 
@@ -554,6 +795,18 @@ class FlashlightConfig:
     unit_lm: bool = False
 
 
+@dataclass
+class PrefixBeamSearchConfig:
+    # number of most likely tokens per frame which extend the prefixes
+    beam_size_token: int = 16
+    # tokens with a lower log probability do not extend the prefixes
+    token_min_logp: float = -10.0
+    # token which separates the words of char models
+    word_delimiter: str = ' '
+    # number of forked worker processes, each decoding a subset of the batch
+    num_workers: int = 1
+
+
 @dataclass
 class BeamCTCInferConfig:
     beam_size: int
@@ -568,3 +821,4 @@ class BeamCTCInferConfig:
 
     # pyctcdecode_cfg: PyCTCDecodeConfig = PyCTCDecodeConfig()
     flashlight_cfg: Optional[FlashlightConfig] = FlashlightConfig()
+    prefix_cfg: Optional[PrefixBeamSearchConfig] = PrefixBeamSearchConfig()
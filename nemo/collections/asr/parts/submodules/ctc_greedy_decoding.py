@@ -141,7 +141,8 @@ class GreedyCTCInfer(Typing, ConfidenceMeasureMixin):
         # set confidence calculation method
         self._init_confidence_measure(confidence_method_cfg)
 
-    @typecheck()
+    # the packed hypotheses are not a list, and must not be iterated in order to be checked
+    @typecheck(ignore_collections=True)
     def forward(
         self, decoder_output: torch.Tensor, decoder_lengths: torch.Tensor,
     ):
@@ -154,93 +155,138 @@ class GreedyCTCInfer(Typing, ConfidenceMeasureMixin):
                 output sequence.
 
         Returns:
-            packed list containing batch number of sentences (Hypotheses).
+            packed list containing batch number of sentences (Hypotheses), as a `rnnt_utils.PackedCTCHypotheses`.
         """
         with torch.inference_mode():
-            hypotheses = []
-            # Process each sequence independently
-            prediction_cpu_tensor = decoder_output.cpu()
-
-            if prediction_cpu_tensor.ndim < 2 or prediction_cpu_tensor.ndim > 3:
+            if decoder_output.ndim < 2 or decoder_output.ndim > 3:
                 raise ValueError(
                     f"`decoder_output` must be a tensor of shape [B, T] (labels, int) or "
-                    f"[B, T, V] (log probs, float). Provided shape = {prediction_cpu_tensor.shape}"
+                    f"[B, T, V] (log probs, float). Provided shape = {decoder_output.shape}"
                 )
 
             # determine type of input - logprobs or labels
-            if prediction_cpu_tensor.ndim == 2:  # labels
-                greedy_decode = self._greedy_decode_labels
+            if decoder_output.ndim == 2:  # labels
+                if self.preserve_alignments:
+                    raise ValueError(
+                        "Requested for alignments, but predictions provided were labels, not log probabilities."
+                    )
+                if self.preserve_frame_confidence:
+                    raise ValueError(
+                        "Requested for per-frame confidence, but predictions provided were labels, "
+                        "not log probabilities."
+                    )
+                packed_result = self._greedy_decode_batch(decoder_output, None, decoder_lengths)
             else:
-                greedy_decode = self._greedy_decode_logprobs
-
-            for ind in range(prediction_cpu_tensor.shape[0]):
-                out_len = decoder_lengths[ind] if decoder_lengths is not None else None
-                hypothesis = greedy_decode(prediction_cpu_tensor[ind], out_len)
-                hypotheses.append(hypothesis)
+                prediction_logprobs, prediction_labels = decoder_output.max(dim=-1)
+                packed_result = self._greedy_decode_batch(prediction_labels, prediction_logprobs, decoder_lengths)
 
-            # Pack results into Hypotheses
-            packed_result = pack_hypotheses(hypotheses, decoder_lengths)
+                if self.preserve_alignments or self.preserve_frame_confidence:
+                    self._add_frame_fields(packed_result, decoder_output.detach().cpu())
 
         return (packed_result,)
 
     @torch.no_grad()
-    def _greedy_decode_logprobs(self, x: torch.Tensor, out_len: torch.Tensor):
-        # x: [T, D]
-        # out_len: [seq_len]
-
-        # Initialize blank state and empty label set in Hypothesis
-        hypothesis = rnnt_utils.Hypothesis(score=0.0, y_sequence=[], dec_state=None, timestep=[], last_token=None)
-        prediction = x.detach().cpu()
-
-        if out_len is not None:
-            prediction = prediction[:out_len]
-
-        prediction_logprobs, prediction_labels = prediction.max(dim=-1)
-
-        non_blank_ids = prediction_labels != self.blank_id
-        hypothesis.y_sequence = prediction_labels.numpy().tolist()
-        hypothesis.score = (prediction_logprobs[non_blank_ids]).sum()
+    def _greedy_decode_batch(
+        self, labels: torch.Tensor, logprobs: Optional[torch.Tensor], lengths: Optional[torch.Tensor]
+    ) -> rnnt_utils.PackedCTCHypotheses:
+        """Packs the per-frame labels (B, T) of the whole batch, and collapses them with tensor operations.
 
-        if self.preserve_alignments:
-            # Preserve the logprobs, as well as labels after argmax
-            hypothesis.alignments = (prediction.clone(), prediction_labels.clone())
+        The scores are the sums of the non-blank per-frame `logprobs` (B, T), or -1 if they are not provided.
+        All the results are computed on the device of `labels`, and copied to the host at once.
+        """
+        batch_size, max_time = labels.shape
+        device = labels.device
+        labels = labels.long()
+        if lengths is None:
+            out_len = torch.full([batch_size], max_time, dtype=torch.long, device=device)
+        else:
+            out_len = lengths.to(device=device, dtype=torch.long).clamp(max=max_time)
 
+        time_idx = torch.arange(max_time, device=device).unsqueeze(0).expand(batch_size, -1)
+        valid_mask = time_idx < out_len.unsqueeze(1)
+        non_blank_mask = valid_mask & (labels != self.blank_id)
+        if logprobs is not None:
+            score = torch.where(non_blank_mask, logprobs, torch.zeros_like(logprobs)).sum(dim=-1)
+        else:
+            score = torch.full([batch_size], -1.0, device=device)
+
+        # a run of identical labels starts at every change of label, and CTC collapse keeps the first label of
+        # every run of non-blank labels
+        previous_labels = torch.nn.functional.pad(labels[:, :-1], (1, 0), value=self.blank_id)
+        run_start_mask = valid_mask & ((labels != previous_labels) | (time_idx == 0))
+        token_mask = run_start_mask & non_blank_mask
+
+        # runs never cross utterances, as every utterance starts with a run
+        num_frames = valid_mask.sum()
+        run_starts = torch.nonzero(run_start_mask[valid_mask], as_tuple=False).squeeze(1)
+        run_lengths = torch.diff(run_starts, append=num_frames.view(1))
+        token_repetitions = run_lengths[token_mask[run_start_mask]]
+
+        token_counts = token_mask.sum(dim=-1)
+        token_offsets = rnnt_utils.PackedHypotheses.lengths_to_offsets(token_counts)
+        token_starts = time_idx[token_mask]
+        # the length of a token is the number of frames since the start of the previous token of the utterance
+        previous_starts = token_starts.roll(1)
+        previous_starts[token_offsets[:-1][token_counts > 0]] = 0
+        token_lengths = token_starts - previous_starts
+
+        parts = [
+            labels[valid_mask],
+            token_offsets,
+            labels[token_mask],
+            token_lengths,
+            token_repetitions,
+            out_len,
+            # bit cast, so that the scores are copied together with the integer results
+            score.double().view(torch.long),
+        ]
+        if lengths is not None:
+            parts.append(lengths.to(device=device, dtype=torch.long))
         if self.compute_timestamps:
-            hypothesis.timestep = torch.nonzero(non_blank_ids, as_tuple=False)[:, 0].numpy().tolist()
-
-        if self.preserve_frame_confidence:
-            hypothesis.frame_confidence = self._get_confidence(prediction)
-
-        return hypothesis
+            parts.append(non_blank_mask.sum(dim=-1))
+            parts.append(time_idx[non_blank_mask])
+
+        # single device to host copy
+        host_parts = torch.cat(parts).cpu().split([part.shape[0] for part in parts])
+        y_sequence, token_offsets, tokens, token_lengths, token_repetitions, out_len, score = host_parts[:7]
+        host_parts = host_parts[7:]
+        length = None
+        if lengths is not None:
+            length, host_parts = host_parts[0], host_parts[1:]
+        timestep, timestep_offsets = None, None
+        if self.compute_timestamps:
+            timestep_offsets = rnnt_utils.PackedHypotheses.lengths_to_offsets(host_parts[0])
+            timestep = host_parts[1]
+
+        return rnnt_utils.PackedCTCHypotheses(
+            tokens=tokens,
+            token_offsets=token_offsets,
+            token_lengths=token_lengths,
+            token_repetitions=token_repetitions,
+            y_sequence=y_sequence,
+            offsets=rnnt_utils.PackedHypotheses.lengths_to_offsets(out_len),
+            score=score.view(torch.float64).float(),
+            length=length,
+            timestep=timestep,
+            timestep_offsets=timestep_offsets,
+        )
 
     @torch.no_grad()
-    def _greedy_decode_labels(self, x: torch.Tensor, out_len: torch.Tensor):
-        # x: [T]
-        # out_len: [seq_len]
-
-        # Initialize blank state and empty label set in Hypothesis
-        hypothesis = rnnt_utils.Hypothesis(score=0.0, y_sequence=[], dec_state=None, timestep=[], last_token=None)
-        prediction_labels = x.detach().cpu()
-
-        if out_len is not None:
-            prediction_labels = prediction_labels[:out_len]
-
-        non_blank_ids = prediction_labels != self.blank_id
-        hypothesis.y_sequence = prediction_labels.numpy().tolist()
-        hypothesis.score = -1.0
+    def _add_frame_fields(self, hypotheses: rnnt_utils.PackedHypotheses, prediction: torch.Tensor):
+        """Adds the alignments and per-frame confidence scores of the log probs `prediction` (B, T, V)."""
+        frame_predictions = [prediction[idx, : len(hypotheses.get_y_sequence(idx))] for idx in range(len(hypotheses))]
 
         if self.preserve_alignments:
-            raise ValueError("Requested for alignments, but predictions provided were labels, not log probabilities.")
-
-        if self.compute_timestamps:
-            hypothesis.timestep = torch.nonzero(non_blank_ids, as_tuple=False)[:, 0].numpy().tolist()
+            # Preserve the logprobs, as well as labels after argmax
+            hypotheses.fields['alignments'] = [
+                (frame_prediction.clone(), hypotheses.get_y_sequence(idx).clone())
+                for idx, frame_prediction in enumerate(frame_predictions)
+            ]
 
         if self.preserve_frame_confidence:
-            raise ValueError(
-                "Requested for per-frame confidence, but predictions provided were labels, not log probabilities."
-            )
-
-        return hypothesis
+            hypotheses.fields['frame_confidence'] = [
+                self._get_confidence(frame_prediction) for frame_prediction in frame_predictions
+            ]
 
     def __call__(self, *args, **kwargs):
         return self.forward(*args, **kwargs)
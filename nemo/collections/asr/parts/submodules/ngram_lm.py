@@ -0,0 +1,230 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import math
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from nemo.utils import logging
+
+__all__ = ['NGramLM']
+
+# ARPA files store log10 probabilities
+LOG_10 = math.log(10.0)
+
+# fields are only separated by spaces and tabs, as words may be any other (e.g. unicode whitespace) character, which
+# happens with the encoding of subwords as unicode chars
+_ARPA_SEPARATORS = ' \t'
+_ARPA_SPLIT = re.compile(f'[{_ARPA_SEPARATORS}]+')
+
+
+class NGramLM:
+    """
+    Back-off n-gram language model read from an ARPA file, without any external dependency.
+
+    The n-grams are stored in an array-backed trie: the node of an n-gram of order k is its index in the arrays of
+    order k, which are sorted by (node of the (k-1)-gram prefix, last word). The children of a node are then a
+    contiguous range of the arrays of the next order, given by `child_offsets`, and are looked up by binary search.
+    Unigram nodes are the word ids.
+
+    A state is the tuple of the ids of the last (order - 1) words. Scores are natural log probabilities.
+
+    Args:
+        vocabulary: dict mapping the words to their ids.
+        log10_probs: for every order, the log10 probabilities of the n-grams.
+        log10_backoffs: for every order, the log10 back-off weights of the n-grams.
+        words: for every order, the last word of the n-grams (unused for unigrams).
+        child_offsets: for every order but the highest, the offsets (num n-grams + 1) of the children of
+            the n-grams in the arrays of the next order.
+        unk_log10_prob: log10 probability of the words which are not in the vocabulary, if there is no `<unk>`.
+    """
+
+    BOS = '<s>'
+    EOS = '</s>'
+    UNK = '<unk>'
+
+    def __init__(
+        self,
+        vocabulary: Dict[str, int],
+        log10_probs: List[np.ndarray],
+        log10_backoffs: List[np.ndarray],
+        words: List[np.ndarray],
+        child_offsets: List[np.ndarray],
+        unk_log10_prob: float = -100.0,
+    ):
+        self.vocabulary = vocabulary
+        self.order = len(log10_probs)
+        self.log10_probs = log10_probs
+        self.log10_backoffs = log10_backoffs
+        self.words = words
+        self.child_offsets = child_offsets
+
+        self.unk_id = vocabulary.get(self.UNK, -1)
+        self.unk_log10_prob = unk_log10_prob
+        self.bos_id = vocabulary.get(self.BOS, -1)
+        self.eos_id = vocabulary.get(self.EOS, -1)
+
+    @classmethod
+    def from_arpa(cls, path: str, unk_log10_prob: float = -100.0) -> 'NGramLM':
+        """
+        Reads an ARPA file (optionally gzipped).
+
+        Args:
+            path: path to the ARPA file. Binary KenLM files are not supported.
+            unk_log10_prob: log10 probability of the words which are not in the vocabulary, if there is no `<unk>`.
+
+        Returns:
+            The NGramLM.
+        """
+        open_fn = gzip.open if path.endswith('.gz') else open
+        vocabulary = {}
+        log10_probs, log10_backoffs, words, child_offsets = [], [], [], []
+
+        with open_fn(path, 'rt', encoding='utf-8') as f:
+            line = ''
+            for line in f:
+                if line.strip():
+                    break
+            if line.strip() != '\\data\\':
+                raise ValueError(f"{path} is not an ARPA file (binary KenLM files are not supported)")
+
+            counts = []
+            for line in f:
+                line = line.strip()
+                if line.startswith('ngram '):
+                    counts.append(int(line.split('=')[1]))
+                elif line:
+                    break
+
+            for order, count in enumerate(counts, start=1):
+                if line != f'\\{order}-grams:':
+                    raise ValueError(f"Expected the {order}-grams section of {path}, got: {line}")
+
+                prefixes = np.empty(count, dtype=np.int64)
+                last_words = np.empty(count, dtype=np.int32)
+                probs = np.empty(count, dtype=np.float32)
+                backoffs = np.zeros(count, dtype=np.float32)
+                idx = 0
+                for line in f:
+                    line = line.rstrip('\r\n').strip(_ARPA_SEPARATORS)
+                    if not line:
+                        continue
+                    if line.startswith('\\'):
+                        break
+                    fields = _ARPA_SPLIT.split(line)
+                    probs[idx] = float(fields[0])
+                    if len(fields) > order + 1:
+                        backoffs[idx] = float(fields[order + 1])
+                    if order == 1:
+                        vocabulary[fields[1]] = idx
+                        prefixes[idx] = 0
+                    else:
+                        ngram = [vocabulary[word] for word in fields[1 : order + 1]]
+                        prefixes[idx] = cls._find_node(ngram[:-1], words, child_offsets)
+                        last_words[idx] = ngram[-1]
+                        if prefixes[idx] < 0:
+                            raise ValueError(f"The prefix of the n-gram `{line}` is missing from {path}")
+                    idx += 1
+
+                if idx != count:
+                    raise ValueError(f"Expected {count} {order}-grams in {path}, found {idx}")
+
+                if order > 1:
+                    # sort the n-grams by (prefix node, last word), so that the children of a node are contiguous
+                    permutation = np.lexsort((last_words, prefixes))
+                    prefixes, last_words = prefixes[permutation], last_words[permutation]
+                    probs, backoffs = probs[permutation], backoffs[permutation]
+                    num_prefixes = len(log10_probs[-1])
+                    offsets = np.zeros(num_prefixes + 1, dtype=np.int64)
+                    offsets[1:] = np.cumsum(np.bincount(prefixes, minlength=num_prefixes))
+                    child_offsets.append(offsets)
+
+                log10_probs.append(probs)
+                log10_backoffs.append(backoffs)
+                words.append(last_words)
+
+        logging.info(f"Loaded {len(counts)}-gram LM from {path} with n-gram counts {counts}")
+        return cls(vocabulary, log10_probs, log10_backoffs, words, child_offsets, unk_log10_prob=unk_log10_prob)
+
+    @staticmethod
+    def _find_node(ngram: List[int], words: List[np.ndarray], child_offsets: List[np.ndarray]) -> int:
+        """Returns the node of an n-gram given as a list of word ids, or -1 if it is not in the model."""
+        node = ngram[0]
+        for order, word in enumerate(ngram[1:], start=1):
+            if order >= len(words):
+                return -1
+            start, end = child_offsets[order - 1][node], child_offsets[order - 1][node + 1]
+            idx = start + np.searchsorted(words[order][start:end], word)
+            if idx == end or words[order][idx] != word:
+                return -1
+            node = idx
+        return node
+
+    def word_id(self, word: str) -> int:
+        """Returns the id of a word, the id of `<unk>` for unknown words, or -1 if there is no `<unk>`."""
+        return self.vocabulary.get(word, self.unk_id)
+
+    def start_state(self) -> Tuple[int, ...]:
+        """Returns the state at the start of a sentence."""
+        return (self.bos_id,) if self.bos_id >= 0 else ()
+
+    def score(self, state: Tuple[int, ...], word_id: int) -> Tuple[float, Tuple[int, ...]]:
+        """
+        Scores a word after a state.
+
+        Args:
+            state: tuple of the ids of the previous words.
+            word_id: id of the word, -1 for an unknown word.
+
+        Returns:
+            A tuple (natural log probability of the word, new state).
+        """
+        if word_id < 0:
+            # unknown words reset the context
+            return self.unk_log10_prob * LOG_10, ()
+
+        log10_prob = 0.0
+        for start in range(len(state) + 1):
+            context = state[start:]
+            node = self._find_node(list(context) + [word_id], self.words, self.child_offsets)
+            if node >= 0:
+                log10_prob += self.log10_probs[len(context)][node]
+                break
+            # back off to a shorter context
+            context_node = self._find_node(list(context), self.words, self.child_offsets)
+            if context_node >= 0:
+                log10_prob += self.log10_backoffs[len(context) - 1][context_node]
+
+        new_state = (state + (word_id,))[-(self.order - 1) :] if self.order > 1 else ()
+        return float(log10_prob) * LOG_10, new_state
+
+    def final_score(self, state: Tuple[int, ...]) -> float:
+        """Returns the natural log probability of the end of sentence after a state."""
+        if self.eos_id < 0:
+            return 0.0
+        return self.score(state, self.eos_id)[0]
+
+    def score_sentence(self, words: List[str], bos: bool = True, eos: bool = True) -> float:
+        """Returns the natural log probability of a sentence given as a list of words."""
+        state = self.start_state() if bos else ()
+        total = 0.0
+        for word in words:
+            logprob, state = self.score(state, self.word_id(word))
+            total += logprob
+        if eos:
+            total += self.final_score(state)
+        return total
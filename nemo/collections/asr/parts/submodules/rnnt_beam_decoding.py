@@ -35,6 +35,7 @@ import torch
 from tqdm import tqdm
 
 from nemo.collections.asr.modules import rnnt_abstract
+from nemo.collections.asr.parts.submodules.context_biasing import BoostingTrie
 from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis, NBestHypotheses, is_prefix, select_k_expansions
 from nemo.core.classes import Typing, typecheck
 from nemo.core.neural_types import AcousticEncodedRepresentation, HypothesisType, LengthsType, NeuralType
@@ -121,6 +122,15 @@ class BeamRNNTInfer(Typing):
 
                 This beam search technique can possibly obtain superior WER while sacrificing some evaluation time.
 
+            `beam_batch` - batched time synchronous decoding. All the utterances of the batch are decoded at once:
+                the `beam_size` hypotheses of every utterance are kept in padded tensors, and each search step
+                calls the decoder and the joint once for all the `batch size x beam_size` hypotheses, instead of
+                once per hypothesis and utterance. At every frame, a hypothesis emits up to
+                `beam_batch_max_symbols` tokens before moving to the next frame with a blank, and hypotheses with
+                the same token sequence are merged by summing their probabilities.
+
+                This is significantly faster than the other strategies for batches of utterances, particularly on GPU.
+
         score_norm: bool, whether to normalize the scores of the log probabilities.
 
         return_best_hypothesis: bool, decides whether to return a single hypothesis (the best out of N),
@@ -164,6 +174,10 @@ class BeamRNNTInfer(Typing):
             thereby reducing speed but potentially improving accuracy). This is a hyper parameter to be experimentally
             tuned on a validation set.
 
+        # Batched beam search flags
+        beam_batch_max_symbols: Used for `search_type=beam_batch`. The maximum number of tokens emitted by a
+            hypothesis per timestep.
+
         softmax_temperature: Scales the logits of the joint prior to computing log_softmax.
 
         preserve_alignments: Bool flag which preserves the history of alignments generated during
@@ -213,6 +227,7 @@ class BeamRNNTInfer(Typing):
         language_model: Optional[Dict[str, Any]] = None,
         softmax_temperature: float = 1.0,
         preserve_alignments: bool = False,
+        beam_batch_max_symbols: int = 10,
     ):
         self.decoder = decoder_model
         self.joint = joint_model
@@ -243,10 +258,12 @@ class BeamRNNTInfer(Typing):
             # self.search_algorithm = self.nsc_beam_search
         elif search_type == "maes":
             self.search_algorithm = self.modified_adaptive_expansion_search
+        elif search_type == "beam_batch":
+            self.search_algorithm = self.batched_beam_search
         else:
             raise NotImplementedError(
                 f"The search type ({search_type}) supplied is not supported!\n"
-                f"Please use one of : (default, tsd, alsd, nsc)"
+                f"Please use one of : (default, tsd, alsd, nsc, maes, beam_batch)"
             )
 
         if tsd_max_sym_exp_per_step is None:
@@ -285,6 +302,22 @@ class BeamRNNTInfer(Typing):
         if self.search_type == 'maes' and self.maes_num_steps < 2:
             raise ValueError("`maes_num_steps` must be greater than 1.")
 
+        self.beam_batch_max_symbols = int(beam_batch_max_symbols)
+
+        if self.search_type == 'beam_batch' and self.beam_batch_max_symbols < 1:
+            raise ValueError("`beam_batch_max_symbols` must be a positive integer.")
+
+        if self.search_type == 'beam_batch' and (preserve_alignments or language_model is not None):
+            raise ValueError("`beam_batch` search does not support `preserve_alignments` or `language_model`.")
+
+        if self.search_algorithm == self.batched_beam_search and (
+            type(self.decoder).batch_gather_states is rnnt_abstract.AbstractRNNTDecoder.batch_gather_states
+        ):
+            raise ValueError(
+                f"`beam_batch` search requires a decoder which implements `batch_gather_states`, "
+                f"{type(self.decoder).__name__} does not. Please use one of the other search types."
+            )
+
         if softmax_temperature != 1.0 and language_model is not None:
             logging.warning(
                 "Softmax temperature is not supported with LM decoding." "Setting softmax-temperature value to 1.0."
@@ -295,6 +328,7 @@ class BeamRNNTInfer(Typing):
             self.softmax_temperature = softmax_temperature
         self.language_model = language_model
         self.preserve_alignments = preserve_alignments
+        self.boosting_trie = None
 
     @typecheck()
     def __call__(
@@ -325,6 +359,26 @@ class BeamRNNTInfer(Typing):
             self.decoder.eval()
             self.joint.eval()
 
+            if self.search_algorithm == self.batched_beam_search:
+                with self.decoder.as_frozen(), self.joint.as_frozen():
+                    dtype = next(self.joint.parameters()).dtype
+                    nbest_hyps_list = self.batched_beam_search(
+                        encoder_output.to(dtype=dtype), encoded_lengths, partial_hypotheses=partial_hypotheses
+                    )
+
+                hypotheses = []
+                for nbest_hyps in nbest_hyps_list:
+                    nbest_hyps = pack_hypotheses(nbest_hyps)
+                    if self.return_best_hypothesis:
+                        hypotheses.append(nbest_hyps[0])
+                    else:
+                        hypotheses.append(NBestHypotheses(nbest_hyps))
+
+                self.decoder.train(decoder_training_state)
+                self.joint.train(joint_training_state)
+
+                return (hypotheses,)
+
             hypotheses = []
             with tqdm(
                 range(encoder_output.size(0)),
@@ -371,6 +425,37 @@ class BeamRNNTInfer(Typing):
 
         return (hypotheses,)
 
+    def set_boosting_trie(self, boosting_trie: Optional[BoostingTrie]):
+        """
+        Sets the phrases to bias the decoding towards, e.g. for every request.
+        Only supported by the `default` and `maes` search types.
+
+        Args:
+            boosting_trie: BoostingTrie of the token ids of the phrases, or None to disable contextual biasing.
+        """
+        if boosting_trie is not None and self.search_algorithm not in (
+            self.default_beam_search,
+            self.modified_adaptive_expansion_search,
+        ):
+            raise ValueError(f"Contextual biasing is not supported by the `{self.search_type}` search type.")
+        self.boosting_trie = boosting_trie
+
+    def _init_boosting_state(self, hyp: Hypothesis):
+        if self.boosting_trie is not None:
+            hyp.boosting_state = BoostingTrie.ROOT
+
+    def _advance_boosting_state(self, hyp: Hypothesis, token: int):
+        """Rewards a hypothesis which was extended with a token, if it spells a boosted phrase."""
+        if self.boosting_trie is not None:
+            reward, hyp.boosting_state = self.boosting_trie.advance(hyp.boosting_state, token)
+            hyp.score += reward
+
+    def _finalize_boosting_states(self, hyps: List[Hypothesis]):
+        """Takes back the rewards of the phrases which are not completed at the end of decoding."""
+        if self.boosting_trie is not None:
+            for hyp in hyps:
+                hyp.score += self.boosting_trie.finalize(hyp.boosting_state)
+
     def sort_nbest(self, hyps: List[Hypothesis]) -> List[Hypothesis]:
         """Sort hypotheses by score or score given sequence length.
 
@@ -507,6 +592,7 @@ class BeamRNNTInfer(Typing):
 
         # Initialize first hypothesis for the beam (blank)
         kept_hyps = [Hypothesis(score=0.0, y_sequence=[self.blank], dec_state=dec_state, timestep=[-1], length=0)]
+        self._init_boosting_state(kept_hyps[0])
         cache = {}
 
         if partial_hypotheses is not None:
@@ -557,6 +643,7 @@ class BeamRNNTInfer(Typing):
                         lm_state=max_hyp.lm_state,
                         timestep=max_hyp.timestep[:],
                         length=encoded_lengths,
+                        boosting_state=max_hyp.boosting_state,
                     )
 
                     if self.preserve_alignments:
@@ -570,6 +657,7 @@ class BeamRNNTInfer(Typing):
                         new_hyp.dec_state = state
                         new_hyp.y_sequence.append(int(k))
                         new_hyp.timestep.append(i)
+                        self._advance_boosting_state(new_hyp, int(k))
 
                         hyps.append(new_hyp)
 
@@ -611,6 +699,7 @@ class BeamRNNTInfer(Typing):
                 if hyp.y_sequence[0] == partial_hypotheses.y_sequence[-1] and len(hyp.y_sequence) > 1:
                     hyp.y_sequence = hyp.y_sequence[1:]
 
+        self._finalize_boosting_states(kept_hyps)
         return self.sort_nbest(kept_hyps)
 
     def time_sync_decoding(
@@ -1066,6 +1155,7 @@ class BeamRNNTInfer(Typing):
                 length=0,
             )
         ]
+        self._init_boosting_state(kept_hyps[0])
 
         # Initialize alignment buffer
         if self.preserve_alignments:
@@ -1121,6 +1211,7 @@ class BeamRNNTInfer(Typing):
                             lm_scores=hyp.lm_scores,
                             timestep=hyp.timestep[:],
                             length=t,
+                            boosting_state=hyp.boosting_state,
                         )
 
                         # If the expansion was for blank
@@ -1132,6 +1223,7 @@ class BeamRNNTInfer(Typing):
                             if (new_hyp.y_sequence + [int(k)]) not in duplication_check:
                                 new_hyp.y_sequence.append(int(k))
                                 new_hyp.timestep.append(t)
+                                self._advance_boosting_state(new_hyp, int(k))
 
                                 # TODO: Setup LM
                                 if self.language_model is not None:
@@ -1276,8 +1368,177 @@ class BeamRNNTInfer(Typing):
                     del h.alignments[-1]
 
         # Sort the hypothesis with best scores
+        self._finalize_boosting_states(kept_hyps)
         return self.sort_nbest(kept_hyps)
 
+    def batched_beam_search(
+        self, h: torch.Tensor, encoded_lengths: torch.Tensor, partial_hypotheses: Optional[List[Hypothesis]] = None
+    ) -> List[List[Hypothesis]]:
+        """Batched time synchronous decoding, which decodes all the utterances of a batch at once.
+
+        The `beam_size` hypotheses of every utterance are kept in padded tensors of shape (B, beam), so every step
+        of the search calls the decoder and the joint once for the whole batch. At every frame, the hypotheses which
+        can still emit tokens (`A`) are extended with a blank, which moves them to the set of hypotheses of the
+        next frame (`F`), or with a non-blank token, up to `beam_batch_max_symbols` tokens per frame. Hypotheses
+        of `F` with the same token sequence are merged by summing their probabilities, as in
+        `recombine_hypotheses`, and hypotheses of `A` which score below the worst hypothesis of `F` are pruned.
+        Duplicate sequences are found with their length and a rolling hash of their tokens, and confirmed by
+        comparing their tokens.
+
+        Args:
+            h: Encoded speech features (B, T_max, D_enc)
+            encoded_lengths: Lengths of the encoded speech features (B)
+
+        Returns:
+            nbest_hyps: sorted N-best decoding results of every utterance
+        """
+        if partial_hypotheses is not None:
+            raise NotImplementedError("`partial_hypotheses` support is not supported")
+
+        batch_size, max_time = h.shape[0], h.shape[1]
+        device = h.device
+        beam = self.beam_size
+        num_hyps = batch_size * beam
+        max_symbols = self.beam_batch_max_symbols
+        encoded_lengths = encoded_lengths.to(device)
+
+        # index of the first hypothesis of every utterance in the flattened (B * beam) hypotheses
+        beam_offsets = torch.arange(batch_size, device=device).unsqueeze(1) * beam
+        # decoded tokens of every hypothesis, the last dimension is grown on demand
+        capacity = max(max_symbols, 8)
+        max_num_tokens = 0
+
+        scores = torch.full([batch_size, beam], float('-inf'), device=device)
+        scores[:, 0] = 0.0
+        hyps = _BatchedHypotheses(
+            scores=scores,
+            tokens=torch.zeros([batch_size, beam, capacity], dtype=torch.long, device=device),
+            timesteps=torch.zeros([batch_size, beam, capacity], dtype=torch.long, device=device),
+            num_tokens=torch.zeros([batch_size, beam], dtype=torch.long, device=device),
+            hashes=torch.zeros([batch_size, beam], dtype=torch.long, device=device),
+            dec_out=None,
+            dec_state=None,
+        )
+        hyps.dec_out, hyps.dec_state = self.decoder.predict(None, None, add_sos=False, batch_size=num_hyps)
+        if hyps.dec_state is None:
+            # the initial state of decoders which do not return a state before the first token
+            hyps.dec_state = self.decoder.initialize_state(torch.zeros([num_hyps, 1], dtype=torch.long, device=device))
+
+        # finished utterances only extend their hypotheses with blanks, which keeps their scores unchanged
+        finished_logp = torch.full([self.vocab_size + 1], float('-inf'), device=device)
+        finished_logp[self.blank] = 0.0
+
+        for t in range(max_time):
+            if max_num_tokens + max_symbols > capacity:
+                capacity = max(2 * capacity, max_num_tokens + max_symbols)
+                hyps.grow(capacity)
+
+            is_active = (t < encoded_lengths).view(batch_size, 1, 1)
+            enc_out = h[:, t : t + 1, :].repeat_interleave(beam, dim=0)  # [B * beam, 1, D]
+            # hypotheses which emitted a blank at this frame, none initially
+            next_hyps = hyps.with_scores(torch.full_like(hyps.scores, float('-inf')))
+
+            for symbol_step in range(max_symbols + 1):
+                logp = self.joint.joint(enc_out, hyps.dec_out) / self.softmax_temperature
+                logp = torch.log_softmax(logp[:, 0, 0, :], dim=-1).float().view(batch_size, beam, -1)
+                logp = torch.where(is_active, logp, finished_logp)
+
+                next_hyps = self._merge_batched_hypotheses(
+                    next_hyps, hyps.with_scores(hyps.scores + logp[:, :, self.blank]), beam_offsets
+                )
+
+                if symbol_step == max_symbols:
+                    break
+
+                expansion_scores = hyps.scores.unsqueeze(-1) + logp
+                expansion_scores[:, :, self.blank] = float('-inf')
+                expansion_scores, expansion_ids = expansion_scores.view(batch_size, -1).topk(beam, dim=-1)
+                # expansions which score below all the hypotheses of the next frame cannot enter the beam anymore
+                expansion_scores = torch.where(
+                    expansion_scores > next_hyps.scores[:, -1:], expansion_scores, float('-inf')
+                )
+                if not torch.isfinite(expansion_scores).any():
+                    break
+
+                parents = torch.div(expansion_ids, logp.shape[-1], rounding_mode='floor')
+                labels = expansion_ids % logp.shape[-1]
+                # labels of discarded expansions may be the blank, which is not a valid decoder input
+                labels = torch.where(labels == self.blank, torch.zeros_like(labels), labels)
+
+                hyps = hyps.gather(self.decoder, parents, beam_offsets, scores=expansion_scores)
+                hyps.append(labels, t)
+                max_num_tokens += 1
+
+                hyps.dec_out, hyps.dec_state = self.decoder.predict(
+                    labels.view(-1, 1), hyps.dec_state, add_sos=False, batch_size=num_hyps
+                )
+
+            hyps = next_hyps
+
+        return self._batched_hypotheses_to_list(hyps, encoded_lengths)
+
+    def _merge_batched_hypotheses(
+        self, hyps: '_BatchedHypotheses', new_hyps: '_BatchedHypotheses', beam_offsets: torch.Tensor
+    ) -> '_BatchedHypotheses':
+        """Merges two sets of batched hypotheses, recombining duplicate sequences and keeping the best `beam`."""
+        beam = hyps.scores.shape[1]
+        scores = torch.cat([hyps.scores, new_hyps.scores], dim=1)  # [B, 2 * beam]
+        hashes = torch.cat([hyps.hashes, new_hyps.hashes], dim=1)
+        num_tokens = torch.cat([hyps.num_tokens, new_hyps.num_tokens], dim=1)
+
+        is_valid = torch.isfinite(scores)
+        is_same = (hashes.unsqueeze(2) == hashes.unsqueeze(1)) & (num_tokens.unsqueeze(2) == num_tokens.unsqueeze(1))
+        is_same &= is_valid.unsqueeze(2) & is_valid.unsqueeze(1)
+        # hashes can collide, compare the tokens of the (few) pairs of hypotheses with the same hash
+        batch_ids, ids, other_ids = is_same.nonzero(as_tuple=True)
+        tokens = torch.cat([hyps.tokens, new_hyps.tokens], dim=1)
+        is_padding = torch.arange(tokens.shape[-1], device=tokens.device) >= num_tokens[batch_ids, ids].unsqueeze(-1)
+        same_tokens = tokens[batch_ids, ids] == tokens[batch_ids, other_ids]
+        is_same[batch_ids, ids, other_ids] = (same_tokens | is_padding).all(dim=-1)
+        # the first occurrence of every sequence gets the sum of the probabilities of all its occurrences
+        merged_scores = torch.logsumexp(scores.unsqueeze(1).masked_fill(~is_same, float('-inf')), dim=-1)
+        is_duplicate = (is_same & torch.ones_like(is_same[0]).tril(diagonal=-1)).any(dim=-1)
+        merged_scores = merged_scores.masked_fill(is_duplicate, float('-inf'))
+
+        scores, ids = merged_scores.topk(beam, dim=-1)
+        from_new = ids >= beam
+        ids = ids % beam
+        merged = hyps.gather(self.decoder, ids, beam_offsets, scores=scores)
+        new = new_hyps.gather(self.decoder, ids, beam_offsets, scores=scores)
+        return merged.where(from_new, new, self.decoder)
+
+    def _batched_hypotheses_to_list(
+        self, hyps: '_BatchedHypotheses', encoded_lengths: torch.Tensor
+    ) -> List[List[Hypothesis]]:
+        """Converts batched hypotheses to sorted lists of Hypothesis, one list per utterance."""
+        batch_size, beam = hyps.scores.shape
+        scores = hyps.scores.cpu()
+        tokens = hyps.tokens.cpu()
+        timesteps = hyps.timesteps.cpu()
+        num_tokens = hyps.num_tokens.cpu()
+        encoded_lengths = encoded_lengths.cpu()
+
+        nbest_hyps_list = []
+        for batch_idx in range(batch_size):
+            nbest_hyps = []
+            for beam_idx in range(beam):
+                score = scores[batch_idx, beam_idx].item()
+                if not np.isfinite(score):
+                    continue
+                length = num_tokens[batch_idx, beam_idx].item()
+                nbest_hyps.append(
+                    Hypothesis(
+                        score=score,
+                        y_sequence=[self.blank] + tokens[batch_idx, beam_idx, :length].tolist(),
+                        timestep=[-1] + timesteps[batch_idx, beam_idx, :length].tolist(),
+                        dec_state=self.decoder.batch_select_state(hyps.dec_state, batch_idx * beam + beam_idx),
+                        length=encoded_lengths[batch_idx],
+                    )
+                )
+            nbest_hyps_list.append(self.sort_nbest(nbest_hyps))
+
+        return nbest_hyps_list
+
     def recombine_hypotheses(self, hypotheses: List[Hypothesis]) -> List[Hypothesis]:
         """Recombine hypotheses with equivalent output sequence.
 
@@ -1335,6 +1596,73 @@ class BeamRNNTInfer(Typing):
         return hypotheses
 
 
+_HASH_MULTIPLIER = 1000003
+_HASH_MODULUS = 2 ** 31 - 1
+
+
+@dataclass
+class _BatchedHypotheses:
+    """Hypotheses of a batched beam search, of shape (B, beam), with the decoder outputs of shape (B * beam, ...)."""
+
+    scores: torch.Tensor
+    tokens: torch.Tensor
+    timesteps: torch.Tensor
+    num_tokens: torch.Tensor
+    hashes: torch.Tensor
+    dec_out: Optional[torch.Tensor]
+    dec_state: Any
+
+    def with_scores(self, scores: torch.Tensor) -> '_BatchedHypotheses':
+        return _BatchedHypotheses(
+            scores, self.tokens, self.timesteps, self.num_tokens, self.hashes, self.dec_out, self.dec_state
+        )
+
+    def grow(self, capacity: int):
+        """Pads the token buffers to `capacity` tokens."""
+        padding = capacity - self.tokens.shape[-1]
+        self.tokens = torch.nn.functional.pad(self.tokens, [0, padding])
+        self.timesteps = torch.nn.functional.pad(self.timesteps, [0, padding])
+
+    def gather(
+        self, decoder: rnnt_abstract.AbstractRNNTDecoder, ids: torch.Tensor, beam_offsets: torch.Tensor, scores
+    ) -> '_BatchedHypotheses':
+        """Selects the hypotheses `ids` (B, beam) of every utterance, with new scores."""
+        token_ids = ids.unsqueeze(-1).expand(-1, -1, self.tokens.shape[-1])
+        flat_ids = (beam_offsets + ids).view(-1)
+        return _BatchedHypotheses(
+            scores=scores,
+            tokens=self.tokens.gather(1, token_ids),
+            timesteps=self.timesteps.gather(1, token_ids),
+            num_tokens=self.num_tokens.gather(1, ids),
+            hashes=self.hashes.gather(1, ids),
+            dec_out=self.dec_out.index_select(0, flat_ids),
+            dec_state=decoder.batch_gather_states(self.dec_state, flat_ids),
+        )
+
+    def where(
+        self, mask: torch.Tensor, other: '_BatchedHypotheses', decoder: rnnt_abstract.AbstractRNNTDecoder
+    ) -> '_BatchedHypotheses':
+        """Takes the hypotheses of `other` where `mask` (B, beam) is True. Modifies the decoder states in place."""
+        flat_mask = mask.view(-1)
+        return _BatchedHypotheses(
+            scores=torch.where(mask, other.scores, self.scores),
+            tokens=torch.where(mask.unsqueeze(-1), other.tokens, self.tokens),
+            timesteps=torch.where(mask.unsqueeze(-1), other.timesteps, self.timesteps),
+            num_tokens=torch.where(mask, other.num_tokens, self.num_tokens),
+            hashes=torch.where(mask, other.hashes, self.hashes),
+            dec_out=torch.where(flat_mask.view(-1, 1, 1), other.dec_out, self.dec_out),
+            dec_state=decoder.batch_copy_states(self.dec_state, other.dec_state, flat_mask),
+        )
+
+    def append(self, labels: torch.Tensor, timestep: int):
+        """Appends the tokens `labels` (B, beam), emitted at `timestep`, to the hypotheses."""
+        self.tokens.scatter_(2, self.num_tokens.unsqueeze(-1), labels.unsqueeze(-1))
+        self.timesteps.scatter_(2, self.num_tokens.unsqueeze(-1), torch.full_like(labels, timestep).unsqueeze(-1))
+        self.num_tokens = self.num_tokens + 1
+        # the hashes stay below 2 ** 31, so that the multiplication does not overflow int64
+        self.hashes = (self.hashes * _HASH_MULTIPLIER + labels + 1) % _HASH_MODULUS
+
+
 @dataclass
 class BeamRNNTInferConfig:
     beam_size: int
@@ -1352,3 +1680,4 @@ class BeamRNNTInferConfig:
     language_model: Optional[Dict[str, Any]] = None
     softmax_temperature: float = 1.0
     preserve_alignments: bool = False
+    beam_batch_max_symbols: int = 10
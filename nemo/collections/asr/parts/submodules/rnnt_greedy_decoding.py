@@ -27,7 +27,7 @@
 # limitations under the License.
 
 from dataclasses import dataclass
-from typing import List, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import torch
@@ -476,6 +476,46 @@ class GreedyRNNTInfer(_GreedyRNNTInfer):
         return hypothesis
 
 
+class _BatchedStepBuffer:
+    """Tokens emitted at every step of batched greedy decoding, accumulated on the decoding device."""
+
+    def __init__(self):
+        self.labels = []
+        self.masks = []
+        self.scores = []
+        self.timesteps = []
+
+    def add(self, labels: torch.Tensor, mask: torch.Tensor, scores: torch.Tensor, time_idx: int):
+        """Adds the `labels` (B) with their `scores` (B), emitted at frame `time_idx` by the samples of `mask` (B)."""
+        self.labels.append(labels)
+        self.masks.append(mask)
+        self.scores.append(scores)
+        self.timesteps.append(time_idx)
+
+    def pack(
+        self, batch_size: int, length: Optional[torch.Tensor] = None, fields: Optional[Dict[str, Any]] = None
+    ) -> rnnt_utils.PackedHypotheses:
+        """Packs the emitted tokens of every sample, with a single copy of every buffer to the CPU."""
+        if len(self.labels) > 0:
+            labels = torch.stack(self.labels, dim=1).cpu()
+            mask = torch.stack(self.masks, dim=1).cpu()
+            scores = torch.stack(self.scores, dim=1).cpu().double()
+        else:
+            labels = torch.zeros([batch_size, 0], dtype=torch.long)
+            mask = torch.zeros([batch_size, 0], dtype=torch.bool)
+            scores = torch.zeros([batch_size, 0], dtype=torch.float64)
+        timesteps = torch.tensor(self.timesteps, dtype=torch.long).expand(batch_size, -1)
+
+        return rnnt_utils.PackedHypotheses(
+            y_sequence=labels[mask].long(),
+            offsets=rnnt_utils.PackedHypotheses.lengths_to_offsets(mask.sum(dim=-1)),
+            score=torch.where(mask, scores, torch.zeros_like(scores)).sum(dim=-1),
+            length=length,
+            timestep=timesteps[mask],
+            fields=fields,
+        )
+
+
 class GreedyBatchedRNNTInfer(_GreedyRNNTInfer):
     """A batch level greedy transducer decoder.
 
@@ -563,7 +603,8 @@ class GreedyBatchedRNNTInfer(_GreedyRNNTInfer):
         else:
             self._greedy_decode = self._greedy_decode_masked
 
-    @typecheck()
+    # the packed hypotheses are not a list, and must not be iterated in order to be checked
+    @typecheck(ignore_collections=True)
     def forward(
         self,
         encoder_output: torch.Tensor,
@@ -600,13 +641,33 @@ class GreedyBatchedRNNTInfer(_GreedyRNNTInfer):
                 )
 
             # Pack the hypotheses results
-            packed_result = pack_hypotheses(hypotheses, logitlen)
+            if isinstance(hypotheses, rnnt_utils.PackedHypotheses):
+                packed_result = hypotheses
+            else:
+                packed_result = pack_hypotheses(hypotheses, logitlen)
 
         self.decoder.train(decoder_training_state)
         self.joint.train(joint_training_state)
 
         return (packed_result,)
 
+    def _pack_step_buffer(
+        self,
+        step_buffer: '_BatchedStepBuffer',
+        hypotheses: Optional[List[rnnt_utils.Hypothesis]],
+        hidden: Optional[List[torch.Tensor]],
+        out_len: torch.Tensor,
+    ) -> rnnt_utils.PackedHypotheses:
+        """Packs the emitted tokens, along with the other fields of `hypotheses` and the final decoder states."""
+        fields = {}
+        if hypotheses is not None:
+            for name in ['alignments', 'frame_confidence', 'y_3best', 'frame_confidence_3best', 'logp']:
+                if getattr(hypotheses[0], name, None) is not None:
+                    fields[name] = [getattr(hyp, name) for hyp in hypotheses]
+        # Preserve states
+        fields['dec_state'] = lambda idx: _states_to_device(self.decoder.batch_select_state(hidden, idx))
+        return step_buffer.pack(batch_size=out_len.shape[0], length=out_len.cpu(), fields=fields)
+
     def _greedy_decode_blank_as_pad(
         self,
         x: torch.Tensor,
@@ -622,11 +683,16 @@ class GreedyBatchedRNNTInfer(_GreedyRNNTInfer):
             # out_len: [B]
             # device: torch.device
 
-            # Initialize list of Hypothesis
+            # Initialize the buffer of emitted tokens, and the list of Hypothesis which hold the
+            # alignments and per-frame confidence scores, if they need to be preserved
             batchsize = x.shape[0]
-            hypotheses = [
-                rnnt_utils.Hypothesis(score=0.0, y_sequence=[], timestep=[], dec_state=None) for _ in range(batchsize)
-            ]
+            step_buffer = _BatchedStepBuffer()
+            hypotheses = None
+            if self.preserve_alignments or self.preserve_frame_confidence:
+                hypotheses = [
+                    rnnt_utils.Hypothesis(score=0.0, y_sequence=[], timestep=[], dec_state=None)
+                    for _ in range(batchsize)
+                ]
 
             # Initialize Hidden state matrix (shared by entire batch)
             hidden = None
@@ -784,11 +850,7 @@ class GreedyBatchedRNNTInfer(_GreedyRNNTInfer):
                         # Force the current predicted label to also be blank
                         # This ensures that blanks propogate across all timesteps
                         # once they have occured (normally stopping condition of sample level loop).
-                        for kidx, ki in enumerate(k):
-                            if blank_mask[kidx] == 0:
-                                hypotheses[kidx].y_sequence.append(ki)
-                                hypotheses[kidx].timestep.append(time_idx)
-                                hypotheses[kidx].score += float(v[kidx])
+                        step_buffer.add(k, ~blank_mask, v, time_idx)
                         symbols_added += 1
 
             # Remove trailing empty list of alignments at T_{am-len} x Uj
@@ -806,11 +868,7 @@ class GreedyBatchedRNNTInfer(_GreedyRNNTInfer):
                         del hypotheses[batch_idx].frame_confidence_3best[-1]
                         del hypotheses[batch_idx].logp[-1]
 
-        # Preserve states
-        for batch_idx in range(batchsize):
-            hypotheses[batch_idx].dec_state = self.decoder.batch_select_state(hidden, batch_idx)
-
-        return hypotheses
+        return self._pack_step_buffer(step_buffer, hypotheses, hidden, out_len)
 
     def _greedy_decode_masked(
         self,
@@ -826,11 +884,15 @@ class GreedyBatchedRNNTInfer(_GreedyRNNTInfer):
         # out_len: [B]
         # device: torch.device
 
-        # Initialize state
+        # Initialize the buffer of emitted tokens, and the list of Hypothesis which hold the
+        # alignments and per-frame confidence scores, if they need to be preserved
         batchsize = x.shape[0]
-        hypotheses = [
-            rnnt_utils.Hypothesis(score=0.0, y_sequence=[], timestep=[], dec_state=None) for _ in range(batchsize)
-        ]
+        step_buffer = _BatchedStepBuffer()
+        hypotheses = None
+        if self.preserve_alignments or self.preserve_frame_confidence:
+            hypotheses = [
+                rnnt_utils.Hypothesis(score=0.0, y_sequence=[], timestep=[], dec_state=None) for _ in range(batchsize)
+            ]
 
         # Initialize Hidden state matrix (shared by entire batch)
         hidden = None
@@ -996,11 +1058,7 @@ class GreedyBatchedRNNTInfer(_GreedyRNNTInfer):
                         # Force the current predicted label to also be blank
                         # This ensures that blanks propogate across all timesteps
                         # once they have occured (normally stopping condition of sample level loop).
-                        for kidx, ki in enumerate(k):
-                            if blank_mask[kidx] == 0:
-                                hypotheses[kidx].y_sequence.append(ki)
-                                hypotheses[kidx].timestep.append(time_idx)
-                                hypotheses[kidx].score += float(v[kidx])
+                        step_buffer.add(k, ~blank_mask, v, time_idx)
 
                     symbols_added += 1
 
@@ -1016,11 +1074,7 @@ class GreedyBatchedRNNTInfer(_GreedyRNNTInfer):
                 if len(hypotheses[batch_idx].frame_confidence[-1]) == 0:
                     del hypotheses[batch_idx].frame_confidence[-1]
 
-        # Preserve states
-        for batch_idx in range(batchsize):
-            hypotheses[batch_idx].dec_state = self.decoder.batch_select_state(hidden, batch_idx)
-
-        return hypotheses
+        return self._pack_step_buffer(step_buffer, hypotheses, hidden, out_len)
 
 
 class ExportedModelGreedyBatchedRNNTInfer:
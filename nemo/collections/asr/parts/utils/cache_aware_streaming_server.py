@@ -0,0 +1,452 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+import torch
+
+from nemo.collections.asr.metrics.rnnt_wer import AbstractRNNTDecoding
+from nemo.collections.asr.parts.mixins.streaming import StreamingEncoder
+from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis
+from nemo.utils import logging
+
+__all__ = ['CacheAwareStreamingServer', 'StreamingResult']
+
+
+@dataclass
+class StreamingResult:
+    """
+    Partial or final transcription of a stream.
+
+    Args:
+        stream_id: id of the stream.
+        text: transcription of the audio received so far.
+        predictions: greedy predictions so far, i.e. the token ids for Transducer models and the frame-level
+            (uncollapsed) ids for CTC models.
+        is_final: whether the stream is finished.
+        latency: seconds between the arrival of the last frame needed by the step and the result.
+    """
+
+    stream_id: int
+    text: str
+    predictions: List[int]
+    is_final: bool
+    latency: float
+
+
+def _get_size(size: Union[int, List[int]], first_step: bool) -> int:
+    """Sizes of the streaming config are either an int, or a list with the size of the first and next steps."""
+    if isinstance(size, list):
+        return size[0] if first_step else size[1]
+    return size
+
+
+class _Stream:
+    """State of a stream: the pending features, the encoder caches and the decoder state."""
+
+    def __init__(self, stream_id: int, cache_last_channel: torch.Tensor, cache_last_time: torch.Tensor):
+        self.stream_id = stream_id
+        # features of the stream from the absolute frame `offset`, older frames are dropped once consumed
+        self.features = None  # type: Optional[torch.Tensor]
+        self.offset = 0
+        self.num_frames = 0
+        # absolute frame of the start of the next chunk
+        self.buffer_idx = 0
+        self.step = 0
+        self.closed = False
+        self.close_time = None  # type: Optional[float]
+        self.finished = False
+        # (absolute end frame, arrival time) of the pushed features
+        self.arrivals = deque()  # type: deque
+
+        self.cache_last_channel = cache_last_channel
+        self.cache_last_time = cache_last_time
+        self.previous_hypothesis = None  # type: Optional[Hypothesis]
+        self.previous_pred_out = None  # type: Optional[torch.Tensor]
+
+        self.last_result = None  # type: Optional[StreamingResult]
+        self.results = asyncio.Queue()  # type: asyncio.Queue
+
+
+class CacheAwareStreamingServer:
+    """
+    Streaming inference engine which multiplexes many concurrent audio streams on a cache-aware streaming
+    (e.g. Conformer) ASR model, within an asyncio event loop.
+
+    Every stream keeps its own encoder caches and decoder state (the partial hypothesis of Transducer models, the
+    greedy predictions of CTC models). At every tick, the engine takes the streams which have received enough
+    features for their next chunk, and runs a single `conformer_stream_step` for a batch of them. A batch only
+    contains streams with the same cache size and kind of step (first, intermediate or last chunk), as these
+    change the shapes of the encoder inputs; the batch of the stream which has waited the longest is run first.
+    The model runs in a worker thread, so that features can be pushed while a step is running.
+
+    Each step publishes a partial result of the streams of the batch, and a final result when a stream is closed and
+    all its features are consumed. Transducer models need the `greedy` decoding strategy, the only one which
+    supports partial hypotheses.
+
+    Clients push features computed by the preprocessor of the model, as done by CacheAwareStreamingAudioBuffer.
+
+    Example:
+
+    .. code-block:: python
+
+        server = CacheAwareStreamingServer(asr_model, max_batch_size=32)
+        await server.start()
+        stream_id = server.open_stream()
+        for features in chunks:  # [feat_in, T]
+            server.push_features(stream_id, features)
+        server.close_stream(stream_id)
+        async for result in server.results(stream_id):
+            print(result.text, result.is_final)
+        await server.stop()
+
+    Args:
+        asr_model: CTC or Transducer model with a StreamingEncoder.
+        max_batch_size: maximum number of streams of a step.
+    """
+
+    def __init__(self, asr_model, max_batch_size: int = 32):
+        if not isinstance(asr_model.encoder, StreamingEncoder):
+            raise ValueError("The encoder of the model does not support cache-aware streaming.")
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be positive, got {max_batch_size}")
+        decoding = getattr(asr_model, 'decoding', None)
+        if isinstance(decoding, AbstractRNNTDecoding) and decoding.cfg.strategy != 'greedy':
+            raise ValueError(
+                f"The `{decoding.cfg.strategy}` decoding strategy does not support partial hypotheses, "
+                f"use `asr_model.change_decoding_strategy()` to set the `greedy` strategy."
+            )
+
+        self.asr_model = asr_model.eval()
+        self.max_batch_size = max_batch_size
+        if self.asr_model.encoder.streaming_cfg is None:
+            self.asr_model.encoder.setup_streaming_params()
+        self.streaming_cfg = self.asr_model.encoder.streaming_cfg
+        self.device = self.asr_model.device
+
+        if hasattr(self.asr_model.encoder, 'pre_encode') and hasattr(
+            self.asr_model.encoder.pre_encode, 'get_sampling_frames'
+        ):
+            self.sampling_frames = self.asr_model.encoder.pre_encode.get_sampling_frames()
+        else:
+            self.sampling_frames = None
+
+        self._streams = {}  # type: Dict[int, _Stream]
+        self._next_stream_id = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._task = None  # type: Optional[asyncio.Task]
+        self._wakeup = None  # type: Optional[asyncio.Event]
+
+        # statistics
+        self.num_steps = 0
+        self.num_stream_steps = 0
+
+    async def start(self):
+        """Starts the processing loop in the running event loop."""
+        if self._task is not None:
+            raise RuntimeError("The server is already started.")
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stops the processing loop. Pending streams are not finalized."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=True)
+
+    def open_stream(self) -> int:
+        """Opens a new stream and returns its id."""
+        stream_id = self._next_stream_id
+        self._next_stream_id += 1
+        cache_last_channel, cache_last_time = self.asr_model.encoder.get_initial_cache_state(batch_size=1)
+        self._streams[stream_id] = _Stream(stream_id, cache_last_channel, cache_last_time)
+        return stream_id
+
+    def push_features(self, stream_id: int, features: torch.Tensor):
+        """
+        Appends features to a stream.
+
+        Args:
+            stream_id: id of an open stream.
+            features: tensor of shape [feat_in, T] (or [1, feat_in, T]) computed by the preprocessor of the model.
+        """
+        stream = self._get_open_stream(stream_id)
+        if features.dim() == 3:
+            features = features.squeeze(0)
+        features = features.to(self.device)
+        stream.features = features if stream.features is None else torch.cat((stream.features, features), dim=-1)
+        stream.num_frames += features.size(-1)
+        stream.arrivals.append((stream.num_frames, time.perf_counter()))
+        self._notify()
+
+    def close_stream(self, stream_id: int):
+        """Marks the end of the audio of a stream, its final result is published once all its features are consumed."""
+        stream = self._get_open_stream(stream_id)
+        stream.closed = True
+        stream.close_time = time.perf_counter()
+        self._notify()
+
+    def get_partial_result(self, stream_id: int) -> Optional[StreamingResult]:
+        """Returns the most recent result of an active stream, if any."""
+        return self._streams[stream_id].last_result
+
+    async def get_result(self, stream_id: int) -> StreamingResult:
+        """Waits for the next result of a stream. The stream is released once its final result is returned."""
+        result = await self._streams[stream_id].results.get()
+        if result.is_final:
+            del self._streams[stream_id]
+        return result
+
+    async def results(self, stream_id: int) -> AsyncIterator[StreamingResult]:
+        """Iterates over the results of a stream, until its final result."""
+        while True:
+            result = await self.get_result(stream_id)
+            yield result
+            if result.is_final:
+                return
+
+    @property
+    def num_active_streams(self) -> int:
+        """Number of streams which are not finished."""
+        return sum(not stream.finished for stream in self._streams.values())
+
+    def _get_open_stream(self, stream_id: int) -> _Stream:
+        stream = self._streams.get(stream_id)
+        if stream is None or stream.closed:
+            raise ValueError(f"Stream {stream_id} is not open.")
+        return stream
+
+    def _notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            inputs = self._prepare_batch(batch)
+            outputs = await loop.run_in_executor(self._executor, self._step, *inputs)
+            self._publish(batch, inputs[-1], outputs)
+
+    def _chunk_bounds(self, stream: _Stream) -> Optional[Tuple[int, int, bool]]:
+        """Returns (chunk end, chunk size, whether it is the last step) if the next chunk of a stream is ready."""
+        first_step = stream.step == 0
+        chunk_size = _get_size(self.streaming_cfg.chunk_size, first_step)
+        remaining = stream.num_frames - stream.buffer_idx
+        if remaining < chunk_size and not stream.closed:
+            return None
+        if self.sampling_frames is not None:
+            # the chunk needs enough frames for at least one output after downsampling
+            min_frames = _get_size(self.sampling_frames, first_step)
+        else:
+            min_frames = 1
+        if min(remaining, chunk_size) < min_frames:
+            return None
+
+        shift_size = _get_size(self.streaming_cfg.shift_size, first_step)
+        is_last = stream.closed and stream.buffer_idx + shift_size >= stream.num_frames
+        return min(stream.buffer_idx + chunk_size, stream.num_frames), chunk_size, is_last
+
+    def _next_batch(self) -> List[Tuple[_Stream, int, bool]]:
+        """
+        Selects the streams of the next step, and finalizes the closed streams without any chunk left.
+
+        Returns:
+            A list of (stream, chunk end, is last step).
+        """
+        groups = {}
+        oldest_key, oldest_arrival = None, None
+        for stream in list(self._streams.values()):
+            if stream.finished:
+                continue
+            bounds = self._chunk_bounds(stream)
+            if bounds is None:
+                if stream.closed:
+                    self._finalize(stream)
+                continue
+
+            end, chunk_size, is_last = bounds
+            arrival = self._chunk_arrival(stream, end, chunk_size)
+            key = (stream.step == 0, stream.cache_last_channel.size(2), is_last)
+            groups.setdefault(key, []).append((arrival, stream.stream_id, stream, end, is_last))
+            if oldest_arrival is None or arrival < oldest_arrival:
+                oldest_key, oldest_arrival = key, arrival
+
+        if oldest_key is None:
+            return []
+        group = sorted(groups[oldest_key], key=lambda item: (item[0], item[1]))[: self.max_batch_size]
+        return [(stream, end, is_last) for _, _, stream, end, is_last in group]
+
+    @staticmethod
+    def _chunk_arrival(stream: _Stream, end: int, chunk_size: int) -> float:
+        """Returns the arrival time of the last frame of a chunk."""
+        while stream.arrivals and stream.arrivals[0][0] < end:
+            stream.arrivals.popleft()
+        if stream.buffer_idx + chunk_size > stream.num_frames or not stream.arrivals:
+            # a truncated chunk can only be processed once the stream is closed
+            return stream.close_time
+        return stream.arrivals[0][1]
+
+    def _get_chunk(self, stream: _Stream, end: int) -> torch.Tensor:
+        """Returns the next chunk of a stream, with the cache of the pre-encoder prepended."""
+        start = stream.buffer_idx - stream.offset
+        chunk = stream.features[:, start : end - stream.offset]
+        pre_encode_cache_size = self.streaming_cfg.pre_encode_cache_size
+        if stream.step == 0 and isinstance(pre_encode_cache_size, list):
+            pre_encode_cache = chunk.new_zeros(chunk.size(0), pre_encode_cache_size[0])
+        else:
+            pre_encode_cache_size = _get_size(pre_encode_cache_size, first_step=False)
+            pre_encode_cache = stream.features[:, max(start - pre_encode_cache_size, 0) : start]
+            if pre_encode_cache.size(-1) < pre_encode_cache_size:
+                zeros_pads = chunk.new_zeros(chunk.size(0), pre_encode_cache_size - pre_encode_cache.size(-1))
+                pre_encode_cache = torch.cat((zeros_pads, pre_encode_cache), dim=-1)
+        return torch.cat((pre_encode_cache, chunk), dim=-1)
+
+    def _prepare_batch(self, batch: List[Tuple[_Stream, int, bool]]):
+        """Gathers the chunks, caches and decoder states of the streams of a batch."""
+        chunks = [self._get_chunk(stream, end) for stream, end, _ in batch]
+        chunk_lengths = torch.tensor([chunk.size(-1) for chunk in chunks], device=self.device)
+        processed_signal = chunks[0].new_zeros(len(chunks), chunks[0].size(0), int(chunk_lengths.max()))
+        for idx, chunk in enumerate(chunks):
+            processed_signal[idx, :, : chunk.size(-1)] = chunk
+
+        streams = [stream for stream, _, _ in batch]
+        cache_last_channel = torch.cat([stream.cache_last_channel for stream in streams], dim=1)
+        cache_last_time = torch.cat([stream.cache_last_time for stream in streams], dim=1)
+        first_step, is_last = streams[0].step == 0, batch[0][2]
+        if first_step:
+            previous_hypotheses, previous_pred_out = None, None
+        else:
+            previous_hypotheses = [stream.previous_hypothesis for stream in streams]
+            previous_pred_out = [stream.previous_pred_out for stream in streams]
+        # no frame is dropped after the downsampling of the first chunk, as there is no pre-encoder cache
+        drop_extra_pre_encoded = 0 if first_step else self.streaming_cfg.drop_extra_pre_encoded
+
+        return (
+            processed_signal,
+            chunk_lengths,
+            cache_last_channel,
+            cache_last_time,
+            previous_hypotheses,
+            previous_pred_out,
+            drop_extra_pre_encoded,
+            is_last,
+        )
+
+    def _step(
+        self,
+        processed_signal: torch.Tensor,
+        chunk_lengths: torch.Tensor,
+        cache_last_channel: torch.Tensor,
+        cache_last_time: torch.Tensor,
+        previous_hypotheses: Optional[List[Hypothesis]],
+        previous_pred_out: Optional[List[torch.Tensor]],
+        drop_extra_pre_encoded: int,
+        keep_all_outputs: bool,
+    ):
+        """Runs a streaming step of the model, in the worker thread."""
+        with torch.inference_mode():
+            (
+                predictions,
+                transcriptions,
+                cache_last_channel_next,
+                cache_last_time_next,
+                best_hyp,
+            ) = self.asr_model.conformer_stream_step(
+                processed_signal=processed_signal,
+                processed_signal_length=chunk_lengths,
+                cache_last_channel=cache_last_channel,
+                cache_last_time=cache_last_time,
+                keep_all_outputs=keep_all_outputs,
+                previous_hypotheses=previous_hypotheses,
+                previous_pred_out=previous_pred_out,
+                drop_extra_pre_encoded=drop_extra_pre_encoded,
+                return_transcription=True,
+            )
+        texts = [hyp.text if isinstance(hyp, Hypothesis) else hyp for hyp in transcriptions]
+        return predictions, texts, cache_last_channel_next, cache_last_time_next, best_hyp
+
+    def _publish(self, batch: List[Tuple[_Stream, int, bool]], is_last: bool, outputs):
+        """Updates the states of the streams of a batch after a step, and publishes their results."""
+        predictions, texts, cache_last_channel, cache_last_time, best_hyp = outputs
+        now = time.perf_counter()
+        self.num_steps += 1
+        self.num_stream_steps += len(batch)
+
+        for idx, (stream, end, _) in enumerate(batch):
+            chunk_size = _get_size(self.streaming_cfg.chunk_size, stream.step == 0)
+            latency = now - self._chunk_arrival(stream, end, chunk_size)
+
+            stream.buffer_idx += _get_size(self.streaming_cfg.shift_size, stream.step == 0)
+            stream.step += 1
+            stream.cache_last_channel = cache_last_channel[:, idx : idx + 1]
+            stream.cache_last_time = cache_last_time[:, idx : idx + 1]
+            if best_hyp is not None:
+                stream.previous_hypothesis = best_hyp[idx]
+            else:
+                stream.previous_pred_out = predictions[idx]
+
+            # drop the consumed features, but the cache of the pre-encoder
+            pre_encode_cache_size = _get_size(self.streaming_cfg.pre_encode_cache_size, first_step=False)
+            keep_from = max(stream.buffer_idx - pre_encode_cache_size, stream.offset)
+            stream.features = stream.features[:, keep_from - stream.offset :]
+            stream.offset = keep_from
+
+            prediction = predictions[idx]
+            prediction = prediction.tolist() if isinstance(prediction, torch.Tensor) else list(prediction)
+            result = StreamingResult(
+                stream_id=stream.stream_id, text=texts[idx], predictions=prediction, is_final=False, latency=latency
+            )
+            if is_last:
+                self._finalize(stream, result)
+            else:
+                stream.last_result = result
+                stream.results.put_nowait(result)
+
+    def _finalize(self, stream: _Stream, result: Optional[StreamingResult] = None):
+        """Publishes the final result of a stream."""
+        if result is None:
+            if stream.last_result is not None:
+                result = stream.last_result
+            else:
+                result = StreamingResult(stream_id=stream.stream_id, text='', predictions=[], is_final=True, latency=0)
+            result = StreamingResult(
+                stream_id=stream.stream_id,
+                text=result.text,
+                predictions=result.predictions,
+                is_final=True,
+                latency=time.perf_counter() - stream.close_time,
+            )
+        else:
+            result.is_final = True
+        stream.finished = True
+        stream.features = stream.cache_last_channel = stream.cache_last_time = None
+        stream.last_result = result
+        stream.results.put_nowait(result)
+        logging.debug(f"Stream {stream.stream_id} finished after {stream.step} steps")
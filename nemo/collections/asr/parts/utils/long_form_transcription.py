@@ -0,0 +1,302 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+import math
+import queue
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+import torch
+from omegaconf import OmegaConf
+
+from nemo.collections.asr.models.ctc_models import EncDecCTCModel
+from nemo.collections.asr.parts.utils.audio_utils import ChannelSelectorType
+from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis
+from nemo.collections.asr.parts.utils.streaming_utils import AudioFileFeatureIterator, FeatureFrameBufferer
+
+__all__ = ['LongFormTranscriber']
+
+# seconds between two checks of the stop event by the threads waiting on a queue
+_QUEUE_TIMEOUT = 0.1
+
+
+class _EndOfStream:
+    """Marks the end of the items of a pipeline queue."""
+
+
+class _StageError:
+    """Carries the exception raised by a pipeline stage to the next stages."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class LongFormTranscriber:
+    """
+    Buffered transcription of long audio files with a CTC model, with a memory usage which does not depend on the
+    duration of the audio.
+
+    The transcription is the same as the one of FrameBatchASR, but it is run as a pipeline of three stages connected
+    by bounded queues:
+
+        1) a thread reads the audio file in blocks (see AudioFileFeatureIterator), computes their features, and
+           builds the normalized buffers of `total_buffer` seconds, shifted by `chunk_len` seconds,
+        2) a thread runs the model on batches of buffers,
+        3) the caller merges the predictions of the middle chunks of the buffers, and gets the words with their
+           timestamps as soon as they are complete.
+
+    Only `max_queue_size` batches are waiting between two stages, so that reading the audio, computing the features
+    and running the model overlap without buffering the whole file.
+
+    Example:
+        transcriber = LongFormTranscriber(asr_model, chunk_len=1.6, total_buffer=4.0, model_stride=4)
+        for word in transcriber.iter_words('long_audio.wav'):
+            print(word['start'], word['end'], word['word'])
+
+    Args:
+        asr_model: CTC model, in eval mode.
+        chunk_len: duration of the chunks, in seconds.
+        total_buffer: duration of the buffers (chunk and left and right context), in seconds.
+        batch_size: number of buffers processed together by the model.
+        model_stride: downsampling factor of the model, 8 for Citrinet models and 4 for Conformer models.
+        max_queue_size: maximum number of batches waiting between two stages of the pipeline.
+        channel_selector: channel(s) of multi-channel audio to use, see `select_channels`. Channels are averaged by
+            default.
+    """
+
+    def __init__(
+        self,
+        asr_model: EncDecCTCModel,
+        chunk_len: float = 1.6,
+        total_buffer: float = 4.0,
+        batch_size: int = 4,
+        model_stride: int = 8,
+        max_queue_size: int = 4,
+        channel_selector: Optional[ChannelSelectorType] = 'average',
+    ):
+        if not isinstance(asr_model, EncDecCTCModel):
+            raise ValueError(f"LongFormTranscriber only supports CTC models, got {type(asr_model).__name__}")
+        if max_queue_size < 1:
+            raise ValueError(f"max_queue_size must be positive, got {max_queue_size}")
+
+        self.asr_model = asr_model
+        self.chunk_len = chunk_len
+        self.total_buffer = total_buffer
+        self.batch_size = batch_size
+        self.max_queue_size = max_queue_size
+        self.channel_selector = channel_selector
+
+        self.model_stride_in_secs = asr_model._cfg.preprocessor['window_stride'] * model_stride
+        self.tokens_per_chunk = math.ceil(chunk_len / self.model_stride_in_secs)
+        self.delay = math.ceil((chunk_len + (total_buffer - chunk_len) / 2) / self.model_stride_in_secs)
+        # time of the first merged prediction: the predictions are taken `delay` steps before the end of the buffers
+        self.time_offset = chunk_len - (self.delay + 1) * self.model_stride_in_secs
+
+        self.blank_id = len(asr_model.decoder.vocabulary)
+        self.decoding = asr_model.decoding
+        self._is_subword = hasattr(asr_model, 'tokenizer')
+        self._starts_word = {}  # type: Dict[int, bool]
+
+        # features are normalized per buffer by FeatureFrameBufferer
+        cfg = copy.deepcopy(asr_model._cfg)
+        OmegaConf.set_struct(cfg.preprocessor, False)
+        cfg.preprocessor.dither = 0.0
+        cfg.preprocessor.pad_to = 0
+        cfg.preprocessor.normalize = "None"
+        self.raw_preprocessor = EncDecCTCModel.from_config_dict(cfg.preprocessor)
+        self.raw_preprocessor.to(asr_model.device)
+        self.raw_preprocessor.eval()
+
+    def transcribe(self, audio_filepath: str) -> Hypothesis:
+        """
+        Transcribes an audio file.
+
+        Args:
+            audio_filepath: path to the audio file, which must have the sample rate of the model.
+
+        Returns:
+            A Hypothesis with the text and the token ids (`y_sequence`) of the transcription, and the word timestamps
+            in `timestep['word']` (see `iter_words`).
+        """
+        tokens = []
+        words = list(self._run_pipeline(self._get_frame_reader(audio_filepath), tokens))
+        text = self.decoding.decode_tokens_to_str(tokens)
+        return Hypothesis(score=0.0, y_sequence=tokens, text=text, timestep={'word': words})
+
+    def iter_words(self, audio_filepath: str) -> Iterator[Dict[str, Union[str, int, float]]]:
+        """
+        Transcribes an audio file, yielding the words as soon as they are complete.
+
+        Args:
+            audio_filepath: path to the audio file, which must have the sample rate of the model.
+
+        Returns:
+            An iterator of dicts with the text of the word ("word"), its first and last (exclusive) time steps of the
+            model ("start_offset" and "end_offset"), and its start and end times in seconds ("start" and "end").
+            Closing the iterator stops the pipeline.
+        """
+        return self._run_pipeline(self._get_frame_reader(audio_filepath))
+
+    def _get_frame_reader(self, audio_filepath: str) -> AudioFileFeatureIterator:
+        # the audio is padded so that the last chunk is at the middle of a buffer, as done by FrameBatchASR
+        return AudioFileFeatureIterator(
+            audio_filepath,
+            self.chunk_len,
+            self.raw_preprocessor,
+            self.asr_model.device,
+            pad_len=self.delay * self.model_stride_in_secs,
+            channel_selector=self.channel_selector,
+        )
+
+    def _run_pipeline(self, frame_reader: AudioFileFeatureIterator, tokens: Optional[List[int]] = None):
+        stop = threading.Event()
+        buffers_queue = queue.Queue(maxsize=self.max_queue_size)
+        predictions_queue = queue.Queue(maxsize=self.max_queue_size)
+        threads = [
+            threading.Thread(
+                target=self._run_stage,
+                args=(self._iter_buffers(frame_reader), buffers_queue, stop),
+                name='LongFormTranscriber-features',
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._run_stage,
+                args=(self._iter_predictions(self._iter_queue(buffers_queue, stop)), predictions_queue, stop),
+                name='LongFormTranscriber-model',
+                daemon=True,
+            ),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            yield from self._merge(self._iter_queue(predictions_queue, stop), tokens)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def _iter_buffers(self, frame_reader: AudioFileFeatureIterator) -> Iterator[np.ndarray]:
+        """Yields the batches of normalized feature buffers."""
+        frame_bufferer = FeatureFrameBufferer(
+            self.asr_model, frame_len=self.chunk_len, batch_size=self.batch_size, total_buffer=self.total_buffer
+        )
+        frame_bufferer.set_frame_reader(frame_reader)
+        frame_buffers = frame_bufferer.get_buffers_batch()
+        while len(frame_buffers) > 0:
+            yield np.stack(frame_buffers)
+            frame_buffers = frame_bufferer.get_buffers_batch()
+
+    def _iter_predictions(self, batches: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        """Yields the greedy predictions of the batches of buffers."""
+        device = self.asr_model.device
+        # grad mode is thread local
+        with torch.inference_mode():
+            for buffers in batches:
+                signal = torch.from_numpy(buffers.astype(np.float32, copy=False)).to(device)
+                signal_len = torch.full([signal.size(0)], signal.size(-1), dtype=torch.long, device=device)
+                _, _, predictions = self.asr_model(processed_signal=signal, processed_signal_length=signal_len)
+                yield predictions.cpu().numpy()
+
+    def _merge(self, batches: Iterable[np.ndarray], tokens: Optional[List[int]]):
+        """Merges the middle chunks of the predictions of the buffers, and yields the complete words."""
+        previous = self.blank_id
+        word = []
+        word_start = word_end = 0
+        step = 0
+        for predictions in batches:
+            for prediction in predictions:
+                start = len(prediction) - 1 - self.delay
+                for token in prediction[start : start + self.tokens_per_chunk].tolist():
+                    if token != self.blank_id:
+                        if token != previous:
+                            if tokens is not None:
+                                tokens.append(token)
+                            if self._is_word_start(token) and len(word) > 0:
+                                yield self._word_offsets(word, word_start, word_end)
+                                word = []
+                            if not self._is_word_delimiter(token):
+                                if len(word) == 0:
+                                    word_start = step
+                                word.append(token)
+                        if len(word) > 0 and word[-1] == token:
+                            word_end = step + 1
+                    previous = token
+                    step += 1
+        if len(word) > 0:
+            yield self._word_offsets(word, word_start, word_end)
+
+    def _is_word_start(self, token: int) -> bool:
+        """Whether a token ends the current word: a subword with a word start marker, or a word delimiter."""
+        starts_word = self._starts_word.get(token)
+        if starts_word is None:
+            if self._is_subword:
+                # the word start marker of sentencepiece is stripped from the text of the token
+                starts_word = self.decoding.decode_ids_to_tokens([token])[0] != self.decoding.decode_tokens_to_str(
+                    [token]
+                )
+            else:
+                starts_word = self._is_word_delimiter(token)
+            self._starts_word[token] = starts_word
+        return starts_word
+
+    def _is_word_delimiter(self, token: int) -> bool:
+        return not self._is_subword and self.decoding.decode_tokens_to_str([token]) == self.decoding.word_seperator
+
+    def _word_offsets(self, word: List[int], start: int, end: int) -> Dict[str, Union[str, int, float]]:
+        return {
+            "word": self.decoding.decode_tokens_to_str(word),
+            "start_offset": start,
+            "end_offset": end,
+            "start": max(0.0, self.time_offset + start * self.model_stride_in_secs),
+            "end": max(0.0, self.time_offset + end * self.model_stride_in_secs),
+        }
+
+    @staticmethod
+    def _run_stage(items: Iterator, output_queue: queue.Queue, stop: threading.Event):
+        """Puts the items of a stage into its output queue, followed by the end of stream or the raised error."""
+        try:
+            for item in items:
+                if not LongFormTranscriber._put(output_queue, item, stop):
+                    return
+            end = _EndOfStream()
+        except BaseException as e:
+            end = _StageError(e)
+        LongFormTranscriber._put(output_queue, end, stop)
+
+    @staticmethod
+    def _put(output_queue: queue.Queue, item, stop: threading.Event) -> bool:
+        """Puts an item into a queue, unless the pipeline is stopped. Returns whether the item was put."""
+        while not stop.is_set():
+            try:
+                output_queue.put(item, timeout=_QUEUE_TIMEOUT)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    @staticmethod
+    def _iter_queue(input_queue: queue.Queue, stop: threading.Event) -> Iterator:
+        """Yields the items of a queue up to the end of stream, and raises the errors of the previous stages."""
+        while not stop.is_set():
+            try:
+                item = input_queue.get(timeout=_QUEUE_TIMEOUT)
+            except queue.Empty:
+                continue
+            if isinstance(item, _EndOfStream):
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
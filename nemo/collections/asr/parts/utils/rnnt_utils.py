@@ -26,8 +26,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections.abc import Sequence
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import torch
 
@@ -83,6 +84,8 @@ class Hypothesis:
     tokens: (Optional) A list of decoded tokens (can be characters or word-pieces.
 
     last_token (Optional): A token or batch of tokens which was predicted in the last step.
+
+    boosting_state (Optional): State of the contextual biasing automaton (a BoostingTrie), if used.
     """
 
     score: float
@@ -101,6 +104,7 @@ class Hypothesis:
     lm_scores: Optional[torch.Tensor] = None
     tokens: Optional[Union[List[int], torch.Tensor]] = None
     last_token: Optional[torch.Tensor] = None
+    boosting_state: Optional[int] = None
 
     @property
     def non_blank_frame_confidence(self) -> List[float]:
@@ -144,6 +148,140 @@ class NBestHypotheses:
     n_best_hypotheses: Optional[List[Hypothesis]]
 
 
+class PackedHypotheses(Sequence):
+    """Hypotheses of a batch of utterances packed into flat tensors, which behave as a list of Hypothesis.
+
+    The tokens of all the hypotheses are concatenated in `y_sequence`, the tokens of the i-th hypothesis being
+    `y_sequence[offsets[i] : offsets[i + 1]]`, and similarly for the timesteps. Decoders build these tensors for
+    the whole batch at once, and consumers which only need the tokens (e.g. to decode the text) can read them
+    with `get_y_sequence` without creating any Hypothesis. A Hypothesis is only created when an element is
+    accessed, and it is cached so that modifications of the returned object persist.
+
+    Args:
+        y_sequence: flat long tensor with the tokens of all the hypotheses.
+        offsets: long tensor of shape (B + 1), with the start of every hypothesis in `y_sequence`.
+        score: float tensor of shape (B), with the score of every hypothesis.
+        length: optional tensor of shape (B), with the length of every utterance.
+        timestep: optional flat long tensor with the timesteps of all the hypotheses.
+        timestep_offsets: optional long tensor of shape (B + 1), with the start of every hypothesis in
+            `timestep`. Defaults to `offsets`.
+        fields: optional dict of other Hypothesis attributes. Values are either sequences with one value per
+            hypothesis, or callables which return the value of a hypothesis given its index.
+    """
+
+    def __init__(
+        self,
+        y_sequence: torch.Tensor,
+        offsets: torch.Tensor,
+        score: torch.Tensor,
+        length: Optional[torch.Tensor] = None,
+        timestep: Optional[torch.Tensor] = None,
+        timestep_offsets: Optional[torch.Tensor] = None,
+        fields: Optional[Dict[str, Union[Sequence, Callable[[int], Any]]]] = None,
+    ):
+        if timestep is not None and timestep_offsets is None:
+            timestep_offsets = offsets
+
+        self.y_sequence = y_sequence
+        self.offsets = offsets
+        self.score = score
+        self.length = length
+        self.timestep = timestep
+        self.timestep_offsets = timestep_offsets
+        self.fields = fields if fields is not None else {}
+
+        self._offsets = offsets.tolist()
+        self._timestep_offsets = timestep_offsets.tolist() if timestep_offsets is not None else None
+        self._hypotheses = [None] * (len(self._offsets) - 1)
+
+    @staticmethod
+    def lengths_to_offsets(lengths: torch.Tensor) -> torch.Tensor:
+        """Returns the offsets (B + 1) of hypotheses with the given number of elements (B)."""
+        offsets = torch.zeros(lengths.shape[0] + 1, dtype=torch.long, device=lengths.device)
+        torch.cumsum(lengths, dim=0, out=offsets[1:])
+        return offsets
+
+    def __len__(self) -> int:
+        return len(self._hypotheses)
+
+    def get_y_sequence(self, idx: int) -> torch.Tensor:
+        """Returns the tokens of the `idx`-th hypothesis, without creating a Hypothesis."""
+        return self.y_sequence[self._offsets[idx] : self._offsets[idx + 1]]
+
+    def get_timestep(self, idx: int) -> List[int]:
+        """Returns the timesteps of the `idx`-th hypothesis, without creating a Hypothesis."""
+        if self.timestep is None:
+            return []
+        return self.timestep[self._timestep_offsets[idx] : self._timestep_offsets[idx + 1]].tolist()
+
+    def __getitem__(self, idx: Union[int, slice]) -> Union[Hypothesis, List[Hypothesis]]:
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if self._hypotheses[idx] is None:
+            self._hypotheses[idx] = self._create_hypothesis(idx)
+        return self._hypotheses[idx]
+
+    def __setitem__(self, idx: int, hypothesis: Hypothesis):
+        self._hypotheses[idx] = hypothesis
+
+    def _create_hypothesis(self, idx: int) -> Hypothesis:
+        hypothesis = Hypothesis(
+            score=self.score[idx].item(),
+            y_sequence=self.get_y_sequence(idx),
+            dec_state=None,
+            timestep=self.get_timestep(idx),
+            length=self.length[idx] if self.length is not None else 0,
+        )
+        for name, values in self.fields.items():
+            setattr(hypothesis, name, values(idx) if callable(values) else values[idx])
+        return hypothesis
+
+
+class PackedCTCHypotheses(PackedHypotheses):
+    """PackedHypotheses of greedy CTC decoding, which also hold the tokens of the batch after CTC collapse.
+
+    `y_sequence` holds the per-frame labels, as the `y_sequence` of the Hypothesis of greedy CTC decoding. The
+    collapsed tokens (without blanks and repetitions) of the i-th hypothesis are
+    `tokens[token_offsets[i] : token_offsets[i + 1]]`, with the same layout for `token_lengths` (the number of
+    frames since the start of the previous token, or since the first frame for the first token) and
+    `token_repetitions` (the number of consecutive frames of the token).
+
+    Args:
+        tokens: flat long tensor with the collapsed tokens of all the hypotheses.
+        token_offsets: long tensor of shape (B + 1), with the start of every hypothesis in `tokens`.
+        token_lengths: flat long tensor with the lengths of the collapsed tokens.
+        token_repetitions: flat long tensor with the repetitions of the collapsed tokens.
+        **kwargs: arguments of PackedHypotheses.
+    """
+
+    def __init__(
+        self,
+        tokens: torch.Tensor,
+        token_offsets: torch.Tensor,
+        token_lengths: torch.Tensor,
+        token_repetitions: torch.Tensor,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.tokens = tokens
+        self.token_offsets = token_offsets
+        self.token_lengths = token_lengths
+        self.token_repetitions = token_repetitions
+
+        self._token_offsets = token_offsets.tolist()
+        self._collapsed = None
+
+    def get_tokens(self, idx: int) -> Tuple[List[int], List[int], List[int]]:
+        """Returns the collapsed tokens, token lengths and token repetitions of the `idx`-th hypothesis."""
+        if self._collapsed is None:
+            # a single conversion for the whole batch, the hypotheses are then sliced from python lists
+            self._collapsed = (self.tokens.tolist(), self.token_lengths.tolist(), self.token_repetitions.tolist())
+        start, end = self._token_offsets[idx], self._token_offsets[idx + 1]
+        return tuple(values[start:end] for values in self._collapsed)
+
+
 def is_prefix(x: List[int], pref: List[int]) -> bool:
     """
     Obtained from https://github.com/espnet/espnet.
@@ -204,3 +342,50 @@ def select_k_expansions(
             k_expansions.append([(k_best_exp_idx, k_best_exp)])
 
     return k_expansions
+
+
+def rnnt_log_likelihood(
+    blank_log_probs: torch.Tensor,
+    label_log_probs: torch.Tensor,
+    input_lengths: torch.Tensor,
+    label_lengths: torch.Tensor,
+) -> torch.Tensor:
+    """
+    Computes the log likelihood of the targets under the RNNT lattice, given only the log probabilities of the blank
+    and target tokens at every node of the lattice. The forward variables are computed one anti-diagonal of the
+    lattice at a time, and the result is differentiable with respect to both log probability tensors.
+
+    Args:
+        blank_log_probs: Log probabilities of the blank token, a torch.Tensor of shape [B, T, U + 1].
+        label_log_probs: Log probabilities of the next target token, a torch.Tensor of shape [B, T, U + 1]
+            (the last target timestep is unused).
+        input_lengths: Lengths of the acoustic sequences, a torch.Tensor of shape [B].
+        label_lengths: Lengths of the target sequences, a torch.Tensor of shape [B].
+
+    Returns:
+        The log likelihood of every sample, a torch.Tensor of shape [B].
+    """
+    batch_size, max_t, max_u = blank_log_probs.shape
+    device = blank_log_probs.device
+    # a finite value, so that the gradients of unreachable nodes are zeros instead of NaNs
+    impossible = -1e30
+
+    u = torch.arange(max_u, device=device)
+    alpha = torch.full((batch_size, max_u), impossible, dtype=blank_log_probs.dtype, device=device)
+    alpha[:, 0] = 0.0
+    alphas = [alpha]  # alphas[n][:, u] is the forward variable of the node (n - u, u)
+    for n in range(1, max_t + max_u - 1):
+        t = n - u
+        valid = (t >= 0) & (t < max_t)
+        # blank transitions from (t - 1, u), and emissions from (t, u - 1)
+        no_emit = alpha + blank_log_probs[:, (t - 1).clamp(0, max_t - 1), u]
+        emit = alpha[:, :-1] + label_log_probs[:, t[1:].clamp(0, max_t - 1), u[:-1]]
+        emit = torch.nn.functional.pad(emit, (1, 0), value=impossible)
+        alpha = torch.where(valid, torch.logaddexp(no_emit, emit), torch.full_like(no_emit, impossible))
+        alphas.append(alpha)
+
+    alphas = torch.stack(alphas)  # [T + U, B, U + 1]
+    batch = torch.arange(batch_size, device=device)
+    final_t = input_lengths - 1
+    final_u = label_lengths
+    return alphas[final_t + final_u, batch, final_u] + blank_log_probs[batch, final_t, final_u]
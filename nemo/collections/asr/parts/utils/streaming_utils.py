@@ -13,9 +13,12 @@
 # limitations under the License.
 
 import copy
+import math
 import os
+from typing import Optional
 
 import numpy as np
+import soundfile as sf
 import torch
 from omegaconf import OmegaConf
 from torch.utils.data import DataLoader
@@ -23,7 +26,7 @@ from torch.utils.data import DataLoader
 from nemo.collections.asr.models.ctc_bpe_models import EncDecCTCModelBPE
 from nemo.collections.asr.parts.mixins.streaming import StreamingEncoder
 from nemo.collections.asr.parts.preprocessing.features import normalize_batch
-from nemo.collections.asr.parts.utils.audio_utils import get_samples
+from nemo.collections.asr.parts.utils.audio_utils import ChannelSelectorType, get_samples, select_channels
 from nemo.core.classes import IterableDataset
 from nemo.core.neural_types import LengthsType, NeuralType
 
@@ -66,6 +69,42 @@ def write_lcs_alignment_to_pickle(alignment, filepath, extras=None):
     torch.save(extras, filepath)
 
 
+def lcs_suffix_table(X, Y) -> np.ndarray:
+    """
+    Computes the table of the lengths of the longest common suffixes of the prefixes of two token sequences,
+    i.e. table[i, j] is the length of the longest common suffix of X[:i] and Y[:j].
+
+    The table is computed with vectorized operations over the matching tokens: the matches are sorted along the
+    diagonals of the table, where the lengths of the common suffixes are the lengths of the runs of matches.
+
+    Args:
+        X: Sequence of m token ids.
+        Y: Sequence of n token ids.
+
+    Returns:
+        An int64 array of shape (m + 1, n + 1).
+    """
+    m, n = len(X), len(Y)
+    table = np.zeros((m + 1, n + 1), dtype=np.int64)
+    if m == 0 or n == 0:
+        return table
+
+    match_i, match_j = np.nonzero(np.asarray(X)[:, None] == np.asarray(Y)[None, :])
+    if len(match_i) == 0:
+        return table
+
+    diagonals = match_j - match_i
+    order = np.lexsort((match_i, diagonals))
+    match_i, match_j, diagonals = match_i[order], match_j[order], diagonals[order]
+    # a run of matches starts where the previous match is not the previous cell of the same diagonal
+    is_start = np.ones(len(match_i), dtype=bool)
+    is_start[1:] = (diagonals[1:] != diagonals[:-1]) | (match_i[1:] != match_i[:-1] + 1)
+    positions = np.arange(len(match_i))
+    run_starts = np.maximum.accumulate(np.where(is_start, positions, 0))
+    table[match_i + 1, match_j + 1] = positions - run_starts + 1
+    return table
+
+
 def longest_common_subsequence_merge(X, Y, filepath=None):
     """
     Longest Common Subsequence merge algorithm for aligning two consecutive buffers.
@@ -86,12 +125,13 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
     It requires a delay of some number of tokens such that:
         lcs_delay = math.floor(((total_buffer_in_secs - chunk_len_in_sec)) / model_stride_in_secs)
 
-    Total cost of the model is O(m_{i-1} * n_{i}) where (m, n) represents the number of subword ids of the buffer.
+    The alignment matrix is built with vectorized operations (see `lcs_suffix_table`), and the searches over the
+    matrix only visit its non-zero entries, or walk along a few diagonals.
 
     Args:
         X: The subset of the previous chunk i-1, sliced such X = X[-(lcs_delay * max_steps_per_timestep):]
             Therefore there can be at most lcs_delay * max_steps_per_timestep symbols for X, preserving computation.
-        Y: The entire current chunk i.
+        Y: The current chunk i (or its beginning, which overlaps with the previous chunk).
         filepath: Optional filepath to save the LCS alignment matrix for later introspection.
 
     Returns:
@@ -99,34 +139,18 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
             - i: Start index of alignment along the i-1 chunk.
             - j: Start index of alignment along the ith chunk.
             - slice_len: number of tokens to slice off from the ith chunk.
-        The LCS alignment matrix itself (shape m + 1, n + 1)
+        The LCS alignment matrix itself (an int64 array of shape m + 1, n + 1)
     """
-    # LCSuff is the table with zero
-    # value initially in each cell
     m = len(X)
     n = len(Y)
-    LCSuff = [[0 for k in range(n + 1)] for l in range(m + 1)]
+    LCSuff = lcs_suffix_table(X, Y)
 
-    # To store the length of
-    # longest common substring
-    result = 0
+    # The longest common substring, the last one in row-major order in case of ties
     result_idx = [0, 0, 0]  # Contains (i, j, slice_len)
-
-    # Following steps to build
-    # LCSuff[m+1][n+1] in bottom up fashion
-    for i in range(m + 1):
-        for j in range(n + 1):
-            if i == 0 or j == 0:
-                LCSuff[i][j] = 0
-            elif X[i - 1] == Y[j - 1]:
-                LCSuff[i][j] = LCSuff[i - 1][j - 1] + 1
-
-                if result <= LCSuff[i][j]:
-                    result = LCSuff[i][j]  # max(result, LCSuff[i][j])
-                    result_idx = [i, j, result]
-
-            else:
-                LCSuff[i][j] = 0
+    result = int(LCSuff.max())
+    if result > 0:
+        last_idx = LCSuff.size - 1 - int(np.argmax(LCSuff.ravel()[::-1] == result))
+        result_idx = [last_idx // (n + 1), last_idx % (n + 1), result]
 
     # Check if perfect alignment was found or not
     # Perfect alignment is found if :
@@ -143,7 +167,7 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
         # Perform backtrack to find the origin point of the slice (j) and how many tokens should be sliced
         while length >= 0 and i > 0 and j > 0:
             # Alignment exists at the required diagonal
-            if LCSuff[i - 1][j - 1] > 0:
+            if LCSuff[i - 1, j - 1] > 0:
                 length -= 1
                 i, j = i - 1, j - 1
 
@@ -176,17 +200,22 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
         j_skip = 0  # Number of tokens that were skipped along the diagonal
         slice_count = 0  # Number of tokens that should be sliced
 
-        # Select leftmost LCS
-        for i_idx in range(m, -1, -1):  # start from last timestep of old buffer
-            for j_idx in range(0, n + 1):  # start from first token from new buffer
-                # Select the longest LCSuff, while minimizing the index of j (token index for new buffer)
-                if LCSuff[i_idx][j_idx] > max_j and j_idx <= max_j_idx:
-                    max_j = LCSuff[i_idx][j_idx]
-                    max_j_idx = j_idx
-
-                    # Update the starting indices of the partial merge
-                    i_partial = i_idx
-                    j_partial = j_idx
+        # Select leftmost LCS, visiting the non-zero entries from the last timestep of the old buffer and
+        # the first token of the new buffer. Once an entry of a row is selected, the next entries of the row
+        # are on its right, so that at most one entry is selected per row.
+        nonzero_i, nonzero_j = np.nonzero(LCSuff)
+        order = np.lexsort((nonzero_j, -nonzero_i))
+        nonzero_i, nonzero_j = nonzero_i[order], nonzero_j[order]
+        values = LCSuff[nonzero_i, nonzero_j]
+        for i_idx, j_idx, value in zip(nonzero_i.tolist(), nonzero_j.tolist(), values.tolist()):
+            # Select the longest LCSuff, while minimizing the index of j (token index for new buffer)
+            if value > max_j and j_idx <= max_j_idx:
+                max_j = value
+                max_j_idx = j_idx
+
+                # Update the starting indices of the partial merge
+                i_partial = i_idx
+                j_partial = j_idx
 
         # EARLY EXIT (if max subsequence length <= MIN merge length)
         # Important case where there is long silence
@@ -228,7 +257,7 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
                 # incorrect token in between correct tokens
                 for j_idx in range(j_temp, j_temp + j_skip + 1):
                     if j_idx < n + 1:
-                        if LCSuff[i_idx][j_idx] == 0:
+                        if LCSuff[i_idx, j_idx] == 0:
                             j_any_skip = 1
                         else:
                             j_exp = 1 + j_skip + j_any_skip
@@ -250,7 +279,7 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
 
             # Partial backward trace to find start of slice
             while i_partial > 0 and j_partial > 0:
-                if LCSuff[i_partial][j_partial] == 0:
+                if LCSuff[i_partial, j_partial] == 0:
                     # diagonal skip occured, move j to left 1 extra time
                     j_partial -= 1
                     j_skip += 1
@@ -292,6 +321,9 @@ def lcs_alignment_merge_buffer(buffer, data, delay, model, max_steps_per_timeste
     The alignment is based on a Longest Common Subsequence algorithm, with some additional heuristics leveraging
     the notion that the chunk size is >= the context window. In case this assumptio is violated, the results of the merge
     will be incorrect (or at least obtain worse WER overall).
+
+    The merge is incremental: only the tail of the buffer and the beginning of the new data, which can both span
+    at most `delay` timesteps of overlapping audio, are aligned.
     """
     # If delay timesteps is 0, that means no future context was used. Simply concatenate the buffer with new data.
     if delay < 1:
@@ -303,12 +335,13 @@ def lcs_alignment_merge_buffer(buffer, data, delay, model, max_steps_per_timeste
         buffer += data
         return buffer
 
-    # Prepare a subset of the buffer that will be LCS Merged with new data
+    # Prepare the overlapping windows of the buffer and new data that will be LCS Merged
     search_size = int(delay * max_steps_per_timestep)
     buffer_slice = buffer[-search_size:]
+    data_slice = data[:search_size]
 
     # Perform LCS Merge
-    lcs_idx, lcs_alignment = longest_common_subsequence_merge(buffer_slice, data, filepath=filepath)
+    lcs_idx, lcs_alignment = longest_common_subsequence_merge(buffer_slice, data_slice, filepath=filepath)
 
     # Slice off new data
     # i, j, slice_len = lcs_idx
@@ -498,6 +531,138 @@ class AudioFeatureIterator(IterableDataset):
         return frame
 
 
+class AudioFileFeatureIterator(IterableDataset):
+    """
+    Streaming counterpart of AudioFeatureIterator, which reads the audio file in blocks instead of loading it into
+    memory, so that the memory used does not depend on the duration of the file.
+
+    The features of every block of `frame_len` seconds are computed with some context of audio on both sides, which
+    covers the STFT window and the preemphasis, so that they are the same as the features of the whole signal. They
+    are returned in frames of `frame_len` seconds, the last one being zero padded, as done by AudioFeatureIterator.
+
+    Args:
+        audio_filepath: path to the audio file, which must have the sample rate of the preprocessor.
+        frame_len: frame duration, in seconds.
+        preprocessor: preprocessor computing the (unnormalized) features.
+        device: device of the preprocessor.
+        pad_len: duration of the silence appended to the audio, in seconds.
+        channel_selector: channel(s) of multi-channel audio to use, see `select_channels`. Channels are averaged by
+            default.
+    """
+
+    def __init__(
+        self,
+        audio_filepath: str,
+        frame_len: float,
+        preprocessor,
+        device,
+        pad_len: float = 0.0,
+        channel_selector: Optional[ChannelSelectorType] = 'average',
+    ):
+        self._preprocessor = preprocessor
+        self._device = device
+        self._channel_selector = channel_selector
+        timestep_duration = preprocessor._cfg['window_stride']
+        self._feature_frame_len = int(frame_len / timestep_duration)
+
+        featurizer = preprocessor.featurizer
+        self._hop_length = featurizer.hop_length
+        self._block_len = self._feature_frame_len * self._hop_length
+        # context of every block, in samples: a multiple of the hop length covering the window and the preemphasis
+        self._context = int(math.ceil((featurizer.n_fft + 1) / self._hop_length)) * self._hop_length
+
+        self._file = sf.SoundFile(audio_filepath, 'r')
+        sample_rate = preprocessor._sample_rate
+        if self._file.samplerate != sample_rate:
+            self._file.close()
+            raise ValueError(
+                f"{audio_filepath} has a sample rate of {self._file.samplerate}Hz, but the model expects "
+                f"{sample_rate}Hz. Long audio files are not resampled on the fly, please resample it first."
+            )
+        self._pad_samples = int(pad_len * sample_rate)
+
+        self.output = True
+        self.count = 0
+        self._frames = self._generate_frames()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        frame = next(self._frames)
+        self.count += 1
+        return frame
+
+    def _read_blocks(self):
+        """Yields the blocks of samples of the file, then of the padding."""
+        try:
+            for block in self._file.blocks(blocksize=self._block_len, dtype='float32', always_2d=True):
+                if block.shape[1] == 1:
+                    yield block[:, 0]
+                else:
+                    yield select_channels(block, self._channel_selector)
+        finally:
+            self._file.close()
+        for start in range(0, self._pad_samples, self._block_len):
+            yield np.zeros(min(self._block_len, self._pad_samples - start), dtype=np.float32)
+
+    @torch.no_grad()
+    def _compute_features(self, samples: np.ndarray) -> np.ndarray:
+        audio_signal = torch.from_numpy(samples).unsqueeze_(0).to(self._device)
+        audio_signal_len = torch.tensor([samples.shape[0]], device=self._device)
+        features, features_len = self._preprocessor(input_signal=audio_signal, length=audio_signal_len)
+        return features[0, :, : features_len[0]].cpu().numpy()
+
+    def _generate_frames(self):
+        # samples[0] is the sample `samples_start` of the audio, features are computed from the sample `next_sample`
+        samples = np.zeros(0, dtype=np.float32)
+        samples_start = 0
+        next_sample = 0
+        features = []
+        num_features = 0
+
+        for block in self._read_blocks():
+            samples = np.concatenate([samples, block])
+            while samples_start + samples.shape[0] >= next_sample + self._block_len + self._context:
+                segment = samples[: next_sample + self._block_len + self._context - samples_start]
+                first_feature = (next_sample - samples_start) // self._hop_length
+                block_features = self._compute_features(segment)
+                features.append(block_features[:, first_feature : first_feature + self._feature_frame_len])
+                num_features += self._feature_frame_len
+                next_sample += self._block_len
+
+                # keep the left context of the next block
+                drop = max(0, next_sample - self._context - samples_start)
+                samples = samples[drop:]
+                samples_start += drop
+
+            while num_features >= self._feature_frame_len:
+                frame, features, num_features = self._pop_frame(features, num_features)
+                yield frame
+
+        # last features, up to the end of the audio
+        if samples.shape[0] > 0:
+            first_feature = (next_sample - samples_start) // self._hop_length
+            block_features = self._compute_features(samples)[:, first_feature:]
+            features.append(block_features)
+            num_features += block_features.shape[1]
+        while num_features >= self._feature_frame_len:
+            frame, features, num_features = self._pop_frame(features, num_features)
+            yield frame
+
+        self.output = False
+        frame = np.zeros([self._preprocessor.featurizer.nfilt, self._feature_frame_len], dtype='float32')
+        if num_features > 0:
+            frame[:, :num_features] = np.concatenate(features, axis=1)
+        yield frame
+
+    def _pop_frame(self, features, num_features):
+        features = np.concatenate(features, axis=1)
+        frame = features[:, : self._feature_frame_len]
+        features = features[:, self._feature_frame_len :]
+        return frame, [features], num_features - self._feature_frame_len
+
+
 def speech_collate_fn(batch):
     """collate batch of audio sig, audio len, tokens, tokens len
     Args:
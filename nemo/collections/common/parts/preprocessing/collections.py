@@ -13,17 +13,41 @@
 # limitations under the License.
 
 import collections
+import collections.abc
 import json
 import os
 from itertools import combinations
 from typing import Any, Dict, Iterable, List, Optional, Union
 
+import numpy as np
 import pandas as pd
 
-from nemo.collections.common.parts.preprocessing import manifest, parsers
+from nemo.collections.common.parts.preprocessing import compiled_manifest, manifest, parsers
 from nemo.utils import logging
 
 
+def parse_text_tokens(parser: parsers.CharParser, text: str, lang: Optional[str] = None) -> Optional[List[int]]:
+    """Tokenizes a single transcript the way `AudioText` does.
+
+    Args:
+        parser: Instance of `CharParser` or a tokenizer wrapper to convert string to tokens.
+        text: Raw transcript.
+        lang: Language id of the transcript, required for aggregate tokenizers.
+
+    Returns:
+        List of tokens, or None if the parser failed to parse the transcript.
+    """
+    if text == '':
+        return []
+
+    if hasattr(parser, "is_aggregate") and parser.is_aggregate and isinstance(text, str):
+        if lang is not None:
+            return parser(text, lang)
+        raise ValueError("lang required in manifest when using aggregate tokenizers")
+
+    return parser(text)
+
+
 class _Collection(collections.UserList):
     """List of parsed and preprocessed data."""
 
@@ -113,6 +137,7 @@ class AudioText(_Collection):
         max_number: Optional[int] = None,
         do_sort_by_duration: bool = False,
         index_by_file_id: bool = False,
+        lazy_tokenization: bool = False,
     ):
         """Instantiates audio-text manifest with filters and preprocessing.
 
@@ -131,6 +156,9 @@ class AudioText(_Collection):
             max_number: Maximum number of samples to collect.
             do_sort_by_duration: True if sort samples list by duration. Not compatible with index_by_file_id.
             index_by_file_id: If True, saves a mapping from filename base (ID) to index in data.
+            lazy_tokenization: If True, transcripts are not tokenized here and `text_tokens` is set to None
+                (unless `token_labels` are provided), leaving tokenization to the consumer on first access.
+                Transcripts which fail to parse are then not filtered out.
         """
 
         output_type = self.OUTPUT_TYPE
@@ -154,17 +182,10 @@ class AudioText(_Collection):
 
             if token_labels is not None:
                 text_tokens = token_labels
+            elif lazy_tokenization:
+                text_tokens = None
             else:
-                if text != '':
-                    if hasattr(parser, "is_aggregate") and parser.is_aggregate and isinstance(text, str):
-                        if lang is not None:
-                            text_tokens = parser(text, lang)
-                        else:
-                            raise ValueError("lang required in manifest when using aggregate tokenizers")
-                    else:
-                        text_tokens = parser(text)
-                else:
-                    text_tokens = []
+                text_tokens = parse_text_tokens(parser, text, lang)
 
                 if text_tokens is None:
                     duration_filtered += duration
@@ -232,6 +253,137 @@ class ASRAudioText(AudioText):
         )
 
 
+class CompiledASRAudioText(collections.abc.Sequence):
+    """`ASRAudioText` counterpart backed by compiled, memory-mapped manifests.
+
+    Manifests are compiled offline with `compiled_manifest.build_compiled_manifest` (see
+    `scripts/speech_recognition/build_compiled_manifest.py`). Filtering and sorting are done with
+    vectorized operations on the duration column and entries are materialized into
+    `AudioText.OUTPUT_TYPE` tuples only on access. Transcripts are tokenized on access unless tokens
+    were pre-computed at compile time with a parser of the same fingerprint.
+    """
+
+    OUTPUT_TYPE = AudioText.OUTPUT_TYPE
+
+    def __init__(
+        self,
+        manifests_files: Union[str, List[str]],
+        parser: parsers.CharParser,
+        min_duration: Optional[float] = None,
+        max_duration: Optional[float] = None,
+        max_number: Optional[int] = None,
+        do_sort_by_duration: bool = False,
+        index_by_file_id: bool = False,
+        lazy_tokenization: bool = False,
+    ):
+        """Opens compiled manifests and applies the same filters as `AudioText`.
+
+        Args:
+            manifests_files: Either single compiled manifest directory or list of such.
+            parser: Instance of `CharParser` to convert string to tokens.
+            min_duration: Minimum duration to keep entry with (default: None).
+            max_duration: Maximum duration to keep entry with (default: None).
+            max_number: Maximum number of samples to collect.
+            do_sort_by_duration: True if sort samples list by duration. Not compatible with index_by_file_id.
+            index_by_file_id: If True, saves a mapping from filename base (ID) to index in data.
+            lazy_tokenization: If True, entries without pre-computed tokens are returned with `text_tokens`
+                set to None instead of being tokenized on access.
+        """
+        if isinstance(manifests_files, str):
+            manifests_files = [manifests_files]
+
+        self.parser = parser
+        self.lazy_tokenization = lazy_tokenization
+        self._parser_fingerprint = parsers.get_parser_fingerprint(parser)
+        self.manifests = [compiled_manifest.CompiledManifest(path) for path in manifests_files]
+        self._manifest_bins = np.cumsum([len(m) for m in self.manifests])
+
+        durations = np.concatenate([np.asarray(m.durations) for m in self.manifests])
+        keep = np.ones(len(durations), dtype=bool)
+        if min_duration is not None:
+            keep &= durations >= min_duration
+        if max_duration is not None:
+            keep &= durations <= max_duration
+        keep &= ~np.concatenate([m.parse_failed_mask(self._parser_fingerprint) for m in self.manifests])
+
+        duration_filtered, num_filtered = durations[~keep].sum(), int((~keep).sum())
+        index = np.flatnonzero(keep)
+        if max_number:
+            index = index[:max_number]
+        total_duration = durations[index].sum()
+
+        if do_sort_by_duration:
+            if index_by_file_id:
+                logging.warning("Tried to sort dataset by duration, but cannot since index_by_file_id is set.")
+            else:
+                index = index[np.argsort(durations[index], kind='stable')]
+
+        index_dtype = np.int32 if len(durations) < np.iinfo(np.int32).max else np.int64
+        self._index = index.astype(index_dtype)
+        self._durations = durations
+
+        if index_by_file_id:
+            self.mapping = {}
+            for idx in range(len(self._index)):
+                manifest_id, local_idx = self._locate(idx)
+                audio_file = self.manifests[manifest_id].get_field(local_idx, 'audio_file')
+                file_id, _ = os.path.splitext(os.path.basename(audio_file))
+                if file_id not in self.mapping:
+                    self.mapping[file_id] = []
+                self.mapping[file_id].append(idx)
+
+        logging.info("Dataset loaded with %d files totalling %.2f hours", len(self._index), total_duration / 3600)
+        logging.info("%d files were filtered totalling %.2f hours", num_filtered, duration_filtered / 3600)
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def durations(self) -> np.ndarray:
+        """Durations of the entries, without materializing them."""
+        return self._durations[self._index]
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError(f"Index {idx} is out of range for collection with {len(self)} samples")
+
+        id_ = int(self._index[idx])
+        manifest_id, local_idx = self._locate(idx)
+        entry = self.manifests[manifest_id]
+
+        text = entry.get_field(local_idx, 'text')
+        lang = entry.get_field(local_idx, 'lang')
+        text_tokens = entry.get_tokens(local_idx, parser_fingerprint=self._parser_fingerprint)
+        if text_tokens is None and not self.lazy_tokenization:
+            text_tokens = parse_text_tokens(self.parser, text, lang)
+            if text_tokens is None:
+                logging.warning("Fail to parse '%s' text line, using empty transcript.", text)
+                text_tokens = []
+
+        return self.OUTPUT_TYPE(
+            id_,
+            entry.get_field(local_idx, 'audio_file'),
+            float(entry.durations[local_idx]),
+            text_tokens,
+            entry.get_offset(local_idx),
+            text,
+            entry.get_field(local_idx, 'speaker'),
+            entry.get_orig_sr(local_idx),
+            lang,
+        )
+
+    def _locate(self, idx: int):
+        """Maps a collection index to (manifest id, index within the manifest)."""
+        global_idx = self._index[idx]
+        manifest_id = int(np.searchsorted(self._manifest_bins, global_idx, side='right'))
+        base_idx = self._manifest_bins[manifest_id - 1] if manifest_id > 0 else 0
+        return manifest_id, int(global_idx - base_idx)
+
+
 class SpeechLabel(_Collection):
     """List of audio-label correspondence with preprocessing."""
 
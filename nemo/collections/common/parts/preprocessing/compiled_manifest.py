@@ -0,0 +1,418 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compiled (binary, memory-mapped) representation of ASR JSON manifests.
+
+A compiled manifest is a directory holding columnar numpy arrays and a string heap:
+
+    meta.json           format version, number of entries, source manifests, tokenizer fingerprint
+    durations.npy       float64 [N]
+    offsets.npy         float64 [N], NaN when the entry has no offset
+    orig_sr.npy         int64 [N], -1 when the entry has no original sample rate
+    strings_index.npy   int64 [N, num_string_fields, 2], (start, length) into the heap, length -1 for None
+    strings.bin         utf-8 string heap
+    tokens.npy          int32 [total_tokens], concatenated token ids
+    tokens_index.npy    int64 [N + 1], offsets into tokens.npy
+    tokens_kind.npy     uint8 [N], see TOKENS_* constants
+
+All arrays are opened with `mmap_mode='r'`, so opening a manifest only reads `meta.json` and the
+pages of the arrays that are actually touched. Data loader workers share those pages through the
+OS page cache instead of holding a private copy of every parsed manifest line.
+
+Tokens caches (see `build_tokens_cache`) use the same `tokens*.npy` layout, indexed by manifest entry id,
+to persist transcript tokens of JSON or compiled manifests for a given parser.
+"""
+
+import array
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from nemo.collections.common.parts.preprocessing import manifest
+from nemo.collections.common.parts.preprocessing.parsers import get_parser_fingerprint
+from nemo.utils import logging
+
+__all__ = [
+    'CompiledManifest',
+    'TokensCache',
+    'build_compiled_manifest',
+    'build_tokens_cache',
+    'get_tokens_cache_path',
+    'is_compiled_manifest',
+]
+
+__compiled_manifest_version__ = '1.0'
+
+META_FILE = 'meta.json'
+STRING_FIELDS = ('audio_file', 'text', 'speaker', 'lang')
+# Fields which are json-encoded in the string heap to preserve their python type
+JSON_STRING_FIELDS = ('speaker',)
+
+# Tokens were not computed offline, the transcript has to be tokenized on access
+TOKENS_NONE = 0
+# Tokens come from the `token_labels` field of the manifest and are always valid
+TOKENS_LABELS = 1
+# Tokens were computed with the parser recorded by `parser_fingerprint` in meta.json
+TOKENS_PARSED = 2
+# The parser recorded by `parser_fingerprint` failed to parse the transcript
+TOKENS_PARSE_FAILED = 3
+
+# Number of tokens buffered in memory while a tokens cache is written
+TOKENS_CHUNK_SIZE = 1 << 20
+
+
+def is_compiled_manifest(path: str) -> bool:
+    """Returns True if `path` points to a compiled manifest directory."""
+    return isinstance(path, str) and os.path.isfile(os.path.join(path, META_FILE))
+
+
+def build_compiled_manifest(
+    manifests_files: Union[str, List[str]],
+    output_dir: str,
+    parser: Optional[Callable] = None,
+    parse_func: Optional[Callable[[str, Optional[str]], Dict[str, Any]]] = None,
+) -> int:
+    """Compiles one or more JSON manifests into a memory-mapped manifest directory.
+
+    Args:
+        manifests_files: Either single string file or list of such - manifests to compile.
+        output_dir: Directory to write the compiled manifest to. Created if it does not exist.
+        parser: Optional parser or tokenizer wrapper used to pre-tokenize the transcripts.
+            Pre-computed tokens are only used at load time by datasets whose parser has
+            the same fingerprint (see `get_parser_fingerprint`).
+        parse_func: Optional manifest line parsing function, see `manifest.item_iter`.
+
+    Returns:
+        Number of compiled entries.
+    """
+    parser_fingerprint = None
+    if parser is not None:
+        parser_fingerprint = get_parser_fingerprint(parser)
+        if parser_fingerprint is None:
+            logging.warning("Parser %s cannot be fingerprinted, transcripts will not be pre-tokenized.", parser)
+            parser = None
+
+    os.makedirs(output_dir, exist_ok=True)
+    # meta.json is written last, so an interrupted build is never picked up as a valid compiled manifest
+    if os.path.exists(os.path.join(output_dir, META_FILE)):
+        os.remove(os.path.join(output_dir, META_FILE))
+
+    durations, offsets, orig_srs = array.array('d'), array.array('d'), array.array('q')
+    strings_index = array.array('q')
+    tokens, tokens_index, tokens_kind = array.array('i'), array.array('q', [0]), array.array('B')
+    heap_pos = 0
+
+    with open(os.path.join(output_dir, 'strings.bin'), 'wb') as heap:
+        for item in manifest.item_iter(manifests_files, parse_func=parse_func):
+            if not isinstance(item['text'], str):
+                raise ValueError(
+                    f"Compiled manifests support only plain string transcripts, got {type(item['text'])} "
+                    f"for {item['audio_file']}."
+                )
+
+            durations.append(item['duration'])
+            offsets.append(np.nan if item['offset'] is None else item['offset'])
+            orig_srs.append(-1 if item['orig_sr'] is None else item['orig_sr'])
+
+            for field in STRING_FIELDS:
+                value = item[field]
+                if value is None:
+                    strings_index.extend((heap_pos, -1))
+                    continue
+                if field in JSON_STRING_FIELDS:
+                    value = json.dumps(value)
+                encoded = str(value).encode('utf-8')
+                heap.write(encoded)
+                strings_index.extend((heap_pos, len(encoded)))
+                heap_pos += len(encoded)
+
+            text_tokens, kind = None, TOKENS_NONE
+            if item['token_labels'] is not None:
+                text_tokens, kind = item['token_labels'], TOKENS_LABELS
+            elif parser is not None:
+                text_tokens = parser(item['text']) if item['text'] != '' else []
+                kind = TOKENS_PARSED if text_tokens is not None else TOKENS_PARSE_FAILED
+
+            if text_tokens:
+                tokens.extend(text_tokens)
+            tokens_index.append(len(tokens))
+            tokens_kind.append(kind)
+
+    num_entries = len(durations)
+    np.save(os.path.join(output_dir, 'durations.npy'), np.frombuffer(durations, dtype=np.float64))
+    np.save(os.path.join(output_dir, 'offsets.npy'), np.frombuffer(offsets, dtype=np.float64))
+    np.save(os.path.join(output_dir, 'orig_sr.npy'), np.frombuffer(orig_srs, dtype=np.int64))
+    np.save(
+        os.path.join(output_dir, 'strings_index.npy'),
+        np.frombuffer(strings_index, dtype=np.int64).reshape(num_entries, len(STRING_FIELDS), 2),
+    )
+    np.save(os.path.join(output_dir, 'tokens.npy'), np.frombuffer(tokens, dtype=np.int32))
+    np.save(os.path.join(output_dir, 'tokens_index.npy'), np.frombuffer(tokens_index, dtype=np.int64))
+    np.save(os.path.join(output_dir, 'tokens_kind.npy'), np.frombuffer(tokens_kind, dtype=np.uint8))
+
+    if isinstance(manifests_files, str):
+        manifests_files = [manifests_files]
+    meta = dict(
+        version=__compiled_manifest_version__,
+        num_entries=num_entries,
+        string_fields=list(STRING_FIELDS),
+        parser_fingerprint=parser_fingerprint,
+        source_manifests=list(manifests_files),
+    )
+    with open(os.path.join(output_dir, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    logging.info("Compiled %d manifest entries into %s", num_entries, output_dir)
+    return num_entries
+
+
+class CompiledManifest:
+    """Read-only, memory-mapped view of a compiled manifest directory.
+
+    Pickling only stores the directory path, so instances can be cheaply sent to data loader workers
+    which re-open the memory maps on their side.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._open()
+
+    def _open(self):
+        with open(os.path.join(self.path, META_FILE), 'r') as f:
+            self.meta = json.load(f)
+
+        version = self.meta.get('version', '0.0')
+        if version != __compiled_manifest_version__:
+            raise RuntimeError(
+                f"Version mismatch: compiled manifest {self.path} has version {version}, expected version "
+                f"{__compiled_manifest_version__}. Please rebuild the compiled manifest."
+            )
+        if self.meta['string_fields'] != list(STRING_FIELDS):
+            raise RuntimeError(
+                f"Compiled manifest {self.path} has unexpected string fields {self.meta['string_fields']}"
+            )
+
+        def load(name):
+            return np.load(os.path.join(self.path, name), mmap_mode='r')
+
+        self.durations = load('durations.npy')
+        self.offsets = load('offsets.npy')
+        self.orig_srs = load('orig_sr.npy')
+        self.strings_index = load('strings_index.npy')
+        self.tokens = load('tokens.npy')
+        self.tokens_index = load('tokens_index.npy')
+        self.tokens_kind = load('tokens_kind.npy')
+
+        heap_path = os.path.join(self.path, 'strings.bin')
+        # np.memmap cannot map empty files
+        if os.path.getsize(heap_path) > 0:
+            self.strings = np.memmap(heap_path, dtype=np.uint8, mode='r')
+        else:
+            self.strings = np.zeros(0, dtype=np.uint8)
+
+        if len(self.durations) != self.meta['num_entries']:
+            raise RuntimeError(f"Compiled manifest {self.path} is corrupted: entries count does not match meta.json")
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.path = state['path']
+        self._open()
+
+    def __len__(self) -> int:
+        return self.meta['num_entries']
+
+    @property
+    def parser_fingerprint(self) -> Optional[str]:
+        return self.meta.get('parser_fingerprint')
+
+    def get_field(self, index: int, field: str) -> Optional[Any]:
+        """Returns a string field (see `STRING_FIELDS`) of a single entry."""
+        start, length = self.strings_index[index, STRING_FIELDS.index(field)]
+        if length < 0:
+            return None
+        value = self.strings[start : start + length].tobytes().decode('utf-8')
+        if field in JSON_STRING_FIELDS:
+            value = json.loads(value)
+        return value
+
+    def get_offset(self, index: int) -> Optional[float]:
+        offset = self.offsets[index]
+        return None if np.isnan(offset) else float(offset)
+
+    def get_orig_sr(self, index: int) -> Optional[int]:
+        orig_sr = self.orig_srs[index]
+        return None if orig_sr < 0 else int(orig_sr)
+
+    def get_tokens(self, index: int, parser_fingerprint: Optional[str] = None) -> Optional[List[int]]:
+        """Returns pre-computed tokens of an entry, or None if they have to be computed on access.
+
+        Args:
+            index: Entry index.
+            parser_fingerprint: Fingerprint of the parser used by the caller. Tokens computed offline
+                are returned only if this matches the fingerprint of the parser used at build time.
+        """
+        kind = self.tokens_kind[index]
+        if kind == TOKENS_LABELS or (kind == TOKENS_PARSED and self._is_parser_compatible(parser_fingerprint)):
+            return self.tokens[self.tokens_index[index] : self.tokens_index[index + 1]].tolist()
+        return None
+
+    def parse_failed_mask(self, parser_fingerprint: Optional[str]) -> np.ndarray:
+        """Returns a boolean mask of entries whose transcripts are known to fail parsing with the given parser."""
+        if not self._is_parser_compatible(parser_fingerprint):
+            return np.zeros(len(self), dtype=bool)
+        return np.asarray(self.tokens_kind) == TOKENS_PARSE_FAILED
+
+    def _is_parser_compatible(self, parser_fingerprint: Optional[str]) -> bool:
+        return parser_fingerprint is not None and parser_fingerprint == self.parser_fingerprint
+
+
+def get_tokens_cache_path(cache_dir: str, manifests_files: Union[str, List[str]], parser_fingerprint: str) -> str:
+    """Returns the location of the persistent tokens cache for a list of manifests and a parser.
+
+    The cache key covers the manifests paths, sizes and modification times, so editing a manifest
+    invalidates its cache, and the parser fingerprint, so every tokenizer gets its own cache.
+    """
+    if isinstance(manifests_files, str):
+        manifests_files = [manifests_files]
+
+    key = [parser_fingerprint]
+    for path in manifests_files:
+        stat_path = os.path.join(path, META_FILE) if is_compiled_manifest(path) else path
+        stat = os.stat(stat_path)
+        key.append((os.path.abspath(path), stat.st_size, stat.st_mtime_ns))
+    digest = hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f'tokens_{digest}')
+
+
+def build_tokens_cache(
+    path: str,
+    entries: Iterable[Tuple[int, Optional[List[int]]]],
+    num_ids: int,
+    parser_fingerprint: str,
+    chunk_size: int = TOKENS_CHUNK_SIZE,
+) -> bool:
+    """Writes a persistent tokens cache.
+
+    Tokens are streamed to disk in chunks of `chunk_size` tokens, so only the per-entry index arrays
+    are kept in memory. The cache is written to a temporary directory and atomically moved to `path`,
+    so concurrent writers never expose a partially written cache.
+
+    Args:
+        path: Cache location, see `get_tokens_cache_path`.
+        entries: Iterable of (manifest entry id, tokens or None if the parser failed) tuples,
+            in increasing manifest entry id order.
+        num_ids: Upper bound of the manifest entry ids.
+        parser_fingerprint: Fingerprint of the parser used to compute the tokens.
+        chunk_size: Number of tokens buffered in memory before they are written to disk.
+
+    Returns:
+        True if this call created the cache, False if another writer created it first.
+    """
+    tmp_path = tempfile.mkdtemp(prefix=os.path.basename(path) + '.', dir=os.path.dirname(path) or None)
+    try:
+        tokens_kind = np.full(num_ids, TOKENS_NONE, dtype=np.uint8)
+        tokens_index = np.zeros(num_ids + 1, dtype=np.int64)
+        num_tokens, last_id = 0, -1
+        raw_tokens_path = os.path.join(tmp_path, 'tokens.bin')
+        with open(raw_tokens_path, 'wb') as f:
+            chunk = array.array('i')
+            for id_, text_tokens in entries:
+                if id_ <= last_id:
+                    raise ValueError(f"Tokens cache entries must be in increasing id order, got {id_} after {last_id}")
+                # entries between last_id and id_ are not cached and get empty token ranges
+                tokens_index[last_id + 1 : id_ + 1] = num_tokens
+                tokens_kind[id_] = TOKENS_PARSED if text_tokens is not None else TOKENS_PARSE_FAILED
+                if text_tokens:
+                    chunk.extend(text_tokens)
+                    num_tokens += len(text_tokens)
+                    if len(chunk) >= chunk_size:
+                        chunk.tofile(f)
+                        chunk = array.array('i')
+                last_id = id_
+            chunk.tofile(f)
+        tokens_index[last_id + 1 :] = num_tokens
+
+        tokens = np.lib.format.open_memmap(
+            os.path.join(tmp_path, 'tokens.npy'), mode='w+', dtype=np.int32, shape=(num_tokens,)
+        )
+        # np.memmap cannot map empty files
+        if num_tokens > 0:
+            raw_tokens = np.memmap(raw_tokens_path, dtype=np.int32, mode='r')
+            for start in range(0, num_tokens, chunk_size):
+                tokens[start : start + chunk_size] = raw_tokens[start : start + chunk_size]
+            del raw_tokens
+        tokens.flush()
+        del tokens
+        os.remove(raw_tokens_path)
+
+        np.save(os.path.join(tmp_path, 'tokens_index.npy'), tokens_index)
+        np.save(os.path.join(tmp_path, 'tokens_kind.npy'), tokens_kind)
+        with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+            json.dump(dict(version=__compiled_manifest_version__, parser_fingerprint=parser_fingerprint), f)
+        os.rename(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        if not os.path.isdir(path):
+            raise
+        return False
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    logging.info("Saved tokens cache for %d manifest entries to %s", num_ids, path)
+    return True
+
+
+class TokensCache:
+    """Read-only, memory-mapped tokens cache written by `build_tokens_cache`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._open()
+
+    def _open(self):
+        with open(os.path.join(self.path, META_FILE), 'r') as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != __compiled_manifest_version__:
+            raise RuntimeError(f"Version mismatch in tokens cache {self.path}, please delete it.")
+
+        self.tokens = np.load(os.path.join(self.path, 'tokens.npy'), mmap_mode='r')
+        self.tokens_index = np.load(os.path.join(self.path, 'tokens_index.npy'), mmap_mode='r')
+        self.tokens_kind = np.load(os.path.join(self.path, 'tokens_kind.npy'), mmap_mode='r')
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.path = state['path']
+        self._open()
+
+    def get(self, id_: int) -> Optional[List[int]]:
+        """Returns cached tokens of a manifest entry, or None if the entry is not cached."""
+        if id_ >= len(self.tokens_kind):
+            return None
+        kind = self.tokens_kind[id_]
+        if kind == TOKENS_PARSED:
+            return self.tokens[self.tokens_index[id_] : self.tokens_index[id_ + 1]].tolist()
+        if kind == TOKENS_PARSE_FAILED:
+            return []
+        return None
@@ -17,8 +17,10 @@ A collection of simple character based parsers. These parser handle cleaning and
 We currently support English.
 """
 
+import hashlib
+import json
 import string
-from typing import List, Optional
+from typing import Callable, List, Optional
 
 from nemo.collections.common.parts.preprocessing import cleaners
 
@@ -250,3 +252,44 @@ def make_parser(labels: Optional[List[str]] = None, name: str = 'base', **kwargs
     parser = parser_type(labels=labels, **kwargs)
 
     return parser
+
+
+def get_parser_fingerprint(parser: Callable) -> Optional[str]:
+    """Computes a stable fingerprint of a text parser or tokenizer.
+
+    Two parsers with the same fingerprint are expected to produce identical
+    token ids for the same text, so the fingerprint can be used to validate
+    token ids that were computed offline (e.g. stored in a compiled manifest).
+
+    Args:
+        parser: Instance of `CharParser`, a tokenizer or a wrapper exposing
+            the wrapped tokenizer via the `_tokenizer` attribute.
+
+    Returns:
+        Hex digest string, or None if the parser cannot be fingerprinted.
+    """
+    if isinstance(parser, CharParser):
+        state = dict(
+            type=type(parser).__qualname__,
+            labels=list(parser._labels),
+            unk_id=parser._unk_id,
+            blank_id=parser._blank_id,
+            do_normalize=parser._do_normalize,
+            do_lowercase=parser._do_lowercase,
+            do_tokenize=parser._do_tokenize,
+            abbreviation_version=getattr(parser, 'abbreviation_version', None),
+        )
+    else:
+        tokenizer = getattr(parser, '_tokenizer', parser)
+        if getattr(parser, 'is_aggregate', False) or not hasattr(tokenizer, 'vocab'):
+            return None
+        try:
+            vocab = tokenizer.vocab
+        except Exception:
+            return None
+        if isinstance(vocab, dict):
+            vocab = sorted(vocab.items(), key=lambda kv: str(kv[0]))
+        state = dict(type=type(tokenizer).__qualname__, vocab=list(vocab))
+
+    serialized = json.dumps(state, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(serialized.encode('utf-8')).hexdigest()
@@ -116,6 +116,12 @@ class SentencePieceTokenizer(TokenizerSpec):
 
         return self.tokenizer.encode_as_ids(text)
 
+    def texts_to_ids(self, texts):
+        if self.legacy:
+            return [self.text_to_ids(text) for text in texts]
+        # sentencepiece encodes lists of texts in a single call
+        return self.tokenizer.encode_as_ids(texts)
+
     def tokens_to_text(self, tokens):
         if isinstance(tokens, np.ndarray):
             tokens = tokens.tolist()
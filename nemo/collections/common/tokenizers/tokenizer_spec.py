@@ -47,6 +47,10 @@ class TokenizerSpec(ABC):
     def ids_to_text(self, ids):
         pass
 
+    def texts_to_ids(self, texts: List[str]) -> List[List[int]]:
+        """Batched version of `text_to_ids`, can be overridden by tokenizers which support batches."""
+        return [self.text_to_ids(text) for text in texts]
+
     def add_special_tokens(self, special_tokens: List[str]):
         raise NotImplementedError("To be implemented")
 
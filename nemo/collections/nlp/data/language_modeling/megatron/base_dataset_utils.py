@@ -12,7 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import json
 import math
+import os
+
+import numpy as np
 
 
 def get_datasets_weights_and_num_samples(data_prefix, num_samples):
@@ -75,3 +80,26 @@ def get_train_valid_test_split_(splits_string, size):
     assert len(splits_index) == 4
     assert splits_index[-1] == size
     return splits_index
+
+
+def get_index_mapping_key(arrays, **params):
+    """Content-addressed key of index mappings, from the integer arrays and parameters they are built from.
+
+    The key does not depend on the path or name of the dataset, so the index mappings of the same documents can be
+    shared by all the datasets, models and jobs using them.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(json.dumps(params, sort_keys=True).encode())
+    for array in arrays:
+        array = np.ascontiguousarray(array, dtype=np.int64)
+        hasher.update(str(array.shape).encode())
+        hasher.update(array.data)
+    return hasher.hexdigest()
+
+
+def save_index_mapping(filename, array):
+    """Saves an index mapping .npy file atomically, so that other ranks or jobs never load a partially written file."""
+    tmp_filename = '{}.{}.tmp'.format(filename, os.getpid())
+    with open(tmp_filename, 'wb') as f:
+        np.save(f, array, allow_pickle=True)
+    os.replace(tmp_filename, filename)
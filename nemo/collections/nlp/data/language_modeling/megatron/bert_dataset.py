@@ -59,12 +59,15 @@ class BertDataset(torch.utils.data.Dataset):
 
         # save index mappings to a configurable dir
         self.index_mapping_dir = cfg.data.get('index_mapping_dir', None)
+        # content-addressed cache of index mappings, shared by all datasets with the same documents
+        self.index_mapping_cache_dir = cfg.data.get('index_mapping_cache_dir', None)
 
-        # create index_mapping_dir on rank 0
+        # create index_mapping_dir and index_mapping_cache_dir on rank 0
         if torch.distributed.is_available() and torch.distributed.is_initialized():
             if torch.distributed.get_rank() == 0:
-                if self.index_mapping_dir is not None and not os.path.isdir(self.index_mapping_dir):
-                    os.makedirs(self.index_mapping_dir)
+                for mapping_dir in [self.index_mapping_dir, self.index_mapping_cache_dir]:
+                    if mapping_dir is not None and not os.path.isdir(mapping_dir):
+                        os.makedirs(mapping_dir, exist_ok=True)
             torch.distributed.barrier()
 
         # Build the samples mapping.
@@ -79,6 +82,7 @@ class BertDataset(torch.utils.data.Dataset):
             self.name,
             self.binary_head,
             index_mapping_dir=self.index_mapping_dir,
+            index_mapping_cache_dir=self.index_mapping_cache_dir,
         )
 
         # Vocab stuff.
@@ -14,7 +14,9 @@
 
 """Blendable dataset."""
 
+import bisect
 import time
+from fractions import Fraction
 
 import numpy as np
 import torch
@@ -77,6 +79,122 @@ class BlendableDataset(torch.utils.data.Dataset):
         return self.datasets[dataset_idx][sample_idx]
 
 
+class CounterBlendableDataset(torch.utils.data.Dataset):
+    """
+    A BlendableDataset implementation which computes the dataset and sample index of any index in O(log num_datasets),
+    without per-sample arrays, and with the exact (not binned) weights.
+
+    The datasets are the leaves of a balanced binary tree. The k-th sample reaching a node with a fraction p of the
+    weight on its left goes to the left child if round((k + 1) * p) > round(k * p), as the round(k * p)-th sample of
+    the left child, and otherwise to the right child as its (k - round(k * p))-th sample. The fractions are exact
+    rationals, so that the number of samples of every dataset in any prefix of size n is within
+    ceil(log2(num_datasets)) / 2 of n * weight.
+
+    The weights can be changed during the training with `weights_schedule`, a list of (start index, weights) with
+    increasing start indices: the indices before the start of new weights keep their samples, and every dataset
+    continues with the samples following the ones it already gave, so that the training can be resumed exactly.
+    Sample indices beyond the length of a dataset wrap around.
+    """
+
+    def __init__(self, datasets, weights, size, weights_schedule=None):
+        self.datasets = datasets
+        num_datasets = len(datasets)
+        assert num_datasets == len(weights)
+        self.size = size
+
+        self.segment_starts = [0]
+        self.segment_trees = [self._build_tree(weights)]
+        for start, segment_weights in weights_schedule or []:
+            assert start > self.segment_starts[-1], 'the start indices of the weights must be increasing.'
+            assert num_datasets == len(segment_weights)
+            self.segment_starts.append(int(start))
+            self.segment_trees.append(self._build_tree(segment_weights))
+
+        # Number of samples given by every dataset before every segment
+        self.segment_offsets = [[0] * num_datasets]
+        for i in range(1, len(self.segment_starts)):
+            num_samples = self.segment_starts[i] - self.segment_starts[i - 1]
+            counts = self._count(self.segment_trees[i - 1], 1, 0, num_datasets, num_samples)
+            self.segment_offsets.append([offset + count for offset, count in zip(self.segment_offsets[-1], counts)])
+
+        self.ds_size = [len(ds) for ds in datasets]
+
+    @staticmethod
+    def _build_tree(weights):
+        """Fraction of the weight on the left of every internal node, as (numerator, denominator), by heap index."""
+        weights = [Fraction(float(weight)) for weight in weights]
+        assert all(weight >= 0 for weight in weights)
+        assert sum(weights) > 0
+
+        tree = {}
+
+        def build(node, lo, hi):
+            if hi - lo == 1:
+                return
+            mid = (lo + hi) // 2
+            total = sum(weights[lo:hi])
+            # nodes without weight are never reached
+            fraction = sum(weights[lo:mid]) / total if total > 0 else Fraction(0)
+            tree[node] = (fraction.numerator, fraction.denominator)
+            build(2 * node, lo, mid)
+            build(2 * node + 1, mid, hi)
+
+        build(1, 0, len(weights))
+        return tree
+
+    @staticmethod
+    def _num_left(fraction, num_samples):
+        """Number of samples going to the left child among the first `num_samples` ones, round(num_samples * p)."""
+        numerator, denominator = fraction
+        return (2 * num_samples * numerator + denominator) // (2 * denominator)
+
+    @classmethod
+    def _count(cls, tree, node, lo, hi, num_samples):
+        """Number of samples of the datasets [lo, hi) among the first `num_samples` samples of a node."""
+        if hi - lo == 1:
+            return [num_samples]
+        mid = (lo + hi) // 2
+        num_left = cls._num_left(tree[node], num_samples)
+        return cls._count(tree, 2 * node, lo, mid, num_left) + cls._count(
+            tree, 2 * node + 1, mid, hi, num_samples - num_left
+        )
+
+    def get_num_samples(self, size=None):
+        """Number of samples taken from every dataset among the first `size` (by default all) samples."""
+        size = self.size if size is None else size
+        segment = bisect.bisect_right(self.segment_starts, size) - 1
+        counts = self._count(
+            self.segment_trees[segment], 1, 0, len(self.datasets), size - self.segment_starts[segment]
+        )
+        return [offset + count for offset, count in zip(self.segment_offsets[segment], counts)]
+
+    def get_ds_sample_idx(self, idx):
+        """Returns ds index and sample index (within the ds) for the given index in the blendable dataset."""
+        segment = bisect.bisect_right(self.segment_starts, idx) - 1
+        tree = self.segment_trees[segment]
+        sample_idx = idx - self.segment_starts[segment]
+        node, lo, hi = 1, 0, len(self.datasets)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            num_left = self._num_left(tree[node], sample_idx)
+            if self._num_left(tree[node], sample_idx + 1) > num_left:
+                node, hi, sample_idx = 2 * node, mid, num_left
+            else:
+                node, lo, sample_idx = 2 * node + 1, mid, sample_idx - num_left
+
+        ds_idx = lo
+        sample_idx = (self.segment_offsets[segment][ds_idx] + sample_idx) % self.ds_size[ds_idx]
+        return ds_idx, sample_idx
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, idx):
+        ds_idx, sample_idx = self.get_ds_sample_idx(idx)
+
+        return self.datasets[ds_idx][sample_idx]
+
+
 class MemoryEfficientBlendableDataset(torch.utils.data.Dataset):
     """
     A BlendableDataset implementation that uses less memory than the original implementation.
@@ -42,7 +42,9 @@ from omegaconf.dictconfig import DictConfig
 
 from nemo.collections.nlp.data.language_modeling.megatron.base_dataset_utils import (
     get_datasets_weights_and_num_samples,
+    get_index_mapping_key,
     get_train_valid_test_split_,
+    save_index_mapping,
 )
 from nemo.collections.nlp.data.language_modeling.megatron.blendable_dataset import BlendableDataset
 from nemo.collections.nlp.data.language_modeling.megatron.indexed_dataset import deallocate_indexed_dataset_memory
@@ -1219,6 +1221,7 @@ def get_samples_mapping(
     name,
     binary_head,
     index_mapping_dir: str = None,
+    index_mapping_cache_dir: str = None,
 ):
     """Get a list that maps a sample index to a starting sentence index, end sentence index, and length"""
 
@@ -1230,19 +1233,35 @@ def get_samples_mapping(
         max_num_samples = np.iinfo(np.int64).max - 1
 
     # Filename of the index mapping
-    if index_mapping_dir is not None:
-        indexmap_filename = os.path.join(index_mapping_dir, os.path.basename(data_prefix))
+    if index_mapping_cache_dir is not None:
+        # Content-addressed, from the documents and sentences the mapping is built from
+        if (getattr(indexed_dataset, 'doc_idx', None) is None) and (getattr(indexed_dataset, 'sizes', None) is None):
+            make_indexed_dataset_compatibility(indexed_dataset)
+        key = get_index_mapping_key(
+            [indexed_dataset.doc_idx, indexed_dataset.sizes],
+            mapping='samples',
+            num_epochs=int(num_epochs),
+            max_num_samples=int(max_num_samples),
+            max_seq_length=int(max_seq_length),
+            short_seq_prob='{:0.2f}'.format(short_seq_prob),
+            seed=int(seed),
+            binary_head=bool(binary_head),
+        )
+        indexmap_filename = os.path.join(index_mapping_cache_dir, key + '.npy')
     else:
-        indexmap_filename = data_prefix
-    indexmap_filename += '_{}_indexmap'.format(name)
-    if num_epochs != (np.iinfo(np.int32).max - 1):
-        indexmap_filename += '_{}ep'.format(num_epochs)
-    if max_num_samples != (np.iinfo(np.int64).max - 1):
-        indexmap_filename += '_{}mns'.format(max_num_samples)
-    indexmap_filename += '_{}msl'.format(max_seq_length)
-    indexmap_filename += '_{:0.2f}ssp'.format(short_seq_prob)
-    indexmap_filename += '_{}s'.format(seed)
-    indexmap_filename += '.npy'
+        if index_mapping_dir is not None:
+            indexmap_filename = os.path.join(index_mapping_dir, os.path.basename(data_prefix))
+        else:
+            indexmap_filename = data_prefix
+        indexmap_filename += '_{}_indexmap'.format(name)
+        if num_epochs != (np.iinfo(np.int32).max - 1):
+            indexmap_filename += '_{}ep'.format(num_epochs)
+        if max_num_samples != (np.iinfo(np.int64).max - 1):
+            indexmap_filename += '_{}mns'.format(max_num_samples)
+        indexmap_filename += '_{}msl'.format(max_seq_length)
+        indexmap_filename += '_{:0.2f}ssp'.format(short_seq_prob)
+        indexmap_filename += '_{}s'.format(seed)
+        indexmap_filename += '.npy'
 
     # Build the indexed mapping if not exist.
     if torch.distributed.get_rank() == 0 and not os.path.isfile(indexmap_filename):
@@ -1284,7 +1303,7 @@ def get_samples_mapping(
             2 if binary_head else 1,
         )
         logging.info(' > done building samples index maping')
-        np.save(indexmap_filename, samples_mapping, allow_pickle=True)
+        save_index_mapping(indexmap_filename, samples_mapping)
         logging.info(' > saved the index mapping in {}'.format(indexmap_filename))
         # Make sure all the ranks have built the mapping
         logging.info(
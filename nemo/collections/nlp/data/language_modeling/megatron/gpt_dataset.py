@@ -23,11 +23,20 @@ from omegaconf.dictconfig import DictConfig
 
 from nemo.collections.nlp.data.language_modeling.megatron.base_dataset_utils import (
     get_datasets_weights_and_num_samples,
+    get_index_mapping_key,
     get_train_valid_test_split_,
+    save_index_mapping,
+)
+from nemo.collections.nlp.data.language_modeling.megatron.blendable_dataset import (
+    BlendableDataset,
+    CounterBlendableDataset,
+)
+from nemo.collections.nlp.data.language_modeling.megatron.indexed_dataset import (
+    MMapIndexedDataset,
+    deallocate_indexed_dataset_memory,
 )
-from nemo.collections.nlp.data.language_modeling.megatron.blendable_dataset import BlendableDataset
-from nemo.collections.nlp.data.language_modeling.megatron.indexed_dataset import deallocate_indexed_dataset_memory
 from nemo.collections.nlp.data.language_modeling.megatron.indexed_dataset import make_dataset as make_indexed_dataset
+from nemo.collections.nlp.modules.common.megatron.utils import get_attention_mask_from_segment_ids
 from nemo.core import Dataset
 from nemo.utils import logging
 
@@ -76,7 +85,18 @@ def build_dataset(cfg, trainer, data_prefix, data_impl, num_samples, seq_length,
         for i in range(len(prefixes)):
             dataset = _build_dataset(prefixes[i], datasets_num_samples[i])
             datasets.append(dataset)
-        return BlendableDataset(datasets, weights, num_samples)
+        return _build_blendable_dataset(cfg, datasets, weights, num_samples, train=name == 'train')
+
+
+def _build_blendable_dataset(cfg, datasets, weights, size, train=False):
+    """Blends the datasets with a BlendableDataset, or a CounterBlendableDataset if cfg.data.counter_blending is set,
+    which also supports changing the weights of the train dataset with cfg.data.blending_weights_schedule."""
+    weights_schedule = cfg.data.get('blending_weights_schedule', None)
+    if not cfg.data.get('counter_blending', False):
+        if weights_schedule is not None:
+            raise ValueError('blending_weights_schedule is only supported with counter_blending=True.')
+        return BlendableDataset(datasets, weights, size)
+    return CounterBlendableDataset(datasets, weights, size, weights_schedule=weights_schedule if train else None)
 
 
 def build_train_valid_test_datasets(
@@ -187,13 +207,13 @@ def build_train_valid_test_datasets(
         # Blend.
         blending_train_dataset = None
         if train_datasets:
-            blending_train_dataset = BlendableDataset(train_datasets, weights, train_n)
+            blending_train_dataset = _build_blendable_dataset(cfg, train_datasets, weights, train_n, train=True)
         blending_valid_dataset = None
         if valid_datasets:
-            blending_valid_dataset = BlendableDataset(valid_datasets, weights, valid_n)
+            blending_valid_dataset = _build_blendable_dataset(cfg, valid_datasets, weights, valid_n)
         blending_test_dataset = None
         if test_datasets:
-            blending_test_dataset = BlendableDataset(test_datasets, weights, test_n)
+            blending_test_dataset = _build_blendable_dataset(cfg, test_datasets, weights, test_n)
 
         return (blending_train_dataset, blending_valid_dataset, blending_test_dataset)
 
@@ -306,6 +326,9 @@ class GPTDataset(Dataset):
         self.reset_position_ids = cfg.data.get('reset_position_ids', False)
         self.reset_attention_mask = cfg.data.get('reset_attention_mask', False)
         self.eod_mask_loss = cfg.data.get('eod_mask_loss', False)
+        # The dense [1, seq_length, seq_length] attention masks are only created if requested, otherwise the
+        # documents of a sample are given by the (much smaller) `segment_ids`, from which the mask can be rebuilt.
+        self.create_attention_mask = cfg.data.get('create_attention_mask', False)
         self.eos_id = tokenizer.eos_id
         self.no_seqlen_plus_one_input_tokens = cfg.data.get('no_seqlen_plus_one_input_tokens', False)
         self.add_extra_token = 1
@@ -314,12 +337,15 @@ class GPTDataset(Dataset):
 
         # save index mappings to a configurable dir
         self.index_mapping_dir = cfg.data.get('index_mapping_dir', None)
+        # content-addressed cache of index mappings, shared by all datasets with the same documents
+        self.index_mapping_cache_dir = cfg.data.get('index_mapping_cache_dir', None)
 
-        # create index_mapping_dir on rank 0
+        # create index_mapping_dir and index_mapping_cache_dir on rank 0
         if torch.distributed.is_available() and torch.distributed.is_initialized():
             if torch.distributed.get_rank() == 0:
-                if self.index_mapping_dir is not None and not os.path.isdir(self.index_mapping_dir):
-                    os.makedirs(self.index_mapping_dir)
+                for mapping_dir in [self.index_mapping_dir, self.index_mapping_cache_dir]:
+                    if mapping_dir is not None and not os.path.isdir(mapping_dir):
+                        os.makedirs(mapping_dir, exist_ok=True)
             torch.distributed.barrier()
 
         # Build index mappings.
@@ -334,6 +360,7 @@ class GPTDataset(Dataset):
             index_mapping_dir=self.index_mapping_dir,
             drop_last=drop_last,
             add_extra_token=self.add_extra_token,
+            index_mapping_cache_dir=self.index_mapping_cache_dir,
         )
         deallocate_indexed_dataset_memory(self.indexed_dataset)
 
@@ -356,6 +383,12 @@ class GPTDataset(Dataset):
             sample = self.indexed_dataset.get(
                 self.doc_idx[doc_index_f], offset=offset_f, length=offset_l - offset_f + self.add_extra_token
             )
+        elif isinstance(self.indexed_dataset, MMapIndexedDataset):
+            # Otherwise, get the rest of the initial document, all the documents in between, and the relevant
+            # portion of the last document at once.
+            doc_ids = self.doc_idx[doc_index_f : doc_index_l + 1]
+            length = self.indexed_dataset.sizes[doc_ids[:-1]].sum() - offset_f + offset_l + self.add_extra_token
+            sample = self.indexed_dataset.get_concatenated(doc_ids, offset=offset_f, length=length)
         else:
             # Otherwise, get the rest of the initial document.
             sample_list = [self.indexed_dataset.get(self.doc_idx[doc_index_f], offset=offset_f)]
@@ -386,7 +419,7 @@ class GPTDataset(Dataset):
             tokens = text
             labels = torch.roll(text, shifts=-1, dims=0)
             labels[-1] = -1
-        attention_mask, loss_mask, position_ids = _create_ltor_masks_and_position_ids(
+        segment_ids, loss_mask, position_ids = _create_segment_ids_and_position_ids(
             tokens, self.eos_id, self.reset_position_ids, self.reset_attention_mask, self.eod_mask_loss,
         )
         loss_mask[labels == -1] = 0.0
@@ -399,24 +432,28 @@ class GPTDataset(Dataset):
             logging.info('WARNING: Got -1 as item index. Masking loss from this sample')
             loss_mask = torch.zeros_like(loss_mask)
 
-        return {
+        sample = {
             'tokens': tokens,
             'labels': labels,
-            'attention_mask': attention_mask,
+            'segment_ids': segment_ids,
             'loss_mask': loss_mask,
             'position_ids': position_ids,
         }
+        if self.create_attention_mask:
+            sample['attention_mask'] = get_attention_mask_from_segment_ids(segment_ids.unsqueeze(0))[0]
+        return sample
 
 
 @torch.no_grad()
-def _create_ltor_masks_and_position_ids(
+def _create_segment_ids_and_position_ids(
     tokens: torch.Tensor, eod_token: int, reset_position_ids: bool, reset_attention_mask: bool, eod_mask_loss: bool,
 ):
-    """Create `attention_mask`, `loss_mask`, and `position_ids`.
+    """Create `segment_ids`, `loss_mask`, and `position_ids`.
 
-    This function is modified :func:`get_ltor_masks_and_position_ids` in nemo/collections/nlp/modules/common/megatron/utils.py:
-    `get_ltor_masks_and_position_ids` assumes a microbatch of ``tokens``, i.e. 2D tensor while
-    this function assumes ``tokens`` to be 1D tensor.
+    Instead of the dense attention mask of :func:`_create_ltor_masks_and_position_ids`, the tokens that can attend
+    to each other (besides causality) are given by their segment id: if `reset_attention_mask` is set, every
+    end-of-document token ends a segment, otherwise all the tokens belong to the segment 0.
+    The attention mask can be rebuilt on device by :func:`get_attention_mask_from_segment_ids`.
 
     Args:
         tokens: A 1D tensor that holds the indices of tokens.
@@ -428,32 +465,49 @@ def _create_ltor_masks_and_position_ids(
     """
     assert tokens.ndim == 1
     seq_length = tokens.numel()
-    # `attention_mask` has the shape of [1, seq_length, seq_length]
-    attention_mask = torch.tril(torch.ones((seq_length, seq_length))).unsqueeze(0)
+    eod = tokens == eod_token
     loss_mask = torch.ones(seq_length, dtype=torch.float)
     if eod_mask_loss:
-        loss_mask[tokens == eod_token] = 0.0
+        loss_mask[eod] = 0.0
+
+    # The segment of a token is the number of end-of-document tokens before it
+    segment_ids = torch.zeros(seq_length, dtype=torch.int64)
+    if reset_attention_mask:
+        segment_ids[1:] = torch.cumsum(eod[:-1], dim=0)
 
     position_ids = torch.arange(seq_length, dtype=torch.int64)
     if reset_position_ids:
-        position_ids = position_ids.clone()
-
-    if reset_position_ids or reset_attention_mask:
-        # Find indices where EOD token is.
-        eod_index = position_ids[tokens[b] == eod_token]
-        # Detach indices from positions if going to modify positions.
-        if reset_position_ids:
-            eod_index = eod_index.clone()
-        prev_index = 0
-        for j in range(eod_index.numel()):
-            i = eod_index[j]
-            if reset_attention_mask:
-                attention_mask[0, (i + 1) :, : (i + 1)] = 0
-            if reset_position_ids:
-                position_ids[(i + 1) :] -= i + 1 - prev_index
-                prev_index = i + 1
-    # Convert attention mask to binary.
-    attention_mask = attention_mask < 0.5
+        # Positions are relative to the first token of the segment
+        segment_starts = torch.cat([torch.ones(1, dtype=torch.bool), eod[:-1]])
+        first_positions = torch.cummax(position_ids * segment_starts, dim=0).values
+        position_ids = position_ids - first_positions
+
+    return segment_ids, loss_mask, position_ids
+
+
+@torch.no_grad()
+def _create_ltor_masks_and_position_ids(
+    tokens: torch.Tensor, eod_token: int, reset_position_ids: bool, reset_attention_mask: bool, eod_mask_loss: bool,
+):
+    """Create `attention_mask`, `loss_mask`, and `position_ids`.
+
+    This function is modified :func:`get_ltor_masks_and_position_ids` in nemo/collections/nlp/modules/common/megatron/utils.py:
+    `get_ltor_masks_and_position_ids` assumes a microbatch of ``tokens``, i.e. 2D tensor while
+    this function assumes ``tokens`` to be 1D tensor.
+
+    Args:
+        tokens: A 1D tensor that holds the indices of tokens.
+        eod_token:
+        reset_position_ids:
+        reset_attention_mask:
+        eod_mask_loss
+
+    """
+    segment_ids, loss_mask, position_ids = _create_segment_ids_and_position_ids(
+        tokens, eod_token, reset_position_ids, reset_attention_mask, eod_mask_loss
+    )
+    # `attention_mask` has the shape of [1, seq_length, seq_length]
+    attention_mask = get_attention_mask_from_segment_ids(segment_ids.unsqueeze(0))[0]
     return attention_mask, loss_mask, position_ids
 
 
@@ -468,6 +522,7 @@ def _build_index_mappings(
     index_mapping_dir: str = None,
     drop_last: bool = True,
     add_extra_token: int = 1,
+    index_mapping_cache_dir: str = None,
 ):
     """Build doc-idx, sample-idx, and shuffle-idx.
     doc-idx: is an array (ordered) of documents to be used in training.
@@ -475,123 +530,39 @@ def _build_index_mappings(
        training sample.
     shuffle-idx: maps the sample index into a random index into sample-idx.
     """
-    # Number of tokens in each epoch and number of required epochs.
-    tokens_per_epoch = _num_tokens(documents, sizes)
-    num_epochs = _num_epochs(tokens_per_epoch, seq_length, num_samples, add_extra_token)
-    # rng state
-    np_rng = np.random.RandomState(seed=seed)
-
-    # Filename of the index mappings.
-    if index_mapping_dir is not None:
-        _filename = os.path.join(index_mapping_dir, os.path.basename(data_prefix))
+    # Build the indexed mapping if not exist.
+    if torch.distributed.get_rank() == 0:
+        _filename, num_epochs = build_index_mapping_files(
+            name,
+            data_prefix,
+            documents,
+            sizes,
+            num_samples,
+            seq_length,
+            seed,
+            index_mapping_dir=index_mapping_dir,
+            drop_last=drop_last,
+            add_extra_token=add_extra_token,
+            index_mapping_cache_dir=index_mapping_cache_dir,
+        )
     else:
-        _filename = data_prefix
-    _filename += '_{}_indexmap'.format(name)
-    _filename += '_{}ns'.format(num_samples)
-    _filename += '_{}sl'.format(seq_length)
-    _filename += '_{}s'.format(seed)
+        _filename, num_epochs = _get_index_mapping_filename(
+            name,
+            data_prefix,
+            documents,
+            sizes,
+            num_samples,
+            seq_length,
+            seed,
+            index_mapping_dir=index_mapping_dir,
+            drop_last=drop_last,
+            add_extra_token=add_extra_token,
+            index_mapping_cache_dir=index_mapping_cache_dir,
+        )
     doc_idx_filename = _filename + '_doc_idx.npy'
     sample_idx_filename = _filename + '_sample_idx.npy'
     shuffle_idx_filename = _filename + '_shuffle_idx.npy'
 
-    # Build the indexed mapping if not exist.
-    if torch.distributed.get_rank() == 0:
-        if (
-            (not os.path.isfile(doc_idx_filename))
-            or (not os.path.isfile(sample_idx_filename))
-            or (not os.path.isfile(shuffle_idx_filename))
-        ):
-
-            logging.info(' > WARNING: could not find index map files, building ' 'the indices on rank 0 ...')
-
-            # For the last epoch, decide whether include the entire epoch
-            # in the global shuffle or not.
-
-            # If we need only one epoch, then separating last epoch  does
-            # not mean anything.
-            if num_epochs == 1:
-                separate_last_epoch = False
-                print(' > only one epoch required, setting ' 'separate_last_epoch to False', flush=True)
-
-            else:
-                # Get the number of samples for the last epoch
-                num_samples_from_epochs_minus_one = (
-                    (num_epochs - 1) * tokens_per_epoch - add_extra_token
-                ) // seq_length
-                last_epoch_num_samples = num_samples - num_samples_from_epochs_minus_one
-                assert last_epoch_num_samples >= 0, 'last epoch number of samples should be non-negative.'
-                num_samples_per_epoch = (tokens_per_epoch - add_extra_token) // seq_length
-                assert last_epoch_num_samples < (
-                    num_samples_per_epoch + 1
-                ), 'last epoch number of samples exceeded max value.'
-                # If we have less than 80% of the samples for the last epoch,
-                # seperate out the epoch and treat it differently.
-                # Note: the 80% number is just based on common sense and can
-                # be adjusted if needed.
-                separate_last_epoch = last_epoch_num_samples < int(0.80 * num_samples_per_epoch)
-                if separate_last_epoch:
-                    string = (
-                        ' > last epoch number of samples ({}) is smaller '
-                        'than 80% of number of samples per epoch ({}), '
-                        'setting separate_last_epoch to True'
-                    )
-                else:
-                    string = (
-                        ' > last epoch number of samples ({}) is larger '
-                        'than 80% of number of samples per epoch ({}), '
-                        'setting separate_last_epoch to False'
-                    )
-                print(string.format(last_epoch_num_samples, num_samples_per_epoch), flush=True)
-
-            # doc-idx.
-            start_time = time.time()
-            doc_idx = _build_doc_idx(documents, num_epochs, np_rng, separate_last_epoch)
-            np.save(doc_idx_filename, doc_idx, allow_pickle=True)
-            logging.info(
-                ' > elasped time to build and save doc-idx mapping '
-                '(seconds): {:4f}'.format(time.time() - start_time)
-            )
-            # sample-idx.
-            start_time = time.time()
-            # Use C++ implementation for speed.
-            # First compile and then import.
-            assert doc_idx.dtype == np.int32
-            assert sizes.dtype == np.int32
-            try:
-                from nemo.collections.nlp.data.language_modeling.megatron.dataset_utils import compile_helper
-
-                compile_helper()
-                from nemo.collections.nlp.data.language_modeling.megatron import helpers
-            except ImportError:
-                raise ImportError(
-                    f'Could not compile megatron dataset C++ helper functions and therefore cannot import helpers python file.'
-                )
-
-            sample_idx = helpers.build_sample_idx(
-                sizes, doc_idx, seq_length, num_epochs, tokens_per_epoch, drop_last, add_extra_token
-            )
-            # sample_idx = _build_sample_idx(sizes, doc_idx, seq_length,
-            #                              num_epochs, tokens_per_epoch, drop_last, add_extra_token)
-            np.save(sample_idx_filename, sample_idx, allow_pickle=True)
-            logging.info(
-                ' > elasped time to build and save sample-idx mapping '
-                '(seconds): {:4f}'.format(time.time() - start_time)
-            )
-            # shuffle-idx.
-            start_time = time.time()
-            # -1 is due to data structure used to retieve the index:
-            #    sample i --> [sample_idx[i], sample_idx[i+1])
-            if separate_last_epoch:
-                num_samples_ = num_samples_from_epochs_minus_one
-            else:
-                num_samples_ = sample_idx.shape[0] - 1
-            shuffle_idx = _build_shuffle_idx(num_samples_, sample_idx.shape[0] - 1, np_rng)
-            np.save(shuffle_idx_filename, shuffle_idx, allow_pickle=True)
-            logging.info(
-                ' > elasped time to build and save shuffle-idx mapping'
-                ' (seconds): {:4f}'.format(time.time() - start_time)
-            )
-
     torch.distributed.barrier()
     counts = torch.cuda.LongTensor([1])
     torch.distributed.all_reduce(counts, group=parallel_state.get_data_parallel_group())
@@ -616,6 +587,189 @@ def _build_index_mappings(
     return doc_idx, sample_idx, shuffle_idx
 
 
+def _get_index_mapping_filename(
+    name,
+    data_prefix,
+    documents,
+    sizes,
+    num_samples,
+    seq_length,
+    seed,
+    index_mapping_dir: str = None,
+    drop_last: bool = True,
+    add_extra_token: int = 1,
+    index_mapping_cache_dir: str = None,
+):
+    """Prefix of the index mapping files, and number of epochs of the index mappings."""
+    # Number of tokens in each epoch and number of required epochs.
+    tokens_per_epoch = _num_tokens(documents, sizes)
+    num_epochs = _num_epochs(tokens_per_epoch, seq_length, num_samples, add_extra_token)
+
+    if index_mapping_cache_dir is not None:
+        # The index mappings only depend on num_samples through the number of epochs and whether the last epoch is
+        # shuffled separately, so that the same cached mappings are used for all the num_samples giving the same
+        # epochs (e.g. when the training is extended or the blending weights are changed).
+        separate_last_epoch = _separate_last_epoch(
+            num_epochs, tokens_per_epoch, seq_length, num_samples, add_extra_token
+        )
+        key = get_index_mapping_key(
+            [documents, sizes[documents]],
+            mapping='gpt',
+            num_epochs=int(num_epochs),
+            separate_last_epoch=bool(separate_last_epoch),
+            seq_length=int(seq_length),
+            seed=int(seed),
+            drop_last=bool(drop_last),
+            add_extra_token=int(add_extra_token),
+        )
+        return os.path.join(index_mapping_cache_dir, key), num_epochs
+
+    # Filename of the index mappings.
+    if index_mapping_dir is not None:
+        _filename = os.path.join(index_mapping_dir, os.path.basename(data_prefix))
+    else:
+        _filename = data_prefix
+    _filename += '_{}_indexmap'.format(name)
+    _filename += '_{}ns'.format(num_samples)
+    _filename += '_{}sl'.format(seq_length)
+    _filename += '_{}s'.format(seed)
+    return _filename, num_epochs
+
+
+def build_index_mapping_files(
+    name,
+    data_prefix,
+    documents,
+    sizes,
+    num_samples,
+    seq_length,
+    seed,
+    index_mapping_dir: str = None,
+    drop_last: bool = True,
+    add_extra_token: int = 1,
+    index_mapping_cache_dir: str = None,
+):
+    """Build and save the doc-idx, sample-idx, and shuffle-idx mappings if they do not exist yet.
+
+    This does not need torch.distributed, so that the index mappings can be built offline before training.
+
+    Returns:
+        The prefix of the index mapping files, and the number of epochs of the index mappings.
+    """
+    _filename, num_epochs = _get_index_mapping_filename(
+        name,
+        data_prefix,
+        documents,
+        sizes,
+        num_samples,
+        seq_length,
+        seed,
+        index_mapping_dir=index_mapping_dir,
+        drop_last=drop_last,
+        add_extra_token=add_extra_token,
+        index_mapping_cache_dir=index_mapping_cache_dir,
+    )
+    doc_idx_filename = _filename + '_doc_idx.npy'
+    sample_idx_filename = _filename + '_sample_idx.npy'
+    shuffle_idx_filename = _filename + '_shuffle_idx.npy'
+    if (
+        os.path.isfile(doc_idx_filename)
+        and os.path.isfile(sample_idx_filename)
+        and os.path.isfile(shuffle_idx_filename)
+    ):
+        return _filename, num_epochs
+
+    logging.info(' > WARNING: could not find index map files, building ' 'the indices on rank 0 ...')
+
+    tokens_per_epoch = _num_tokens(documents, sizes)
+    # rng state
+    np_rng = np.random.RandomState(seed=seed)
+
+    # For the last epoch, decide whether include the entire epoch
+    # in the global shuffle or not.
+    separate_last_epoch = _separate_last_epoch(num_epochs, tokens_per_epoch, seq_length, num_samples, add_extra_token)
+    num_samples_from_epochs_minus_one = ((num_epochs - 1) * tokens_per_epoch - add_extra_token) // seq_length
+    if num_epochs == 1:
+        print(' > only one epoch required, setting ' 'separate_last_epoch to False', flush=True)
+    else:
+        print(
+            ' > last epoch number of samples ({}) compared to 80% of number of samples per epoch ({}), '
+            'setting separate_last_epoch to {}'.format(
+                num_samples - num_samples_from_epochs_minus_one,
+                (tokens_per_epoch - add_extra_token) // seq_length,
+                separate_last_epoch,
+            ),
+            flush=True,
+        )
+
+    # doc-idx.
+    start_time = time.time()
+    doc_idx = _build_doc_idx(documents, num_epochs, np_rng, separate_last_epoch)
+    save_index_mapping(doc_idx_filename, doc_idx)
+    logging.info(
+        ' > elasped time to build and save doc-idx mapping ' '(seconds): {:4f}'.format(time.time() - start_time)
+    )
+    # sample-idx.
+    start_time = time.time()
+    # Use C++ implementation for speed.
+    # First compile and then import.
+    assert doc_idx.dtype == np.int32
+    assert sizes.dtype == np.int32
+    try:
+        from nemo.collections.nlp.data.language_modeling.megatron.dataset_utils import compile_helper
+
+        compile_helper()
+        from nemo.collections.nlp.data.language_modeling.megatron import helpers
+    except ImportError:
+        raise ImportError(
+            f'Could not compile megatron dataset C++ helper functions and therefore cannot import helpers python file.'
+        )
+
+    sample_idx = helpers.build_sample_idx(
+        sizes, doc_idx, seq_length, num_epochs, tokens_per_epoch, drop_last, add_extra_token
+    )
+    # sample_idx = _build_sample_idx(sizes, doc_idx, seq_length,
+    #                              num_epochs, tokens_per_epoch, drop_last, add_extra_token)
+    save_index_mapping(sample_idx_filename, sample_idx)
+    logging.info(
+        ' > elasped time to build and save sample-idx mapping ' '(seconds): {:4f}'.format(time.time() - start_time)
+    )
+    # shuffle-idx.
+    start_time = time.time()
+    # -1 is due to data structure used to retieve the index:
+    #    sample i --> [sample_idx[i], sample_idx[i+1])
+    if separate_last_epoch:
+        num_samples_ = num_samples_from_epochs_minus_one
+    else:
+        num_samples_ = sample_idx.shape[0] - 1
+    shuffle_idx = _build_shuffle_idx(num_samples_, sample_idx.shape[0] - 1, np_rng)
+    save_index_mapping(shuffle_idx_filename, shuffle_idx)
+    logging.info(
+        ' > elasped time to build and save shuffle-idx mapping' ' (seconds): {:4f}'.format(time.time() - start_time)
+    )
+    return _filename, num_epochs
+
+
+def _separate_last_epoch(num_epochs, tokens_per_epoch, seq_length, num_samples, add_extra_token=1):
+    """Whether the last epoch is shuffled separately from the previous epochs."""
+    # If we need only one epoch, then separating last epoch  does
+    # not mean anything.
+    if num_epochs == 1:
+        return False
+
+    # Get the number of samples for the last epoch
+    num_samples_from_epochs_minus_one = ((num_epochs - 1) * tokens_per_epoch - add_extra_token) // seq_length
+    last_epoch_num_samples = num_samples - num_samples_from_epochs_minus_one
+    assert last_epoch_num_samples >= 0, 'last epoch number of samples should be non-negative.'
+    num_samples_per_epoch = (tokens_per_epoch - add_extra_token) // seq_length
+    assert last_epoch_num_samples < (num_samples_per_epoch + 1), 'last epoch number of samples exceeded max value.'
+    # If we have less than 80% of the samples for the last epoch,
+    # seperate out the epoch and treat it differently.
+    # Note: the 80% number is just based on common sense and can
+    # be adjusted if needed.
+    return last_epoch_num_samples < int(0.80 * num_samples_per_epoch)
+
+
 def _num_tokens(documents, sizes):
     """Total number of tokens in the dataset."""
     return np.sum(sizes[documents])
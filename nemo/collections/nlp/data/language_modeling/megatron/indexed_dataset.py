@@ -554,6 +554,41 @@ class MMapIndexedDataset(torch.utils.data.Dataset):
         np_array = np.frombuffer(self._bin_buffer, dtype=self._index.dtype, count=length, offset=ptr)
         return np_array
 
+    def get_concatenated(self, indices, offset=0, length=None):
+        """ Retrieves the concatenation of several items of the dataset, starting at `offset` in the first item,
+        with the option to only return the first `length` elements.
+
+        When the items are adjacent in the data file, they are read with a single slice of the memory map
+        (and the returned array is a read-only view of it). Otherwise, all the ranges are gathered at once.
+
+        get_concatenated([i, j, k], offset, length) is the same as
+        np.concatenate([get(i, offset), get(j), get(k)])[:length], without a read per item.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        itemsize = np.dtype(self._index.dtype).itemsize
+        pointers = self._index._pointers[indices]
+        sizes = self._index._sizes[indices].astype(np.int64)
+
+        # number of elements read from every item
+        counts = sizes.copy()
+        counts[0] -= offset
+        ends = np.cumsum(counts)
+        length = int(ends[-1]) if length is None else min(length, int(ends[-1]))
+        num_items = int(np.searchsorted(ends, length)) + 1
+        counts = counts[:num_items]
+        counts[-1] -= ends[num_items - 1] - length
+        starts = pointers[:num_items] // itemsize
+        starts[0] += offset
+
+        if np.all(pointers[1:num_items] == pointers[: num_items - 1] + sizes[: num_items - 1] * itemsize):
+            # Adjacent items, a single contiguous read
+            return np.frombuffer(self._bin_buffer, dtype=self._index.dtype, count=length, offset=starts[0] * itemsize)
+
+        # Gather of the element ranges [starts, starts + counts) of all the items
+        data = np.frombuffer(self._bin_buffer, dtype=self._index.dtype)
+        gather_idx = np.arange(length, dtype=np.int64) + np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        return data[gather_idx]
+
     @property
     def sizes(self):
         return self._index.sizes
@@ -594,11 +629,13 @@ class MMapIndexedDatasetBuilder(object):
 
     def merge_file_(self, another_file):
         # Concatenate index
-        index = MMapIndexedDataset.Index(index_file_path(another_file))
+        index = MMapIndexedDataset.Index(index_file_path(another_file), skip_warmup=True)
         assert index.dtype == self._dtype
 
-        for size in index.sizes:
-            self._sizes.append(size)
+        # Concatenate document boundaries, shifted by the number of items already added
+        offset = len(self._sizes)
+        self._doc_idx.extend((offset + index.doc_idx[1:]).tolist())
+        self._sizes.extend(index.sizes.tolist())
 
         # Concatenate data
         with open(data_file_path(another_file), 'rb') as f:
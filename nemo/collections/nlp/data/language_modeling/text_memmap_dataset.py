@@ -31,6 +31,40 @@ __idx_version__ = '0.2'  # index file version
 __idx_suffix__ = 'idx'  # index file suffix
 
 
+# Number of bytes of a data file processed by each index building task
+_INDEX_CHUNK_SIZE = 64 * 1024 ** 2
+
+
+def _get_file_chunks(file_size, chunk_size=None):
+    """Returns the (start, end) byte ranges of the chunks of a file of `file_size` bytes."""
+    chunk_size = chunk_size or _INDEX_CHUNK_SIZE
+    return [(start, min(start + chunk_size, file_size)) for start in range(0, max(file_size, 1), chunk_size)]
+
+
+def _count_trailing_delimiters(mdata, newline_int, block_size=4096):
+    """Returns the number of consecutive delimiters at the end of `mdata`."""
+    count, end = 0, len(mdata)
+    while end > 0:
+        block = mdata[max(0, end - block_size) : end]
+        others = np.flatnonzero(block != newline_int)
+        if len(others) > 0:
+            return count + len(block) - 1 - int(others[-1])
+        count += len(block)
+        end -= len(block)
+    return count
+
+
+def _get_num_index_entries(num_delimiters, num_trailing_delimiters):
+    """
+    Returns the number of index entries of a file from its number of delimiters.
+    Empty lines at the end of the file are removed, and the end of the file is added
+    as a last entry if the file does not end with a delimiter.
+    """
+    if num_trailing_delimiters == 0:
+        return num_delimiters + 1
+    return num_delimiters - num_trailing_delimiters + 1
+
+
 def _build_index_from_memdata(fn, newline_int):
     """
     Build index of delimiter positions between samples in memmap.
@@ -40,19 +74,16 @@ def _build_index_from_memdata(fn, newline_int):
     """
     # use memmap to read file
     mdata = np.memmap(fn, dtype=np.uint8, mode='r')
-    # find newline positions
-    midx = np.where(mdata == newline_int)[0]
-    midx_dtype = midx.dtype
-    # make sure to account for all data
-    midx = midx.tolist()
-    # add last item in case there is no new-line at the end of the file
-    if (len(midx) == 0) or (midx[-1] + 1 != len(mdata)):
-        midx = midx + [len(mdata) + 1]
-
+    # find newline positions, chunk by chunk to bound the size of temporary arrays
+    midx = np.concatenate(
+        [np.flatnonzero(mdata[start:end] == newline_int) + start for start, end in _get_file_chunks(len(mdata))]
+    )
+    num_trailing = _count_trailing_delimiters(mdata, newline_int)
     # remove empty lines from end of file
-    while len(midx) > 1 and (midx[-1] - midx[-2]) < 2:
-        midx.pop(-1)
-    midx = np.asarray(midx, dtype=midx_dtype)
+    midx = midx[: _get_num_index_entries(len(midx), num_trailing)]
+    # add last item in case there is no new-line at the end of the file
+    if num_trailing == 0:
+        midx = np.append(midx, len(mdata) + 1)
 
     # free memmap
     mdata._mmap.close()
@@ -163,6 +194,46 @@ class TextMemMapDataset(Dataset):
 
         return data
 
+    def get_batch(self, indices):
+        """
+        Return the samples of `indices` (in the same order), with batched look-ups of their positions.
+
+        File ids are resolved with a single vectorized search, reads are grouped by file and sorted by offset
+        (random reads become near-sequential), and samples are tokenized with one batched tokenizer call.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) == 0:
+            return []
+        if (indices >= len(self)).any() or (indices < 0).any():
+            raise IndexError(f"Indices {indices} are out of dataset range with {len(self)} samples")
+
+        # Identify the files containing the records
+        file_ids = np.searchsorted(self.midx_bins, indices, side='right')
+        base_idx = np.where(file_ids > 0, self.midx_bins[file_ids - 1], 0)
+        file_idx = indices - base_idx + self._header_lines
+
+        # read samples sorted by file and position in the file
+        order = np.lexsort((file_idx, file_ids))
+        file_boundaries = np.flatnonzero(np.diff(file_ids[order])) + 1
+        texts = [None] * len(indices)
+        for positions in np.split(order, file_boundaries):
+            mdata, midx = self.mdata_midx_list[file_ids[positions[0]]]
+            sample_idx = file_idx[positions]
+            ends = midx[sample_idx]
+            # ignore newline
+            starts = np.where(sample_idx > 0, midx[np.maximum(sample_idx - 1, 0)] + 1, 0)
+            for position, i, j in zip(positions.tolist(), starts.tolist(), ends.tolist()):
+                texts[position] = self._fetch_sample_from_memmap(mdata, i, j)
+
+        return self._build_data_from_texts(texts)
+
+    def __getitems__(self, indices):
+        """Used by `torch.utils.data.DataLoader` to fetch all samples of a batch at once."""
+        if type(self).__getitem__ is not TextMemMapDataset.__getitem__:
+            # child-classes which customize the loading of a single sample
+            return [self[idx] for idx in indices]
+        return self.get_batch(indices)
+
     def _fetch_sample_from_memmap(self, mdata, i, j):
         """Fetchs the text sample. Can be overriden by child-classes to support loading of partial samples and alternative decode methods"""
         # load text sample by slicing memmap data[i:j]
@@ -180,6 +251,19 @@ class TextMemMapDataset(Dataset):
 
         return data
 
+    def _build_data_from_texts(self, texts):
+        """Batched version of `_build_data_from_text`"""
+        if type(self)._build_data_from_text is not TextMemMapDataset._build_data_from_text:
+            # child-classes which only customize the parsing of a single sample
+            return [self._build_data_from_text(text) for text in texts]
+        return self._tokenize_texts(texts)
+
+    def _tokenize_texts(self, texts):
+        """Tokenizes texts with a single call to the tokenizer"""
+        if self.tokenizer is None:
+            return texts
+        return self.tokenizer.texts_to_ids(texts)
+
     def load_file(self, fn):
         """
         Loads a text file as np.int8.
@@ -203,7 +287,12 @@ class TextMemMapDataset(Dataset):
                 raise RuntimeError(f"Missing header, expected {self._header_lines} header lines")
 
             # load meta info
-            idx_info_dict = pickle.load(open(idx_fn + ".info", 'rb'))
+            idx_info_dict = _load_index_info(idx_fn)
+            # test that the data file was not modified since the index was built
+            if _is_index_stale(fn, idx_info_dict):
+                raise RuntimeError(
+                    f"Index file {idx_fn}.npy is out of date, data file {fn} was modified since it was built"
+                )
             # test for mismatch in expected newline_int
             if 'newline_int' in idx_info_dict:
                 newline_int = idx_info_dict['newline_int']
@@ -258,6 +347,10 @@ class CSVMemMapDataset(TextMemMapDataset):
         # tokenize
         return super()._build_data_from_text(text)
 
+    def _build_data_from_texts(self, texts):
+        """Return CSV fields from texts"""
+        return self._tokenize_texts([text.split(self._data_sep)[self._data_col] for text in texts])
+
 
 class JSONLMemMapDataset(TextMemMapDataset):
     """
@@ -280,16 +373,68 @@ class JSONLMemMapDataset(TextMemMapDataset):
         """Return a dictionary of data based on a single JSON line."""
         return json.loads(text)
 
+    def _build_data_from_texts(self, texts):
+        """Return dictionaries of data based on JSON lines."""
+        return [json.loads(text) for text in texts]
+
+
+def _get_file_stats(fn):
+    """Returns the size and modification time of a data file, used to validate its index."""
+    stat = os.stat(fn)
+    return dict(file_size=stat.st_size, file_mtime_ns=stat.st_mtime_ns)
+
+
+def _load_index_info(idx_fn):
+    """Loads the metadata of an index file, stored as JSON (or pickled by older versions)."""
+    with open(idx_fn + ".info", 'rb') as f:
+        content = f.read()
+    try:
+        return json.loads(content)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return pickle.loads(content)
+
+
+def _save_index_info(idx_fn, newline_int, file_stats):
+    data = dict(newline_int=newline_int, version=__idx_version__, **file_stats)
+    logging.info(f"Saving metadata file = {idx_fn}.info")
+    tmp_fn = f"{idx_fn}.info.tmp{os.getpid()}"
+    with open(tmp_fn, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_fn, idx_fn + ".info")
+
+
+def _is_index_stale(fn, idx_info_dict):
+    """
+    Returns True if the data file was modified since its index was built.
+    Indices built by older versions, without file size and modification time, are assumed to be valid.
+    """
+    if 'file_size' not in idx_info_dict:
+        return False
+    file_stats = _get_file_stats(fn)
+    return any(idx_info_dict.get(key) != value for key, value in file_stats.items())
+
+
+def _needs_index(fn):
+    """Returns True if the index of `fn` does not exist, or is stale."""
+    idx_fn = f"{fn}.{__idx_suffix__}"
+    if not os.path.exists(idx_fn + ".npy"):
+        return True
+    if os.path.exists(idx_fn + ".info") and _is_index_stale(fn, _load_index_info(idx_fn)):
+        logging.info(f"Data file {fn} was modified since its index was built, rebuilding it")
+        return True
+    return False
+
 
 def _build_memmap_index_files(newline_int, build_index_fn, fn):
     """Helper function to build an index file"""
     idx_fn = f"{fn}.{__idx_suffix__}"
 
     # create data map
-    if os.path.exists(idx_fn + ".npy"):
+    if not _needs_index(fn):
         return False
     else:
         logging.info(f"Building indexing for fn = {fn}")
+        file_stats = _get_file_stats(fn)
         # find all newline positions
         midx = build_index_fn(fn, newline_int)
         # validate midx
@@ -297,18 +442,98 @@ def _build_memmap_index_files(newline_int, build_index_fn, fn):
         if not np.issubdtype(midx.dtype, np.integer):
             raise TypeError(f"midx must be an integer array, but got type = {midx.dtype}")
 
-        # create e metadata file
-        data = dict(newline_int=newline_int, version=__idx_version__)
-
         # save index as numpy array to enable memmap reading
         logging.info(f"Saving idx file = {idx_fn}.npy")
-        np.save(idx_fn + ".npy", midx, allow_pickle=True)
-        logging.info(f"Saving metadata file = {idx_fn}.info")
-        pickle.dump(data, open(idx_fn + ".info", "wb"))
+        tmp_fn = f"{idx_fn}.npy.tmp{os.getpid()}"
+        with open(tmp_fn, 'wb') as f:
+            np.save(f, midx, allow_pickle=True)
+        os.replace(tmp_fn, idx_fn + ".npy")
+        _save_index_info(idx_fn, newline_int, file_stats)
 
         return True
 
 
+def _count_delimiters(newline_int, fn, start, end):
+    """Returns the number of delimiters in bytes [start, end) of `fn`."""
+    mdata = np.memmap(fn, dtype=np.uint8, mode='r')
+    count = int(np.count_nonzero(mdata[start:end] == newline_int))
+    mdata._mmap.close()
+    del mdata
+    return count
+
+
+def _write_delimiters(newline_int, fn, start, end, idx_fn, offset, count):
+    """Writes the positions of the first `count` delimiters in bytes [start, end) of `fn` to the index `idx_fn`."""
+    mdata = np.memmap(fn, dtype=np.uint8, mode='r')
+    positions = np.flatnonzero(mdata[start:end] == newline_int)[:count] + start
+    mdata._mmap.close()
+    del mdata
+    midx = np.load(idx_fn, mmap_mode='r+')
+    midx[offset : offset + count] = positions
+    midx.flush()
+    del midx
+
+
+def _build_memmap_index_files_chunked(dataset_paths, newline_int, workers):
+    """
+    Builds the index files of `dataset_paths` with the default delimiter index, writing delimiter
+    positions directly to the on-disk index. Files are split in chunks which are processed in parallel,
+    so that large files are indexed by all workers, with memory bounded by the chunk size.
+
+    Returns a list with True for every file whose index was built.
+    """
+    build_status = [_needs_index(fn) for fn in dataset_paths]
+    paths = sorted({fn for fn, status in zip(dataset_paths, build_status) if status})
+    if not paths:
+        return build_status
+
+    file_stats = {fn: _get_file_stats(fn) for fn in paths}
+    chunks = {fn: _get_file_chunks(file_stats[fn]['file_size']) for fn in paths}
+    count_tasks = [(fn, start, end) for fn in paths for start, end in chunks[fn]]
+    with mp.Pool(workers) as p:
+        # first pass: count delimiters, to size the index files
+        counts = p.starmap(partial(_count_delimiters, newline_int), count_tasks)
+
+        write_tasks, index_files = [], []
+        for fn in paths:
+            logging.info(f"Building indexing for fn = {fn}")
+            file_counts, counts = counts[: len(chunks[fn])], counts[len(chunks[fn]) :]
+            mdata = np.memmap(fn, dtype=np.uint8, mode='r')
+            num_trailing = _count_trailing_delimiters(mdata, newline_int)
+            file_size = len(mdata)
+            mdata._mmap.close()
+            del mdata
+
+            num_entries = _get_num_index_entries(sum(file_counts), num_trailing)
+            idx_fn = f"{fn}.{__idx_suffix__}"
+            tmp_fn = f"{idx_fn}.npy.tmp{os.getpid()}"
+            midx = np.lib.format.open_memmap(tmp_fn, mode='w+', dtype=np.int64, shape=(num_entries,))
+            # add last item in case there is no new-line at the end of the file
+            if num_trailing == 0:
+                midx[-1] = file_size + 1
+            midx.flush()
+            del midx
+            index_files.append((fn, idx_fn, tmp_fn))
+
+            offset = 0
+            for (start, end), count in zip(chunks[fn], file_counts):
+                # empty lines at the end of the file are not written
+                count = min(count, num_entries - offset - int(num_trailing == 0))
+                if count > 0:
+                    write_tasks.append((fn, start, end, tmp_fn, offset, count))
+                offset += count
+
+        # second pass: write delimiter positions
+        p.starmap(partial(_write_delimiters, newline_int), write_tasks)
+
+    for fn, idx_fn, tmp_fn in index_files:
+        logging.info(f"Saving idx file = {idx_fn}.npy")
+        os.replace(tmp_fn, idx_fn + ".npy")
+        _save_index_info(idx_fn, newline_int, file_stats[fn])
+
+    return build_status
+
+
 def build_index_files(dataset_paths, newline_int, workers=None, build_index_fn=_build_index_from_memdata):
     """Auxiliary method to build multiple index files"""
     if len(dataset_paths) < 1:
@@ -320,8 +545,11 @@ def build_index_files(dataset_paths, newline_int, workers=None, build_index_fn=_
     logging.info(f"Processing {len(dataset_paths)} data files using {workers} workers")
     # load all files into memmap
     start_time = time.time()
-    with mp.Pool(workers) as p:
-        build_status = p.map(partial(_build_memmap_index_files, newline_int, build_index_fn), dataset_paths)
+    if build_index_fn is _build_index_from_memdata:
+        build_status = _build_memmap_index_files_chunked(dataset_paths, newline_int, workers)
+    else:
+        with mp.Pool(workers) as p:
+            build_status = p.map(partial(_build_memmap_index_files, newline_int, build_index_fn), dataset_paths)
 
     logging.info(
         f'Time building {sum(build_status)} / {len(build_status)} mem-mapped files: {datetime.timedelta(seconds=time.time() - start_time)}'
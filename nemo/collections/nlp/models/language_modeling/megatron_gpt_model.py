@@ -32,6 +32,7 @@ from nemo.collections.nlp.modules.common.megatron.module import Float16Module
 from nemo.collections.nlp.modules.common.megatron.utils import (
     average_losses_across_data_parallel_group,
     get_all_params_for_weight_decay_optimization,
+    get_attention_mask_from_segment_ids,
     get_params_for_weight_decay_optimization,
 )
 from nemo.collections.nlp.modules.common.text_generation_utils import (
@@ -524,6 +525,9 @@ class MegatronGPTModel(MegatronBaseModel, TextGeneration):
                 batch = next(dataloader_iter)
                 for k in batch.keys():
                     batch[k] = batch[k].cuda(non_blocking=True) if k not in ['attention_mask'] else None
+                # Documents of a sample only attend to themselves, the mask is built on device from the segment ids
+                if self.cfg.data.get('reset_attention_mask', False) and batch.get('segment_ids') is not None:
+                    batch['attention_mask'] = get_attention_mask_from_segment_ids(batch['segment_ids'])
             else:
                 if parallel_state.is_pipeline_first_stage():
                     batch = next(dataloader_iter)
@@ -539,6 +543,9 @@ class MegatronGPTModel(MegatronBaseModel, TextGeneration):
                     # Intermediate pipeline stage doesn't need any inputs
                     batch = {k: None for k in ['tokens', 'position_ids', 'attention_mask', 'labels']}
 
+            # The dataset only returns dense attention masks if `create_attention_mask` is set
+            batch.setdefault('attention_mask', None)
+
             output_tensor = model(
                 batch['tokens'],
                 batch['position_ids'],
@@ -220,6 +220,23 @@ def get_ltor_masks_and_position_ids(data, eod_token, reset_position_ids, reset_a
     return attention_mask, loss_mask, position_ids
 
 
+def get_attention_mask_from_segment_ids(segment_ids):
+    """Build the left to right attention mask of packed sequences from the segment ids of their tokens.
+
+    Args:
+        segment_ids: A [b, s] tensor, where the tokens of the same segment (e.g. document) share the same id.
+
+    Returns:
+        A [b, 1, s, s] binary tensor, where True masks out the attention of a query (row) to a key (column),
+        i.e. to the future tokens and to the tokens of other segments, as done by `get_ltor_masks_and_position_ids`.
+    """
+    seq_length = segment_ids.size(-1)
+    causal_mask = torch.tril(torch.ones((seq_length, seq_length), dtype=torch.bool, device=segment_ids.device))
+    same_segment = segment_ids.unsqueeze(-1) == segment_ids.unsqueeze(-2)
+    attention_mask = ~(causal_mask & same_segment)
+    return attention_mask.unsqueeze(1)
+
+
 def attn_mask_postprocess(attn_mask):
     # [b, 1, s, s]
     # Attn_masks for enc-dec attn and dec attn is None when trying to get just the encoder hidden states.
@@ -0,0 +1,407 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Iteration-level (continuous) batching of text generation requests."""
+
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future
+from typing import List, Optional
+
+import torch
+import torch.nn.functional as F
+
+from nemo.collections.nlp.modules.common.text_generation_utils import repetition_penalty, top_k_logits
+from nemo.utils import logging
+
+__all__ = ['TextGenerationStepModel', 'MegatronGPTStepModel', 'ContinuousBatchingScheduler']
+
+
+class TextGenerationStepModel(ABC):
+    """
+    Causal language model with a key/value cache of `max_sequence_length` positions, shared by the rows of a batch,
+    as used by `ContinuousBatchingScheduler`.
+
+    Every call to `forward` appends the keys/values of the input tokens to the cache, at the same positions for all
+    the rows. The attention mask (True for masked positions) has shape [batch, 1, max_sequence_length,
+    max_sequence_length], and the rows of the mask of the input tokens are `[start:start + num_tokens]`, where
+    `start` is the number of positions already in the cache.
+    """
+
+    max_sequence_length: int
+
+    @property
+    @abstractmethod
+    def device(self) -> torch.device:
+        pass
+
+    @abstractmethod
+    def forward(
+        self, tokens: torch.Tensor, position_ids: torch.Tensor, attention_mask: torch.Tensor, allocate: bool
+    ) -> torch.Tensor:
+        """
+        Args:
+            tokens: input tokens of shape [batch, num_tokens]
+            position_ids: positions of the input tokens of shape [batch, num_tokens]
+            attention_mask: attention mask of shape [batch, 1, max_sequence_length, max_sequence_length]
+            allocate: whether to (re)allocate an empty cache before the forward pass
+        Returns:
+            logits of shape [batch, num_tokens, vocab]
+        """
+        pass
+
+    @abstractmethod
+    def shift_cache(self, offset: int):
+        """Drops the first `offset` positions of the cache, and moves the following positions to the front."""
+        pass
+
+
+class MegatronGPTStepModel(TextGenerationStepModel):
+    """
+    `TextGenerationStepModel` of a `MegatronGPTModel`, using the key/value cache of its attention layers.
+    Only models without tensor or pipeline parallelism, and with learned absolute position embeddings are supported.
+
+    Args:
+        model: `MegatronGPTModel` in eval mode
+    """
+
+    def __init__(self, model):
+        if (
+            model.cfg.get('tensor_model_parallel_size', 1) != 1
+            or model.cfg.get('pipeline_model_parallel_size', 1) != 1
+        ):
+            raise ValueError("Continuous batching does not support tensor or pipeline model parallelism")
+        if model.cfg.get('position_embedding_type', 'learned_absolute') != 'learned_absolute':
+            raise ValueError("Continuous batching only supports learned absolute position embeddings")
+        self.model = model
+        self.max_sequence_length = model.cfg.encoder_seq_length
+
+    @property
+    def device(self) -> torch.device:
+        return next(self.model.parameters()).device
+
+    def forward(self, tokens, position_ids, attention_mask, allocate):
+        with torch.no_grad():
+            logits = self.model.model(
+                tokens,
+                position_ids,
+                attention_mask,
+                set_inference_key_value_memory=allocate,
+                inference_max_sequence_len=self.max_sequence_length,
+            )
+        return logits.float()
+
+    def shift_cache(self, offset):
+        for module in self.model.model.modules():
+            if getattr(module, 'inference_key_memory', None) is None:
+                continue
+            for memory in (module.inference_key_memory, module.inference_value_memory):
+                memory[:-offset] = memory[offset:].clone()
+            module.inference_current_sequence_len -= offset
+
+
+class _GenerationRequest:
+    def __init__(
+        self,
+        tokens: List[int],
+        tokens_to_generate: int,
+        greedy: bool,
+        temperature: float,
+        top_k: int,
+        top_p: float,
+        repetition_penalty: float,
+        min_tokens_to_generate: int,
+    ):
+        # prompt followed by the generated tokens
+        self.tokens = tokens
+        self.prompt_length = len(tokens)
+        self.tokens_to_generate = tokens_to_generate
+        self.greedy = greedy
+        self.temperature = temperature
+        self.top_k = top_k
+        self.top_p = top_p
+        self.repetition_penalty = repetition_penalty
+        self.min_tokens_to_generate = min_tokens_to_generate
+        # log prob of every token but the first one
+        self.logprob = []
+        # number of tokens already in the cache
+        self.num_cached = 0
+        # cache position of the first token
+        self.offset = 0
+        self.future = Future()
+
+    @property
+    def num_generated(self) -> int:
+        return len(self.tokens) - self.prompt_length
+
+
+class ContinuousBatchingScheduler:
+    """
+    Text generation with iteration-level batching: every forward step runs the requests of all the slots of a batch,
+    and a new request is admitted in a slot as soon as the previous one finishes (EOS, `tokens_to_generate` or
+    the maximum sequence length), instead of waiting for the longest request of a static batch.
+
+    All the slots share the positions of the key/value cache. A request admitted when `p` positions are in use
+    starts at cache position `p`, its position ids start at 0, and the cache positions before `p` are masked.
+    When the cache is full, positions which are not used by any request are dropped from the front of the cache.
+    Prompts are fed in the same forward step for requests admitted together in an empty batch, and one token per
+    step otherwise, as in `sample_sequence_batch` for prompts longer than the shortest one.
+
+    Requests are submitted with `submit` from any thread, and processed by calling `step` or `run_until_complete`,
+    or in a background thread with `start`.
+
+    Args:
+        step_model: model and its key/value cache
+        tokenizer: tokenizer of the model, used for the EOS id and vocabulary size
+        max_batch_size: number of slots of the batch
+    """
+
+    def __init__(self, step_model: TextGenerationStepModel, tokenizer, max_batch_size: int):
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be positive, got {max_batch_size}")
+        self.step_model = step_model
+        self.eos_id = tokenizer.eos_id
+        self.vocab_size = tokenizer.vocab_size
+        self.max_batch_size = max_batch_size
+        self.max_sequence_length = step_model.max_sequence_length
+
+        self._slots: List[Optional[_GenerationRequest]] = [None] * max_batch_size
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        # number of cache positions in use
+        self._position = 0
+        self._attention_mask = None
+
+    def submit(
+        self,
+        prompt_tokens: List[int],
+        tokens_to_generate: int,
+        greedy: bool = False,
+        temperature: float = 1.0,
+        top_k: int = 0,
+        top_p: float = 0.9,
+        repetition_penalty: float = 1.0,
+        min_tokens_to_generate: int = 0,
+    ) -> Future:
+        """
+        Adds a request to the queue. The parameters are the same as in `generate`.
+
+        Returns:
+            Future of a dictionary with the `token_ids` of the prompt and generated tokens (List[int]),
+            and the `logprob` of every token but the first one (List[float]).
+        """
+        if len(prompt_tokens) == 0:
+            raise ValueError("Prompt must not be empty")
+        if len(prompt_tokens) >= self.max_sequence_length:
+            raise ValueError(
+                f"Prompt of {len(prompt_tokens)} tokens is too long for maximum sequence length "
+                f"{self.max_sequence_length}"
+            )
+        if tokens_to_generate < 1:
+            raise ValueError(f"tokens_to_generate must be positive, got {tokens_to_generate}")
+        request = _GenerationRequest(
+            list(prompt_tokens),
+            tokens_to_generate,
+            greedy,
+            temperature,
+            top_k,
+            top_p,
+            repetition_penalty,
+            min_tokens_to_generate,
+        )
+        with self._condition:
+            self._queue.append(request)
+            self._condition.notify()
+        return request.future
+
+    @property
+    def num_active(self) -> int:
+        return sum(request is not None for request in self._slots)
+
+    def has_work(self) -> bool:
+        with self._condition:
+            return self.num_active > 0 or len(self._queue) > 0
+
+    def _admit_requests(self):
+        with self._condition:
+            for slot, request in enumerate(self._slots):
+                if request is not None:
+                    continue
+                if not self._queue:
+                    break
+                request = self._queue.popleft()
+                request.offset = self._position
+                self._slots[slot] = request
+
+    def _compact_cache(self):
+        """Drops the cache positions before the oldest request."""
+        offset = min(request.offset for request in self._slots if request is not None)
+        # requests are finished before they fill the cache, so the offset is positive
+        assert offset > 0
+        self.step_model.shift_cache(offset)
+        self._position -= offset
+        for request in self._slots:
+            if request is not None:
+                request.offset -= offset
+
+    def _get_attention_mask(self, num_tokens: int) -> torch.Tensor:
+        """Updates the mask rows of the next `num_tokens` positions: causal, and masking positions before a slot."""
+        if self._attention_mask is None:
+            self._attention_mask = torch.ones(
+                self.max_batch_size,
+                1,
+                self.max_sequence_length,
+                self.max_sequence_length,
+                dtype=torch.bool,
+                device=self.step_model.device,
+            )
+        start, end = self._position, self._position + num_tokens
+        columns = torch.arange(self.max_sequence_length, device=self.step_model.device)
+        rows = torch.arange(start, end, device=self.step_model.device)
+        offsets = torch.tensor(
+            [self._position if request is None else request.offset for request in self._slots],
+            device=self.step_model.device,
+        )
+        mask = (columns[None, None, :] > rows[None, :, None]) | (columns[None, None, :] < offsets[:, None, None])
+        self._attention_mask[:, 0, start:end, :] = mask
+        return self._attention_mask
+
+    def _sample(self, request: _GenerationRequest, logits: torch.Tensor) -> int:
+        """Samples the next token of `request` from the logits [vocab] of its last token."""
+        logits = logits.clone()
+        if request.num_generated < request.min_tokens_to_generate:
+            logits[self.eos_id] = -float('Inf')
+        # make sure it won't sample outside the vocab_size range
+        logits[self.vocab_size :] = -float('Inf')
+        if request.greedy:
+            token = torch.argmax(logits).item()
+        else:
+            logits = logits.view(1, -1) / request.temperature
+            used_tokens = torch.tensor([request.tokens[1:]], device=logits.device) if len(request.tokens) > 1 else None
+            logits = repetition_penalty(logits, request.repetition_penalty, used_tokens)
+            logits = top_k_logits(logits, top_k=request.top_k, top_p=request.top_p)
+            token = torch.multinomial(F.softmax(logits, dim=-1), num_samples=1).item()
+        return min(token, self.vocab_size - 1)
+
+    def _finish(self, slot: int):
+        request = self._slots[slot]
+        self._slots[slot] = None
+        request.future.set_result({'token_ids': request.tokens, 'logprob': request.logprob})
+
+    def step(self) -> bool:
+        """
+        Admits queued requests in the free slots, and runs one forward step.
+
+        Returns:
+            False if there was no request to process.
+        """
+        self._admit_requests()
+        if self.num_active == 0:
+            return False
+        if self._position == self.max_sequence_length:
+            self._compact_cache()
+
+        active = [(slot, request) for slot, request in enumerate(self._slots) if request is not None]
+        # feed the prompt tokens which are available for all the active requests, or the last generated tokens
+        num_tokens = min(len(request.tokens) - request.num_cached for _, request in active)
+        num_tokens = min(num_tokens, self.max_sequence_length - self._position)
+
+        tokens = torch.full((self.max_batch_size, num_tokens), self.eos_id, dtype=torch.long)
+        position_ids = torch.arange(num_tokens).repeat(self.max_batch_size, 1)
+        for slot, request in active:
+            tokens[slot] = torch.tensor(request.tokens[request.num_cached : request.num_cached + num_tokens])
+            position_ids[slot] += self._position - request.offset
+        attention_mask = self._get_attention_mask(num_tokens)
+
+        logits = self.step_model.forward(
+            tokens.to(self.step_model.device),
+            position_ids.to(self.step_model.device),
+            attention_mask,
+            allocate=self._position == 0,
+        )
+        self._position += num_tokens
+
+        log_probs = F.log_softmax(logits, dim=-1)
+        for slot, request in active:
+            # log probs of the prompt tokens which were predicted at this step
+            num_known = min(num_tokens, len(request.tokens) - request.num_cached - 1)
+            if num_known > 0:
+                known = torch.tensor(request.tokens[request.num_cached + 1 : request.num_cached + 1 + num_known])
+                request.logprob.extend(log_probs[slot, torch.arange(num_known), known.to(log_probs.device)].tolist())
+            request.num_cached += num_tokens
+            if request.num_cached < len(request.tokens):
+                continue
+
+            token = self._sample(request, logits[slot, -1])
+            request.tokens.append(token)
+            request.logprob.append(log_probs[slot, -1, token].item())
+            if (
+                token == self.eos_id
+                or request.num_generated >= request.tokens_to_generate
+                or len(request.tokens) >= self.max_sequence_length
+            ):
+                self._finish(slot)
+
+        if self.num_active == 0:
+            # the cache is allocated again for the next requests
+            self._position = 0
+        return True
+
+    def run_until_complete(self):
+        """Processes requests until the queue and all the slots are empty."""
+        while self.step():
+            pass
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and self.num_active == 0 and not self._queue:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+            try:
+                self.step()
+            except Exception as e:
+                logging.error(f"Text generation step failed: `{e}`")
+                self._fail_all(e)
+
+    def _fail_all(self, error: Exception):
+        with self._condition:
+            requests = [request for request in self._slots if request is not None] + list(self._queue)
+            self._slots = [None] * self.max_batch_size
+            self._queue.clear()
+        self._position = 0
+        for request in requests:
+            request.future.set_exception(error)
+
+    def start(self):
+        """Processes requests in a background thread."""
+        if self._thread is not None:
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background thread, after the current step."""
+        if self._thread is None:
+            return
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join()
+        self._thread = None
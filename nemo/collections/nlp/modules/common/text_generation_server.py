@@ -24,7 +24,7 @@ from nemo.collections.nlp.modules.common.retro_inference_strategies import (
     RetroModelTextGenerationStrategy,
     RetroQAModelTextGenerationStrategy,
 )
-from nemo.collections.nlp.modules.common.text_generation_utils import generate
+from nemo.collections.nlp.modules.common.text_generation_utils import decode_generated_tokens, generate
 from nemo.utils import logging
 
 GENERATE_NUM = 0
@@ -50,9 +50,11 @@ API_ALLOWED_KEYS = set(
 
 
 class MegatronGenerate(Resource):
-    def __init__(self, model, inference_strategy=None):
+    def __init__(self, model, inference_strategy=None, scheduler=None):
         self.model = model
         self.inference_strategy = inference_strategy
+        # optional ContinuousBatchingScheduler, which batches the sentences of concurrent requests
+        self.scheduler = scheduler
 
     @staticmethod
     def send_do_generate():
@@ -165,6 +167,25 @@ class MegatronGenerate(Resource):
             if not (0.0 <= weights <= 1.0):
                 return "weights must be a positive number less than or equal to 1.0"
 
+        if self.scheduler is not None:
+            if not isinstance(sentences, list) or task_ids is not None or self.inference_strategy is not None:
+                return "Only a list of prompt texts is supported with continuous batching", 400
+            if all_probs:
+                return "all_probs is not supported with continuous batching", 400
+            return jsonify(
+                self._generate_continuous(
+                    sentences,
+                    tokens_to_generate,
+                    temperature,
+                    add_BOS,
+                    top_k,
+                    top_p,
+                    greedy,
+                    repetition_penalty,
+                    min_tokens_to_generate,
+                )
+            )
+
         with lock:  # Need to get lock to keep multiple threads from hitting code
             MegatronGenerate.send_do_generate()  # Tell other ranks we're doing generate
             extra = {}
@@ -209,12 +230,57 @@ class MegatronGenerate(Resource):
                 output['retrieved'] = retrieved_doc
         return jsonify(output)
 
+    def _generate_continuous(
+        self,
+        sentences,
+        tokens_to_generate,
+        temperature,
+        add_BOS,
+        top_k,
+        top_p,
+        greedy,
+        repetition_penalty,
+        min_tokens_to_generate,
+    ):
+        """Generates the sentences with the continuous batching scheduler, along with other requests."""
+        tokenizer = self.model.tokenizer
+        futures = []
+        for sentence in sentences:
+            prompt_tokens = tokenizer.text_to_ids(sentence)
+            if add_BOS:
+                prompt_tokens = [tokenizer.bos_id] + prompt_tokens
+            futures.append(
+                self.scheduler.submit(
+                    prompt_tokens,
+                    tokens_to_generate,
+                    greedy=greedy,
+                    temperature=temperature,
+                    top_k=top_k,
+                    top_p=top_p,
+                    repetition_penalty=repetition_penalty,
+                    min_tokens_to_generate=min_tokens_to_generate,
+                )
+            )
+        results = [future.result() for future in futures]
+
+        token_ids = [result['token_ids'] for result in results]
+        resp_sentences, resp_sentences_seg, all_offsets = decode_generated_tokens(tokenizer, token_ids)
+        output = {}
+        output['sentences'] = resp_sentences
+        output['tokens'] = resp_sentences_seg
+        output['logprob'] = [result['logprob'] for result in results]
+        output['token_ids'] = token_ids
+        output['offsets'] = all_offsets
+        return output
+
 
 class MegatronServer(object):
-    def __init__(self, model, inference_strategy=None):
+    def __init__(self, model, inference_strategy=None, scheduler=None):
         self.app = Flask(__name__, static_url_path='')
         api = Api(self.app)
-        api.add_resource(MegatronGenerate, '/generate', resource_class_args=[model, inference_strategy])
+        api.add_resource(MegatronGenerate, '/generate', resource_class_args=[model, inference_strategy, scheduler])
+        if scheduler is not None:
+            scheduler.start()
 
     def run(self, url, port=5000):
         self.app.run(url, threaded=True, port=port, debug=False)
@@ -40,6 +40,7 @@ __all__ = [
     "megatron_gpt_generate",
     "get_computeprob_response",
     "generate",
+    "decode_generated_tokens",
 ]
 
 
@@ -384,6 +385,70 @@ def synced_generate(
         return tokens[:, :context_length], output_logits, full_logits
 
 
+def decode_generated_tokens(tokenizer, decode_tokens):
+    """
+    Converts generated token ids into text.
+
+    Args:
+        tokenizer: tokenizer of the model
+        decode_tokens (List[List[int]]): token ids of every sequence
+    Returns:
+        Tuple of the sentences (List[str]), the sentences broken into tokens (List[List[str]])
+        and the start position of every token in the text (List[List[int]]).
+    """
+    special_tokens = set()
+    if hasattr(tokenizer, 'pad_token') and tokenizer.pad_token is not None:
+        special_tokens.add(tokenizer.pad_token)
+    if hasattr(tokenizer, 'eos_token') and tokenizer.eos_token is not None:
+        special_tokens.add(tokenizer.eos_token)
+    if hasattr(tokenizer, 'bos_token') and tokenizer.bos_token is not None:
+        special_tokens.add(tokenizer.bos_token)
+    if hasattr(tokenizer, 'cls_token') and tokenizer.cls_token is not None:
+        special_tokens.add(tokenizer.cls_token)
+    if hasattr(tokenizer, 'unk_token') and tokenizer.unk_token is not None:
+        special_tokens.add(tokenizer.unk_token)
+    if hasattr(tokenizer, 'sep_token') and tokenizer.sep_token is not None:
+        special_tokens.add(tokenizer.sep_token)
+    if hasattr(tokenizer, 'mask_token') and tokenizer.mask_token is not None:
+        special_tokens.add(tokenizer.mask_token)
+    resp_sentences = []
+    resp_sentences_seg = []
+
+    for decode_token in decode_tokens:
+        sentence = tokenizer.ids_to_text(decode_token)
+        resp_sentences.append(sentence)
+        if not isinstance(tokenizer, TabularTokenizer):
+            words = []
+            for token in decode_token:
+                if not isinstance(token, Iterable):
+                    token = [token]
+                word = tokenizer.ids_to_tokens(token)
+                if isinstance(word, Iterable):
+                    word = word[0]
+                if hasattr(tokenizer.tokenizer, 'byte_decoder'):
+                    word = bytearray([tokenizer.tokenizer.byte_decoder[c] for c in word]).decode(
+                        'utf-8', errors='replace'
+                    )
+                words.append(word)
+            resp_sentences_seg.append(words)
+        else:
+            words = tokenizer.text_to_tokens(sentence)
+            resp_sentences_seg.append(words)
+
+    # offsets calculation
+    all_offsets = []
+    for item in resp_sentences_seg:
+        offsets = [0]
+        for index, token in enumerate(item):
+            if index != len(item) - 1:
+                if token in special_tokens:
+                    offsets.append(offsets[-1])
+                else:
+                    offsets.append(len(token) + offsets[-1])
+        all_offsets.append(offsets)
+    return resp_sentences, resp_sentences_seg, all_offsets
+
+
 def generate(
     model,
     inputs=None,
@@ -474,59 +539,10 @@ def generate(
         repetition_penalty=repetition_penalty,
         min_tokens_to_generate=min_tokens_to_generate,
     )
-    special_tokens = set()
-    if hasattr(tokenizer, 'pad_token') and tokenizer.pad_token is not None:
-        special_tokens.add(tokenizer.pad_token)
-    if hasattr(tokenizer, 'eos_token') and tokenizer.eos_token is not None:
-        special_tokens.add(tokenizer.eos_token)
-    if hasattr(tokenizer, 'bos_token') and tokenizer.bos_token is not None:
-        special_tokens.add(tokenizer.bos_token)
-    if hasattr(tokenizer, 'cls_token') and tokenizer.cls_token is not None:
-        special_tokens.add(tokenizer.cls_token)
-    if hasattr(tokenizer, 'unk_token') and tokenizer.unk_token is not None:
-        special_tokens.add(tokenizer.unk_token)
-    if hasattr(tokenizer, 'sep_token') and tokenizer.sep_token is not None:
-        special_tokens.add(tokenizer.sep_token)
-    if hasattr(tokenizer, 'mask_token') and tokenizer.mask_token is not None:
-        special_tokens.add(tokenizer.mask_token)
     if output is not None:
         decode_tokens, output_logits, full_logits = output
-        resp_sentences = []
-        resp_sentences_seg = []
-
         decode_tokens = decode_tokens.cpu().numpy().tolist()
-        for decode_token in decode_tokens:
-            sentence = tokenizer.ids_to_text(decode_token)
-            resp_sentences.append(sentence)
-            if not isinstance(tokenizer, TabularTokenizer):
-                words = []
-                for token in decode_token:
-                    if not isinstance(token, Iterable):
-                        token = [token]
-                    word = tokenizer.ids_to_tokens(token)
-                    if isinstance(word, Iterable):
-                        word = word[0]
-                    if hasattr(tokenizer.tokenizer, 'byte_decoder'):
-                        word = bytearray([tokenizer.tokenizer.byte_decoder[c] for c in word]).decode(
-                            'utf-8', errors='replace'
-                        )
-                    words.append(word)
-                resp_sentences_seg.append(words)
-            else:
-                words = tokenizer.text_to_tokens(sentence)
-                resp_sentences_seg.append(words)
-
-        # offsets calculation
-        all_offsets = []
-        for item in resp_sentences_seg:
-            offsets = [0]
-            for index, token in enumerate(item):
-                if index != len(item) - 1:
-                    if token in special_tokens:
-                        offsets.append(offsets[-1])
-                    else:
-                        offsets.append(len(token) + offsets[-1])
-            all_offsets.append(offsets)
+        resp_sentences, resp_sentences_seg, all_offsets = decode_generated_tokens(tokenizer, decode_tokens)
 
         output = {}
         output['sentences'] = resp_sentences
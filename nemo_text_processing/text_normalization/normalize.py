@@ -12,11 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
 import itertools
 import os
 import re
+import shutil
+import tempfile
 from argparse import ArgumentParser
 from collections import OrderedDict
+from functools import lru_cache
 from math import factorial
 from time import perf_counter
 from typing import Dict, List, Union
@@ -43,6 +47,100 @@ except (ModuleNotFoundError, ImportError) as e:
 
 SPACE_DUP = re.compile(' {2,}')
 
+# Version of the grammar cache layout, increase to invalidate all the existing caches
+GRAMMAR_CACHE_VERSION = 1
+
+
+@lru_cache(maxsize=None)
+def _get_grammar_sources_hash(lang: str) -> str:
+    """
+    Returns a hash of the grammar sources and data files of a language, including the shared English grammar
+    utilities, and of the pynini version. The sources do not change while the process runs, so they are only read
+    once per language.
+    """
+    hasher = hashlib.sha1(f"{GRAMMAR_CACHE_VERSION} {getattr(pynini, '__version__', '')}".encode())
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for grammar_dir in sorted({lang, "en"}):
+        for root, dirs, files in os.walk(os.path.join(package_dir, grammar_dir)):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            for file_name in sorted(files):
+                if file_name.endswith((".pyc", ".far")):
+                    continue
+                file_path = os.path.join(root, file_name)
+                hasher.update(os.path.relpath(file_path, package_dir).encode())
+                with open(file_path, "rb") as f:
+                    hasher.update(f.read())
+    return hasher.hexdigest()
+
+
+def get_grammar_cache_dir(cache_dir: str, lang: str, whitelist: str = None) -> str:
+    """
+    Returns the sub-directory of `cache_dir` for the .far grammars of a language. The sub-directory is keyed by a
+    hash of the grammar sources and data files (including the shared English grammar utilities), of the whitelist
+    and of the pynini version, so that grammars are rebuilt when any of them changes.
+
+    Args:
+        cache_dir: path to the root dir of the grammar cache
+        lang: language of the grammars
+        whitelist: path to a file with whitelist replacements
+
+    Returns path to the cache dir of the grammars
+    """
+    hasher = hashlib.sha1(_get_grammar_sources_hash(lang).encode())
+    if whitelist is not None and os.path.exists(whitelist):
+        with open(whitelist, "rb") as f:
+            hasher.update(f.read())
+    return os.path.join(cache_dir, f"{lang}_{hasher.hexdigest()[:16]}")
+
+
+def migrate_flat_grammar_cache(cache_dir: str, grammar_cache_dir: str, lang: str) -> bool:
+    """
+    Copies the .far grammars of a language stored directly in `cache_dir`, as done before the grammar cache was
+    keyed by `get_grammar_cache_dir`, to `grammar_cache_dir` if it does not exist yet. The grammars of the flat
+    layout are not versioned, so they are reused as is: set `overwrite_cache` to rebuild them.
+
+    Args:
+        cache_dir: path to the root dir of the grammar cache
+        grammar_cache_dir: path to the cache dir of the grammars, see `get_grammar_cache_dir`
+        lang: language of the grammars
+
+    Returns True if grammars were migrated
+    """
+    if os.path.exists(grammar_cache_dir) or not os.path.isdir(cache_dir):
+        return False
+    far_files = [
+        file_name
+        for file_name in os.listdir(cache_dir)
+        if file_name.endswith(".far")
+        and f"{lang}_tn_" in file_name
+        and os.path.isfile(os.path.join(cache_dir, file_name))
+    ]
+    if not far_files:
+        return False
+
+    print(
+        f"Reusing the {lang} grammars of {cache_dir} in {grammar_cache_dir}. They may be out of date, "
+        f"set overwrite_cache to rebuild them."
+    )
+    tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(grammar_cache_dir) + ".", dir=cache_dir)
+    try:
+        for file_name in far_files:
+            shutil.copy2(os.path.join(cache_dir, file_name), tmp_dir)
+        # the grammars are moved at once, so other processes never see a partially migrated cache
+        os.rename(tmp_dir, grammar_cache_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.isdir(grammar_cache_dir):
+            raise
+    return True
+
+
+def _get_num_jobs(n_jobs: int) -> int:
+    """Converts joblib-style `n_jobs` (e.g. -1 for all CPUs) into a number of processes."""
+    if n_jobs < 0:
+        n_jobs = max(os.cpu_count() + 1 + n_jobs, 1)
+    return max(n_jobs, 1)
+
 
 class Normalizer:
     """
@@ -53,6 +151,9 @@ class Normalizer:
         input_case: expected input capitalization
         lang: language specifying the TN rules, by default: English
         cache_dir: path to a dir with .far grammar file. Set to None to avoid using cache.
+            The grammars are stored in a sub-directory keyed by a hash of the grammar sources and whitelist,
+            see `get_grammar_cache_dir`. Grammars stored directly in cache_dir by older versions are copied to that
+            sub-directory when it does not exist yet, unless overwrite_cache is set.
         overwrite_cache: set to True to overwrite .far files
         whitelist: path to a file with whitelist replacements
         post_process: WFST-based post-processing, e.g. to remove extra spaces added during TN.
@@ -72,6 +173,12 @@ class Normalizer:
     ):
         assert input_case in ["lower_cased", "cased"]
 
+        if cache_dir is not None and cache_dir != "None":
+            grammar_cache_dir = get_grammar_cache_dir(cache_dir, lang, whitelist)
+            if not overwrite_cache:
+                migrate_flat_grammar_cache(cache_dir, grammar_cache_dir, lang)
+            cache_dir = grammar_cache_dir
+
         self.post_processor = None
 
         if lang == "en":
@@ -152,17 +259,24 @@ class Normalizer:
 
         Returns converted list input strings
         """
+        if not texts:
+            return []
 
         # to save intermediate results to a file
         batch = min(len(texts), batch_size)
+        batches = [texts[i : i + batch] for i in range(0, len(texts), batch)]
+        n_jobs = min(_get_num_jobs(n_jobs), len(batches))
 
-        try:
+        if n_jobs == 1:
+            normalized_texts = [
+                self.process_batch(batch_texts, verbose, punct_pre_process, punct_post_process)
+                for batch_texts in batches
+            ]
+        else:
             normalized_texts = Parallel(n_jobs=n_jobs)(
-                delayed(self.process_batch)(texts[i : i + batch], verbose, punct_pre_process, punct_post_process)
-                for i in range(0, len(texts), batch)
+                delayed(self.process_batch)(batch_texts, verbose, punct_pre_process, punct_post_process)
+                for batch_texts in batches
             )
-        except BaseException as e:
-            raise e
 
         normalized_texts = list(itertools.chain(*normalized_texts))
         return normalized_texts
@@ -0,0 +1,89 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from argparse import ArgumentParser
+from time import perf_counter
+
+from nemo_text_processing.text_normalization.normalize import Normalizer
+
+'''
+Measures the throughput of text normalization (sentences/sec):
+    - Normalizer initialization, with an empty and with a warm grammar cache
+    - normalize_list, sequentially and with joblib workers
+
+Input files contain one sentence per line, or test cases in the `<written>~<spoken>` format with --test_cases, e.g.
+the standard English test set:
+
+    python run_benchmark.py \
+        --input_file tests/nemo_text_processing/en/data_text_normalization/test_cases_*.txt \
+        --test_cases --cache_dir=<CACHE_DIR> --n_jobs=4 --batch_size=32
+'''
+
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument("--input_file", help="input file path(s)", nargs="+", required=True, type=str)
+    parser.add_argument("--test_cases", help="input files are in the `<written>~<spoken>` format", action="store_true")
+    parser.add_argument("--language", help="language", choices=["en", "de", "es", "zh"], default="en", type=str)
+    parser.add_argument(
+        "--input_case", help="input capitalization", choices=["lower_cased", "cased"], default="cased", type=str
+    )
+    parser.add_argument("--cache_dir", help="path to a dir with .far grammar files", required=True, type=str)
+    parser.add_argument("--n_jobs", help="number of workers", default=4, type=int)
+    parser.add_argument("--batch_size", help="number of sentences sent to a worker at once", default=32, type=int)
+    parser.add_argument("--repeat", help="number of times the input is repeated", default=1, type=int)
+    return parser.parse_args()
+
+
+def load_sentences(input_files, test_cases):
+    sentences = []
+    for input_file in input_files:
+        with open(input_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if test_cases:
+                    line = line.split("~")[0]
+                if line.strip():
+                    sentences.append(line)
+    return sentences
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    sentences = load_sentences(args.input_file, args.test_cases) * args.repeat
+    print(f"- Data: {len(sentences)} sentences")
+
+    def create_normalizer(overwrite_cache):
+        start_time = perf_counter()
+        normalizer = Normalizer(
+            input_case=args.input_case, lang=args.language, cache_dir=args.cache_dir, overwrite_cache=overwrite_cache
+        )
+        return normalizer, perf_counter() - start_time
+
+    _, build_time = create_normalizer(overwrite_cache=True)
+    normalizer, load_time = create_normalizer(overwrite_cache=False)
+    print(f"Normalizer init: {build_time:.2f}s building grammars, {load_time:.2f}s from cache")
+
+    results = {}
+    for name, normalize_fn in [
+        ("sequential", lambda: normalizer.normalize_list(sentences, batch_size=args.batch_size, n_jobs=1)),
+        ("joblib", lambda: normalizer.normalize_list(sentences, batch_size=args.batch_size, n_jobs=args.n_jobs)),
+    ]:
+        start_time = perf_counter()
+        results[name] = normalize_fn()
+        elapsed = perf_counter() - start_time
+        print(f"{name:>10}: {elapsed:.2f}s, {len(sentences) / elapsed:.1f} sentences/sec")
+
+    if results["joblib"] != results["sequential"]:
+        raise RuntimeError("Parallel normalization does not match sequential normalization")
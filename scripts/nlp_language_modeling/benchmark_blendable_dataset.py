@@ -0,0 +1,132 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark of the blending of datasets, with the per-sample index arrays of `BlendableDataset` (built by
+`helpers.build_blending_indices`) and with the counter-based `CounterBlendableDataset`.
+
+For every size, it reports the time and memory to build the blending, the time per index lookup, and the largest
+deviation of the number of samples of a dataset from size * weight. The index arrays are only built up to
+`--max-helpers-size` samples (they take 9 bytes per sample), and their build time is extrapolated beyond it.
+
+```python
+python scripts/nlp_language_modeling/benchmark_blendable_dataset.py \
+    --num-datasets=200 \
+    --sizes 1000000 100000000 10000000000
+```
+"""
+
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from nemo.collections.nlp.data.language_modeling.megatron.blendable_dataset import CounterBlendableDataset
+from nemo.collections.nlp.data.language_modeling.megatron.dataset_utils import compile_helper
+
+
+class _Dataset(torch.utils.data.Dataset):
+    def __init__(self, size):
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, idx):
+        return idx
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--num-datasets', type=int, default=100, help='Number of blended datasets, at most 254.')
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[10 ** 6, 10 ** 8, 10 ** 10], help='Sizes of the blended datasets.'
+    )
+    parser.add_argument(
+        '--max-helpers-size', type=int, default=10 ** 8, help='Largest size for which the index arrays are built.'
+    )
+    parser.add_argument('--num-lookups', type=int, default=100000, help='Number of random lookups timed.')
+    parser.add_argument('--seed', type=int, default=1234, help='Random seed.')
+    return parser.parse_args()
+
+
+def benchmark_helpers(helpers, weights, size, indices):
+    start = time.perf_counter()
+    dataset_index = np.zeros(size, dtype=np.uint8)
+    dataset_sample_index = np.zeros(size, dtype=np.int64)
+    helpers.build_blending_indices(dataset_index, dataset_sample_index, weights, len(weights), size, False)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for idx in indices:
+        dataset_index[idx], dataset_sample_index[idx]
+    lookup_time = (time.perf_counter() - start) / len(indices)
+
+    counts = np.bincount(dataset_index, minlength=len(weights))
+    deviation = np.abs(counts - size * weights).max()
+    return build_time, dataset_index.nbytes + dataset_sample_index.nbytes, lookup_time, deviation
+
+
+def benchmark_counter(weights, size, indices):
+    start = time.perf_counter()
+    dataset = CounterBlendableDataset([_Dataset(size)] * len(weights), weights.tolist(), size)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for idx in indices:
+        dataset.get_ds_sample_idx(idx)
+    lookup_time = (time.perf_counter() - start) / len(indices)
+
+    counts = np.array(dataset.get_num_samples(), dtype=np.float64)
+    deviation = np.abs(counts - size * weights).max()
+    return build_time, lookup_time, deviation
+
+
+def main():
+    args = get_args()
+    # the dataset indices of BlendableDataset are uint8
+    assert args.num_datasets < 255
+    compile_helper()
+    from nemo.collections.nlp.data.language_modeling.megatron import helpers
+
+    rng = np.random.default_rng(args.seed)
+    weights = rng.random(args.num_datasets)
+    weights /= weights.sum()
+
+    helpers_time_per_sample = None
+    for size in args.sizes:
+        indices = [int(idx) for idx in rng.integers(0, size, args.num_lookups)]
+        line = f"size {size:.0e}: "
+        if size <= args.max_helpers_size:
+            build_time, memory, lookup_time, deviation = benchmark_helpers(helpers, weights, size, indices)
+            helpers_time_per_sample = build_time / size
+            line += (
+                f"index arrays build {build_time:.2f}s, {memory / 1024 ** 3:.2f}GB, "
+                f"lookup {lookup_time * 1e6:.2f}us, max deviation {deviation:.2f} | "
+            )
+        elif helpers_time_per_sample is not None:
+            line += (
+                f"index arrays build ~{helpers_time_per_sample * size:.0f}s (extrapolated), "
+                f"{size * 9 / 1024 ** 3:.0f}GB | "
+            )
+
+        build_time, lookup_time, deviation = benchmark_counter(weights, size, indices)
+        line += (
+            f"counter build {build_time * 1000:.1f}ms, lookup {lookup_time * 1e6:.2f}us, max deviation {deviation:.2f}"
+        )
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Microbenchmark of the assembly of GPT samples spanning many documents, in samples per second of a single worker.
+
+It writes a synthetic mmap indexed dataset of short documents, and reads samples of `seq-length + 1` tokens, as done
+by `GPTDataset._get_text`, either with one `MMapIndexedDataset.get` per document followed by `np.concatenate`, or
+with a single `MMapIndexedDataset.get_concatenated`. The documents are read in the order of the data file (adjacent
+documents, a single memory map slice) and in a shuffled order (gather of many ranges).
+
+```python
+python scripts/nlp_language_modeling/benchmark_gpt_sample_assembly.py \
+    --num-documents=1000000 \
+    --mean-document-length=20 \
+    --seq-length=4096
+```
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from nemo.collections.nlp.data.language_modeling.megatron.indexed_dataset import (
+    MMapIndexedDataset,
+    MMapIndexedDatasetBuilder,
+    data_file_path,
+    index_file_path,
+)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--num-documents', type=int, default=100000, help='Number of documents of the dataset.')
+    parser.add_argument('--mean-document-length', type=int, default=20, help='Mean number of tokens per document.')
+    parser.add_argument('--seq-length', type=int, default=4096, help='Sequence length of the samples.')
+    parser.add_argument('--num-samples', type=int, default=200, help='Number of samples read per configuration.')
+    parser.add_argument('--seed', type=int, default=1234, help='Random seed.')
+    return parser.parse_args()
+
+
+def write_dataset(prefix, args):
+    rng = np.random.default_rng(args.seed)
+    sizes = rng.geometric(1.0 / args.mean_document_length, args.num_documents)
+    tokens = rng.integers(0, 50000, sizes.sum(), dtype=np.int64)
+    builder = MMapIndexedDatasetBuilder(data_file_path(prefix), dtype=np.uint16)
+    for document in np.split(tokens, np.cumsum(sizes)[:-1]):
+        builder.add_item(torch.from_numpy(document))
+        builder.end_document()
+    builder.finalize(index_file_path(prefix))
+
+
+def build_samples(sizes, doc_idx, seq_length, num_samples):
+    """Start and end (document index, offset) of consecutive samples of `seq_length` (+ 1) tokens."""
+    doc_ends = np.cumsum(sizes[doc_idx])
+    positions = np.arange(num_samples + 1) * seq_length
+    doc_index = np.searchsorted(doc_ends, positions, side='right')
+    offsets = positions - (doc_ends[doc_index] - sizes[doc_idx][doc_index])
+    return np.stack([doc_index, offsets], axis=1)
+
+
+def get_text_with_loop(dataset, doc_idx, sample_idx, idx):
+    doc_index_f, offset_f = sample_idx[idx]
+    doc_index_l, offset_l = sample_idx[idx + 1]
+    if doc_index_f == doc_index_l:
+        return dataset.get(doc_idx[doc_index_f], offset=offset_f, length=offset_l - offset_f + 1)
+    sample_list = [dataset.get(doc_idx[doc_index_f], offset=offset_f)]
+    for i in range(doc_index_f + 1, doc_index_l):
+        sample_list.append(dataset.get(doc_idx[i]))
+    sample_list.append(dataset.get(doc_idx[doc_index_l], length=offset_l + 1))
+    return np.concatenate(sample_list)
+
+
+def get_text_concatenated(dataset, doc_idx, sample_idx, idx):
+    doc_index_f, offset_f = sample_idx[idx]
+    doc_index_l, offset_l = sample_idx[idx + 1]
+    if doc_index_f == doc_index_l:
+        return dataset.get(doc_idx[doc_index_f], offset=offset_f, length=offset_l - offset_f + 1)
+    doc_ids = doc_idx[doc_index_f : doc_index_l + 1]
+    length = dataset.sizes[doc_ids[:-1]].sum() - offset_f + offset_l + 1
+    return dataset.get_concatenated(doc_ids, offset=offset_f, length=length)
+
+
+def main():
+    args = get_args()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        prefix = os.path.join(tmpdir, 'documents')
+        write_dataset(prefix, args)
+        dataset = MMapIndexedDataset(prefix, skip_warmup=False)
+        sizes = dataset.sizes.astype(np.int64)
+        num_samples = min(args.num_samples, sizes.sum() // args.seq_length - 1)
+
+        for order in ['sequential', 'shuffled']:
+            doc_idx = np.arange(len(sizes))
+            if order == 'shuffled':
+                np.random.default_rng(args.seed).shuffle(doc_idx)
+            sample_idx = build_samples(sizes, doc_idx, args.seq_length, num_samples)
+            docs_per_sample = np.diff(sample_idx[:, 0]).mean() + 1
+
+            results = {}
+            for name, get_text in [('loop', get_text_with_loop), ('concatenated', get_text_concatenated)]:
+                start = time.perf_counter()
+                results[name] = [get_text(dataset, doc_idx, sample_idx, i) for i in range(num_samples)]
+                results[name + '_time'] = time.perf_counter() - start
+
+            assert all(np.array_equal(a, b) for a, b in zip(results['loop'], results['concatenated']))
+            print(
+                f"{order:>10} documents, {docs_per_sample:.0f} documents per sample: "
+                f"loop {num_samples / results['loop_time']:.0f} samples/s, "
+                f"get_concatenated {num_samples / results['concatenated_time']:.0f} samples/s"
+            )
+
+
+if __name__ == '__main__':
+    main()
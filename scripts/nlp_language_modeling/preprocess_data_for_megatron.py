@@ -48,6 +48,12 @@ python scripts/nlp_language_modeling/preprocess_data_for_megatron.py \
     --workers=48
 ```
 
+By default, the documents are tokenized one by one and written from the main process. With `--dataset-impl=mmap`,
+set `--shard-size-mb` (e.g. 256) to split the input files into shards of that size instead (gzipped files are not
+split): every worker tokenizes whole shards and writes their own .bin/.idx files in the `OUTPUT_PREFIX_shards`
+folder, which are merged in the order of the input at the end. If the preprocessing is interrupted, running the same
+command again only processes the shards that were not completed.
+
 Example script to preprocess the loose JSON file for retrieval DB Dataset
 
 ```python
@@ -88,6 +94,7 @@ import json
 import multiprocessing
 import os
 import pathlib
+import shutil
 import sys
 import time
 
@@ -196,6 +203,159 @@ class Encoder(object):
             ids['text'] = doc_ids
         return ids, len(json_line)
 
+    def encode_shard(self, shard):
+        """Tokenizes the documents of a shard of an input file, and writes them to their own indexed datasets.
+
+        Args:
+            shard: A tuple (shard index, input file path, first byte, end byte), the end byte being None
+                for whole files.
+
+        Returns:
+            The statistics of the shard, which are also written to its marker file once it is complete.
+        """
+        shard_idx, json_file, start, end = shard
+        builders = {}
+        for key in self.args.json_keys:
+            builders[key] = indexed_dataset.make_builder(
+                indexed_dataset.data_file_path(get_shard_prefix(self.args, key, shard_idx)),
+                impl=self.args.dataset_impl,
+                vocab_size=Encoder.tokenizer.vocab_size,
+            )
+
+        stats = {'documents': 0, 'tokens': 0, 'bytes': 0}
+        for line in read_lines(json_file, start, end):
+            doc, bytes_processed = self.encode(line)
+            stats['documents'] += 1
+            stats['bytes'] += bytes_processed
+            for key, sentences in doc.items():
+                if len(sentences) == 0:
+                    continue
+                for sentence in sentences:
+                    builders[key].add_item(torch.IntTensor(sentence))
+                    stats['tokens'] += len(sentence)
+                builders[key].end_document()
+
+        for key in self.args.json_keys:
+            builders[key].finalize(indexed_dataset.index_file_path(get_shard_prefix(self.args, key, shard_idx)))
+
+        # the marker is written last, so that only complete shards are skipped when resuming
+        marker = get_shard_marker(self.args, shard_idx)
+        with open(marker + '.tmp', 'w') as f:
+            json.dump(stats, f)
+        os.replace(marker + '.tmp', marker)
+        return stats
+
+
+def get_shards(json_files, shard_size):
+    """Splits the input files into shards of `shard_size` bytes, except gzipped files which are not split."""
+    shards = []
+    for json_file in json_files:
+        if json_file.endswith('.gz'):
+            shards.append((json_file, 0, None))
+            continue
+        file_size = os.path.getsize(json_file)
+        for start in range(0, file_size, shard_size):
+            shards.append((json_file, start, min(start + shard_size, file_size)))
+    return shards
+
+
+def read_lines(json_file, start, end):
+    """Yields the lines of a file which start within the byte range [start, end), or all of them if end is None."""
+    if json_file.endswith('.gz'):
+        with gzip.open(json_file, 'rt', encoding='utf-8') as fin:
+            yield from fin
+        return
+
+    with open(json_file, 'rb') as fin:
+        if start > 0:
+            # the line which contains the previous byte belongs to the previous shard
+            fin.seek(start - 1)
+            fin.readline()
+        while fin.tell() < end:
+            line = fin.readline()
+            if not line:
+                break
+            yield line.decode('utf-8')
+
+
+def get_shard_dir(args):
+    return f"{args.output_prefix}_shards"
+
+
+def get_shard_prefix(args, key, shard_idx):
+    return os.path.join(get_shard_dir(args), f"{key}_{args.level}_{shard_idx:06d}")
+
+
+def get_shard_marker(args, shard_idx):
+    return os.path.join(get_shard_dir(args), f"{shard_idx:06d}.done")
+
+
+def preprocess_shards(args, json_files, encoder, builders):
+    """Tokenizes the shards of the input files in parallel, and merges them into `builders` in the input order."""
+    shard_dir = get_shard_dir(args)
+    os.makedirs(shard_dir, exist_ok=True)
+    shards = get_shards(json_files, args.shard_size_mb * 1024 * 1024)
+
+    # The shards of an interrupted run can only be reused if the input and output are the same
+    manifest = {
+        'shards': [list(shard) for shard in shards],
+        'json_keys': args.json_keys,
+        'level': args.level,
+        'text_file': args.text_file,
+        'append_eod': args.append_eod,
+        'apply_ftfy': args.apply_ftfy,
+        'tokenizer': [args.tokenizer_library, args.tokenizer_type, args.tokenizer_model, args.vocab_file],
+    }
+    # not a .json file, so that it is not found by --files-filter if the output is in the --input folder
+    manifest_path = os.path.join(shard_dir, 'shards.manifest')
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            if json.load(f) != manifest:
+                raise ValueError(
+                    f"The shards in {shard_dir} were created with other inputs or options, delete this folder first."
+                )
+    else:
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
+
+    totals = {'documents': 0, 'tokens': 0, 'bytes': 0}
+    pending = []
+    for shard_idx, shard in enumerate(shards):
+        marker = get_shard_marker(args, shard_idx)
+        if os.path.exists(marker):
+            with open(marker, 'r') as f:
+                for name, value in json.load(f).items():
+                    totals[name] += value
+        else:
+            pending.append((shard_idx, *shard))
+    if len(pending) < len(shards):
+        print(f"Resuming: {len(shards) - len(pending)}/{len(shards)} shards were already processed.")
+
+    proc_start = time.time()
+    processed = {'documents': 0, 'tokens': 0, 'bytes': 0}
+    with multiprocessing.Pool(args.workers, initializer=encoder.initializer) as pool:
+        for i, stats in enumerate(pool.imap_unordered(encoder.encode_shard, pending), start=1):
+            for name, value in stats.items():
+                processed[name] += value
+            elapsed = time.time() - proc_start
+            print(
+                f"Processed {i + len(shards) - len(pending)}/{len(shards)} shards, "
+                f"{totals['documents'] + processed['documents']} documents "
+                f"({processed['tokens'] / elapsed:.0f} tokens/s, "
+                f"{processed['bytes'] / elapsed / 1024 / 1024:.2f} MB/s).",
+                file=sys.stderr,
+            )
+
+    for key in args.json_keys:
+        for shard_idx in range(len(shards)):
+            builders[key].merge_file_(get_shard_prefix(args, key, shard_idx))
+    shutil.rmtree(shard_dir)
+
+    print(
+        f"Processed {totals['documents'] + processed['documents']} documents, "
+        f"{totals['tokens'] + processed['tokens']} tokens."
+    )
+
 
 def get_args():
     parser = argparse.ArgumentParser()
@@ -239,6 +399,13 @@ def get_args():
 
     group = parser.add_argument_group(title='runtime')
     group.add_argument('--workers', type=int, default=1, help='Number of worker processes to launch')
+    group.add_argument(
+        '--shard-size-mb',
+        type=int,
+        default=0,
+        help='Size of the shards of the input files processed by every worker, for --dataset-impl=mmap. '
+        'By default (0), the documents are processed one by one.',
+    )
     group.add_argument('--chunk_size', type=int, default=64, help='chunk size used for retrieval')
     group.add_argument(
         '--chunk_stride_size', type=int, default=64, help='the stride size for neighbor chunks used for retrieval'
@@ -296,6 +463,7 @@ def main():
     level = "document"
     if args.split_sentences:
         level = "sentence"
+    args.level = level
 
     print(f"Vocab size: {tokenizer.vocab_size}")
     print(f"Output prefix: {args.output_prefix}")
@@ -320,6 +488,12 @@ def main():
     total_bytes_processed = 0
     print("Time to startup:", startup_end - startup_start)
 
+    if args.dataset_impl == 'mmap' and args.shard_size_mb > 0:
+        preprocess_shards(args, json_files, encoder, builders)
+        for key in args.json_keys:
+            builders[key].finalize(output_idx_files[key])
+        return
+
     pool = multiprocessing.Pool(args.workers, initializer=encoder.initializer)
 
     for idx, json_file in enumerate(json_files):
@@ -327,7 +501,7 @@ def main():
         if json_file.endswith('.gz'):
             fin = gzip.open(json_file, 'r')
         else:
-            fin = open(args.input, 'r', encoding='utf-8')
+            fin = open(json_file, 'r', encoding='utf-8')
 
         encoded_docs = pool.imap(encoder.encode, fin, 25)
 
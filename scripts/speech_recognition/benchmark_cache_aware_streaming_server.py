@@ -0,0 +1,158 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+# This script is a local load generator for CacheAwareStreamingServer: concurrent clients stream the audio files of a
+# manifest (or random noise) to a cache-aware streaming model, pushing the features of `push_interval_ms` of audio at
+# a time, in real time by default. It reports the latency percentiles of the partial and final results, the mean
+# batch size of the streaming steps, and the throughput.
+
+# Usage:
+
+python benchmark_cache_aware_streaming_server.py \
+    --asr_model=asr_model.nemo \
+    --num_streams=32 \
+    --total_streams=128 \
+    [--manifest_file=manifest.json] \
+    [--duration=10.0] \
+    [--push_interval_ms=80] \
+    [--max_batch_size=32] \
+    [--no_realtime] \
+    [--device=cpu]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+import torch
+from omegaconf import open_dict
+
+from nemo.collections.asr.models import ASRModel
+from nemo.collections.asr.parts.utils.audio_utils import get_samples
+from nemo.collections.asr.parts.utils.cache_aware_streaming_server import CacheAwareStreamingServer
+from nemo.collections.asr.parts.utils.streaming_utils import CacheAwareStreamingAudioBuffer
+
+parser = argparse.ArgumentParser(description="Load test of the cache-aware streaming server.")
+parser.add_argument("--asr_model", required=True, type=str, help="Pretrained streaming model name or .nemo path.")
+parser.add_argument("--manifest_file", default=None, type=str, help="Optional manifest of the audio to stream.")
+parser.add_argument("--duration", default=10.0, type=float, help="Duration of the random audio, in seconds.")
+parser.add_argument("--num_streams", default=32, type=int, help="Number of concurrent streams.")
+parser.add_argument("--total_streams", default=128, type=int, help="Total number of streams.")
+parser.add_argument("--push_interval_ms", default=80, type=int, help="Audio sent by the clients at once, in ms.")
+parser.add_argument("--no_realtime", action="store_true", help="Push the audio as fast as possible.")
+parser.add_argument("--max_batch_size", default=32, type=int, help="Maximum number of streams of a step.")
+parser.add_argument("--device", default="cpu", type=str, help="Device.")
+parser.add_argument("--seed", default=0, type=int, help="Random seed.")
+args = parser.parse_args()
+
+
+def load_model():
+    if args.asr_model.endswith('.nemo'):
+        model = ASRModel.restore_from(args.asr_model, map_location='cpu')
+    else:
+        model = ASRModel.from_pretrained(args.asr_model, map_location='cpu')
+    if hasattr(model, 'joint'):
+        # partial hypotheses are only supported by the greedy decoding of Transducer models
+        decoding_cfg = model.cfg.decoding
+        with open_dict(decoding_cfg):
+            decoding_cfg.strategy = "greedy"
+        model.change_decoding_strategy(decoding_cfg)
+    return model.to(args.device).eval()
+
+
+def load_audio(sample_rate):
+    if args.manifest_file is None:
+        rng = np.random.default_rng(args.seed)
+        return [rng.standard_normal(int(args.duration * sample_rate)).astype(np.float32) * 0.1]
+    audio = []
+    with open(args.manifest_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                audio.append(get_samples(json.loads(line)['audio_filepath'], target_sr=sample_rate))
+    return audio
+
+
+def percentiles(values):
+    p50, p90, p99 = np.percentile(values, [50, 90, 99]) * 1000
+    return f"p50 {p50:.1f}ms, p90 {p90:.1f}ms, p99 {p99:.1f}ms (mean {np.mean(values) * 1000:.1f}ms)"
+
+
+async def run_client(server, features, frames_per_push, push_interval):
+    stream_id = server.open_stream()
+    results = []
+
+    async def receive():
+        async for result in server.results(stream_id):
+            results.append(result)
+
+    receiver = asyncio.get_running_loop().create_task(receive())
+    start = time.perf_counter()
+    for push_idx, push_start in enumerate(range(0, features.size(-1), frames_per_push)):
+        server.push_features(stream_id, features[:, push_start : push_start + frames_per_push])
+        # pace the pushes like a live audio source
+        await asyncio.sleep(max(0.0, start + (push_idx + 1) * push_interval - time.perf_counter()))
+    server.close_stream(stream_id)
+    await receiver
+    return results
+
+
+async def run_load_test(server, features, frames_per_push, push_interval):
+    semaphore = asyncio.Semaphore(args.num_streams)
+
+    async def run_stream(stream_idx):
+        async with semaphore:
+            return await run_client(server, features[stream_idx % len(features)], frames_per_push, push_interval)
+
+    await server.start()
+    try:
+        return await asyncio.gather(*[run_stream(stream_idx) for stream_idx in range(args.total_streams)])
+    finally:
+        await server.stop()
+
+
+def main():
+    torch.manual_seed(args.seed)
+    model = load_model()
+    preprocessor_cfg = model.cfg.preprocessor
+    sample_rate = preprocessor_cfg.get('sample_rate', 16000)
+    window_stride = preprocessor_cfg.get('window_stride', 0.01)
+
+    streaming_buffer = CacheAwareStreamingAudioBuffer(model=model)
+    features = [streaming_buffer.preprocess_audio(audio)[0][0] for audio in load_audio(sample_rate)]
+    frames_per_push = max(1, int(round(args.push_interval_ms / 1000 / window_stride)))
+    push_interval = 0.0 if args.no_realtime else frames_per_push * window_stride
+
+    server = CacheAwareStreamingServer(model, max_batch_size=args.max_batch_size)
+    start = time.perf_counter()
+    all_results = asyncio.run(run_load_test(server, features, frames_per_push, push_interval))
+    elapsed = time.perf_counter() - start
+
+    partial_latencies = [result.latency for results in all_results for result in results if not result.is_final]
+    final_latencies = [results[-1].latency for results in all_results]
+    audio_duration = sum(
+        features[stream_idx % len(features)].size(-1) * window_stride for stream_idx in range(args.total_streams)
+    )
+    print(f"{args.total_streams} streams ({args.num_streams} concurrent), {audio_duration:.1f}s of audio")
+    print(f"{server.num_steps} steps, mean batch size {server.num_stream_steps / max(server.num_steps, 1):.2f}")
+    if partial_latencies:
+        print(f"partial results latency: {percentiles(partial_latencies)}")
+    print(f"final results latency: {percentiles(final_latencies)}")
+    print(f"elapsed {elapsed:.2f}s, RTFx {audio_duration / elapsed:.2f}")
+
+
+if __name__ == '__main__':
+    main()
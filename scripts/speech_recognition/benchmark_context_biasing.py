@@ -0,0 +1,87 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+# This script measures the cost of contextual biasing with a BoostingTrie of random phrases: the time to build the
+# trie, the time to get it for a request once it is cached, and the throughput of the CTC `prefix` beam search on
+# random log probabilities with and without biasing.
+
+# Usage:
+
+python benchmark_context_biasing.py \
+    --num_phrases=50000 \
+    --max_phrase_length=8 \
+    --vocab_size=128 \
+    --num_utterances=32 \
+    --num_frames=200 \
+    --beam_size=8
+"""
+
+import argparse
+import time
+
+import torch
+
+from nemo.collections.asr.parts.submodules.context_biasing import get_boosting_trie
+from nemo.collections.asr.parts.submodules.ctc_beam_decoding import BeamCTCInfer, PrefixBeamSearchConfig
+
+parser = argparse.ArgumentParser(description="Benchmark contextual biasing with a BoostingTrie.")
+parser.add_argument("--num_phrases", default=50000, type=int, help="Number of boosted phrases.")
+parser.add_argument("--max_phrase_length", default=8, type=int, help="Maximum number of tokens of a phrase.")
+parser.add_argument("--vocab_size", default=128, type=int, help="Vocabulary size.")
+parser.add_argument("--boost", default=1.0, type=float, help="Reward of every token of a matched phrase.")
+parser.add_argument("--num_utterances", default=32, type=int, help="Number of utterances.")
+parser.add_argument("--num_frames", default=200, type=int, help="Number of frames per utterance.")
+parser.add_argument("--beam_size", default=8, type=int, help="Beam size.")
+parser.add_argument("--seed", default=0, type=int, help="Random seed.")
+args = parser.parse_args()
+
+
+def main():
+    torch.manual_seed(args.seed)
+    lengths = torch.randint(1, args.max_phrase_length + 1, [args.num_phrases]).tolist()
+    phrases = [torch.randint(0, args.vocab_size, [length]).tolist() for length in lengths]
+
+    start = time.perf_counter()
+    trie = get_boosting_trie(phrases, boost=args.boost)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    assert get_boosting_trie(phrases, boost=args.boost) is trie
+    lookup_time = time.perf_counter() - start
+    print(f"{trie.num_phrases} phrases, {len(trie)} nodes")
+    print(f"trie build: {build_time:.2f}s, cached lookup: {lookup_time * 1000:.2f}ms")
+
+    logprobs = torch.randn(args.num_utterances, args.num_frames, args.vocab_size + 1).log_softmax(-1)
+    encoded_lengths = torch.full([args.num_utterances], args.num_frames)
+    beam = BeamCTCInfer(
+        blank_id=args.vocab_size,
+        beam_size=args.beam_size,
+        search_type='prefix',
+        prefix_cfg=PrefixBeamSearchConfig(beam_size_token=args.beam_size),
+    )
+    beam.set_vocabulary([chr(0x100 + token) for token in range(args.vocab_size)])
+    beam.set_decoding_type('char')
+
+    for boosting_trie in [None, trie]:
+        beam.set_boosting_trie(boosting_trie)
+        start = time.perf_counter()
+        beam(decoder_output=logprobs, decoder_lengths=encoded_lengths)
+        elapsed = time.perf_counter() - start
+        num_frames = args.num_utterances * args.num_frames
+        name = "no biasing" if boosting_trie is None else "biasing"
+        print(f"{name:>12}: {elapsed:.2f}s, {num_frames / elapsed:.0f} frames/sec")
+
+
+if __name__ == '__main__':
+    main()
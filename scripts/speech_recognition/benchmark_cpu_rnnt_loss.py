@@ -0,0 +1,97 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+# This script measures the forward + backward time of the numba RNNT loss on CPU for random joint activations of
+# several sizes [B, T, U, V+1], with the multi-threaded kernels of `cpu_rnnt_kernel`, and with the PyTorch reference
+# implementation `RNNTLossPytorch` (autograd through the alphas). It also reports the maximum differences of the
+# losses and gradients of the two implementations.
+
+# Usage:
+
+python benchmark_cpu_rnnt_loss.py \
+    --sizes 8x100x20x128 8x200x50x256 32x100x20x128 \
+    --num_threads=8 \
+    --repeats=3 \
+    [--skip_reference]
+"""
+
+import argparse
+import time
+
+import numba
+import torch
+
+from nemo.collections.asr.losses.rnnt_pytorch import RNNTLossPytorch
+from nemo.collections.asr.parts.numba.rnnt_loss.rnnt_pytorch import RNNTLossNumba
+
+parser = argparse.ArgumentParser(description="Benchmark the CPU RNNT loss.")
+parser.add_argument(
+    "--sizes",
+    nargs="+",
+    default=["8x100x20x128", "8x200x50x256", "32x100x20x128"],
+    help="Sizes BxTxUxV of the joint activations, U and V including the blank.",
+)
+parser.add_argument("--num_threads", default=0, type=int, help="Number of numba threads, the default if 0.")
+parser.add_argument("--repeats", default=3, type=int, help="Number of timed runs.")
+parser.add_argument("--skip_reference", action="store_true", help="Do not run the PyTorch reference implementation.")
+parser.add_argument("--seed", default=0, type=int, help="Random seed.")
+args = parser.parse_args()
+
+
+def run(loss_fn, acts, labels, act_lens, label_lens):
+    acts = acts.detach().requires_grad_(True)
+    loss = loss_fn(acts, labels, act_lens, label_lens).sum()
+    loss.backward()
+    return loss.detach(), acts.grad
+
+
+def benchmark(loss_fn, inputs):
+    run(loss_fn, *inputs)  # warm up (numba compilation)
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        result = run(loss_fn, *inputs)
+    return (time.perf_counter() - start) / args.repeats, result
+
+
+def main():
+    torch.manual_seed(args.seed)
+    if args.num_threads > 0:
+        numba.set_num_threads(args.num_threads)
+    print(f"numba threads: {numba.get_num_threads()}")
+
+    fused_loss = RNNTLossNumba(blank=0, reduction='sum')
+    reference_loss = RNNTLossPytorch(blank=0, reduction='sum')
+    for size in args.sizes:
+        B, T, U, V = [int(dim) for dim in size.split('x')]
+        acts = torch.randn(B, T, U, V)
+        labels = torch.randint(1, V, (B, U - 1), dtype=torch.int32)
+        act_lens = torch.full((B,), T, dtype=torch.int32)
+        label_lens = torch.full((B,), U - 1, dtype=torch.int32)
+        inputs = (acts, labels, act_lens, label_lens)
+
+        fused_time, (fused_cost, fused_grads) = benchmark(fused_loss, inputs)
+        line = f"{size:>16}: fused {fused_time * 1000:.1f}ms"
+        if not args.skip_reference:
+            reference_time, (reference_cost, reference_grads) = benchmark(reference_loss, inputs)
+            line += (
+                f", reference {reference_time * 1000:.1f}ms, speedup {reference_time / fused_time:.1f}x"
+                f", cost diff {abs(float(fused_cost - reference_cost)):.2e}"
+                f", max grad diff {float((fused_grads - reference_grads).abs().max()):.2e}"
+            )
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+# This script compares the CPU throughput of log-mel feature extraction with `FilterbankFeatures` called on each
+# utterance, with the batched `FilterbankFeaturesCPU` engine, on synthetic audio.
+
+# Usage:
+
+python benchmark_feature_extraction.py \
+    --num_utterances=1000 \
+    --min_duration=1.0 \
+    --max_duration=20.0 \
+    --chunk_size=16 \
+    --num_threads=4 \
+    [--int16]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from nemo.collections.asr.parts.preprocessing.features import FilterbankFeatures, FilterbankFeaturesCPU
+from nemo.utils import logging
+
+parser = argparse.ArgumentParser(description="Benchmark CPU log-mel feature extraction.")
+parser.add_argument("--num_utterances", default=1000, type=int, help="Number of utterances.")
+parser.add_argument("--min_duration", default=1.0, type=float, help="Minimum duration of utterances, in seconds.")
+parser.add_argument("--max_duration", default=20.0, type=float, help="Maximum duration of utterances, in seconds.")
+parser.add_argument("--sample_rate", default=16000, type=int, help="Sample rate of utterances.")
+parser.add_argument("--batch_size", default=64, type=int, help="Number of utterances per call to the batched engine.")
+parser.add_argument("--chunk_size", default=16, type=int, help="Chunk size of the batched engine.")
+parser.add_argument("--num_threads", default=1, type=int, help="Number of threads of the batched engine.")
+parser.add_argument("--int16", action='store_true', help="Use int16 (PCM) signals instead of float32.")
+parser.add_argument("--seed", default=0, type=int, help="Random seed.")
+args = parser.parse_args()
+
+
+def main():
+    rng = np.random.default_rng(args.seed)
+    durations = rng.uniform(args.min_duration, args.max_duration, size=args.num_utterances)
+    signals = [
+        np.clip(rng.normal(scale=0.1, size=int(duration * args.sample_rate)), -1, 1).astype(np.float32)
+        for duration in durations
+    ]
+    if args.int16:
+        signals = [(signal * 2 ** 15).astype(np.int16) for signal in signals]
+
+    featurizer = FilterbankFeatures(sample_rate=args.sample_rate, dither=0.0).eval()
+    engine = FilterbankFeaturesCPU(featurizer, chunk_size=args.chunk_size, num_threads=args.num_threads)
+
+    start = time.perf_counter()
+    reference = []
+    for signal in signals:
+        signal = torch.from_numpy(signal)
+        if args.int16:
+            signal = signal.float() / 2 ** 15
+        features, length = featurizer(signal.unsqueeze(0), torch.tensor([signal.shape[0]]))
+        reference.append(features[0, :, : length[0]])
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    max_diff = 0.0
+    for batch_start in range(0, len(signals), args.batch_size):
+        features, lengths = engine(signals[batch_start : batch_start + args.batch_size])
+        for idx, length in enumerate(lengths):
+            ref = reference[batch_start + idx]
+            max_diff = max(max_diff, (features[idx, :, :length] - ref).abs().max().item())
+    batched_time = time.perf_counter() - start
+
+    total_duration = durations.sum()
+    logging.info(f"{len(signals)} utterances, {total_duration / 3600:.2f} hours of audio")
+    logging.info(f"maximum absolute difference of features: {max_diff:.2e}")
+    logging.info(f"per-utterance : {loop_time:.3f} s ({total_duration / loop_time:.0f}x real time)")
+    logging.info(f"batched engine: {batched_time:.3f} s ({total_duration / batched_time:.0f}x real time)")
+    logging.info(f"speedup       : {loop_time / batched_time:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
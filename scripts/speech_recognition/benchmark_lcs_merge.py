@@ -0,0 +1,205 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+# This script measures the throughput of the LCS merge of buffered RNN-T inference (as done by
+# LongestCommonSubsequenceBatchedFrameASRRNNT) on the simulated token ids of long audio: every buffer of
+# `total_buffer` seconds, shifted by `chunk_len` seconds, decodes the tokens of a random reference transcript
+# which are emitted within the buffer, with random substitutions and deletions close to the buffer boundaries.
+# It compares the vectorized, incremental `lcs_alignment_merge_buffer` with the previous pure Python implementation,
+# and reports the token error rate of the merged transcripts with respect to the reference.
+
+# Usage:
+
+python benchmark_lcs_merge.py \
+    --hours=1.0 \
+    --chunk_len=1.6 \
+    --total_buffer=4.0 \
+    --model_stride=0.04 \
+    --tokens_per_sec=4.0
+"""
+
+import argparse
+import math
+import time
+
+import editdistance
+import numpy as np
+
+from nemo.collections.asr.parts.utils.streaming_utils import MIN_MERGE_SUBSEQUENCE_LEN, lcs_alignment_merge_buffer
+
+parser = argparse.ArgumentParser(description="Benchmark the LCS merge of buffered RNN-T inference.")
+parser.add_argument("--hours", default=1.0, type=float, help="Duration of the simulated audio, in hours.")
+parser.add_argument("--chunk_len", default=1.6, type=float, help="Chunk duration, in seconds.")
+parser.add_argument("--total_buffer", default=4.0, type=float, help="Buffer duration, in seconds.")
+parser.add_argument("--model_stride", default=0.04, type=float, help="Model stride, in seconds.")
+parser.add_argument("--max_steps_per_timestep", default=5, type=int, help="Maximum number of tokens per frame.")
+parser.add_argument("--tokens_per_sec", default=4.0, type=float, help="Number of reference tokens per second.")
+parser.add_argument("--vocab_size", default=1024, type=int, help="Vocabulary size.")
+parser.add_argument("--boundary_error_rate", default=0.3, type=float, help="Token error rate at buffer boundaries.")
+parser.add_argument("--seed", default=0, type=int, help="Random seed.")
+args = parser.parse_args()
+
+
+def legacy_longest_common_subsequence_merge(X, Y):
+    """Previous implementation of longest_common_subsequence_merge, with a pure Python alignment matrix."""
+    m = len(X)
+    n = len(Y)
+    LCSuff = [[0 for k in range(n + 1)] for l in range(m + 1)]
+    result = 0
+    result_idx = [0, 0, 0]
+    for i in range(m + 1):
+        for j in range(n + 1):
+            if i == 0 or j == 0:
+                LCSuff[i][j] = 0
+            elif X[i - 1] == Y[j - 1]:
+                LCSuff[i][j] = LCSuff[i - 1][j - 1] + 1
+                if result <= LCSuff[i][j]:
+                    result = LCSuff[i][j]
+                    result_idx = [i, j, result]
+            else:
+                LCSuff[i][j] = 0
+
+    i, j = result_idx[0:2]
+    if i == m:
+        length = result_idx[-1]
+        while length >= 0 and i > 0 and j > 0:
+            if LCSuff[i - 1][j - 1] > 0:
+                length -= 1
+                i, j = i - 1, j - 1
+            else:
+                i, j, length = i - 1, j - 1, length - 1
+                break
+    else:
+        max_j = 0
+        max_j_idx = n
+        i_partial = m
+        j_partial = -1
+        j_skip = 0
+        slice_count = 0
+        for i_idx in range(m, -1, -1):
+            for j_idx in range(0, n + 1):
+                if LCSuff[i_idx][j_idx] > max_j and j_idx <= max_j_idx:
+                    max_j = LCSuff[i_idx][j_idx]
+                    max_j_idx = j_idx
+                    i_partial = i_idx
+                    j_partial = j_idx
+
+        if max_j <= MIN_MERGE_SUBSEQUENCE_LEN:
+            i = i_partial
+            j = 0
+            result_idx[-1] = 0
+        else:
+            i_temp = i_partial + 1
+            j_temp = j_partial + 1
+            j_exp = 0
+            j_skip = 0
+            for i_idx in range(i_temp, m + 1):
+                j_any_skip = 0
+                for j_idx in range(j_temp, j_temp + j_skip + 1):
+                    if j_idx < n + 1:
+                        if LCSuff[i_idx][j_idx] == 0:
+                            j_any_skip = 1
+                        else:
+                            j_exp = 1 + j_skip + j_any_skip
+                j_skip += j_any_skip
+                j_temp += 1
+            j_skip = 0
+            j_partial += j_exp
+            while i_partial > 0 and j_partial > 0:
+                if LCSuff[i_partial][j_partial] == 0:
+                    j_partial -= 1
+                    j_skip += 1
+                if j_partial > 0:
+                    slice_count += 1
+                    i_partial -= 1
+                    j_partial -= 1
+            i = max(0, i_partial)
+            j = max(0, j_partial)
+            result_idx[-1] = slice_count + j_skip
+
+    result_idx[0] = i
+    result_idx[1] = j
+    return result_idx, LCSuff
+
+
+def legacy_lcs_alignment_merge_buffer(buffer, data, delay, model, max_steps_per_timestep=5):
+    """Previous implementation of lcs_alignment_merge_buffer, which aligns the whole new data."""
+    if delay < 1 or len(buffer) == 0:
+        buffer += data
+        return buffer
+    search_size = int(delay * max_steps_per_timestep)
+    lcs_idx, _ = legacy_longest_common_subsequence_merge(buffer[-search_size:], data)
+    buffer += data[lcs_idx[1] + lcs_idx[-1] :]
+    return buffer
+
+
+def simulate_buffers(rng):
+    """Returns the reference token ids, and the token ids decoded from every buffer."""
+    duration = args.hours * 3600
+    num_tokens = int(duration * args.tokens_per_sec)
+    reference = rng.integers(0, args.vocab_size, num_tokens)
+    times = np.sort(rng.uniform(0, duration, num_tokens))
+
+    boundary = args.total_buffer - args.chunk_len
+    buffers = []
+    num_buffers = int(math.ceil(duration / args.chunk_len))
+    for buffer_idx in range(num_buffers):
+        end = (buffer_idx + 1) * args.chunk_len
+        start = end - args.total_buffer
+        first, last = np.searchsorted(times, [start, end])
+        tokens, token_times = reference[first:last].copy(), times[first:last]
+        # errors are more likely close to the boundaries of the buffer, where the acoustic context is missing
+        distance = np.minimum(token_times - start, end - token_times)
+        error_prob = args.boundary_error_rate * np.exp(-distance / (0.25 * boundary))
+        errors = rng.random(len(tokens)) < error_prob
+        substitutions = errors & (rng.random(len(tokens)) < 0.5)
+        tokens[substitutions] = rng.integers(0, args.vocab_size, int(substitutions.sum()))
+        buffers.append(tokens[~(errors & ~substitutions)].tolist())
+    return reference.tolist(), buffers
+
+
+def merge(merge_fn, buffers, delay):
+    merged = []
+    for tokens in buffers:
+        merged = merge_fn(merged, tokens, delay, model=None, max_steps_per_timestep=args.max_steps_per_timestep)
+    return merged
+
+
+def main():
+    rng = np.random.default_rng(args.seed)
+    reference, buffers = simulate_buffers(rng)
+    delay = int((args.total_buffer - args.chunk_len) / args.model_stride)
+    print(f"{args.hours:.2f}h of audio: {len(reference)} reference tokens, {len(buffers)} buffers, LCS delay {delay}")
+
+    results = {}
+    for name, merge_fn in [
+        ("previous", legacy_lcs_alignment_merge_buffer),
+        ("vectorized", lcs_alignment_merge_buffer),
+    ]:
+        start = time.perf_counter()
+        results[name] = merge(merge_fn, buffers, delay)
+        elapsed = time.perf_counter() - start
+        token_error_rate = editdistance.eval(results[name], reference) / len(reference)
+        print(
+            f"{name:>10}: {elapsed:.2f}s, {len(buffers) / elapsed:.0f} buffers/sec, "
+            f"{args.hours * 3600 / elapsed:.0f}x real time, token error rate {token_error_rate:.4f}"
+        )
+
+    num_diffs = editdistance.eval(results["previous"], results["vectorized"])
+    print(f"edit distance between the merged transcripts: {num_diffs}")
+
+
+if __name__ == '__main__':
+    main()
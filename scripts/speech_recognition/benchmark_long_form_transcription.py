@@ -0,0 +1,129 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+# This script compares the buffered transcription of a long audio file (or of random noise of `duration` seconds)
+# with a CTC model by FrameBatchASR, which loads the whole file, with the pipelined LongFormTranscriber, which reads
+# it in blocks. It reports the time, the real time factor and the peak of the memory allocated by numpy and python
+# (traced by tracemalloc), and checks that the transcriptions are the same.
+
+# Usage:
+
+python benchmark_long_form_transcription.py \
+    --asr_model=stt_en_citrinet_256 \
+    --model_stride=8 \
+    [--audio_file=long_audio.wav] \
+    [--duration=3600] \
+    [--chunk_len=1.6] \
+    [--total_buffer=4.0] \
+    [--batch_size=32] \
+    [--device=cpu]
+"""
+
+import argparse
+import math
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import soundfile as sf
+import torch
+
+from nemo.collections.asr.models import ASRModel
+from nemo.collections.asr.parts.utils.long_form_transcription import LongFormTranscriber
+from nemo.collections.asr.parts.utils.streaming_utils import FrameBatchASR
+
+parser = argparse.ArgumentParser(description="Benchmark the memory usage of the transcription of long audio.")
+parser.add_argument("--asr_model", required=True, type=str, help="Pretrained CTC model name or .nemo path.")
+parser.add_argument("--model_stride", default=8, type=int, help="Downsampling factor of the model.")
+parser.add_argument("--audio_file", default=None, type=str, help="Optional audio file to transcribe.")
+parser.add_argument("--duration", default=3600.0, type=float, help="Duration of the random audio, in seconds.")
+parser.add_argument("--chunk_len", default=1.6, type=float, help="Chunk duration, in seconds.")
+parser.add_argument("--total_buffer", default=4.0, type=float, help="Buffer duration, in seconds.")
+parser.add_argument("--batch_size", default=32, type=int, help="Number of buffers processed together.")
+parser.add_argument("--device", default="cpu", type=str, help="Device.")
+parser.add_argument("--seed", default=0, type=int, help="Random seed.")
+args = parser.parse_args()
+
+
+def load_model():
+    if args.asr_model.endswith('.nemo'):
+        model = ASRModel.restore_from(args.asr_model, map_location='cpu')
+    else:
+        model = ASRModel.from_pretrained(args.asr_model, map_location='cpu')
+    return model.to(args.device).eval()
+
+
+def write_random_audio(audio_filepath, sample_rate):
+    rng = np.random.default_rng(args.seed)
+    with sf.SoundFile(audio_filepath, 'w', samplerate=sample_rate, channels=1, subtype='PCM_16') as f:
+        for start in range(0, int(args.duration * sample_rate), 60 * sample_rate):
+            num_samples = min(60 * sample_rate, int(args.duration * sample_rate) - start)
+            f.write(np.clip(rng.standard_normal(num_samples) * 0.1, -1.0, 1.0))
+
+
+def transcribe_with_frame_batch_asr(model, audio_filepath):
+    model_stride_in_secs = model.cfg.preprocessor.window_stride * args.model_stride
+    tokens_per_chunk = math.ceil(args.chunk_len / model_stride_in_secs)
+    mid_delay = math.ceil((args.chunk_len + (args.total_buffer - args.chunk_len) / 2) / model_stride_in_secs)
+    frame_asr = FrameBatchASR(
+        asr_model=model, frame_len=args.chunk_len, total_buffer=args.total_buffer, batch_size=args.batch_size,
+    )
+    frame_asr.read_audio_file(audio_filepath, mid_delay, model_stride_in_secs)
+    return frame_asr.transcribe(tokens_per_chunk, mid_delay)
+
+
+def transcribe_with_long_form_transcriber(model, audio_filepath):
+    transcriber = LongFormTranscriber(
+        model,
+        chunk_len=args.chunk_len,
+        total_buffer=args.total_buffer,
+        batch_size=args.batch_size,
+        model_stride=args.model_stride,
+    )
+    return transcriber.transcribe(audio_filepath).text
+
+
+def main():
+    torch.manual_seed(args.seed)
+    model = load_model()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        audio_filepath = args.audio_file
+        if audio_filepath is None:
+            audio_filepath = os.path.join(tmpdir, 'audio.wav')
+            write_random_audio(audio_filepath, model.cfg.sample_rate)
+        duration = sf.info(audio_filepath).duration
+        print(f"{duration:.1f}s of audio")
+
+        texts = {}
+        for name, transcribe_fn in [
+            ("FrameBatchASR", transcribe_with_frame_batch_asr),
+            ("LongFormTranscriber", transcribe_with_long_form_transcriber),
+        ]:
+            tracemalloc.start()
+            start = time.perf_counter()
+            with torch.inference_mode():
+                texts[name] = transcribe_fn(model, audio_filepath)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{name:>20}: {elapsed:.2f}s, RTFx {duration / elapsed:.1f}, peak memory {peak / 2 ** 20:.1f}MiB")
+
+    print(f"same transcription: {texts['FrameBatchASR'] == texts['LongFormTranscriber']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+# This script compares the throughput of RNN-T beam search strategies which decode every utterance independently
+# (`default`, `maes`) with the batched `beam_batch` strategy, on random encoder outputs and randomly initialized
+# decoder and joint networks of the given sizes. Pass `--model` to use the decoder and joint of a pretrained model.
+
+# Usage:
+
+python benchmark_rnnt_beam_search.py \
+    --num_utterances=64 \
+    --batch_size=16 \
+    --beam_size=4 \
+    --num_frames=200 \
+    --search_types default maes beam_batch \
+    [--model=stt_en_conformer_transducer_small] \
+    [--device=cuda]
+"""
+
+import argparse
+import time
+
+import torch
+
+from nemo.collections.asr.models import ASRModel
+from nemo.collections.asr.modules import RNNTDecoder, RNNTJoint
+from nemo.collections.asr.parts.submodules.rnnt_beam_decoding import BeamRNNTInfer
+
+parser = argparse.ArgumentParser(description="Benchmark RNN-T beam search strategies.")
+parser.add_argument("--model", default=None, type=str, help="Optional pretrained RNN-T model name or .nemo path.")
+parser.add_argument("--num_utterances", default=64, type=int, help="Number of utterances.")
+parser.add_argument("--batch_size", default=16, type=int, help="Batch size.")
+parser.add_argument("--num_frames", default=200, type=int, help="Maximum number of encoder frames per utterance.")
+parser.add_argument("--beam_size", default=4, type=int, help="Beam size.")
+parser.add_argument(
+    "--search_types", default=["default", "maes", "beam_batch"], nargs="+", type=str, help="Search types to compare."
+)
+parser.add_argument("--vocab_size", default=128, type=int, help="Vocabulary size of the random networks.")
+parser.add_argument("--encoder_hidden", default=256, type=int, help="Encoder size of the random networks.")
+parser.add_argument("--pred_hidden", default=320, type=int, help="Decoder size of the random networks.")
+parser.add_argument("--joint_hidden", default=320, type=int, help="Joint size of the random networks.")
+parser.add_argument("--device", default="cpu", type=str, help="Device.")
+parser.add_argument("--seed", default=0, type=int, help="Random seed.")
+args = parser.parse_args()
+
+
+def get_decoder_and_joint():
+    if args.model is not None:
+        if args.model.endswith('.nemo'):
+            model = ASRModel.restore_from(args.model, map_location='cpu')
+        else:
+            model = ASRModel.from_pretrained(args.model, map_location='cpu')
+        return model.decoder, model.joint, model.joint.encoder_hidden
+
+    decoder = RNNTDecoder(prednet={'pred_hidden': args.pred_hidden, 'pred_rnn_layers': 1}, vocab_size=args.vocab_size)
+    joint = RNNTJoint(
+        jointnet={
+            'encoder_hidden': args.encoder_hidden,
+            'pred_hidden': args.pred_hidden,
+            'joint_hidden': args.joint_hidden,
+            'activation': 'relu',
+        },
+        num_classes=args.vocab_size,
+    )
+    return decoder, joint, args.encoder_hidden
+
+
+def main():
+    torch.manual_seed(args.seed)
+    decoder, joint, encoder_hidden = get_decoder_and_joint()
+    decoder, joint = decoder.to(args.device).eval(), joint.to(args.device).eval()
+
+    encoder_outputs = torch.randn(args.num_utterances, encoder_hidden, args.num_frames, device=args.device)
+    encoded_lengths = torch.randint(args.num_frames // 2, args.num_frames + 1, [args.num_utterances])
+    encoded_lengths = encoded_lengths.to(args.device)
+
+    results = {}
+    for search_type in args.search_types:
+        beam = BeamRNNTInfer(decoder, joint, beam_size=args.beam_size, search_type=search_type)
+        hypotheses = []
+        start = time.perf_counter()
+        with torch.no_grad():
+            for batch_start in range(0, args.num_utterances, args.batch_size):
+                batch = slice(batch_start, batch_start + args.batch_size)
+                hypotheses += beam(encoder_output=encoder_outputs[batch], encoded_lengths=encoded_lengths[batch])[0]
+        if args.device.startswith('cuda'):
+            torch.cuda.synchronize()
+        elapsed = time.perf_counter() - start
+        results[search_type] = [hyp.y_sequence.tolist() for hyp in hypotheses]
+        print(f"{search_type:>12}: {elapsed:.2f}s, {args.num_utterances / elapsed:.2f} utterances/sec")
+
+    reference = args.search_types[0]
+    for search_type in args.search_types[1:]:
+        num_same = sum(a == b for a, b in zip(results[reference], results[search_type]))
+        print(
+            f"{search_type:>12}: same best hypothesis as {reference} for {num_same}/{args.num_utterances} utterances"
+        )
+
+
+if __name__ == '__main__':
+    main()
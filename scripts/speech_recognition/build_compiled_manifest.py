@@ -0,0 +1,95 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+# This script compiles one or more JSON manifests into a binary, memory-mapped manifest directory.
+# Compiled manifests open in seconds regardless of their size and are shared across data loader workers
+# through the OS page cache. The resulting directory can be used anywhere a `manifest_filepath` is
+# accepted by `AudioToCharDataset` / `AudioToBPEDataset`.
+
+# Optionally, transcripts can be pre-tokenized with the tokenizer of the model that is going to be trained.
+# Pre-computed tokens are only used by datasets whose tokenizer has the same vocabulary, otherwise
+# transcripts are tokenized on access.
+
+# Usage:
+
+python build_compiled_manifest.py \
+    --manifest_path=<path to the manifest file(s), comma-separated> \
+    --output_dir=<path to the compiled manifest directory> \
+    [--tokenizer_dir=<path to the tokenizer directory> --tokenizer_type=<bpe or wpe>]
+"""
+
+import argparse
+import os
+import time
+
+from nemo.collections.common import tokenizers
+from nemo.collections.common.parts.preprocessing.compiled_manifest import build_compiled_manifest
+from nemo.utils import logging
+
+parser = argparse.ArgumentParser(description="Compile JSON ASR manifests into a memory-mapped manifest directory.")
+parser.add_argument(
+    "--manifest_path", required=True, type=str, help="Path to the manifest file(s) to compile, comma-separated."
+)
+parser.add_argument("--output_dir", required=True, type=str, help="Directory to write the compiled manifest to.")
+parser.add_argument(
+    "--tokenizer_dir",
+    default=None,
+    type=str,
+    help="Optional tokenizer directory (as in the `tokenizer.dir` model config) used to pre-tokenize transcripts.",
+)
+parser.add_argument(
+    "--tokenizer_type",
+    default="bpe",
+    choices=["bpe", "wpe"],
+    help="Type of the tokenizer in `--tokenizer_dir`: `bpe` for SentencePiece, `wpe` for BERT based tokenizers.",
+)
+args = parser.parse_args()
+
+
+def load_tokenizer(tokenizer_dir: str, tokenizer_type: str):
+    if tokenizer_type == 'bpe':
+        return tokenizers.SentencePieceTokenizer(model_path=os.path.join(tokenizer_dir, 'tokenizer.model'))
+    return tokenizers.AutoTokenizer(
+        pretrained_model_name='bert-base-cased', vocab_file=os.path.join(tokenizer_dir, 'vocab.txt')
+    )
+
+
+def main():
+    manifest_paths = args.manifest_path.split(',')
+
+    text_parser = None
+    if args.tokenizer_dir is not None:
+        text_parser = _TokenizerParser(load_tokenizer(args.tokenizer_dir, args.tokenizer_type))
+
+    start_time = time.time()
+    num_entries = build_compiled_manifest(manifest_paths, args.output_dir, parser=text_parser)
+    elapsed = time.time() - start_time
+    logging.info(
+        f"Compiled {num_entries} entries in {elapsed:.1f} s ({num_entries / max(elapsed, 1e-6):.0f} entries/s)"
+    )
+
+
+class _TokenizerParser:
+    """Mirrors the tokenizer wrapper of `AudioToBPEDataset`, so both get the same parser fingerprint."""
+
+    def __init__(self, tokenizer):
+        self._tokenizer = tokenizer
+
+    def __call__(self, text):
+        return self._tokenizer.text_to_ids(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gc
+import weakref
+
+import pytest
+import torch
+
+from nemo.collections.asr.metrics.wer import CTCDecoding, CTCDecodingConfig
+from nemo.collections.asr.parts.submodules.context_biasing import BoostingTrie, get_boosting_trie
+
+
+def advance_all(trie, tokens):
+    state, score = BoostingTrie.ROOT, 0.0
+    for token in tokens:
+        reward, state = trie.advance(state, token)
+        score += reward
+    return score, state
+
+
+class TestBoostingTrie:
+    @pytest.mark.unit
+    def test_matches(self):
+        trie = BoostingTrie([[1, 2, 3], [2, 3, 4], [5], []], boost=1.0)
+        assert trie.num_phrases == 3
+        # root, 1, 12, 123, 2, 23, 234, 5
+        assert len(trie) == 8
+
+        # partial match
+        score, state = advance_all(trie, [1, 2])
+        assert score == 2.0
+        assert trie.finalize(state) == -2.0
+
+        # completed phrase, the state goes back to the root
+        assert advance_all(trie, [1, 2, 3]) == (3.0, BoostingTrie.ROOT)
+        assert advance_all(trie, [7, 1, 2, 3, 7]) == (3.0, BoostingTrie.ROOT)
+
+        # broken match, the failure links lead to the phrase `5`
+        assert advance_all(trie, [1, 2, 5]) == (1.0, BoostingTrie.ROOT)
+
+        # broken match, the failure links lead to the prefix `2` of the phrase `234`
+        assert advance_all(trie, [1, 2, 2, 3, 4]) == (3.0, BoostingTrie.ROOT)
+        score, state = advance_all(trie, [1, 2, 2, 3])
+        assert score + trie.finalize(state) == 0.0
+
+    @pytest.mark.unit
+    def test_cached_transitions(self):
+        trie = BoostingTrie([[1, 2]], boost=2.0, max_cached_transitions=2)
+        assert advance_all(trie, [1, 2]) == (4.0, BoostingTrie.ROOT)
+        assert advance_all(trie, [1, 3, 1, 2]) == (4.0, BoostingTrie.ROOT)
+        assert len(trie._transitions) <= 2
+
+    @pytest.mark.unit
+    def test_get_boosting_trie(self):
+        trie = get_boosting_trie([[1, 2], [3]], boost=1.5)
+        assert get_boosting_trie([(1, 2), (3,)], boost=1.5) is trie
+        assert get_boosting_trie([[1, 2], [3]], boost=2.0) is not trie
+
+        trie = get_boosting_trie(['ab', 'c', 'ax'], vocabulary=['a', 'b', 'c'])
+        assert get_boosting_trie(['ab', 'c', 'ax'], vocabulary=['a', 'b', 'c']) is trie
+        assert get_boosting_trie(['ab', 'c', 'ax'], vocabulary=['c', 'b', 'a']) is not trie
+        assert trie.num_phrases == 2
+        assert advance_all(trie, [2, 0, 1]) == (3.0, BoostingTrie.ROOT)
+
+    @pytest.mark.unit
+    def test_get_boosting_trie_tokenizer(self):
+        class CharTokenizer:
+            def text_to_ids(self, text):
+                return [ord(char) for char in text]
+
+        tokenizer = CharTokenizer()
+        trie = get_boosting_trie(['ab', 'c'], tokenizer=tokenizer)
+        assert get_boosting_trie(['ab', 'c'], tokenizer=tokenizer) is trie
+        assert get_boosting_trie(['ab', 'c'], tokenizer=CharTokenizer()) is not trie
+        assert advance_all(trie, tokenizer.text_to_ids('xab')) == (2.0, BoostingTrie.ROOT)
+
+        # the cache does not keep the tokenizer alive
+        tokenizer_ref = weakref.ref(tokenizer)
+        del tokenizer
+        gc.collect()
+        assert tokenizer_ref() is None
+
+
+class TestCTCContextBiasing:
+    @pytest.mark.unit
+    def test_prefix_beam_search_biasing(self):
+        vocab = ['a', 'b', 'c', ' ']
+        blank_id = len(vocab)
+        # the acoustic model slightly prefers `ab` to `cb`
+        frames = [{0: 0.5, 2: 0.45}, {1: 0.95}]
+        probs = torch.full([len(frames), blank_id + 1], 0.01)
+        for t, frame in enumerate(frames):
+            for token, prob in frame.items():
+                probs[t, token] = prob
+        logprobs = (probs / probs.sum(-1, keepdim=True)).log().unsqueeze(0).repeat(2, 1, 1)
+        lengths = torch.tensor([len(frames)] * 2)
+
+        cfg = CTCDecodingConfig(strategy='prefix')
+        cfg.beam.beam_size = 4
+        decoding = CTCDecoding(decoding_cfg=cfg, vocabulary=vocab)
+        texts, _ = decoding.ctc_decoder_predictions_tensor(logprobs, lengths)
+        assert texts == ['ab'] * 2
+
+        # phrases with characters outside of the vocabulary are ignored
+        decoding.set_boosting_phrases(['cb', 'xyz'], boost=1.0)
+        assert decoding.decoding.boosting_trie.num_phrases == 1
+        texts, _ = decoding.ctc_decoder_predictions_tensor(logprobs, lengths)
+        assert texts == ['cb'] * 2
+
+        # partial matches are not rewarded
+        decoding.set_boosting_phrases(['cbc'], boost=1.0)
+        texts, _ = decoding.ctc_decoder_predictions_tensor(logprobs, lengths)
+        assert texts == ['ab'] * 2
+
+        decoding.set_boosting_phrases(None)
+        assert decoding.decoding.boosting_trie is None
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('strategy', ['greedy', 'beam'])
+    def test_unsupported_strategy(self, strategy):
+        decoding = CTCDecoding(decoding_cfg=CTCDecodingConfig(strategy=strategy), vocabulary=['a', 'b'])
+        with pytest.raises(ValueError):
+            decoding.set_boosting_phrases(['ab'])
@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import itertools
+import math
 import os
 from functools import lru_cache
 
@@ -22,7 +24,10 @@ from omegaconf import DictConfig, OmegaConf
 from nemo.collections.asr.metrics.wer import CTCDecoding, CTCDecodingConfig
 from nemo.collections.asr.metrics.wer_bpe import CTCBPEDecoding, CTCBPEDecodingConfig
 from nemo.collections.asr.parts.mixins import mixins
-from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis
+from nemo.collections.asr.parts.submodules.ctc_beam_decoding import BeamCTCInfer, PrefixBeamSearchConfig
+from nemo.collections.asr.parts.submodules.ctc_greedy_decoding import GreedyCTCInfer
+from nemo.collections.asr.parts.submodules.ngram_lm import NGramLM
+from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis, PackedCTCHypotheses, PackedHypotheses
 
 
 def char_vocabulary():
@@ -187,3 +192,226 @@ class TestCTCDecoding:
                 # timestamps check
                 if timestamps:
                     check_subword_timestamps(hyp, decoding)
+
+    @pytest.mark.unit
+    def test_packed_hypotheses(self):
+        y_sequence = torch.tensor([3, 1, 4, 1, 5, 9])
+        offsets = PackedHypotheses.lengths_to_offsets(torch.tensor([2, 0, 4]))
+        packed = PackedHypotheses(
+            y_sequence,
+            offsets,
+            score=torch.tensor([-1.0, -2.0, -3.0]),
+            timestep=torch.tensor([0, 3, 1, 2, 4, 5]),
+            fields={'alignments': ['a', 'b', 'c'], 'frame_confidence': lambda idx: idx * 10},
+        )
+
+        assert offsets.tolist() == [0, 2, 2, 6]
+        assert len(packed) == 3
+        assert packed.get_y_sequence(2).tolist() == [4, 1, 5, 9]
+        assert packed.get_timestep(0) == [0, 3]
+        assert all(hyp is None for hyp in packed._hypotheses)
+
+        hyp = packed[-1]
+        assert isinstance(hyp, Hypothesis)
+        assert hyp.y_sequence.tolist() == [4, 1, 5, 9]
+        assert hyp.timestep == [1, 2, 4, 5]
+        assert hyp.score == -3.0
+        assert hyp.alignments == 'c'
+        assert hyp.frame_confidence == 20
+        # hypotheses are cached, so that modifications persist
+        hyp.text = 'text'
+        assert packed[2].text == 'text'
+        assert packed[1].y_sequence.tolist() == []
+        assert [h.score for h in packed] == [-1.0, -2.0, -3.0]
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('fold_consecutive', [False, True])
+    def test_char_decoding_greedy_packed(self, fold_consecutive):
+        cfg = CTCDecodingConfig(strategy='greedy')
+        vocab = char_vocabulary()
+        decoding = CTCDecoding(decoding_cfg=cfg, vocabulary=vocab)
+
+        B, T = 8, 30
+        V = len(char_vocabulary()) + 1
+        torch.manual_seed(0)
+        input_signal = torch.randn(size=(B, T, V)).log_softmax(-1)
+        length = torch.randint(low=1, high=T, size=[B])
+
+        with torch.no_grad():
+            (packed,) = decoding.decoding(decoder_output=input_signal, decoder_lengths=length)
+            texts, _ = decoding.ctc_decoder_predictions_tensor(
+                input_signal, length, fold_consecutive=fold_consecutive, return_hypotheses=False
+            )
+            hyps, _ = decoding.ctc_decoder_predictions_tensor(
+                input_signal, length, fold_consecutive=fold_consecutive, return_hypotheses=True
+            )
+
+        assert isinstance(packed, PackedHypotheses)
+        for idx in range(B):
+            logprobs, labels = input_signal[idx, : length[idx]].max(-1)
+            assert packed.get_y_sequence(idx).tolist() == labels.tolist()
+            # the score is the sum of the log probabilities of the non blank frames
+            assert packed[idx].score == pytest.approx(logprobs[labels != decoding.blank_id].sum().item(), abs=1e-4)
+            assert texts[idx] == hyps[idx].text
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('blank_id', [0, 4])
+    def test_greedy_batch_collapse(self, blank_id):
+        cfg = CTCDecodingConfig(strategy='greedy', compute_timestamps=True)
+        decoding = CTCDecoding(decoding_cfg=cfg, vocabulary=list('abcd'))
+        decoding.blank_id = blank_id
+
+        B, T = 16, 25
+        torch.manual_seed(0)
+        # a small vocabulary, so that there are many repetitions and blanks
+        labels = torch.randint(0, 5, size=(B, T))
+        length = torch.randint(low=0, high=T + 1, size=[B])
+        length[0], length[1] = 0, T
+
+        greedy = GreedyCTCInfer(blank_id=blank_id, compute_timestamps=True)
+        (packed,) = greedy(decoder_output=labels, decoder_lengths=length)
+        assert isinstance(packed, PackedCTCHypotheses)
+
+        reference = decoding.decode_hypothesis(
+            [
+                Hypothesis(score=0.0, y_sequence=labels[idx], length=length[idx], dec_state=None, timestep=[])
+                for idx in range(B)
+            ],
+            fold_consecutive=True,
+        )
+        for idx in range(B):
+            labels_idx = labels[idx, : length[idx]]
+            assert packed.get_y_sequence(idx).tolist() == labels_idx.tolist()
+            assert packed.get_timestep(idx) == torch.nonzero(labels_idx != blank_id).squeeze(1).tolist()
+            if length[idx] > 0:
+                assert packed.get_tokens(idx) == tuple(reference[idx].text)
+            else:
+                assert packed.get_tokens(idx) == ([], [], [])
+
+
+ARPA = """
+\\data\\
+ngram 1=5
+ngram 2=4
+ngram 3=1
+
+\\1-grams:
+-99\t<s>\t-0.5
+-0.5\t</s>
+-0.3\tab\t-0.2
+-0.7\tba\t-0.4
+-2.0\t<unk>
+
+\\2-grams:
+-0.1\t<s> ab
+-0.2\tab ba\t-0.1
+-0.3\tba </s>
+-0.6\tba ab
+
+\\3-grams:
+-0.05\t<s> ab ba
+
+\\end\\
+"""
+
+
+@pytest.fixture()
+def arpa_path(tmp_path):
+    path = os.path.join(tmp_path, 'lm.arpa')
+    with open(path, 'w') as f:
+        f.write(ARPA)
+    return path
+
+
+def ctc_sequence_logprobs(logprobs, blank_id):
+    """Exact log probability of every collapsed sequence, by enumeration of all the paths."""
+    sequences = {}
+    for path in itertools.product(range(logprobs.shape[1]), repeat=logprobs.shape[0]):
+        logprob = sum(logprobs[t, token].item() for t, token in enumerate(path))
+        collapsed = tuple(
+            token for idx, token in enumerate(path) if token != blank_id and (idx == 0 or token != path[idx - 1])
+        )
+        sequences[collapsed] = math.log(math.exp(sequences.get(collapsed, -math.inf)) + math.exp(logprob))
+    return sequences
+
+
+class TestCTCPrefixBeamSearch:
+    @pytest.mark.unit
+    def test_ngram_lm(self, arpa_path):
+        lm = NGramLM.from_arpa(arpa_path)
+        assert lm.order == 3
+        # trigram, then back-off of the bigram `ab ba` to the bigram `ba </s>`
+        assert lm.score_sentence(['ab', 'ba']) == pytest.approx((-0.1 - 0.05 - 0.1 - 0.3) * math.log(10), abs=1e-5)
+        # back-off of `<s>` to the unigram `ba`, bigram `ba ab`, back-off of `ab` to the unigram `</s>`
+        assert lm.score_sentence(['ba', 'ab']) == pytest.approx((-1.2 - 0.6 - 0.7) * math.log(10), abs=1e-5)
+        # unknown word
+        assert lm.score_sentence(['zz']) == pytest.approx((-2.5 - 0.5) * math.log(10), abs=1e-5)
+        assert lm.score(lm.start_state(), lm.word_id('ab'))[1] == (lm.word_id('<s>'), lm.word_id('ab'))
+
+    @pytest.mark.unit
+    def test_not_arpa(self, tmp_path):
+        path = os.path.join(tmp_path, 'lm.bin')
+        with open(path, 'w') as f:
+            f.write('mmap lm http://kheafield.com/code format version 5')
+        with pytest.raises(ValueError):
+            NGramLM.from_arpa(path)
+
+    @pytest.mark.unit
+    def test_prefix_beam_search_exact(self):
+        # without pruning, the prefix beam search computes the exact probability of the collapsed sequences
+        T, V = 5, 3
+        torch.manual_seed(0)
+        logprobs = torch.randn(2, T, V + 1).log_softmax(-1)
+        lengths = torch.tensor([T, T - 1])
+
+        beam = BeamCTCInfer(
+            blank_id=V,
+            beam_size=1000,
+            search_type='prefix',
+            return_best_hypothesis=False,
+            prefix_cfg=PrefixBeamSearchConfig(beam_size_token=V + 1, token_min_logp=-math.inf),
+        )
+        beam.set_vocabulary(['a', 'b', 'c'])
+        beam.set_decoding_type('char')
+        (nbest,) = beam(decoder_output=logprobs, decoder_lengths=lengths)
+
+        for idx in range(2):
+            expected = ctc_sequence_logprobs(logprobs[idx, : lengths[idx]], blank_id=V)
+            hypotheses = nbest[idx].n_best_hypotheses
+            assert len(hypotheses) == len(expected)
+            for hyp in hypotheses:
+                assert hyp.score == pytest.approx(expected[tuple(hyp.y_sequence.tolist())], abs=1e-4)
+            assert hypotheses[0].score == pytest.approx(max(expected.values()), abs=1e-4)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('num_workers', [1, 2])
+    def test_prefix_beam_search_lm(self, arpa_path, num_workers):
+        vocab = ['a', 'b', ' ']
+        blank_id = len(vocab)
+        # the acoustic model slightly prefers `ab b` (`b` being unknown to the LM) to `ab ba`
+        frames = [
+            {0: 0.97},
+            {1: 0.97},
+            {2: 0.97},
+            {1: 0.97},
+            {0: 0.45, 1: 0.53},
+        ]
+        probs = torch.full([len(frames), blank_id + 1], 0.01)
+        for t, frame in enumerate(frames):
+            for token, prob in frame.items():
+                probs[t, token] = prob
+        logprobs = (probs / probs.sum(-1, keepdim=True)).log().unsqueeze(0).repeat(3, 1, 1)
+        lengths = torch.tensor([len(frames)] * 3)
+
+        texts = {}
+        for kenlm_path in [None, arpa_path]:
+            cfg = CTCDecodingConfig(strategy='prefix')
+            cfg.beam.beam_size = 4
+            cfg.beam.beam_alpha = 1.0
+            cfg.beam.kenlm_path = kenlm_path
+            cfg.beam.prefix_cfg.num_workers = num_workers
+            decoding = CTCDecoding(decoding_cfg=cfg, vocabulary=vocab)
+            texts[kenlm_path], _ = decoding.ctc_decoder_predictions_tensor(logprobs, lengths)
+
+        assert texts[None] == ['ab b'] * 3
+        assert texts[arpa_path] == ['ab ba'] * 3
@@ -15,6 +15,7 @@
 import os
 from functools import lru_cache
 
+import numpy as np
 import pytest
 import torch
 from omegaconf import DictConfig
@@ -22,7 +23,7 @@ from omegaconf import DictConfig
 from nemo.collections.asr.metrics.rnnt_wer import RNNTDecoding, RNNTDecodingConfig
 from nemo.collections.asr.metrics.rnnt_wer_bpe import RNNTBPEDecoding, RNNTBPEDecodingConfig
 from nemo.collections.asr.models import ASRModel
-from nemo.collections.asr.modules import RNNTDecoder, RNNTJoint
+from nemo.collections.asr.modules import RNNTDecoder, RNNTJoint, StatelessTransducerDecoder, rnnt_abstract
 from nemo.collections.asr.parts.mixins import mixins
 from nemo.collections.asr.parts.submodules import rnnt_beam_decoding as beam_decode
 from nemo.collections.asr.parts.submodules import rnnt_greedy_decoding as greedy_decode
@@ -253,3 +254,256 @@ class TestRNNTDecoding:
                 assert len(hyp_.timestep) > 0
                 print("Timesteps", hyp_.timestep)
                 print()
+
+
+def get_stateless_decoder(vocab_size, decoder_output_size=4):
+    torch.manual_seed(0)
+    decoder = StatelessTransducerDecoder(
+        prednet={'pred_hidden': decoder_output_size}, vocab_size=vocab_size, context_size=2
+    )
+    decoder.freeze()
+    return decoder
+
+
+def exhaustive_sequence_scores(decoder, joint, encoder_output, max_symbols):
+    """
+    Log-probabilities of all the token sequences of a single utterance (T, D), summed over all the alignments
+    with at most `max_symbols` tokens per frame.
+    """
+    blank = decoder.blank_idx
+    dec_out, dec_state = decoder.predict(None, None, add_sos=False, batch_size=1)
+    if dec_state is None:
+        dec_state = decoder.initialize_state(torch.zeros([1, 1], dtype=torch.long))
+    cache = {(): (dec_out, dec_state)}
+
+    def get_decoder_output(sequence):
+        if sequence not in cache:
+            _, parent_state = get_decoder_output(sequence[:-1])
+            label = torch.tensor([[sequence[-1]]])
+            cache[sequence] = decoder.predict(label, parent_state, add_sos=False, batch_size=1)
+        return cache[sequence]
+
+    scores = {(): 0.0}
+    for t in range(encoder_output.shape[0]):
+        frame = encoder_output[t : t + 1].unsqueeze(0)  # [1, 1, D]
+        next_scores, frontier = {}, scores
+        for symbol_step in range(max_symbols + 1):
+            expansions = {}
+            for sequence, score in frontier.items():
+                dec_out = get_decoder_output(sequence)[0]
+                logp = torch.log_softmax(joint.joint(frame, dec_out)[0, 0, 0], dim=-1).tolist()
+                next_scores[sequence] = np.logaddexp(next_scores.get(sequence, -np.inf), score + logp[blank])
+                if symbol_step < max_symbols:
+                    for token in range(decoder.vocab_size):
+                        expansions[sequence + (token,)] = score + logp[token]
+            frontier = expansions
+        scores = next_scores
+    return scores
+
+
+class TestBatchedRNNTBeamSearch:
+    @pytest.mark.unit
+    @pytest.mark.parametrize("decoder_type", ["rnn", "stateless"])
+    def test_exhaustive_beam_matches_all_sequences(self, decoder_type):
+        # with a beam larger than the number of possible sequences, no hypothesis is pruned and the search
+        # computes the exact probability of every sequence
+        vocab_size, max_symbols = 3, 2
+        if decoder_type == "rnn":
+            decoder = get_rnnt_decoder(vocab_size)
+        else:
+            decoder = get_stateless_decoder(vocab_size)
+        joint = get_rnnt_joint(vocab_size)
+        beam = beam_decode.BeamRNNTInfer(
+            decoder,
+            joint,
+            beam_size=128,
+            search_type='beam_batch',
+            score_norm=False,
+            return_best_hypothesis=False,
+            beam_batch_max_symbols=max_symbols,
+        )
+
+        torch.manual_seed(1)
+        encoder_output = torch.randn(2, 4, 2)
+        encoded_lengths = torch.tensor([2, 1])
+        with torch.no_grad():
+            hyps = beam(encoder_output=encoder_output, encoded_lengths=encoded_lengths)[0]
+
+        for batch_idx, nbest in enumerate(hyps):
+            assert isinstance(nbest, rnnt_utils.NBestHypotheses)
+            length = int(encoded_lengths[batch_idx])
+            with torch.no_grad():
+                expected = exhaustive_sequence_scores(
+                    decoder, joint, encoder_output[batch_idx, :, :length].t(), max_symbols
+                )
+            # the sequences start with the blank token
+            scores = {tuple(hyp.y_sequence[1:].tolist()): hyp.score for hyp in nbest.n_best_hypotheses}
+            assert scores.keys() == expected.keys()
+            for sequence, score in scores.items():
+                assert score == pytest.approx(expected[sequence], abs=1e-4)
+            assert [hyp.score for hyp in nbest.n_best_hypotheses] == sorted(scores.values(), reverse=True)
+
+    @pytest.mark.unit
+    def test_hash_collisions(self, monkeypatch):
+        # with all the hashes equal, the duplicate sequences are found by comparing their tokens
+        vocab_size, max_symbols = 3, 2
+        decoder = get_rnnt_decoder(vocab_size)
+        joint = get_rnnt_joint(vocab_size)
+        beam = beam_decode.BeamRNNTInfer(
+            decoder,
+            joint,
+            beam_size=16,
+            search_type='beam_batch',
+            score_norm=False,
+            return_best_hypothesis=False,
+            beam_batch_max_symbols=max_symbols,
+        )
+
+        torch.manual_seed(1)
+        encoder_output = torch.randn(2, 4, 3)
+        encoded_lengths = torch.tensor([3, 2])
+        with torch.no_grad():
+            expected = beam(encoder_output=encoder_output, encoded_lengths=encoded_lengths)[0]
+            monkeypatch.setattr(beam_decode, '_HASH_MODULUS', 1)
+            hyps = beam(encoder_output=encoder_output, encoded_lengths=encoded_lengths)[0]
+
+        for nbest, expected_nbest in zip(hyps, expected):
+            assert len(nbest.n_best_hypotheses) == len(expected_nbest.n_best_hypotheses)
+            for hyp, expected_hyp in zip(nbest.n_best_hypotheses, expected_nbest.n_best_hypotheses):
+                assert hyp.y_sequence.tolist() == expected_hyp.y_sequence.tolist()
+                assert hyp.score == pytest.approx(expected_hyp.score, abs=1e-4)
+
+    @pytest.mark.unit
+    def test_batch_invariance(self):
+        vocab_size = 8
+        decoder = get_rnnt_decoder(vocab_size)
+        joint = get_rnnt_joint(vocab_size)
+        beam = beam_decode.BeamRNNTInfer(
+            decoder, joint, beam_size=4, search_type='beam_batch', return_best_hypothesis=False
+        )
+
+        torch.manual_seed(2)
+        encoder_output = torch.randn(4, 4, 12)
+        encoded_lengths = torch.tensor([12, 5, 9, 1])
+        with torch.no_grad():
+            batch_hyps = beam(encoder_output=encoder_output, encoded_lengths=encoded_lengths)[0]
+
+            for batch_idx in range(encoder_output.shape[0]):
+                length = int(encoded_lengths[batch_idx])
+                hyps = beam(
+                    encoder_output=encoder_output[batch_idx : batch_idx + 1, :, :length],
+                    encoded_lengths=encoded_lengths[batch_idx : batch_idx + 1],
+                )[0]
+                expected = hyps[0].n_best_hypotheses
+                result = batch_hyps[batch_idx].n_best_hypotheses
+                assert len(result) == len(expected) == 4
+                for hyp, expected_hyp in zip(result, expected):
+                    assert hyp.y_sequence.tolist() == expected_hyp.y_sequence.tolist()
+                    assert hyp.timestep == expected_hyp.timestep
+                    assert len(hyp.timestep) == len(hyp.y_sequence) - 1
+                    assert all(0 <= step < length for step in hyp.timestep)
+                    assert hyp.score == pytest.approx(expected_hyp.score, abs=1e-4)
+
+    @pytest.mark.unit
+    def test_rnnt_decoding_strategy(self):
+        vocab = char_vocabulary()
+        decoder = get_rnnt_decoder(vocab_size=len(vocab))
+        joint = get_rnnt_joint(vocab_size=len(vocab))
+        cfg = RNNTDecodingConfig(strategy='beam_batch', beam=beam_decode.BeamRNNTInferConfig(beam_size=3))
+        decoding = RNNTDecoding(decoding_cfg=cfg, decoder=decoder, joint=joint, vocabulary=vocab)
+
+        torch.manual_seed(3)
+        encoder_output = torch.randn(3, 4, 10)
+        encoded_lengths = torch.tensor([10, 7, 3])
+        with torch.no_grad():
+            texts, _ = decoding.rnnt_decoder_predictions_tensor(encoder_output, encoded_lengths)
+        assert len(texts) == 3
+        assert all(isinstance(text, str) for text in texts)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("search_type", ["default", "tsd", "alsd", "beam_batch"])
+    def test_beam_larger_than_vocabulary(self, search_type):
+        vocab_size = 3
+        decoder = get_rnnt_decoder(vocab_size)
+        joint = get_rnnt_joint(vocab_size)
+        beam = beam_decode.BeamRNNTInfer(decoder, joint, beam_size=8, search_type=search_type)
+
+        torch.manual_seed(5)
+        encoder_output = torch.randn(1, 4, 6)
+        encoded_lengths = torch.tensor([6])
+        with torch.no_grad():
+            hyps = beam(encoder_output=encoder_output, encoded_lengths=encoded_lengths)[0]
+        assert len(hyps) == 1
+        assert isinstance(hyps[0], rnnt_utils.Hypothesis)
+        # the sequence starts with the blank token
+        assert all(0 <= token < vocab_size for token in hyps[0].y_sequence[1:].tolist())
+
+    @pytest.mark.unit
+    def test_invalid_arguments(self):
+        decoder = get_rnnt_decoder(8)
+        joint = get_rnnt_joint(8)
+        with pytest.raises(ValueError):
+            beam_decode.BeamRNNTInfer(decoder, joint, beam_size=4, search_type='beam_batch', preserve_alignments=True)
+        with pytest.raises(ValueError):
+            beam_decode.BeamRNNTInfer(decoder, joint, beam_size=4, search_type='beam_batch', beam_batch_max_symbols=0)
+
+        class DecoderWithoutGather(RNNTDecoder):
+            batch_gather_states = rnnt_abstract.AbstractRNNTDecoder.batch_gather_states
+
+        decoder.__class__ = DecoderWithoutGather
+        with pytest.raises(ValueError, match="batch_gather_states"):
+            beam_decode.BeamRNNTInfer(decoder, joint, beam_size=4, search_type='beam_batch')
+        # the other searches do not need it
+        beam_decode.BeamRNNTInfer(decoder, joint, beam_size=4, search_type='tsd')
+
+    @pytest.mark.unit
+    def test_beam_batch_preserve_alignments_config(self):
+        vocab = char_vocabulary()
+        decoder = get_rnnt_decoder(vocab_size=len(vocab))
+        joint = get_rnnt_joint(vocab_size=len(vocab))
+        cfg = RNNTDecodingConfig(
+            strategy='beam_batch', beam=beam_decode.BeamRNNTInferConfig(beam_size=2, preserve_alignments=True)
+        )
+        with pytest.raises(ValueError, match="beam_batch"):
+            RNNTDecoding(decoding_cfg=cfg, decoder=decoder, joint=joint, vocabulary=vocab)
+
+
+class TestRNNTContextBiasing:
+    @pytest.mark.unit
+    @pytest.mark.parametrize("strategy", ["beam", "maes"])
+    def test_beam_search_biasing(self, strategy):
+        vocab = char_vocabulary()
+        decoder = get_rnnt_decoder(vocab_size=len(vocab))
+        joint = get_rnnt_joint(vocab_size=len(vocab))
+        cfg = RNNTDecodingConfig(strategy=strategy, beam=beam_decode.BeamRNNTInferConfig(beam_size=4))
+        decoding = RNNTDecoding(decoding_cfg=cfg, decoder=decoder, joint=joint, vocabulary=vocab)
+
+        # a seed for which the boosted phrase is not extended by the beam search of both strategies
+        torch.manual_seed(20)
+        encoder_output = torch.randn(1, 4, 8)
+        encoded_lengths = torch.tensor([8])
+        with torch.no_grad():
+            texts, _ = decoding.rnnt_decoder_predictions_tensor(encoder_output, encoded_lengths)
+            # boosting the best hypothesis keeps it in the best hypothesis, and increases its score
+            decoding.set_boosting_phrases([texts[0]], boost=0.5)
+            boosted_hyps, _ = decoding.rnnt_decoder_predictions_tensor(
+                encoder_output, encoded_lengths, return_hypotheses=True
+            )
+            decoding.set_boosting_phrases(None)
+            hyps, _ = decoding.rnnt_decoder_predictions_tensor(encoder_output, encoded_lengths, return_hypotheses=True)
+
+        assert len(texts[0]) > 0
+        assert hyps[0].text == texts[0]
+        assert boosted_hyps[0].text == texts[0]
+        assert boosted_hyps[0].score == pytest.approx(hyps[0].score + 0.5 * len(texts[0]), abs=1e-4)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("strategy", ["greedy_batch", "tsd", "beam_batch"])
+    def test_unsupported_strategy(self, strategy):
+        vocab = char_vocabulary()
+        decoder = get_rnnt_decoder(vocab_size=len(vocab))
+        joint = get_rnnt_joint(vocab_size=len(vocab))
+        cfg = RNNTDecodingConfig(strategy=strategy, beam=beam_decode.BeamRNNTInferConfig(beam_size=2))
+        decoding = RNNTDecoding(decoding_cfg=cfg, decoder=decoder, joint=joint, vocabulary=vocab)
+        with pytest.raises(ValueError):
+            decoding.set_boosting_phrases(['ab'])
@@ -0,0 +1,116 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numba
+import numpy as np
+import pytest
+import torch
+
+from nemo.collections.asr.parts.numba.rnnt_loss import rnnt_loss_cpu
+from nemo.collections.asr.parts.numba.rnnt_loss.rnnt_numpy import RNNTLoss as RNNTLoss_Numpy
+from nemo.collections.asr.parts.numba.rnnt_loss.rnnt_numpy import transduce_batch
+from nemo.collections.asr.parts.numba.rnnt_loss.utils.cpu_utils import cpu_rnnt_kernel
+
+
+def random_batch(seed, B=5, T=12, U=6, V=7):
+    rng = np.random.default_rng(seed)
+    acts = rng.standard_normal((B, T, U + 1, V)).astype(np.float32)
+    labels = rng.integers(1, V, (B, U)).astype(np.int32)
+    input_lengths = rng.integers(1, T + 1, B).astype(np.int32)
+    label_lengths = rng.integers(0, U + 1, B).astype(np.int32)
+    input_lengths[0], label_lengths[0] = T, U
+    return acts, labels, input_lengths, label_lengths
+
+
+class TestCpuRNNTKernel:
+    @pytest.mark.unit
+    @pytest.mark.parametrize('parallel_samples', [True, False])
+    @pytest.mark.parametrize('fastemit_lambda', [0.0, 0.01])
+    @pytest.mark.parametrize('clamp', [0.0, 0.1])
+    def test_matches_numpy_reference(self, monkeypatch, parallel_samples, fastemit_lambda, clamp):
+        if not parallel_samples:
+            # process the samples one after the other, each of them with all the threads
+            monkeypatch.setattr(cpu_rnnt_kernel.numba, 'get_num_threads', lambda: 1000)
+        acts, labels, input_lengths, label_lengths = random_batch(seed=int(clamp * 10 + fastemit_lambda * 100))
+
+        costs = np.zeros(acts.shape[0], dtype=np.float32)
+        grads = np.zeros_like(acts)
+        cpu_rnnt_kernel.cost_and_grad(
+            acts, labels, input_lengths, label_lengths, costs, grads, 0, fastemit_lambda=fastemit_lambda, clamp=clamp
+        )
+
+        log_probs = torch.log_softmax(torch.from_numpy(acts), -1).numpy()
+        expected_costs, _ = transduce_batch(log_probs, labels, input_lengths, label_lengths, 0, fastemit_lambda)
+
+        acts_tensor = torch.from_numpy(acts).requires_grad_(True)
+        loss = RNNTLoss_Numpy(blank=0, fastemit_lambda=fastemit_lambda, clamp=clamp)
+        loss(
+            acts_tensor, torch.from_numpy(labels), torch.from_numpy(input_lengths), torch.from_numpy(label_lengths),
+        ).backward()
+
+        assert np.allclose(costs, expected_costs, rtol=1e-5)
+        assert np.allclose(grads, acts_tensor.grad.numpy(), atol=1e-6, rtol=1e-4)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('parallel_samples', [True, False])
+    def test_costs_without_grads(self, monkeypatch, parallel_samples):
+        if not parallel_samples:
+            monkeypatch.setattr(cpu_rnnt_kernel.numba, 'get_num_threads', lambda: 1000)
+        acts, labels, input_lengths, label_lengths = random_batch(seed=0)
+
+        costs = np.zeros(acts.shape[0], dtype=np.float32)
+        cpu_rnnt_kernel.cost_and_grad(
+            acts, labels, input_lengths, label_lengths, costs, None, 0, fastemit_lambda=0.0, clamp=0.0
+        )
+        costs_with_grads = np.zeros(acts.shape[0], dtype=np.float32)
+        cpu_rnnt_kernel.cost_and_grad(
+            acts,
+            labels,
+            input_lengths,
+            label_lengths,
+            costs_with_grads,
+            np.zeros_like(acts),
+            0,
+            fastemit_lambda=0.0,
+            clamp=0.0,
+        )
+        assert np.array_equal(costs, costs_with_grads)
+
+    @pytest.mark.unit
+    def test_log_softmax_inputs(self):
+        # log probabilities give the same loss and gradients as the activations they are computed from
+        acts, labels, input_lengths, label_lengths = random_batch(seed=1)
+        log_probs = torch.log_softmax(torch.from_numpy(acts), -1).numpy()
+        results = []
+        for inputs in [acts, log_probs]:
+            costs = np.zeros(acts.shape[0], dtype=np.float32)
+            grads = np.zeros_like(acts)
+            cpu_rnnt_kernel.cost_and_grad(
+                inputs, labels, input_lengths, label_lengths, costs, grads, 0, fastemit_lambda=0.0, clamp=0.0
+            )
+            results.append((costs, grads))
+        assert np.allclose(results[0][0], results[1][0], rtol=1e-5)
+        assert np.allclose(results[0][1], results[1][1], atol=1e-6)
+
+    @pytest.mark.unit
+    def test_num_threads_restored(self):
+        acts, labels, input_lengths, label_lengths = (torch.from_numpy(x) for x in random_batch(seed=3))
+        num_threads = numba.get_num_threads()
+        costs = torch.zeros(acts.shape[0])
+        rnnt_loss_cpu(
+            acts, labels, input_lengths, label_lengths, costs, None, 0, fastemit_lambda=0.0, clamp=0.0, num_threads=-1
+        )
+        # the number of numba threads is a process-wide setting
+        assert numba.get_num_threads() == num_threads
+        assert torch.isfinite(costs).all()
@@ -0,0 +1,127 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+import torch
+from pytorch_lightning.utilities.data import _update_dataloader
+
+from nemo.collections.asr.data.bucketing_sampler import DurationBucketingBatchSampler
+from nemo.collections.asr.models.asr_model import ASRModel
+
+
+@pytest.fixture()
+def durations():
+    return np.random.default_rng(0).uniform(0.5, 20.0, size=1000)
+
+
+class TestDurationBucketingBatchSampler:
+    @pytest.mark.unit
+    @pytest.mark.parametrize('quadratic_duration', [None, 15.0])
+    def test_batches_under_budget(self, durations, quadratic_duration):
+        sampler = DurationBucketingBatchSampler(
+            durations, batch_duration=100.0, num_buckets=10, quadratic_duration=quadratic_duration
+        )
+        batches = list(sampler)
+        assert len(batches) == len(sampler)
+        assert sorted(idx for batch in batches for idx in batch) == list(range(len(durations)))
+        for batch in batches:
+            max_cost = durations[batch].max()
+            if quadratic_duration is not None:
+                max_cost += max_cost ** 2 / quadratic_duration
+            assert len(batch) * max_cost <= 100.0
+
+    @pytest.mark.unit
+    def test_max_batch_size(self, durations):
+        sampler = DurationBucketingBatchSampler(durations, batch_duration=1000.0, max_batch_size=8)
+        assert max(len(batch) for batch in sampler) == 8
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('drop_last', [False, True])
+    def test_distributed(self, durations, drop_last):
+        samplers = [
+            DurationBucketingBatchSampler(
+                durations, batch_duration=100.0, drop_last=drop_last, global_rank=rank, world_size=3
+            )
+            for rank in range(3)
+        ]
+        rank_batches = [list(sampler) for sampler in samplers]
+        assert len({len(batches) for batches in rank_batches}) == 1
+        indices = [idx for batches in rank_batches for batch in batches for idx in batch]
+        if drop_last:
+            assert len(indices) == len(set(indices))
+        else:
+            assert set(indices) == set(range(len(durations)))
+
+    @pytest.mark.unit
+    def test_epochs_and_resumption(self, durations):
+        sampler = DurationBucketingBatchSampler(durations, batch_duration=100.0, seed=1)
+        epoch_0 = list(sampler)
+        assert list(sampler) == epoch_0
+        sampler.set_epoch(1)
+        epoch_1 = list(sampler)
+        assert epoch_1 != epoch_0
+
+        # stop in the middle of epoch 1 and resume from the state of the sampler
+        iterator = iter(sampler)
+        consumed = [next(iterator) for _ in range(5)]
+        # batches prefetched by the data loader are not consumed
+        next(iterator)
+        resumed = DurationBucketingBatchSampler(durations, batch_duration=100.0)
+        resumed.load_state_dict(sampler.state_dict(batches_consumed=5))
+        resumed.set_epoch(1)
+        assert consumed + list(resumed) == epoch_1
+        assert list(resumed) == epoch_1
+
+    @pytest.mark.unit
+    def test_distributed_sampler_replacement(self, durations):
+        sampler = DurationBucketingBatchSampler(durations, batch_duration=100.0, global_rank=0, world_size=2)
+        loader = torch.utils.data.DataLoader(durations, batch_sampler=sampler)
+        # the trainer wraps batch samplers in a DistributedSampler unless `replace_sampler_ddp=False`
+        with pytest.raises(ValueError, match="replace_sampler_ddp=False"):
+            _update_dataloader(loader, torch.utils.data.DistributedSampler(durations, num_replicas=2, rank=0))
+
+    @pytest.mark.unit
+    def test_checkpoint_hooks(self, durations):
+        sampler = DurationBucketingBatchSampler(durations, batch_duration=100.0, seed=1)
+        sampler.set_epoch(1)
+        epoch_1 = list(sampler)
+
+        model = Mock(_epoch_start_step=None, current_epoch=1)
+        model._get_duration_bucketing_sampler.return_value = sampler
+        model.trainer.global_step = 10
+        model.trainer.accumulate_grad_batches = 2
+        ASRModel.on_train_epoch_start(model)
+
+        # 3 optimizer steps of 2 batches, and 2 batches prefetched by the data loader
+        iterator = iter(sampler)
+        consumed = [next(iterator) for _ in range(6)]
+        next(iterator), next(iterator)
+        model.trainer.global_step = 13
+        checkpoint = {}
+        ASRModel.on_save_checkpoint(model, checkpoint)
+        assert checkpoint['duration_bucketing_sampler']['batches_consumed'] == 6
+
+        resumed = DurationBucketingBatchSampler(durations, batch_duration=100.0)
+        resumed_model = Mock(_epoch_start_step=None, current_epoch=1)
+        resumed_model._get_duration_bucketing_sampler.return_value = resumed
+        resumed_model.trainer.global_step = 13
+        ASRModel.on_load_checkpoint(resumed_model, checkpoint)
+        resumed.set_epoch(1)
+        # the epoch started before the checkpoint
+        ASRModel.on_train_epoch_start(resumed_model)
+        assert resumed_model._epoch_start_step == (1, 10)
+        assert consumed + list(resumed) == epoch_1
@@ -0,0 +1,159 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+import torch
+from omegaconf import DictConfig, ListConfig
+
+from nemo.collections.asr.models import EncDecCTCModel, EncDecRNNTModel
+from nemo.collections.asr.parts.utils.cache_aware_streaming_server import CacheAwareStreamingServer
+from nemo.collections.asr.parts.utils.streaming_utils import CacheAwareStreamingAudioBuffer
+
+FEAT_IN = 16
+LABELS = [' ', 'a', 'b', 'c']
+
+
+def get_streaming_model(model_type):
+    preprocessor = {
+        '_target_': 'nemo.collections.asr.modules.AudioToMelSpectrogramPreprocessor',
+        'features': FEAT_IN,
+        'dither': 0.0,
+        'normalize': 'per_feature',
+    }
+    encoder = {
+        '_target_': 'nemo.collections.asr.modules.ConformerEncoder',
+        'feat_in': FEAT_IN,
+        'n_layers': 2,
+        'd_model': 16,
+        'n_heads': 2,
+        'subsampling': 'striding',
+        'subsampling_factor': 4,
+        'causal_downsampling': True,
+        'att_context_size': [8, 1],
+        'att_context_style': 'chunked_limited',
+        'conv_kernel_size': 5,
+        'conv_context_size': 'causal',
+        'conv_norm_type': 'layer_norm',
+    }
+    torch.manual_seed(0)
+    if model_type == 'ctc':
+        decoder = {
+            '_target_': 'nemo.collections.asr.modules.ConvASRDecoder',
+            'feat_in': 16,
+            'num_classes': len(LABELS),
+            'vocabulary': LABELS,
+        }
+        cfg = {'preprocessor': preprocessor, 'encoder': encoder, 'decoder': decoder}
+        model = EncDecCTCModel(cfg=DictConfig(cfg))
+    else:
+        cfg = {
+            'labels': ListConfig(LABELS),
+            'model_defaults': {'enc_hidden': 16, 'pred_hidden': 8},
+            'preprocessor': preprocessor,
+            'encoder': encoder,
+            'decoder': {
+                '_target_': 'nemo.collections.asr.modules.RNNTDecoder',
+                'prednet': {'pred_hidden': 8, 'pred_rnn_layers': 1},
+            },
+            'joint': {
+                '_target_': 'nemo.collections.asr.modules.RNNTJoint',
+                'jointnet': {'joint_hidden': 8, 'activation': 'relu'},
+            },
+            'decoding': {'strategy': 'greedy', 'greedy': {'max_symbols': 5}},
+        }
+        model = EncDecRNNTModel(cfg=DictConfig(cfg))
+    return model.eval()
+
+
+def stream_sequentially(model, features):
+    """Reference: streaming of a single utterance with CacheAwareStreamingAudioBuffer."""
+    streaming_buffer = CacheAwareStreamingAudioBuffer(model=model)
+    streaming_buffer.append_processed_signal(features.unsqueeze(0))
+    cache_last_channel, cache_last_time = model.encoder.get_initial_cache_state(batch_size=1)
+    predictions, hypotheses, texts = None, None, None
+    for step, (chunk, chunk_lengths) in enumerate(streaming_buffer):
+        with torch.inference_mode():
+            (predictions, texts, cache_last_channel, cache_last_time, hypotheses,) = model.conformer_stream_step(
+                processed_signal=chunk,
+                processed_signal_length=chunk_lengths,
+                cache_last_channel=cache_last_channel,
+                cache_last_time=cache_last_time,
+                keep_all_outputs=streaming_buffer.is_buffer_empty(),
+                previous_hypotheses=hypotheses,
+                previous_pred_out=predictions,
+                drop_extra_pre_encoded=0 if step == 0 else model.encoder.streaming_cfg.drop_extra_pre_encoded,
+                return_transcription=True,
+            )
+    text = texts[0] if isinstance(texts[0], str) else texts[0].text
+    return predictions[0].tolist(), text
+
+
+async def stream_concurrently(server, features, piece_sizes):
+    async def client(features, piece_size):
+        stream_id = server.open_stream()
+        for start in range(0, features.size(-1), piece_size):
+            server.push_features(stream_id, features[:, start : start + piece_size])
+            await asyncio.sleep(0)
+        server.close_stream(stream_id)
+        return [result async for result in server.results(stream_id)]
+
+    await server.start()
+    try:
+        return await asyncio.gather(*[client(feats, size) for feats, size in zip(features, piece_sizes)])
+    finally:
+        await server.stop()
+
+
+class TestCacheAwareStreamingServer:
+    @pytest.mark.unit
+    @pytest.mark.parametrize('model_type', ['ctc', 'rnnt'])
+    def test_matches_sequential_streaming(self, model_type):
+        model = get_streaming_model(model_type)
+        torch.manual_seed(1)
+        lengths, piece_sizes = [37, 80, 5, 64, 21], [7, 13, 2, 64, 1]
+        features = [torch.randn(FEAT_IN, length) for length in lengths]
+
+        server = CacheAwareStreamingServer(model, max_batch_size=3)
+        all_results = asyncio.run(stream_concurrently(server, features, piece_sizes))
+
+        assert server.num_active_streams == 0
+        # streams are batched together
+        assert server.num_stream_steps > server.num_steps
+        for feats, results in zip(features, all_results):
+            assert [result.is_final for result in results] == [False] * (len(results) - 1) + [True]
+            assert all(result.latency >= 0 for result in results)
+            predictions, text = stream_sequentially(model, feats)
+            assert results[-1].predictions == predictions
+            assert results[-1].text == text
+
+    @pytest.mark.unit
+    def test_invalid_streams(self):
+        server = CacheAwareStreamingServer(get_streaming_model('ctc'))
+        stream_id = server.open_stream()
+        server.close_stream(stream_id)
+        with pytest.raises(ValueError):
+            server.push_features(stream_id, torch.randn(FEAT_IN, 10))
+        with pytest.raises(ValueError):
+            server.close_stream(stream_id + 1)
+        with pytest.raises(ValueError):
+            CacheAwareStreamingServer(get_streaming_model('ctc'), max_batch_size=0)
+
+    @pytest.mark.unit
+    def test_rnnt_decoding_strategy(self):
+        model = get_streaming_model('rnnt')
+        model.change_decoding_strategy(DictConfig({'strategy': 'greedy_batch', 'greedy': {'max_symbols': 5}}))
+        with pytest.raises(ValueError, match='greedy'):
+            CacheAwareStreamingServer(model)
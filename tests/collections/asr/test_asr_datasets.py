@@ -15,6 +15,7 @@ import copy
 import filecmp
 import json
 import os
+import pickle
 import shutil
 import tempfile
 from unittest import mock
@@ -35,6 +36,7 @@ from nemo.collections.asr.data.audio_to_audio import (
     _audio_collate_fn,
 )
 from nemo.collections.asr.data.audio_to_text import (
+    AudioToCharDataset,
     DataStoreObject,
     TarredAudioToBPEDataset,
     TarredAudioToCharDataset,
@@ -52,6 +54,12 @@ from nemo.collections.asr.models.ctc_models import EncDecCTCModel
 from nemo.collections.asr.parts.utils.audio_utils import get_segment_start
 from nemo.collections.asr.parts.utils.manifest_utils import write_manifest
 from nemo.collections.common import tokenizers
+from nemo.collections.common.parts.preprocessing import collections, parsers
+from nemo.collections.common.parts.preprocessing.compiled_manifest import (
+    TokensCache,
+    build_compiled_manifest,
+    build_tokens_cache,
+)
 from nemo.utils import logging
 
 try:
@@ -641,6 +649,99 @@ class TestASRDatasets:
                 assert torch.equal(token_len, torch.tensor(5))
             assert cnt == num_samples
 
+    @pytest.mark.unit
+    @pytest.mark.parametrize('pretokenize', [False, True])
+    def test_compiled_manifest_char_dataset(self, pretokenize: bool):
+        sample_rate = 16000
+        durations = [0.5, 0.1, 0.3, 0.2, 0.4]
+        texts = ["a b c", "", "hello world", "xyz", "the end"]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_path = os.path.join(tmpdir, 'manifest_input.json')
+            with open(manifest_path, 'w', encoding='utf-8') as fp:
+                for i, (duration, text) in enumerate(zip(durations, texts)):
+                    audio_file = os.path.join(tmpdir, f"audio_{i}.wav")
+                    sf.write(audio_file, np.random.rand(int(duration * sample_rate)), sample_rate, 'float')
+                    entry = {'audio_filepath': audio_file, 'duration': duration, 'text': text, 'speaker': i}
+                    fp.write(json.dumps(entry) + '\n')
+
+            text_parser = None
+            if pretokenize:
+                text_parser = parsers.make_parser(labels=self.labels, name='en', unk_id=-1, blank_id=-1)
+            compiled_path = os.path.join(tmpdir, 'compiled_manifest')
+            assert build_compiled_manifest(manifest_path, compiled_path, parser=text_parser) == len(texts)
+
+            dataset_kwargs = dict(labels=self.labels, sample_rate=sample_rate, min_duration=0.15, max_duration=0.45)
+            ref_dataset = AudioToCharDataset(manifest_path, **dataset_kwargs)
+            dataset = AudioToCharDataset(compiled_path, **dataset_kwargs)
+            assert isinstance(dataset.manifest_processor.collection, collections.CompiledASRAudioText)
+            assert len(dataset) == len(ref_dataset) == 3
+
+            # collection must survive pickling into data loader workers
+            dataset = pickle.loads(pickle.dumps(dataset))
+            for idx in range(len(ref_dataset)):
+                assert dataset.get_manifest_sample(idx) == ref_dataset.get_manifest_sample(idx)
+                for value, ref_value in zip(dataset[idx], ref_dataset[idx]):
+                    assert torch.equal(value, ref_value)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('use_tokens_cache_dir', [False, True])
+    def test_lazy_tokenization_char_dataset(self, use_tokens_cache_dir: bool):
+        sample_rate = 16000
+        texts = ["a b c", "", "hello world", "xyz", "the end"]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_path = os.path.join(tmpdir, 'manifest_input.json')
+            with open(manifest_path, 'w', encoding='utf-8') as fp:
+                for i, text in enumerate(texts):
+                    audio_file = os.path.join(tmpdir, f"audio_{i}.wav")
+                    sf.write(audio_file, np.random.rand(sample_rate // 10), sample_rate, 'float')
+                    fp.write(json.dumps({'audio_filepath': audio_file, 'duration': 0.1, 'text': text}) + '\n')
+
+            tokens_cache_dir = os.path.join(tmpdir, 'tokens_cache') if use_tokens_cache_dir else None
+            ref_dataset = AudioToCharDataset(manifest_path, labels=self.labels, sample_rate=sample_rate)
+            for _ in range(2):
+                # the second dataset reuses the persistent tokens cache built by the first one
+                dataset = AudioToCharDataset(
+                    manifest_path,
+                    labels=self.labels,
+                    sample_rate=sample_rate,
+                    lazy_tokenization=True,
+                    tokens_cache_size=2,
+                    tokens_cache_dir=tokens_cache_dir,
+                )
+                assert all(sample.text_tokens is None for sample in dataset.manifest_processor.collection)
+                for idx in range(len(ref_dataset)):
+                    assert dataset.manifest_processor.process_text_by_id(
+                        idx
+                    ) == ref_dataset.manifest_processor.process_text_by_id(idx)
+                assert len(dataset.manifest_processor._tokens_lru._data) <= 2
+
+            if use_tokens_cache_dir:
+                assert len(os.listdir(tokens_cache_dir)) == 1
+
+    @pytest.mark.unit
+    def test_build_tokens_cache(self):
+        entries = [(1, [1, 2, 3]), (2, None), (3, []), (5, [4, 5, 6, 7, 8]), (6, [9])]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache_path = os.path.join(tmpdir, 'tokens')
+            # a small chunk size writes the tokens to disk in several chunks
+            assert build_tokens_cache(cache_path, iter(entries), 8, 'parser', chunk_size=2)
+            cache = pickle.loads(pickle.dumps(TokensCache(cache_path)))
+            assert [cache.get(id_) for id_ in range(9)] == [
+                None,
+                [1, 2, 3],
+                [],
+                [],
+                None,
+                [4, 5, 6, 7, 8],
+                [9],
+                None,
+                None,
+            ]
+
+            with pytest.raises(ValueError):
+                build_tokens_cache(os.path.join(tmpdir, 'unsorted'), iter(entries[::-1]), 8, 'parser')
+            assert os.listdir(tmpdir) == ['tokens']
+
     @pytest.mark.unit
     def test_feature_with_rttm_to_text_char_dataset(self):
         num_samples = 2
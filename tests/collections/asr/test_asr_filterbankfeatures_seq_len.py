@@ -12,12 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import pickle
+
 import librosa
 import numpy as np
 import pytest
 import torch
 
-from nemo.collections.asr.parts.preprocessing.features import FilterbankFeatures
+from nemo.collections.asr.parts.preprocessing.features import FilterbankFeatures, FilterbankFeaturesCPU
 
 
 class TestFilterbankFeatures:
@@ -97,3 +99,48 @@ class TestFilterbankFeatures:
             assert (
                 fb_spec.shape[2] == audio_length // hop_size
             ), f"{fb_spec.shape}, {nfft}, {window_size}, {hop_size}, {audio_length}, {audio_length // hop_size}"
+
+
+class TestFilterbankFeaturesCPU:
+    @pytest.mark.unit
+    @pytest.mark.parametrize(
+        'config',
+        [
+            {},
+            {'exact_pad': True},
+            {'normalize': 'all_features', 'frame_splicing': 2, 'mag_power': 1.0, 'log_zero_guard_type': 'clamp'},
+            {'preemph': None, 'normalize': None, 'pad_to': 0},
+        ],
+    )
+    @pytest.mark.parametrize('int16', [False, True])
+    def test_matches_per_utterance_features(self, config, int16):
+        fb_module = FilterbankFeatures(dither=0.0, **config).eval()
+        # pickling mirrors the use of the engine in data loader workers
+        engine = pickle.loads(pickle.dumps(FilterbankFeaturesCPU(fb_module, chunk_size=3, num_threads=2)))
+
+        rng = np.random.default_rng(0)
+        signals = [(rng.normal(size=length) * 3000).astype(np.int16) for length in rng.integers(800, 16000, size=7)]
+        float_signals = [signal.astype(np.float32) / 2 ** 15 for signal in signals]
+        features, features_len = engine(signals if int16 else float_signals)
+
+        assert features.shape[0] == len(signals)
+        for idx, signal in enumerate(float_signals):
+            ref_spec, ref_len = fb_module(torch.from_numpy(signal).unsqueeze(0), torch.tensor([len(signal)]))
+            assert features_len[idx] == ref_len[0]
+            assert torch.allclose(features[idx, :, : ref_len[0]], ref_spec[0, :, : ref_len[0]], atol=1e-4)
+            assert (features[idx, :, ref_len[0] :] == fb_module.pad_value).all()
+
+    @pytest.mark.unit
+    def test_padded_input(self):
+        engine = FilterbankFeaturesCPU(FilterbankFeatures(dither=0.0).eval())
+        signals = torch.randn(2, 4000)
+        lengths = torch.tensor([4000, 2500])
+        features, features_len = engine(signals, lengths)
+        single_features, _ = engine([signals[1, :2500]])
+        assert torch.allclose(features[1, :, : features_len[1]], single_features[0, :, : features_len[1]], atol=1e-5)
+
+    @pytest.mark.unit
+    def test_mixed_dtypes(self):
+        engine = FilterbankFeaturesCPU(FilterbankFeatures(dither=0.0).eval())
+        with pytest.raises(ValueError):
+            engine([np.zeros(1600, dtype=np.int16), np.zeros(1600, dtype=np.float32)])
@@ -0,0 +1,239 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import threading
+
+import numpy as np
+import pytest
+import soundfile as sf
+import torch
+from omegaconf import DictConfig
+
+from nemo.collections.asr.models import EncDecCTCModel
+from nemo.collections.asr.parts.utils.long_form_transcription import LongFormTranscriber
+from nemo.collections.asr.parts.utils.streaming_utils import (
+    AudioFeatureIterator,
+    AudioFileFeatureIterator,
+    FeatureFrameBufferer,
+)
+
+SAMPLE_RATE = 16000
+CHUNK_LEN = 0.8
+TOTAL_BUFFER = 2.0
+MODEL_STRIDE = 2
+
+
+@pytest.fixture(scope='module')
+def asr_model():
+    torch.manual_seed(0)
+    preprocessor = {
+        '_target_': 'nemo.collections.asr.modules.AudioToMelSpectrogramPreprocessor',
+        'sample_rate': SAMPLE_RATE,
+        'window_stride': 0.01,
+        'features': 64,
+        'dither': 0.0,
+    }
+    encoder = {
+        '_target_': 'nemo.collections.asr.modules.ConvASREncoder',
+        'feat_in': 64,
+        'activation': 'relu',
+        'conv_mask': True,
+        'jasper': [
+            {
+                'filters': 64,
+                'repeat': 1,
+                'kernel': [11],
+                'stride': [MODEL_STRIDE],
+                'dilation': [1],
+                'dropout': 0.0,
+                'residual': False,
+                'separable': True,
+                'se': False,
+                'se_context_size': -1,
+            }
+        ],
+    }
+    decoder = {
+        '_target_': 'nemo.collections.asr.modules.ConvASRDecoder',
+        'feat_in': 64,
+        'num_classes': 5,
+        'vocabulary': [' ', 'a', 'b', 'c', 'd'],
+    }
+    model = EncDecCTCModel(
+        cfg=DictConfig(
+            {
+                'sample_rate': SAMPLE_RATE,
+                'preprocessor': DictConfig(preprocessor),
+                'encoder': DictConfig(encoder),
+                'decoder': DictConfig(decoder),
+            }
+        )
+    )
+    return model.eval()
+
+
+@pytest.fixture()
+def audio_file(tmpdir):
+    samples = np.random.default_rng(0).standard_normal(int(7.3 * SAMPLE_RATE)).astype(np.float32) * 0.1
+    audio_filepath = os.path.join(tmpdir, 'audio.wav')
+    sf.write(audio_filepath, samples, SAMPLE_RATE, subtype='FLOAT')
+    return audio_filepath, samples
+
+
+def buffered_transcription(transcriber, samples):
+    """Token ids of the in-memory buffered transcription, as done by FrameBatchASR."""
+    model = transcriber.asr_model
+    pad = np.zeros(int(transcriber.delay * transcriber.model_stride_in_secs * SAMPLE_RATE), dtype=np.float32)
+    frame_reader = AudioFeatureIterator(
+        np.concatenate([samples, pad]), CHUNK_LEN, transcriber.raw_preprocessor, model.device
+    )
+    frame_bufferer = FeatureFrameBufferer(model, frame_len=CHUNK_LEN, batch_size=3, total_buffer=TOTAL_BUFFER)
+    frame_bufferer.set_frame_reader(frame_reader)
+
+    unmerged = []
+    frame_buffers = frame_bufferer.get_buffers_batch()
+    while len(frame_buffers) > 0:
+        signal = torch.tensor(np.stack(frame_buffers))
+        with torch.no_grad():
+            _, _, predictions = model(
+                processed_signal=signal, processed_signal_length=torch.full([len(signal)], signal.size(-1))
+            )
+        for prediction in predictions.tolist():
+            start = len(prediction) - 1 - transcriber.delay
+            unmerged += prediction[start : start + transcriber.tokens_per_chunk]
+        frame_buffers = frame_bufferer.get_buffers_batch()
+
+    tokens = []
+    previous = transcriber.blank_id
+    for token in unmerged:
+        if token != previous and token != transcriber.blank_id:
+            tokens.append(token)
+        previous = token
+    return tokens
+
+
+class TestAudioFileFeatureIterator:
+    @pytest.mark.unit
+    @pytest.mark.parametrize('num_samples', [1000, 3 * 12800, 3 * 12800 + 160, 5 * SAMPLE_RATE + 123])
+    @pytest.mark.parametrize('pad_len', [0.0, 0.5])
+    def test_same_frames_as_in_memory_features(self, asr_model, tmpdir, num_samples, pad_len):
+        transcriber = LongFormTranscriber(asr_model, chunk_len=CHUNK_LEN, total_buffer=TOTAL_BUFFER)
+        samples = np.random.default_rng(num_samples).standard_normal(num_samples).astype(np.float32) * 0.1
+        audio_filepath = os.path.join(tmpdir, 'audio.wav')
+        sf.write(audio_filepath, samples, SAMPLE_RATE, subtype='FLOAT')
+        preprocessor = transcriber.raw_preprocessor
+
+        padded_samples = np.pad(samples, (0, int(pad_len * SAMPLE_RATE)))
+        expected = list(AudioFeatureIterator(padded_samples, CHUNK_LEN, preprocessor, 'cpu'))
+        frames = list(AudioFileFeatureIterator(audio_filepath, CHUNK_LEN, preprocessor, 'cpu', pad_len=pad_len))
+
+        assert len(frames) == len(expected)
+        for frame, expected_frame in zip(frames, expected):
+            assert np.allclose(frame, np.asarray(expected_frame), atol=1e-5)
+
+    @pytest.mark.unit
+    def test_channel_selection(self, asr_model, tmpdir):
+        transcriber = LongFormTranscriber(asr_model, chunk_len=CHUNK_LEN, total_buffer=TOTAL_BUFFER)
+        samples = np.random.default_rng(0).standard_normal([SAMPLE_RATE, 2]).astype(np.float32) * 0.1
+        audio_filepath = os.path.join(tmpdir, 'audio.wav')
+        sf.write(audio_filepath, samples, SAMPLE_RATE, subtype='FLOAT')
+        preprocessor = transcriber.raw_preprocessor
+
+        for channel_selector, expected_samples in [('average', samples.mean(axis=1)), (1, samples[:, 1])]:
+            expected = list(AudioFeatureIterator(expected_samples, CHUNK_LEN, preprocessor, 'cpu'))
+            frames = list(
+                AudioFileFeatureIterator(
+                    audio_filepath, CHUNK_LEN, preprocessor, 'cpu', channel_selector=channel_selector
+                )
+            )
+            assert len(frames) == len(expected)
+            for frame, expected_frame in zip(frames, expected):
+                assert np.allclose(frame, np.asarray(expected_frame), atol=1e-5)
+
+    @pytest.mark.unit
+    def test_sample_rate_mismatch(self, asr_model, tmpdir):
+        transcriber = LongFormTranscriber(asr_model, chunk_len=CHUNK_LEN, total_buffer=TOTAL_BUFFER)
+        audio_filepath = os.path.join(tmpdir, 'audio.wav')
+        sf.write(audio_filepath, np.zeros(8000, dtype=np.float32), 8000)
+        with pytest.raises(ValueError, match='sample rate'):
+            transcriber.transcribe(audio_filepath)
+
+
+class TestLongFormTranscriber:
+    @pytest.mark.unit
+    @pytest.mark.parametrize('max_queue_size', [1, 4])
+    def test_same_transcription_as_buffered_inference(self, asr_model, audio_file, max_queue_size):
+        audio_filepath, samples = audio_file
+        transcriber = LongFormTranscriber(
+            asr_model,
+            chunk_len=CHUNK_LEN,
+            total_buffer=TOTAL_BUFFER,
+            batch_size=3,
+            model_stride=MODEL_STRIDE,
+            max_queue_size=max_queue_size,
+        )
+        hypothesis = transcriber.transcribe(audio_filepath)
+
+        expected_tokens = buffered_transcription(transcriber, samples)
+        assert len(expected_tokens) > 0
+        assert hypothesis.y_sequence == expected_tokens
+        assert hypothesis.text == asr_model.decoding.decode_tokens_to_str(expected_tokens)
+
+    @pytest.mark.unit
+    def test_word_timestamps(self, asr_model, audio_file):
+        audio_filepath, samples = audio_file
+        transcriber = LongFormTranscriber(
+            asr_model, chunk_len=CHUNK_LEN, total_buffer=TOTAL_BUFFER, batch_size=3, model_stride=MODEL_STRIDE
+        )
+        hypothesis = transcriber.transcribe(audio_filepath)
+        words = hypothesis.timestep['word']
+
+        assert len(words) > 1
+        assert [word['word'] for word in words] == hypothesis.text.split()
+        assert words == list(transcriber.iter_words(audio_filepath))
+        previous_end = 0
+        for word in words:
+            assert previous_end <= word['start_offset'] < word['end_offset']
+            assert 0.0 <= word['start'] <= word['end'] <= len(samples) / SAMPLE_RATE + TOTAL_BUFFER
+            previous_end = word['end_offset']
+
+    @pytest.mark.unit
+    def test_close_stops_the_pipeline(self, asr_model, audio_file):
+        audio_filepath, _ = audio_file
+        transcriber = LongFormTranscriber(
+            asr_model, chunk_len=CHUNK_LEN, total_buffer=TOTAL_BUFFER, batch_size=1, max_queue_size=1
+        )
+        num_threads = threading.active_count()
+        words = transcriber.iter_words(audio_filepath)
+        next(words)
+        words.close()
+        assert threading.active_count() == num_threads
+
+    @pytest.mark.unit
+    def test_errors_are_raised_to_the_caller(self, asr_model, audio_file, monkeypatch):
+        audio_filepath, _ = audio_file
+        transcriber = LongFormTranscriber(asr_model, chunk_len=CHUNK_LEN, total_buffer=TOTAL_BUFFER)
+
+        def failing_forward(*args, **kwargs):
+            raise RuntimeError("model failure")
+
+        monkeypatch.setattr(asr_model, 'forward', failing_forward)
+        with pytest.raises(RuntimeError, match='model failure'):
+            transcriber.transcribe(audio_filepath)
+
+    @pytest.mark.unit
+    def test_ctc_models_only(self):
+        with pytest.raises(ValueError, match='CTC'):
+            LongFormTranscriber(torch.nn.Linear(1, 1))
@@ -17,6 +17,8 @@ import torch
 from omegaconf import OmegaConf
 
 from nemo.collections.asr import modules
+from nemo.collections.asr.losses.rnnt import RNNTLoss
+from nemo.collections.asr.metrics.rnnt_wer import RNNTWER, RNNTDecoding, RNNTDecodingConfig
 from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis
 from nemo.core.utils import numba_utils
 from nemo.core.utils.numba_utils import __NUMBA_MINIMUM_VERSION__
@@ -307,3 +309,114 @@ class TestASRModulesBasicTests:
 
         # assert vocab size
         assert jointnet.num_classes_with_blank == vocab_size + 1
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('fused_batch_size', [2, 5])
+    @pytest.mark.parametrize('fused_time_chunk_size,fused_label_chunk_size', [(1, None), (4, None), (5, 3), (64, 1)])
+    @pytest.mark.parametrize('loss_kwargs', [{}, {'fastemit_lambda': 0.01}, {'clamp': 0.02}])
+    def test_RNNTJoint_fused_chunks(
+        self, fused_batch_size, fused_time_chunk_size, fused_label_chunk_size, loss_kwargs
+    ):
+        if not numba_utils.numba_cpu_is_supported(__NUMBA_MINIMUM_VERSION__):
+            pytest.skip('Numba RNNT loss is not supported.')
+
+        vocab = [str(x) for x in range(6)]
+        vocab_size = len(vocab)
+        batchsize = 5
+        encoder_hidden = 16
+        pred_hidden = 8
+        jointnet = {
+            'encoder_hidden': encoder_hidden,
+            'pred_hidden': pred_hidden,
+            'joint_hidden': 12,
+            'activation': 'relu',
+        }
+
+        torch.manual_seed(0)
+        enc = torch.randn(batchsize, encoder_hidden, 17)  # [B, D1, T]
+        dec = torch.randn(batchsize, pred_hidden, 8)  # [B, D2, U + 1]
+        transcripts = torch.randint(0, vocab_size, (batchsize, 7))
+        enc_lens = torch.tensor([17, 3, 11, 17, 1])
+        transcript_lens = torch.tensor([7, 0, 5, 2, 1])
+
+        fastemit_lambda, clamp = loss_kwargs.get('fastemit_lambda', 0.0), loss_kwargs.get('clamp', 0.0)
+        loss = RNNTLoss(num_classes=vocab_size, loss_name='warprnnt_numba', loss_kwargs=dict(loss_kwargs))
+        assert loss.fastemit_lambda == fastemit_lambda
+        assert loss.clamp == clamp
+
+        # unfused joint and loss
+        joint = modules.RNNTJoint(jointnet, num_classes=vocab_size)
+        inputs = [enc.clone().requires_grad_(True), dec.clone().requires_grad_(True)]
+        expected_loss = loss(
+            log_probs=joint(encoder_outputs=inputs[0], decoder_outputs=inputs[1]),
+            targets=transcripts,
+            input_lengths=enc_lens,
+            target_lengths=transcript_lens,
+        )
+        expected_grads = torch.autograd.grad(expected_loss, inputs + list(joint.parameters()))
+
+        # fused joint and loss, over chunks of the acoustic and target timesteps
+        fused_joint = modules.RNNTJoint(
+            jointnet,
+            num_classes=vocab_size,
+            fuse_loss_wer=True,
+            fused_batch_size=fused_batch_size,
+            fused_time_chunk_size=fused_time_chunk_size,
+            fused_label_chunk_size=fused_label_chunk_size,
+        )
+        fused_joint.load_state_dict(joint.state_dict())
+        decoding = RNNTDecoding(
+            RNNTDecodingConfig(),
+            modules.RNNTDecoder({'pred_hidden': pred_hidden, 'pred_rnn_layers': 1}, vocab_size),
+            fused_joint,
+            vocab,
+        )
+        fused_joint.set_loss(loss)
+        fused_joint.set_wer(RNNTWER(decoding))
+        inputs = [enc.clone().requires_grad_(True), dec.clone().requires_grad_(True)]
+        fused_loss, _, _, _ = fused_joint(
+            encoder_outputs=inputs[0],
+            decoder_outputs=inputs[1],
+            encoder_lengths=enc_lens,
+            transcripts=transcripts,
+            transcript_lengths=transcript_lens,
+        )
+        grads = torch.autograd.grad(fused_loss, inputs + list(fused_joint.parameters()))
+
+        assert torch.allclose(fused_loss, expected_loss, atol=1e-6, rtol=1e-5)
+        for grad, expected_grad in zip(grads, expected_grads):
+            assert torch.allclose(grad, expected_grad, atol=1e-5, rtol=1e-4)
+
+    @pytest.mark.unit
+    def test_RNNTJoint_fused_chunks_unsupported_loss(self):
+        jointnet = {'encoder_hidden': 4, 'pred_hidden': 4, 'joint_hidden': 4, 'activation': 'relu'}
+        joint = modules.RNNTJoint(jointnet, num_classes=3, fuse_loss_wer=True, fused_batch_size=2)
+        joint.set_fused_chunk_sizes(2)
+        # the pytorch loss cannot report its FastEmit and clamp parameters to the chunked loss
+        loss = RNNTLoss(num_classes=3, loss_name='pytorch')
+        with pytest.raises(ValueError):
+            loss.fastemit_lambda
+        joint.set_loss(loss)
+        with pytest.raises(ValueError):
+            joint(
+                encoder_outputs=torch.randn(2, 4, 3),
+                decoder_outputs=torch.randn(2, 4, 2),
+                encoder_lengths=torch.tensor([3, 2]),
+                transcripts=torch.randint(0, 3, (2, 1)),
+                transcript_lengths=torch.tensor([1, 1]),
+            )
+
+    @pytest.mark.unit
+    def test_RNNTJoint_fused_chunks_config(self):
+        jointnet = {'encoder_hidden': 4, 'pred_hidden': 4, 'joint_hidden': 4, 'activation': 'relu'}
+        joint = modules.RNNTJoint(jointnet, num_classes=3, fuse_loss_wer=True, fused_batch_size=2)
+        assert joint.fused_time_chunk_size is None
+
+        joint.set_fused_chunk_sizes(8, 2)
+        assert joint.fused_time_chunk_size == 8
+        assert joint.fused_label_chunk_size == 2
+
+        with pytest.raises(ValueError):
+            joint.set_fused_chunk_sizes(None, 2)
+        with pytest.raises(ValueError):
+            joint.set_fused_chunk_sizes(0)
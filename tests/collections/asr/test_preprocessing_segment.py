@@ -21,6 +21,7 @@ import numpy as np
 import pytest
 import soundfile as sf
 
+from nemo.collections.asr.parts.preprocessing.audio_cache import DecodedAudioCache
 from nemo.collections.asr.parts.preprocessing.perturb import NoisePerturbation, SilencePerturbation
 from nemo.collections.asr.parts.preprocessing.segment import AudioSegment
 from nemo.collections.asr.parts.utils.audio_utils import select_channels
@@ -201,3 +202,83 @@ class TestAudioSegment:
             _ = perturber.perturb(audio)
 
             assert len(audio._samples) == ori_audio_len + 2 * dur * self.sample_rate
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("num_channels", [1, 4])
+    @pytest.mark.parametrize("channel_selector", [None, 'average', 1])
+    @pytest.mark.parametrize("dtype", ['float32', 'int16'])
+    def test_from_file_audio_cache(self, num_channels, channel_selector, dtype):
+        """Test loading a signal through the decoded audio cache.
+        """
+        if num_channels == 1 and channel_selector == 1:
+            pytest.skip("Channel selector is not applicable to single-channel signals")
+
+        target_sr = self.sample_rate // 2
+        with tempfile.TemporaryDirectory() as test_dir:
+            audio_file = os.path.join(test_dir, 'audio.wav')
+            if num_channels == 1:
+                samples = np.random.rand(self.num_samples) - 0.5
+            else:
+                samples = np.random.rand(self.num_samples, num_channels) - 0.5
+            sf.write(audio_file, samples, self.sample_rate, 'float')
+
+            audio_cache = DecodedAudioCache(os.path.join(test_dir, 'cache'), dtype=dtype)
+            golden = AudioSegment.from_file(audio_file, target_sr=target_sr, channel_selector=channel_selector)
+            max_diff_tol = self.max_diff_tol if dtype == 'float32' else 2.0 ** -15
+
+            # first load populates the cache, second load is served from it
+            for _ in range(2):
+                uut = AudioSegment.from_file(
+                    audio_file, target_sr=target_sr, channel_selector=channel_selector, audio_cache=audio_cache
+                )
+                assert uut.sample_rate == target_sr
+                assert uut.num_channels == golden.num_channels
+                assert np.max(np.abs(uut.samples - golden.samples)) <= max_diff_tol
+            assert len(list(audio_cache._list_entries())) == 1
+
+            # in-place modifications do not change the cache
+            uut._samples *= 0.0
+            uut = AudioSegment.from_file(
+                audio_file, target_sr=target_sr, channel_selector=channel_selector, audio_cache=audio_cache
+            )
+            assert np.max(np.abs(uut.samples - golden.samples)) <= max_diff_tol
+
+            # a different segment of the file is a different entry
+            uut = AudioSegment.from_file(
+                audio_file,
+                target_sr=target_sr,
+                offset=0.5,
+                duration=1.0,
+                channel_selector=channel_selector,
+                audio_cache=audio_cache,
+            )
+            assert uut.num_samples == target_sr
+            assert len(list(audio_cache._list_entries())) == 2
+
+            # a modified file is decoded again
+            sf.write(audio_file, samples[: self.num_samples // 2], self.sample_rate, 'float')
+            os.utime(audio_file, ns=(0, 0))
+            uut = AudioSegment.from_file(
+                audio_file, target_sr=target_sr, channel_selector=channel_selector, audio_cache=audio_cache
+            )
+            assert uut.num_samples == golden.num_samples // 2
+
+    @pytest.mark.unit
+    def test_audio_cache_eviction(self):
+        """Test least recently used entries are evicted when the cache is full.
+        """
+        with tempfile.TemporaryDirectory() as test_dir:
+            entry_size = self.num_samples * 4
+            # room for two entries
+            audio_cache = DecodedAudioCache(test_dir, max_size_gb=2.5 * entry_size / 1024 ** 3)
+            keys = [str(idx) * 40 for idx in range(4)]
+            for idx, key in enumerate(keys[:2]):
+                assert audio_cache.save(key, np.full(self.num_samples, idx, dtype=np.float32))
+                os.utime(audio_cache._get_path(key), ns=(idx, idx))
+
+            # the first entry becomes the most recently used one
+            assert audio_cache.load(keys[0]) is not None
+            assert audio_cache.save(keys[2], np.zeros(self.num_samples, dtype=np.float32))
+            assert audio_cache.load(keys[1]) is None
+            assert np.all(audio_cache.load(keys[0]) == 0.0)
+            assert audio_cache.load(keys[2]) is not None
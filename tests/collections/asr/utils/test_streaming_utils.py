@@ -0,0 +1,65 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+from nemo.collections.asr.parts.utils.streaming_utils import (
+    lcs_alignment_merge_buffer,
+    lcs_suffix_table,
+    longest_common_subsequence_merge,
+)
+
+
+class TestLongestCommonSubsequenceMerge:
+    @pytest.mark.unit
+    @pytest.mark.parametrize("m, n", [(0, 3), (3, 0), (1, 1), (7, 5), (4, 12)])
+    def test_lcs_suffix_table(self, m, n):
+        rng = np.random.default_rng(m * 100 + n)
+        X, Y = rng.integers(0, 3, m).tolist(), rng.integers(0, 3, n).tolist()
+        expected = np.zeros((m + 1, n + 1), dtype=np.int64)
+        for i in range(1, m + 1):
+            for j in range(1, n + 1):
+                if X[i - 1] == Y[j - 1]:
+                    expected[i, j] = expected[i - 1, j - 1] + 1
+        np.testing.assert_array_equal(lcs_suffix_table(X, Y), expected)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize(
+        "X, Y, expected",
+        [
+            # complete merge
+            ([5, 6, 7, 8], [7, 8, 9, 10], [2, 0, 2]),
+            # partial merge, with a mismatch in the overlap
+            ([1, 2, 3, 4, 5], [2, 3, 9, 5, 6, 7], [1, 0, 4]),
+            # no overlap
+            ([1, 2, 3], [4, 5, 6], [3, 0, 0]),
+            ([1, 2, 3, 4], [4, 9, 9], [3, 0, 1]),
+            # repeated subsequences, the leftmost one is selected
+            ([3, 1, 2, 3, 1, 2], [1, 2, 7, 8], [4, 0, 2]),
+        ],
+    )
+    def test_longest_common_subsequence_merge(self, X, Y, expected):
+        result_idx, alignment = longest_common_subsequence_merge(X, Y)
+        assert result_idx == expected
+        assert alignment.shape == (len(X) + 1, len(Y) + 1)
+
+    @pytest.mark.unit
+    def test_lcs_alignment_merge_buffer(self):
+        buffer = lcs_alignment_merge_buffer([1, 2, 3, 4, 5, 6], [5, 6, 7, 8], delay=1, model=None)
+        assert buffer == [1, 2, 3, 4, 5, 6, 7, 8]
+        # only the beginning of the new data is aligned with the end of the buffer
+        buffer = lcs_alignment_merge_buffer([1, 2, 3], [3, 4, 1, 2, 3], delay=1, model=None, max_steps_per_timestep=2)
+        assert buffer == [1, 2, 3, 4, 1, 2, 3]
+        assert lcs_alignment_merge_buffer([1, 2], [2, 3], delay=0, model=None) == [1, 2, 2, 3]
@@ -0,0 +1,85 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+
+import numpy as np
+import pytest
+import torch
+
+from nemo.collections.nlp.data.language_modeling.megatron.blendable_dataset import CounterBlendableDataset
+
+
+class IndexDataset(torch.utils.data.Dataset):
+    def __init__(self, size):
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, idx):
+        return idx
+
+
+def get_samples(dataset):
+    return [dataset.get_ds_sample_idx(idx) for idx in range(len(dataset))]
+
+
+class TestCounterBlendableDataset:
+    @pytest.mark.unit
+    @pytest.mark.parametrize('num_datasets', [1, 2, 5, 16])
+    def test_blending(self, num_datasets):
+        weights = np.random.default_rng(num_datasets).random(num_datasets)
+        weights[-1] = 0.0 if num_datasets > 1 else 1.0
+        size = 2000
+        dataset = CounterBlendableDataset([IndexDataset(size)] * num_datasets, weights.tolist(), size)
+
+        counts = [0] * num_datasets
+        max_deviation = math.ceil(math.log2(num_datasets)) / 2 + 1e-9
+        for idx, (ds_idx, sample_idx) in enumerate(get_samples(dataset)):
+            # every dataset gives its samples in order
+            assert sample_idx == counts[ds_idx]
+            counts[ds_idx] += 1
+            assert np.abs(np.array(counts) - (idx + 1) * weights / weights.sum()).max() <= max_deviation
+            if idx % 100 == 0:
+                assert dataset.get_num_samples(idx + 1) == counts
+        assert dataset.get_num_samples() == counts
+        if num_datasets > 1:
+            assert counts[-1] == 0
+
+    @pytest.mark.unit
+    def test_weights_schedule(self):
+        datasets = [IndexDataset(1000)] * 3
+        weights = [0.2, 0.5, 0.3]
+        samples = get_samples(CounterBlendableDataset(datasets, weights, 1000))
+        scheduled_dataset = CounterBlendableDataset(
+            datasets, weights, 1000, weights_schedule=[(300, [0.6, 0.0, 0.4]), (700, weights)]
+        )
+        scheduled_samples = get_samples(scheduled_dataset)
+
+        # the samples before the new weights do not change, and the datasets continue after their last sample
+        assert scheduled_samples[:300] == samples[:300]
+        assert all(ds_idx != 1 for ds_idx, _ in scheduled_samples[300:700])
+        counts = [0] * 3
+        for ds_idx, sample_idx in scheduled_samples:
+            assert sample_idx == counts[ds_idx]
+            counts[ds_idx] += 1
+        assert scheduled_dataset.get_num_samples() == counts
+
+    @pytest.mark.unit
+    def test_large_index(self):
+        weights = [1.0, 2.0, 3.0, 4.0]
+        dataset = CounterBlendableDataset([IndexDataset(10 ** 10)] * 4, weights, 10 ** 10)
+        assert dataset.get_num_samples() == [10 ** 9, 2 * 10 ** 9, 3 * 10 ** 9, 4 * 10 ** 9]
+        assert dataset[10 ** 10 - 1] == dataset.get_ds_sample_idx(10 ** 10 - 1)[1]
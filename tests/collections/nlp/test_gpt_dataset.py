@@ -0,0 +1,137 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import numpy as np
+import pytest
+import torch
+
+from nemo.collections.nlp.data.language_modeling.megatron.base_dataset_utils import get_index_mapping_key
+from nemo.collections.nlp.data.language_modeling.megatron.gpt_dataset import (
+    _create_ltor_masks_and_position_ids,
+    _create_segment_ids_and_position_ids,
+    build_index_mapping_files,
+)
+from nemo.collections.nlp.modules.common.megatron.utils import (
+    get_attention_mask_from_segment_ids,
+    get_ltor_masks_and_position_ids,
+)
+
+EOD = 0
+
+
+class TestGPTDatasetMasks:
+    @pytest.mark.unit
+    def test_segment_ids(self):
+        tokens = torch.tensor([5, 6, EOD, 7, EOD, EOD, 8, 9])
+        segment_ids, loss_mask, position_ids = _create_segment_ids_and_position_ids(
+            tokens, EOD, reset_position_ids=True, reset_attention_mask=True, eod_mask_loss=True
+        )
+        assert segment_ids.tolist() == [0, 0, 0, 1, 1, 2, 3, 3]
+        assert position_ids.tolist() == [0, 1, 2, 0, 1, 0, 0, 1]
+        assert loss_mask.tolist() == [1, 1, 0, 1, 0, 0, 1, 1]
+
+        segment_ids, _, position_ids = _create_segment_ids_and_position_ids(
+            tokens, EOD, reset_position_ids=False, reset_attention_mask=False, eod_mask_loss=False
+        )
+        assert segment_ids.tolist() == [0] * 8
+        assert position_ids.tolist() == list(range(8))
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('reset_position_ids', [False, True])
+    @pytest.mark.parametrize('reset_attention_mask', [False, True])
+    @pytest.mark.parametrize('eod_mask_loss', [False, True])
+    def test_same_masks_as_dense_masks(self, reset_position_ids, reset_attention_mask, eod_mask_loss):
+        torch.manual_seed(0)
+        tokens = torch.randint(0, 4, (3, 64))
+        expected_mask, expected_loss_mask, expected_position_ids = get_ltor_masks_and_position_ids(
+            tokens, EOD, reset_position_ids, reset_attention_mask, eod_mask_loss
+        )
+
+        segment_ids = []
+        for b in range(tokens.shape[0]):
+            sample_segment_ids, loss_mask, position_ids = _create_segment_ids_and_position_ids(
+                tokens[b], EOD, reset_position_ids, reset_attention_mask, eod_mask_loss
+            )
+            attention_mask, _, _ = _create_ltor_masks_and_position_ids(
+                tokens[b], EOD, reset_position_ids, reset_attention_mask, eod_mask_loss
+            )
+            assert torch.equal(attention_mask, expected_mask[b if reset_attention_mask else 0])
+            assert torch.equal(loss_mask, expected_loss_mask[b])
+            assert torch.equal(position_ids, expected_position_ids[b])
+            segment_ids.append(sample_segment_ids)
+
+        attention_mask = get_attention_mask_from_segment_ids(torch.stack(segment_ids))
+        assert torch.equal(attention_mask, expected_mask.expand_as(attention_mask))
+
+
+def load_index_mappings(filename):
+    return [np.load(filename + suffix) for suffix in ['_doc_idx.npy', '_sample_idx.npy', '_shuffle_idx.npy']]
+
+
+class TestGPTDatasetIndexMappings:
+    @pytest.mark.unit
+    def test_index_mapping_key(self):
+        documents = np.arange(10, 20, dtype=np.int32)
+        sizes = np.random.default_rng(0).integers(1, 100, 30).astype(np.int32)
+        key = get_index_mapping_key([documents, sizes[documents]], seed=1)
+
+        assert key == get_index_mapping_key([documents.astype(np.int64), sizes[documents].copy()], seed=1)
+        assert key != get_index_mapping_key([documents, sizes[documents]], seed=2)
+        assert key != get_index_mapping_key([documents[::-1], sizes[documents[::-1]]], seed=1)
+        other_sizes = sizes.copy()
+        other_sizes[documents[0]] += 1
+        assert key != get_index_mapping_key([documents, other_sizes[documents]], seed=1)
+
+    @pytest.mark.unit
+    def test_cached_index_mappings(self, tmp_path):
+        sizes = np.random.default_rng(0).integers(1, 100, 200).astype(np.int32)
+        documents = np.arange(20, 200, dtype=np.int32)
+        seq_length, seed = 64, 1234
+        # the documents have about 150 samples per epoch
+        cache_dir = os.path.join(tmp_path, 'cache')
+        os.makedirs(cache_dir)
+
+        for num_samples in [50, 100, 400]:
+            filename, num_epochs = build_index_mapping_files(
+                'train', os.path.join(tmp_path, 'data'), documents, sizes, num_samples, seq_length, seed
+            )
+            cached_filename, cached_num_epochs = build_index_mapping_files(
+                'train',
+                os.path.join(tmp_path, 'data'),
+                documents,
+                sizes,
+                num_samples,
+                seq_length,
+                seed,
+                index_mapping_cache_dir=cache_dir,
+            )
+            assert os.path.dirname(cached_filename) == cache_dir
+            assert num_epochs == cached_num_epochs
+            for mapping, cached_mapping in zip(load_index_mappings(filename), load_index_mappings(cached_filename)):
+                assert np.array_equal(mapping, cached_mapping)
+
+        def get_cached_filename(name, data_prefix, num_samples):
+            filename, _ = build_index_mapping_files(
+                name, data_prefix, documents, sizes, num_samples, seq_length, seed, index_mapping_cache_dir=cache_dir
+            )
+            return filename
+
+        # shared by datasets with other names or paths, and by the number of samples of the same epochs
+        cached_filename = get_cached_filename('train', os.path.join(tmp_path, 'data'), 50)
+        assert get_cached_filename('valid', os.path.join(tmp_path, 'copy_of_data'), 50) == cached_filename
+        assert get_cached_filename('train', os.path.join(tmp_path, 'data'), 100) == cached_filename
+        assert get_cached_filename('train', os.path.join(tmp_path, 'data'), 400) != cached_filename
+        assert len(os.listdir(cache_dir)) == 2 * 3
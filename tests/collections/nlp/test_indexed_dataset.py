@@ -0,0 +1,107 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import numpy as np
+import pytest
+import torch
+from numpy.testing import assert_array_equal
+
+from nemo.collections.nlp.data.language_modeling.megatron.indexed_dataset import (
+    MMapIndexedDataset,
+    MMapIndexedDatasetBuilder,
+    data_file_path,
+    index_file_path,
+)
+
+
+@pytest.fixture()
+def indexed_dataset(tmp_path):
+    rng = np.random.default_rng(0)
+    prefix = os.path.join(tmp_path, 'documents')
+    builder = MMapIndexedDatasetBuilder(data_file_path(prefix), dtype=np.uint16)
+    documents = []
+    for size in rng.integers(1, 20, 50):
+        document = rng.integers(0, 2 ** 16, size, dtype=np.uint16)
+        builder.add_item(torch.from_numpy(document.astype(np.int64)))
+        builder.end_document()
+        documents.append(document)
+    builder.finalize(index_file_path(prefix))
+    return MMapIndexedDataset(prefix, skip_warmup=True), documents
+
+
+class TestMMapIndexedDataset:
+    @pytest.mark.unit
+    @pytest.mark.parametrize('adjacent', [True, False])
+    def test_get_concatenated(self, indexed_dataset, adjacent):
+        dataset, documents = indexed_dataset
+        rng = np.random.default_rng(1)
+        for _ in range(100):
+            num_docs = rng.integers(1, 6)
+            if adjacent:
+                first = rng.integers(0, len(documents) - num_docs + 1)
+                indices = np.arange(first, first + num_docs)
+            else:
+                indices = rng.choice(len(documents), num_docs, replace=False)
+            offset = rng.integers(0, len(documents[indices[0]]))
+            expected = np.concatenate([documents[indices[0]][offset:]] + [documents[i] for i in indices[1:]])
+            length = rng.integers(0, len(expected) + 1)
+
+            assert_array_equal(dataset.get_concatenated(indices, offset=offset, length=length), expected[:length])
+            assert_array_equal(dataset.get_concatenated(indices, offset=offset), expected)
+
+    @pytest.mark.unit
+    def test_get_concatenated_same_as_get(self, indexed_dataset):
+        dataset, documents = indexed_dataset
+        first, middle, last = 7, 3, 11
+        offset = len(documents[first]) - 1
+        expected = np.concatenate(
+            [
+                dataset.get(first, offset=offset),
+                dataset.get(middle),
+                dataset.get(last, length=len(documents[last]) - 1),
+            ]
+        )
+        length = len(expected)
+        assert_array_equal(dataset.get_concatenated([first, middle, last], offset=offset, length=length), expected)
+
+    @pytest.mark.unit
+    def test_merge_file(self, tmp_path):
+        rng = np.random.default_rng(2)
+        documents = [
+            [rng.integers(0, 1000, rng.integers(1, 10)) for _ in range(rng.integers(1, 4))] for _ in range(30)
+        ]
+
+        def build(prefix, docs, shard_prefixes=()):
+            builder = MMapIndexedDatasetBuilder(data_file_path(prefix), dtype=np.uint16)
+            for sentences in docs:
+                for sentence in sentences:
+                    builder.add_item(torch.from_numpy(sentence))
+                builder.end_document()
+            for shard_prefix in shard_prefixes:
+                builder.merge_file_(shard_prefix)
+            builder.finalize(index_file_path(prefix))
+            return MMapIndexedDataset(prefix, skip_warmup=True)
+
+        expected = build(os.path.join(tmp_path, 'expected'), documents)
+        shards = [os.path.join(tmp_path, f'shard_{i}') for i in range(3)]
+        for i, shard in enumerate(shards):
+            build(shard, documents[10 * i + 5 : 10 * (i + 1) + 5])
+        merged = build(os.path.join(tmp_path, 'merged'), documents[:5], shards)
+
+        assert_array_equal(merged.sizes, expected.sizes)
+        assert_array_equal(merged.doc_idx, expected.doc_idx)
+        for i in range(len(expected)):
+            assert_array_equal(merged[i], expected[i])
@@ -0,0 +1,282 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+import torch
+import torch.nn.functional as F
+from omegaconf import DictConfig
+
+from nemo.collections.nlp.modules.common.text_generation_scheduler import (
+    ContinuousBatchingScheduler,
+    MegatronGPTStepModel,
+    TextGenerationStepModel,
+)
+
+
+class TinyGPT(torch.nn.Module):
+    """Single layer, single head GPT."""
+
+    def __init__(self, vocab_size, hidden_size, max_sequence_length):
+        super().__init__()
+        self.word_embeddings = torch.nn.Embedding(vocab_size, hidden_size)
+        self.position_embeddings = torch.nn.Embedding(max_sequence_length, hidden_size)
+        self.query_key_value = torch.nn.Linear(hidden_size, 3 * hidden_size)
+        self.output_layer = torch.nn.Linear(hidden_size, vocab_size)
+
+    def embed(self, tokens, position_ids):
+        hidden = self.word_embeddings(tokens) + self.position_embeddings(position_ids)
+        return hidden, self.query_key_value(hidden).chunk(3, dim=-1)
+
+    def attend(self, hidden, query, key, value, mask):
+        scores = torch.matmul(query, key.transpose(1, 2)) / query.size(-1) ** 0.5
+        scores = scores.masked_fill(mask, -10000.0)
+        return self.output_layer(hidden + torch.matmul(F.softmax(scores, dim=-1), value))
+
+    def forward(self, tokens):
+        """Logits [batch, time, vocab] of full sequences, without cache."""
+        position_ids = torch.arange(tokens.size(1)).expand_as(tokens)
+        hidden, (query, key, value) = self.embed(tokens, position_ids)
+        mask = torch.ones(tokens.size(1), tokens.size(1), dtype=torch.bool).triu(1)
+        return self.attend(hidden, query, key, value, mask)
+
+
+class TinyGPTStepModel(TextGenerationStepModel):
+    """Step model of `TinyGPT`, with a Megatron-like key/value cache."""
+
+    def __init__(self, model, max_sequence_length):
+        self.model = model
+        self.max_sequence_length = max_sequence_length
+        self.key_memory, self.value_memory, self.current_sequence_len = None, None, 0
+
+    @property
+    def device(self):
+        return torch.device('cpu')
+
+    @torch.no_grad()
+    def forward(self, tokens, position_ids, attention_mask, allocate):
+        hidden, (query, key, value) = self.model.embed(tokens, position_ids)
+        if allocate:
+            self.key_memory = torch.zeros(tokens.size(0), self.max_sequence_length, key.size(-1))
+            self.value_memory = torch.zeros_like(self.key_memory)
+            self.current_sequence_len = 0
+        start = self.current_sequence_len
+        self.current_sequence_len += tokens.size(1)
+        end = self.current_sequence_len
+        self.key_memory[:, start:end] = key
+        self.value_memory[:, start:end] = value
+        mask = attention_mask[:, 0, start:end, :end]
+        return self.model.attend(hidden, query, self.key_memory[:, :end], self.value_memory[:, :end], mask)
+
+    def shift_cache(self, offset):
+        for memory in (self.key_memory, self.value_memory):
+            memory[:, :-offset] = memory[:, offset:].clone()
+        self.current_sequence_len -= offset
+
+
+class TinyAttention(torch.nn.Module):
+    """Holds a key/value cache with the layout of the Megatron attention layers: [sequence, batch, hidden]."""
+
+    def __init__(self):
+        super().__init__()
+        self.inference_key_memory = None
+        self.inference_value_memory = None
+        self.inference_current_sequence_len = 0
+
+
+class TinyMegatronGPT(torch.nn.Module):
+    """`TinyGPT` with the inference interface of the Megatron GPT module."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.gpt = model
+        self.attention = TinyAttention()
+
+    def forward(
+        self,
+        tokens,
+        position_ids,
+        attention_mask,
+        set_inference_key_value_memory=False,
+        inference_max_sequence_len=None,
+    ):
+        hidden, (query, key, value) = self.gpt.embed(tokens, position_ids)
+        attention = self.attention
+        if set_inference_key_value_memory:
+            attention.inference_key_memory = torch.zeros(inference_max_sequence_len, tokens.size(0), key.size(-1))
+            attention.inference_value_memory = torch.zeros_like(attention.inference_key_memory)
+            attention.inference_current_sequence_len = 0
+        start = attention.inference_current_sequence_len
+        attention.inference_current_sequence_len += tokens.size(1)
+        end = attention.inference_current_sequence_len
+        attention.inference_key_memory[start:end] = key.transpose(0, 1)
+        attention.inference_value_memory[start:end] = value.transpose(0, 1)
+        keys = attention.inference_key_memory[:end].transpose(0, 1)
+        values = attention.inference_value_memory[:end].transpose(0, 1)
+        return self.gpt.attend(hidden, query, keys, values, attention_mask[:, 0, start:end, :end])
+
+
+class TinyMegatronGPTModel(torch.nn.Module):
+    def __init__(self, model, max_sequence_length, **cfg):
+        super().__init__()
+        self.cfg = DictConfig({'encoder_seq_length': max_sequence_length, **cfg})
+        self.model = TinyMegatronGPT(model)
+
+
+class TinyTokenizer:
+    def __init__(self, vocab_size, eos_id):
+        self.vocab_size = vocab_size
+        self.eos_id = eos_id
+
+
+def greedy_generate(model, tokenizer, prompt, tokens_to_generate, max_sequence_length):
+    """Reference greedy generation of a single request, recomputing the full sequence at every step."""
+    tokens, logprob = list(prompt), []
+    with torch.no_grad():
+        while len(tokens) - len(prompt) < tokens_to_generate and len(tokens) < max_sequence_length:
+            log_probs = F.log_softmax(model(torch.tensor([tokens]))[0], dim=-1)
+            tokens.append(log_probs[-1, : tokenizer.vocab_size].argmax().item())
+            logprob = log_probs[torch.arange(len(tokens) - 1), torch.tensor(tokens[1:])].tolist()
+            if tokens[-1] == tokenizer.eos_id:
+                break
+    return tokens, logprob
+
+
+class TestContinuousBatchingScheduler:
+    vocab_size = 13
+    max_sequence_length = 24
+
+    @pytest.fixture
+    def model(self):
+        torch.manual_seed(0)
+        return TinyGPT(self.vocab_size, 16, self.max_sequence_length).eval()
+
+    def make_scheduler(self, model, max_batch_size, tokenizer=None):
+        step_model = TinyGPTStepModel(model, self.max_sequence_length)
+        tokenizer = tokenizer or TinyTokenizer(self.vocab_size, eos_id=0)
+        return ContinuousBatchingScheduler(step_model, tokenizer, max_batch_size)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('max_batch_size', [1, 2, 3])
+    @pytest.mark.parametrize('never_eos', [False, True])
+    def test_greedy_matches_sequential_generation(self, model, max_batch_size, never_eos):
+        # with `never_eos`, EOS is the last (padded) logit which is never sampled, so requests are only finished by
+        # their length, and requests longer than the cache exercise the compaction of the cache
+        if never_eos:
+            tokenizer = TinyTokenizer(self.vocab_size - 1, eos_id=self.vocab_size - 1)
+        else:
+            tokenizer = TinyTokenizer(self.vocab_size, eos_id=0)
+        requests = [([1, 2, 3], 5), ([4, 5], 12), ([6, 7, 8, 9, 10], 3), ([11], 30), ([2, 4, 6, 8], 9), ([3], 1)]
+        scheduler = self.make_scheduler(model, max_batch_size, tokenizer)
+        futures = [scheduler.submit(prompt, length, greedy=True) for prompt, length in requests]
+        scheduler.run_until_complete()
+
+        for (prompt, length), future in zip(requests, futures):
+            result = future.result()
+            expected_tokens, expected_logprob = greedy_generate(
+                model, tokenizer, prompt, length, self.max_sequence_length
+            )
+            assert result['token_ids'] == expected_tokens
+            assert torch.allclose(torch.tensor(result['logprob']), torch.tensor(expected_logprob), atol=1e-5)
+
+    @pytest.mark.unit
+    def test_requests_admitted_in_free_slots(self, model):
+        scheduler = self.make_scheduler(model, max_batch_size=2)
+        first = scheduler.submit([1, 2], 2, greedy=True, min_tokens_to_generate=2)
+        second = scheduler.submit([3, 4], 10, greedy=True, min_tokens_to_generate=10)
+        scheduler.step()
+        assert scheduler.num_active == 2
+        third = scheduler.submit([5], 3, greedy=True, min_tokens_to_generate=3)
+        # the first request finishes after its second token, and the third one takes its slot
+        scheduler.step()
+        assert first.done() and not second.done()
+        scheduler.step()
+        assert scheduler.num_active == 2
+        scheduler.run_until_complete()
+        assert len(second.result()['token_ids']) == 12
+        assert third.result()['token_ids'][:1] == [5]
+        assert not scheduler.has_work()
+
+    @pytest.mark.unit
+    def test_background_thread(self, model):
+        scheduler = self.make_scheduler(model, max_batch_size=2)
+        scheduler.start()
+        try:
+            futures = [scheduler.submit([idx + 1], 4, top_k=3, top_p=0.0) for idx in range(5)]
+            results = [future.result(timeout=60) for future in futures]
+        finally:
+            scheduler.stop()
+        for idx, result in enumerate(results):
+            assert result['token_ids'][0] == idx + 1
+            assert 1 < len(result['token_ids']) <= 5
+            assert all(0 <= token < self.vocab_size for token in result['token_ids'])
+
+    @pytest.mark.unit
+    def test_invalid_requests(self, model):
+        scheduler = self.make_scheduler(model, max_batch_size=2)
+        with pytest.raises(ValueError):
+            scheduler.submit([], 4)
+        with pytest.raises(ValueError):
+            scheduler.submit([1] * self.max_sequence_length, 4)
+        with pytest.raises(ValueError):
+            scheduler.submit([1], 0)
+
+
+class TestMegatronGPTStepModel:
+    vocab_size = 13
+    max_sequence_length = 12
+
+    @pytest.fixture
+    def model(self):
+        torch.manual_seed(0)
+        return TinyGPT(self.vocab_size, 16, self.max_sequence_length).eval()
+
+    @pytest.mark.unit
+    def test_step(self, model):
+        step_model = MegatronGPTStepModel(TinyMegatronGPTModel(model, self.max_sequence_length))
+        tokens = torch.tensor([[1, 2, 3, 4], [5, 6, 7, 8]])
+        position_ids = torch.arange(4).expand_as(tokens)
+        mask = torch.ones(self.max_sequence_length, self.max_sequence_length, dtype=torch.bool).triu(1)
+        mask = mask.expand(2, 1, -1, -1)
+
+        logits = step_model.forward(tokens[:, :3], position_ids[:, :3], mask, allocate=True)
+        assert torch.allclose(logits, model(tokens)[:, :3], atol=1e-5)
+
+        # after dropping the first cached position, the last token only attends to the following ones
+        step_model.shift_cache(1)
+        logits = step_model.forward(tokens[:, 3:], position_ids[:, 3:], mask, allocate=False)
+        assert step_model.model.model.attention.inference_current_sequence_len == 3
+        hidden, (query, key, value) = model.embed(tokens[:, 1:], position_ids[:, 1:])
+        expected = model.attend(hidden, query, key, value, mask[:, 0, :3, :3])[:, -1:]
+        assert torch.allclose(logits, expected, atol=1e-5)
+
+    @pytest.mark.unit
+    def test_greedy_matches_sequential_generation(self, model):
+        # EOS is never sampled, so that the long requests exercise the compaction of the cache
+        tokenizer = TinyTokenizer(self.vocab_size - 1, eos_id=self.vocab_size - 1)
+        step_model = MegatronGPTStepModel(TinyMegatronGPTModel(model, self.max_sequence_length))
+        scheduler = ContinuousBatchingScheduler(step_model, tokenizer, max_batch_size=2)
+        requests = [([1, 2, 3], 5), ([4, 5], 10), ([6], 3)]
+        futures = [scheduler.submit(prompt, length, greedy=True) for prompt, length in requests]
+        scheduler.run_until_complete()
+
+        for (prompt, length), future in zip(requests, futures):
+            expected_tokens, _ = greedy_generate(model, tokenizer, prompt, length, self.max_sequence_length)
+            assert future.result()['token_ids'] == expected_tokens
+
+    @pytest.mark.unit
+    def test_unsupported_models(self, model):
+        with pytest.raises(ValueError):
+            MegatronGPTStepModel(TinyMegatronGPTModel(model, self.max_sequence_length, tensor_model_parallel_size=2))
+        with pytest.raises(ValueError):
+            MegatronGPTStepModel(TinyMegatronGPTModel(model, self.max_sequence_length, position_embedding_type='rope'))
@@ -0,0 +1,140 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import random
+
+import numpy as np
+import pytest
+import torch
+
+from nemo.collections.nlp.data.language_modeling import text_memmap_dataset
+from nemo.collections.nlp.data.language_modeling.text_memmap_dataset import (
+    CSVMemMapDataset,
+    JSONLMemMapDataset,
+    TextMemMapDataset,
+    build_index_files,
+)
+
+
+def _reference_index(fn, newline_int):
+    """Index built with a python list, as by the original in-memory implementation."""
+    mdata = np.fromfile(fn, dtype=np.uint8)
+    midx = np.where(mdata == newline_int)[0].tolist()
+    if (len(midx) == 0) or (midx[-1] + 1 != len(mdata)):
+        midx = midx + [len(mdata) + 1]
+    while len(midx) > 1 and (midx[-1] - midx[-2]) < 2:
+        midx.pop(-1)
+    return np.asarray(midx)
+
+
+@pytest.fixture()
+def text_files(tmp_path):
+    rng = random.Random(0)
+    files = []
+    for idx in range(20):
+        text = ''.join(rng.choice('ab\n') for _ in range(rng.randint(1, 60)))
+        if idx % 4 == 0:
+            # empty lines at the end of the file
+            text += '\n' * rng.randint(1, 4)
+        fn = os.path.join(tmp_path, f"data_{idx}.txt")
+        with open(fn, 'w') as f:
+            f.write(text)
+        files.append(fn)
+    return files
+
+
+class TestTextMemMapIndex:
+    @pytest.mark.unit
+    def test_chunked_index_matches_reference(self, text_files, monkeypatch):
+        # small chunks, so that files are split across index building tasks
+        monkeypatch.setattr(text_memmap_dataset, '_INDEX_CHUNK_SIZE', 7)
+        build_index_files(text_files, newline_int=10, workers=2)
+        for fn in text_files:
+            expected = _reference_index(fn, 10)
+            assert np.array_equal(np.load(fn + '.idx.npy'), expected)
+            assert np.array_equal(text_memmap_dataset._build_index_from_memdata(fn, 10), expected)
+
+    @pytest.mark.unit
+    def test_index_rebuilt_when_file_changes(self, text_files):
+        fn = text_files[1]
+        build_index_files([fn], newline_int=10, workers=1)
+        with open(fn + '.idx.info') as f:
+            info = json.load(f)
+        assert info['file_size'] == os.path.getsize(fn)
+
+        with open(fn, 'a') as f:
+            f.write('\nnew last line\n')
+        dataset = TextMemMapDataset([fn], workers=1)
+        assert dataset[len(dataset) - 1] == 'new last line'
+
+        # an index which is older than its data file cannot be loaded
+        with open(fn, 'a') as f:
+            f.write('one more line\n')
+        with pytest.raises(RuntimeError):
+            dataset.load_file(fn)
+
+
+class TestTextMemMapBatchedAccess:
+    @pytest.mark.unit
+    def test_jsonl_get_batch(self, tmp_path):
+        files = []
+        for file_idx in range(3):
+            fn = os.path.join(tmp_path, f"data_{file_idx}.jsonl")
+            with open(fn, 'w') as f:
+                f.write(json.dumps({'header': True}) + '\n')
+                for line_idx in range(50):
+                    f.write(json.dumps({'text': f"file {file_idx} line {line_idx}"}) + '\n')
+            files.append(fn)
+        dataset = JSONLMemMapDataset(files, workers=1)
+
+        rng = random.Random(0)
+        indices = [rng.randrange(len(dataset)) for _ in range(100)] + [0, len(dataset) - 1]
+        assert dataset.get_batch(indices) == [dataset[idx] for idx in indices]
+        assert dataset.get_batch([]) == []
+        with pytest.raises(IndexError):
+            dataset.get_batch([len(dataset)])
+
+        # data loaders fetch whole batches with `get_batch`
+        loader = torch.utils.data.DataLoader(dataset, batch_size=8, shuffle=True, collate_fn=lambda batch: batch)
+        samples = [sample['text'] for batch in loader for sample in batch]
+        assert sorted(samples) == sorted(dataset[idx]['text'] for idx in range(len(dataset)))
+
+    @pytest.mark.unit
+    def test_csv_get_batch(self, tmp_path):
+        fn = os.path.join(tmp_path, "data.csv")
+        with open(fn, 'w') as f:
+            f.write('id,text\n')
+            for line_idx in range(30):
+                f.write(f"{line_idx},text {line_idx}\n")
+        dataset = CSVMemMapDataset([fn], workers=1)
+        indices = list(range(len(dataset)))[::-3]
+        assert dataset.get_batch(indices) == [f"text {idx}" for idx in indices]
+
+    @pytest.mark.unit
+    def test_getitem_override(self, tmp_path):
+        class UpperCaseDataset(TextMemMapDataset):
+            def __getitem__(self, idx):
+                return super().__getitem__(idx).upper()
+
+        fn = os.path.join(tmp_path, "data.txt")
+        with open(fn, 'w') as f:
+            for line_idx in range(20):
+                f.write(f"line {line_idx}\n")
+        dataset = UpperCaseDataset([fn], workers=1)
+
+        # data loaders must not bypass the `__getitem__` of child-classes
+        loader = torch.utils.data.DataLoader(dataset, batch_size=8, collate_fn=lambda batch: batch)
+        assert [sample for batch in loader for sample in batch] == [f"LINE {idx}" for idx in range(20)]
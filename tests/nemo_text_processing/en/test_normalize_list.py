@@ -0,0 +1,84 @@
+# Copyright (c) 2023, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import pytest
+
+from ..utils import CACHE_DIR
+
+try:
+    from nemo_text_processing.text_normalization.normalize import (
+        Normalizer,
+        get_grammar_cache_dir,
+        migrate_flat_grammar_cache,
+    )
+
+    PYNINI_AVAILABLE = True
+except (ImportError, ModuleNotFoundError):
+    PYNINI_AVAILABLE = False
+
+
+class TestNormalizeList:
+    normalizer_en = (
+        Normalizer(input_case='cased', lang='en', cache_dir=CACHE_DIR, overwrite_cache=False, post_process=True)
+        if PYNINI_AVAILABLE
+        else None
+    )
+
+    @pytest.mark.run_only_on('CPU')
+    @pytest.mark.unit
+    @pytest.mark.skipif(
+        not PYNINI_AVAILABLE,
+        reason="`pynini` not installed, please install via nemo_text_processing/pynini_install.sh",
+    )
+    def test_parallel_normalize_list(self):
+        texts = ["He paid $123 for this desk.", "It happened on Dec. 1. 2020.", "", "Call 123-456-7890 at 9 a.m."] * 3
+        expected = [self.normalizer_en.normalize(text) for text in texts]
+        assert self.normalizer_en.normalize_list(texts, batch_size=2, n_jobs=1) == expected
+        assert self.normalizer_en.normalize_list(texts, batch_size=2, n_jobs=2) == expected
+        assert self.normalizer_en.normalize_list([], n_jobs=2) == []
+
+    @pytest.mark.run_only_on('CPU')
+    @pytest.mark.unit
+    @pytest.mark.skipif(
+        not PYNINI_AVAILABLE,
+        reason="`pynini` not installed, please install via nemo_text_processing/pynini_install.sh",
+    )
+    def test_grammar_cache_dir(self, tmp_path):
+        whitelist = tmp_path / "whitelist.tsv"
+        whitelist.write_text("Dr.\tdoctor\n")
+        cache_dir = get_grammar_cache_dir(str(tmp_path), "en", str(whitelist))
+        assert cache_dir == get_grammar_cache_dir(str(tmp_path), "en", str(whitelist))
+        assert cache_dir != get_grammar_cache_dir(str(tmp_path), "de", str(whitelist))
+        # grammars are rebuilt when the whitelist is modified
+        whitelist.write_text("Dr.\tdoctor\nSt.\tstreet\n")
+        assert cache_dir != get_grammar_cache_dir(str(tmp_path), "en", str(whitelist))
+
+    @pytest.mark.run_only_on('CPU')
+    @pytest.mark.unit
+    @pytest.mark.skipif(
+        not PYNINI_AVAILABLE,
+        reason="`pynini` not installed, please install via nemo_text_processing/pynini_install.sh",
+    )
+    def test_migrate_flat_grammar_cache(self, tmp_path):
+        far_files = ["en_tn_True_deterministic_verbalizer.far", "_cased_en_tn_True_deterministic.far"]
+        for file_name in far_files + ["de_tn_True_deterministic_verbalizer.far"]:
+            (tmp_path / file_name).write_bytes(b"far")
+        grammar_cache_dir = get_grammar_cache_dir(str(tmp_path), "en")
+        assert migrate_flat_grammar_cache(str(tmp_path), grammar_cache_dir, "en")
+        assert sorted(os.listdir(grammar_cache_dir)) == sorted(far_files)
+        # grammars are only migrated to a missing cache dir
+        assert not migrate_flat_grammar_cache(str(tmp_path), grammar_cache_dir, "en")
+        assert not migrate_flat_grammar_cache(str(tmp_path), get_grammar_cache_dir(str(tmp_path), "es"), "es")